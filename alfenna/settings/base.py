@@ -280,6 +280,17 @@ EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', '0') in ('1', 'true', 'True')
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 MESSAGING_SECURE_BASE_URL = os.getenv('MESSAGING_SECURE_BASE_URL')
+MESSAGING_SMTP_BATCH_DELIVERY = env_flag("MESSAGING_SMTP_BATCH_DELIVERY", default=False)  # un lot = une connexion SMTP
+MESSAGING_SMTP_BATCH_SIZE = int(os.getenv("MESSAGING_SMTP_BATCH_SIZE", "50"))
+MESSAGING_SMTP_MAX_RECONNECTS = int(os.getenv("MESSAGING_SMTP_MAX_RECONNECTS", "3"))  # par lot
+MESSAGING_ASYNC_SMTP_CONCURRENCY = int(os.getenv("MESSAGING_ASYNC_SMTP_CONCURRENCY", "20"))  # sessions SMTP simultanées (email_async_worker)
+MESSAGING_TEMPLATE_CACHE_SIZE = int(os.getenv("MESSAGING_TEMPLATE_CACHE_SIZE", "256"))  # templates compilés en mémoire (LRU)
+MESSAGING_TEMPLATE_RESOLVE_TTL = float(os.getenv("MESSAGING_TEMPLATE_RESOLVE_TTL", "30"))  # slug/locale -> version, 0 = sans cache
+MESSAGING_CAMPAIGN_CHUNK_SIZE = int(os.getenv("MESSAGING_CAMPAIGN_CHUNK_SIZE", "500"))  # destinataires par transaction de fan-out
+MESSAGING_OUTBOX_ARCHIVE_AFTER_DAYS = int(os.getenv("MESSAGING_OUTBOX_ARCHIVE_AFTER_DAYS", "90"))  # SENT/FAILED/SUPPRESSED -> archive
+MESSAGING_OUTBOX_ARCHIVE_BATCH_SIZE = int(os.getenv("MESSAGING_OUTBOX_ARCHIVE_BATCH_SIZE", "500"))
+MESSAGING_METRICS_TOKEN = os.getenv("MESSAGING_METRICS_TOKEN", "")  # Bearer du scrape Prometheus (/email/metrics/), sinon staff
+MESSAGING_LINK_RESULT_CACHE_SECONDS = int(os.getenv("MESSAGING_LINK_RESULT_CACHE_SECONDS", "300"))  # rejoue le 1er clic vérif./désinscription, 0 = sans cache
 PASSWORD_RESET_TIMEOUT = int(os.getenv('PASSWORD_RESET_TIMEOUT_SECONDS', '3600'))
 
 # E-mail preflight / guard rails ------------------------------------------------------
@@ -305,6 +316,42 @@ EMAIL_RATE_LIMIT = {
     },
 }
 
+# Débit de livraison par couloir (token bucket, "600/min" ; vide = illimité) : le drain
+# ne réclame un e-mail que si chaque couloir (domaine destinataire, purpose, utilisateur)
+# a un jeton, les autres sont replanifiés.
+MESSAGING_DELIVERY_RATE_LIMITS = {
+    "domains": {
+        "gmail.com": os.getenv("MESSAGING_RATE_GMAIL", "1200/min"),
+        "googlemail.com": os.getenv("MESSAGING_RATE_GMAIL", "1200/min"),
+        "outlook.com": os.getenv("MESSAGING_RATE_MICROSOFT", "600/min"),
+        "hotmail.com": os.getenv("MESSAGING_RATE_MICROSOFT", "600/min"),
+        "live.com": os.getenv("MESSAGING_RATE_MICROSOFT", "600/min"),
+        "yahoo.com": os.getenv("MESSAGING_RATE_YAHOO", "600/min"),
+    },
+    "default_domain": os.getenv("MESSAGING_RATE_DEFAULT_DOMAIN", ""),
+    "purposes": {
+        "campaign": os.getenv("MESSAGING_RATE_CAMPAIGN", ""),
+    },
+    "user": os.getenv("MESSAGING_RATE_PER_USER", ""),
+}
+
+# Couloirs du drain : chaque lot est partagé par poids entre couloirs ; un couloir dont
+# l'e-mail dû le plus ancien dépasse slo_seconds passe d'abord. "queue" publie ses tâches
+# d'envoi dans une file Celery dédiée (les workers doivent l'écouter), vide = CELERY_TASK_ROUTES.
+MESSAGING_DELIVERY_LANES = {
+    "transactional": {
+        "weight": max(1, _int_env("MESSAGING_TRANSACTIONAL_WEIGHT", 4)),
+        "slo_seconds": max(1, _int_env("MESSAGING_TRANSACTIONAL_SLO_SECONDS", 60)),
+        "queue": os.getenv("MESSAGING_TRANSACTIONAL_QUEUE", ""),
+    },
+    "bulk": {
+        "weight": max(1, _int_env("MESSAGING_BULK_WEIGHT", 1)),
+        "slo_seconds": None,
+        "queue": os.getenv("MESSAGING_BULK_QUEUE", ""),
+    },
+}
+MESSAGING_BULK_NAMESPACES = ("marketing",)  # + purposes "campaign:<slug>"
+
 # --------------------------------------------------------------------------------------
 # Logging (propre, exploitable)
 # --------------------------------------------------------------------------------------
@@ -339,6 +386,26 @@ VIDEO_STREAM_CHUNK_BYTES = 512 * 1024
 
 # Feature flags -----------------------------------------------------------------------
 ANALYTICS_ENABLED = True
+# Raw events partitioning (PostgreSQL) — see `manage.py analytics_partitions`.
+ANALYTICS_RAW_PARTITION_GRANULARITY = os.getenv("ANALYTICS_RAW_PARTITION_GRANULARITY", "month")  # day|month
+ANALYTICS_RAW_PARTITION_AHEAD = _int_env("ANALYTICS_RAW_PARTITION_AHEAD", 3)
+ANALYTICS_EXPORT_DIR = Path(os.getenv("ANALYTICS_EXPORT_DIR", str(BASE_DIR / "exports" / "analytics")))
+# Incremental Parquet exports skip rows younger than the lag (still committing) and re-check id gaps.
+ANALYTICS_EXPORT_LAG_SECONDS = _int_env("ANALYTICS_EXPORT_LAG_SECONDS", 300)
+ANALYTICS_EXPORT_RECHECK_SECONDS = _int_env("ANALYTICS_EXPORT_RECHECK_SECONDS", 24 * 3600)
+# Week/month rollups chained after each daily rollup are rebuilt at most once per window.
+ANALYTICS_ROLLUP_COALESCE_SECONDS = _int_env("ANALYTICS_ROLLUP_COALESCE_SECONDS", 60)
+# Adaptive load-shedding of the collector (see apps/atelier/analytics/sampling.py).
+ANALYTICS_SAMPLING = {
+    "enabled": env_flag("ANALYTICS_SAMPLING_ENABLED", default=True),
+    "queue": "analytics",
+    "queue_depth_target": _int_env("ANALYTICS_SAMPLING_QUEUE_DEPTH_TARGET", 5000),
+    "lag_target_seconds": _int_env("ANALYTICS_SAMPLING_LAG_TARGET_SECONDS", 30),
+    "probe_interval_seconds": 5,
+    # Floors per event type; protected types (and payload.conversion=true) are never sampled.
+    "min_rates": {"view": 0.05, "scroll": 0.05, "heatmap": 0.02, "click": 0.25},
+    "protected_types": [],
+}
 
 # --------------------------------------------------------------------------------------
 # Redis / Celery
@@ -385,9 +452,12 @@ CELERY_RESULT_SERIALIZER = "json"
 CELERY_TASK_ROUTES = {
     "apps.messaging.tasks.send_outbox_email": {"queue": "email"},
     "apps.messaging.tasks.drain_outbox_batch": {"queue": "email"},
+    "apps.messaging.tasks.send_outbox_batch": {"queue": "email"},
     "apps.messaging.tasks.enqueue_render_from_template": {"queue": "email"},
     "apps.messaging.tasks.schedule_campaigns": {"queue": "email"},
     "apps.messaging.tasks.process_campaign": {"queue": "email"},
+    "apps.messaging.tasks.archive_outbox_emails": {"queue": "email"},
+    "apps.messaging.tasks.refresh_outbox_metrics": {"queue": "email"},
 }
 CELERY_BEAT_SCHEDULE = {
     "chatbot-purge-history": {
@@ -399,11 +469,44 @@ CELERY_BEAT_SCHEDULE = {
         "schedule": crontab(minute="*"),
         "options": {"queue": "email"},
     },
+    "analytics.raw_partitions": {
+        "task": "apps.atelier.analytics.tasks.maintain_raw_partitions",
+        "schedule": crontab(minute=15, hour=2),
+        "options": {"queue": "analytics"},
+    },
+    "analytics.export_parquet": {
+        "task": "apps.atelier.analytics.tasks.export_raw_parquet_incremental",
+        "schedule": crontab(minute=30, hour=3),
+        "options": {"queue": "analytics"},
+    },
+    "leads.drain_pending": {
+        "task": "leads.drain_pending_leads",
+        "schedule": crontab(minute="*"),
+        "options": {"queue": "leads"},
+    },
+    "flowforms.flush_touches": {
+        "task": "flowforms.flush_session_touches",
+        "schedule": crontab(minute="*"),
+    },
+    "flowforms.recover_drafts": {
+        "task": "flowforms.recover_flow_drafts",
+        "schedule": crontab(minute="*/5"),
+    },
     "messaging.campaigns": {
         "task": "apps.messaging.tasks.schedule_campaigns",
         "schedule": crontab(minute="*/5"),
         "options": {"queue": "email"},
     },
+    "messaging.outbox_metrics": {
+        "task": "apps.messaging.tasks.refresh_outbox_metrics",
+        "schedule": crontab(minute="*"),
+        "options": {"queue": "email"},
+    },
+    "messaging.archive_outbox": {
+        "task": "apps.messaging.tasks.archive_outbox_emails",
+        "schedule": crontab(minute=40, hour=4),
+        "options": {"queue": "email"},
+    },
 }
 
 REST_FRAMEWORK = {
@@ -425,6 +528,15 @@ REST_FRAMEWORK = {
 LEADS_SIGNING_SECRET = os.getenv("LEADS_SIGNING_SECRET", "change-me-please")
 LEADS_POLICY_YAML = os.getenv("LEADS_POLICY_YAML", os.path.join(BASE_DIR, "configs", "leads_fields.yaml"))
 LEADS_REQUIRED_PRIORITY = ["db", "yaml", "settings"]  # ordre de fusion
+# Fenêtres glissantes antispam (moteur Lua Redis) ; vide => taux DRF leads_ip / leads_email
+LEADS_RATE_LIMITS = {}  # ex. {"ip": "30/min", "email": "10/min", "form_kinds": {"checkout_intent": {"ip": "10/min"}}}
+LEADS_POLICY_RELOAD_SECONDS = float(os.getenv("LEADS_POLICY_RELOAD_SECONDS", "2"))  # stat() du YAML, 0 = à chaque appel
+LEADS_BATCH_MAX_ITEMS = int(os.getenv("LEADS_BATCH_MAX_ITEMS", "500"))  # /collect/batch/
+LEADS_INGEST_TOKEN = os.getenv("LEADS_INGEST_TOKEN", "")  # Bearer des partenaires pour /collect/batch/ (vide = staff uniquement)
+LEADS_PROCESS_BATCH_SIZE = int(os.getenv("LEADS_PROCESS_BATCH_SIZE", "200"))  # leads réservés par lot worker
+LEADS_EXPORT_TOKEN = os.getenv("LEADS_EXPORT_TOKEN", "")  # Bearer de la synchro CRM (vide = staff uniquement)
+LEADS_EXPORT_CHUNK_SIZE = int(os.getenv("LEADS_EXPORT_CHUNK_SIZE", "2000"))  # lignes lues par aller-retour curseur
+LEADS_EXPORT_SYNC_LAG_SECONDS = int(os.getenv("LEADS_EXPORT_SYNC_LAG_SECONDS", "120"))  # synchro : ignore les lignes modifiées depuis moins (commits tardifs)
 
 # --- Logs structurés conseillés ---
 LOGGING["loggers"].update({
@@ -551,6 +663,13 @@ FLOWFORMS_ENDPOINT_COLLECT_URLNAME = "leads:collect"
 FLOWFORMS_REQUIRE_SIGNED = True
 FLOWFORMS_SIGN_URLNAME = "leads:sign"
 FLOWFORMS_COMPONENT_ENABLED = True
+# last_touch_at via sorted set Redis + flush beat (False => UPDATE à chaque GET)
+FLOWFORMS_TOUCH_WRITE_BEHIND = True
+# "db" : FlowSession/Lead écrits à chaque step ; "draft" : brouillon en cache (TTL),
+# écrit en base aux checkpoints (identité, steps checkpoint: true, soumission finale)
+FLOWFORMS_STORAGE_BACKEND = "db"
+FLOWFORMS_DRAFT_TTL_SECONDS = 2 * 24 * 3600
+FLOWFORMS_DRAFT_RECOVER_AFTER_SECONDS = 15 * 60
 
 # 🔵 Étape 2 — flag d’activation du wiring Compose/Children pour forms/shell
 FLOWFORMS_USE_CHILD_COMPOSE = False
@@ -1,7 +1,13 @@
 """Admin registrations for Atelier analytics."""
 from django.contrib import admin
 
-from .analytics.models import AnalyticsEventRaw, ComponentStatDaily, HeatmapBucketDaily
+from .analytics.models import (
+    AnalyticsEventRaw,
+    ComponentStatDaily,
+    ComponentStatRollup,
+    HeatmapBucketDaily,
+    HeatmapBucketRollup,
+)
 
 
 @admin.register(ComponentStatDaily)
@@ -37,6 +43,41 @@ class HeatmapBucketDailyAdmin(admin.ModelAdmin):
     ordering = ("-date", "page_id", "device", "bucket_x", "bucket_y")
 
 
+@admin.register(ComponentStatRollup)
+class ComponentStatRollupAdmin(admin.ModelAdmin):
+    list_display = (
+        "tier",
+        "period_start",
+        "site_version",
+        "page_id",
+        "slot_id",
+        "component_alias",
+        "impressions",
+        "clicks",
+        "avg_scroll_pct",
+        "uu_count",
+    )
+    list_filter = ("tier", "period_start", "site_version", "page_id")
+    search_fields = ("page_id", "slot_id", "component_alias")
+    ordering = ("-period_start", "tier", "page_id", "slot_id")
+
+
+@admin.register(HeatmapBucketRollup)
+class HeatmapBucketRollupAdmin(admin.ModelAdmin):
+    list_display = (
+        "tier",
+        "period_start",
+        "site_version",
+        "page_id",
+        "device",
+        "bucket_x",
+        "bucket_y",
+        "hits",
+    )
+    list_filter = ("tier", "period_start", "site_version", "page_id", "device")
+    ordering = ("-period_start", "tier", "page_id", "device", "bucket_x", "bucket_y")
+
+
 @admin.register(AnalyticsEventRaw)
 class AnalyticsEventRawAdmin(admin.ModelAdmin):
     list_display = ("ts", "event_type", "page_id", "slot_id", "component_alias", "request_id")
@@ -1,10 +1,369 @@
 """
-Exports (placeholder).
-Étape 1: signatures neutres.
+Exports of raw analytics events for offline analysis.
+
+``export_raw_parquet`` streams ``AnalyticsEventRaw`` with a server-side cursor
+and writes compressed Parquet files laid out Hive-style
+(``day=YYYY-MM-DD/site_version=.../page_id=.../part-*.parquet``) so that
+pyarrow/DuckDB/Spark can prune on read. Memory stays bounded: rows are
+buffered per partition and flushed as row groups, and the number of open
+writers is capped. A watermark file (``_watermark.json``) records the last
+exported id so nightly runs only process new rows.
+
+Ids are assigned at insert but rows become visible at commit, so an
+incremental run stops before the first row created less than
+``ANALYTICS_EXPORT_LAG_SECONDS`` ago. Ids missing from the exported range
+(a transaction still open, or rolled back) are kept in the watermark as
+``pending`` and looked up again by the following runs for
+``ANALYTICS_EXPORT_RECHECK_SECONDS``; a late row is exported once, when it
+shows up.
 """
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import timedelta
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import uuid
+
+from django.conf import settings
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from .models import AnalyticsEventRaw
+
+try:  # pragma: no cover - optional dependency
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - library not installed in some environments
+    pa = None  # type: ignore
+    pq = None  # type: ignore
+
+
+log = logging.getLogger("apps.atelier.analytics.exporters")
+
+WATERMARK_FILE = "_watermark.json"
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_ROW_GROUP_SIZE = 50_000
+DEFAULT_MAX_BUFFERED_ROWS = 200_000
+DEFAULT_MAX_OPEN_WRITERS = 32
+DEFAULT_COMPRESSION = "zstd"
+DEFAULT_LAG_SECONDS = 300
+DEFAULT_RECHECK_SECONDS = 24 * 3600
+MAX_PENDING_IDS = 10_000
+
+_STRING_COLUMNS = (
+    "event_uuid",
+    "request_id",
+    "site_version",
+    "page_id",
+    "slot_id",
+    "component_alias",
+    "event_type",
+    "user_id",
+    "consent",
+    "lang",
+    "device",
+    "path",
+    "referer",
+    "ua_hash",
+    "ip_hash",
+)
+_COLUMNS = ("id", "ts", *_STRING_COLUMNS, "payload", "sample_rate", "created_at")
+
+
+class ExportDependencyError(RuntimeError):
+    """Raised when the optional Parquet dependency (pyarrow) is missing."""
+
+
+@dataclass
+class ExportResult:
+    rows: int = 0
+    files: List[str] = field(default_factory=list)
+    first_id: Optional[int] = None
+    last_id: Optional[int] = None
+    pending: int = 0  # ids still missing below the watermark, re-checked by later runs
+
+
+def default_export_dir() -> Path:
+    configured = getattr(settings, "ANALYTICS_EXPORT_DIR", None)
+    if configured:
+        return Path(configured)
+    return Path(settings.BASE_DIR) / "exports" / "analytics"
+
+
+def _schema():
+    timestamp = pa.timestamp("us", tz="UTC")
+    fields = [pa.field("id", pa.int64()), pa.field("ts", timestamp)]
+    fields += [pa.field(name, pa.string()) for name in _STRING_COLUMNS]
+    fields += [
+        pa.field("payload", pa.string()),
+        pa.field("sample_rate", pa.float64()),
+        pa.field("created_at", timestamp),
+    ]
+    return pa.schema(fields)
+
+
+def _lag_seconds() -> int:
+    return max(int(getattr(settings, "ANALYTICS_EXPORT_LAG_SECONDS", DEFAULT_LAG_SECONDS)), 0)
+
+
+def _recheck_seconds() -> int:
+    return max(int(getattr(settings, "ANALYTICS_EXPORT_RECHECK_SECONDS", DEFAULT_RECHECK_SECONDS)), 0)
+
+
+def read_watermark_state(target_dir: Path | str) -> Tuple[int, Dict[int, str]]:
+    """Return ``(last_id, {pending_id: first_missed_at})`` from the watermark file."""
+    path = Path(target_dir) / WATERMARK_FILE
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        pending = {int(pk): str(seen) for pk, seen in data.get("pending") or []}
+        return int(data.get("last_id") or 0), pending
+    except (FileNotFoundError, ValueError, TypeError):
+        return 0, {}
+
+
+def read_watermark(target_dir: Path | str) -> int:
+    return read_watermark_state(target_dir)[0]
+
+
+def write_watermark(
+    target_dir: Path | str, last_id: int, *, rows: int, pending: Optional[Dict[int, str]] = None
+) -> None:
+    path = Path(target_dir) / WATERMARK_FILE
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(
+        json.dumps({
+            "last_id": int(last_id),
+            "rows": int(rows),
+            "exported_at": timezone.now().isoformat(),
+            "pending": sorted([pk, seen] for pk, seen in (pending or {}).items()),
+        }),
+        encoding="utf-8",
+    )
+    os.replace(tmp, path)
+
+
+def _export_bound(since_id: int, lag_seconds: int) -> Optional[int]:
+    """Highest id to export: the rows before the first one still inside the lag window."""
+    qs = AnalyticsEventRaw.objects.filter(id__gt=since_id)
+    if lag_seconds:
+        cutoff = timezone.now() - timedelta(seconds=lag_seconds)
+        first_recent = qs.filter(created_at__gt=cutoff).aggregate(low=Min("id"))["low"]
+        qs = qs.filter(created_at__lte=cutoff)
+        if first_recent is not None:
+            qs = qs.filter(id__lt=first_recent)
+    return qs.aggregate(top=Max("id"))["top"]
+
+
+def _partition_dir(day: str, site_version: str, page_id: str) -> str:
+    def _clean(value: str) -> str:
+        return (value or "_").replace("/", "_").replace("=", "_")
+
+    return os.path.join(f"day={day}", f"site_version={_clean(site_version)}", f"page_id={_clean(page_id)}")
+
+
+class _PartitionedParquetWriter:
+    """Buffer rows per partition and flush them as Parquet row groups."""
+
+    def __init__(
+        self,
+        root: Path,
+        *,
+        compression: str,
+        row_group_size: int,
+        max_buffered_rows: int,
+        max_open_writers: int,
+    ) -> None:
+        self.root = root
+        self.compression = compression
+        self.row_group_size = max(int(row_group_size), 1)
+        self.max_buffered_rows = max(int(max_buffered_rows), self.row_group_size)
+        self.max_open_writers = max(int(max_open_writers), 1)
+        self.schema = _schema()
+        self.run_id = timezone.now().strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:8]
+        self._buffers: Dict[str, Dict[str, list]] = {}
+        self._buffered = 0
+        self._writers: "OrderedDict[str, Tuple[Any, Path, Path]]" = OrderedDict()
+        self._parts: Dict[str, int] = {}
+        self.files: List[str] = []
+
+    def add(self, partition: str, row: Dict[str, Any]) -> None:
+        buffer = self._buffers.get(partition)
+        if buffer is None:
+            buffer = {name: [] for name in _COLUMNS}
+            self._buffers[partition] = buffer
+        for name in _COLUMNS:
+            buffer[name].append(row[name])
+        self._buffered += 1
+        if len(buffer["id"]) >= self.row_group_size:
+            self._flush(partition)
+        elif self._buffered >= self.max_buffered_rows:
+            largest = max(self._buffers, key=lambda key: len(self._buffers[key]["id"]))
+            self._flush(largest)
+
+    def _writer_for(self, partition: str):
+        entry = self._writers.get(partition)
+        if entry is not None:
+            self._writers.move_to_end(partition)
+            return entry[0]
+        if len(self._writers) >= self.max_open_writers:
+            oldest, _ = next(iter(self._writers.items()))
+            self._close(oldest)
+        directory = self.root / partition
+        directory.mkdir(parents=True, exist_ok=True)
+        part = self._parts.get(partition, 0)
+        self._parts[partition] = part + 1
+        final = directory / f"part-{self.run_id}-{part:05d}.parquet"
+        tmp = final.with_suffix(".parquet.tmp")
+        writer = pq.ParquetWriter(str(tmp), self.schema, compression=self.compression)
+        self._writers[partition] = (writer, tmp, final)
+        return writer
+
+    def _flush(self, partition: str) -> None:
+        buffer = self._buffers.pop(partition, None)
+        if not buffer or not buffer["id"]:
+            return
+        size = len(buffer["id"])
+        table = pa.Table.from_pydict(buffer, schema=self.schema)
+        self._writer_for(partition).write_table(table, row_group_size=self.row_group_size)
+        self._buffered -= size
+
+    def _close(self, partition: str) -> None:
+        writer, tmp, final = self._writers.pop(partition)
+        writer.close()
+        os.replace(tmp, final)
+        self.files.append(str(final))
+
+    def close(self) -> None:
+        for partition in list(self._buffers):
+            self._flush(partition)
+        for partition in list(self._writers):
+            self._close(partition)
+
+    def abort(self) -> None:
+        """Discard everything written by this run so a retry starts clean."""
+        self._buffers.clear()
+        for partition in list(self._writers):
+            writer, tmp, _ = self._writers.pop(partition)
+            try:
+                writer.close()
+            finally:
+                tmp.unlink(missing_ok=True)
+        for path in self.files:
+            Path(path).unlink(missing_ok=True)
+        self.files = []
+
+
+def _iter_rows(
+    since_id: int, until_id: int, chunk_size: int, extra_ids: Iterable[int] = ()
+) -> Iterable[Dict[str, Any]]:
+    selection = Q(id__gt=since_id, id__lte=until_id)
+    extra_ids = list(extra_ids)
+    if extra_ids:
+        selection |= Q(id__in=extra_ids)
+    qs = (
+        AnalyticsEventRaw.objects.filter(selection)
+        .order_by("id")
+        .values_list(*_COLUMNS)
+    )
+    for values in qs.iterator(chunk_size=chunk_size):
+        row = dict(zip(_COLUMNS, values))
+        row["event_uuid"] = str(row["event_uuid"]) if row["event_uuid"] else ""
+        row["payload"] = json.dumps(row["payload"] or {}, separators=(",", ":"), sort_keys=True)
+        yield row
+
+
+def export_raw_parquet(
+    target_dir: Path | str | None = None,
+    *,
+    incremental: bool = True,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+    max_buffered_rows: int = DEFAULT_MAX_BUFFERED_ROWS,
+    max_open_writers: int = DEFAULT_MAX_OPEN_WRITERS,
+    compression: str = DEFAULT_COMPRESSION,
+) -> ExportResult:
+    """Export raw events to partitioned Parquet files under ``target_dir``.
+
+    With ``incremental`` the export starts after the stored watermark, holds
+    back rows younger than the lag and re-checks the pending ids; the
+    watermark is advanced only once every file has been written, so a failed
+    run is simply retried from the same point.
+    """
+    if pa is None or pq is None:
+        raise ExportDependencyError("pyarrow is required for Parquet exports (pip install pyarrow).")
+
+    root = Path(target_dir) if target_dir else default_export_dir()
+    root.mkdir(parents=True, exist_ok=True)
+    since_id, pending = read_watermark_state(root) if incremental else (0, {})
+    now = timezone.now()
+    if pending:
+        expired = (now - timedelta(seconds=_recheck_seconds())).isoformat()
+        pending = {pk: seen for pk, seen in pending.items() if seen >= expired}
+    # Snapshot the upper bound so rows ingested during the export wait for the next run.
+    if incremental:
+        until_id = _export_bound(since_id, _lag_seconds())
+    else:
+        until_id = AnalyticsEventRaw.objects.aggregate(top=Max("id"))["top"]
+    result = ExportResult()
+    if until_id is None and not pending:
+        return result
+    until_id = until_id if until_id is not None else since_id
+
+    default_tz = timezone.get_default_timezone()
+    writer = _PartitionedParquetWriter(
+        root,
+        compression=compression,
+        row_group_size=row_group_size,
+        max_buffered_rows=max_buffered_rows,
+        max_open_writers=max_open_writers,
+    )
+    # Gaps are only tracked above an id already seen: on a first run the table
+    # may start anywhere (purged rows, rolled-back inserts), not at 1.
+    previous = since_id or None
+    missed_at = now.isoformat()
+    try:
+        for row in _iter_rows(since_id, until_id, chunk_size, extra_ids=pending):
+            if row["id"] in pending:
+                del pending[row["id"]]
+            elif previous is not None and row["id"] > previous + 1 and len(pending) < MAX_PENDING_IDS:
+                gap = range(previous + 1, min(row["id"], previous + 1 + MAX_PENDING_IDS - len(pending)))
+                pending.update((pk, missed_at) for pk in gap)
+            if row["id"] > since_id:
+                previous = row["id"]
+            day = timezone.localtime(row["ts"], default_tz).date().isoformat()
+            writer.add(_partition_dir(day, row["site_version"], row["page_id"]), row)
+            if result.first_id is None:
+                result.first_id = row["id"]
+            result.last_id = row["id"]
+            result.rows += 1
+        writer.close()
+    except Exception:
+        writer.abort()
+        raise
+
+    result.files = writer.files
+    result.pending = len(pending)
+    if incremental:
+        write_watermark(root, until_id, rows=result.rows, pending=pending)
+    log.info(
+        "export_raw_parquet rows=%s files=%s ids=%s..%s pending=%s target=%s",
+        result.rows,
+        len(result.files),
+        result.first_id,
+        result.last_id,
+        result.pending,
+        root,
+    )
+    return result
+
 
 def export_daily_csv(date_str: str, target_path: str) -> None:
     return
 
 def export_campaign_csv(date_str: str, campaign: str, target_path: str) -> None:
-    return
\ No newline at end of file
+    return
@@ -0,0 +1,191 @@
+"""Server-side rendering of heatmap buckets into compressed overlay images.
+
+The 100x100 ``(bucket_x, bucket_y, hits)`` grid is accumulated with NumPy,
+log-scaled, mapped through a colour ramp and encoded by Pillow as a
+transparent PNG or WebP. Rendered bytes are cached per page / site version /
+device / day range / size / format and keyed by the rollup high-water mark,
+so a dashboard fetches a few kilobytes instead of thousands of JSON rows.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+import hashlib
+import io
+from typing import Dict, Tuple
+
+from django.core.cache import cache
+from PIL import Image, ImageFilter
+
+from . import rollups
+
+try:  # pragma: no cover - optional dependency
+    import numpy as np
+except ImportError:  # pragma: no cover - library not installed in some environments
+    np = None  # type: ignore
+
+
+GRID_SIZE = 100
+DEFAULT_WIDTH = 400
+MIN_SIZE = 50
+MAX_SIZE = 2000
+CACHE_TTL = 3600
+FORMATS = {"png": ("PNG", "image/png"), "webp": ("WEBP", "image/webp")}
+
+# Colour ramp (position, (r, g, b)): blue -> cyan -> green -> yellow -> red.
+_RAMP = (
+    (0.0, (0, 0, 255)),
+    (0.25, (0, 255, 255)),
+    (0.5, (0, 255, 0)),
+    (0.75, (255, 255, 0)),
+    (1.0, (255, 0, 0)),
+)
+
+
+class HeatmapRenderError(RuntimeError):
+    """Raised when the optional NumPy dependency is missing."""
+
+
+@dataclass(frozen=True)
+class RenderedHeatmap:
+    content: bytes
+    content_type: str
+    etag: str
+    total_hits: int
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise HeatmapRenderError("numpy is required to render heatmaps (pip install numpy).")
+
+
+def _lut():
+    positions = [pos for pos, _ in _RAMP]
+    levels = np.linspace(0.0, 1.0, 256)
+    channels = [np.interp(levels, positions, [rgb[i] for _, rgb in _RAMP]) for i in range(3)]
+    return np.stack(channels, axis=1).astype(np.uint8)
+
+
+def clamp_size(width: int = DEFAULT_WIDTH, height: int | None = None) -> Tuple[int, int]:
+    """Resolve the output size (``height`` defaults to ``width``) within ``MIN_SIZE``..``MAX_SIZE``.
+
+    Applied before digests and cache keys, so out-of-range requests share the
+    entry of the image they actually produce.
+    """
+    width = min(max(int(width), MIN_SIZE), MAX_SIZE)
+    height = min(max(int(height or width), MIN_SIZE), MAX_SIZE)
+    return width, height
+
+
+def build_grid(hits: Dict[Tuple[str, int, int], int]):
+    """Accumulate ``{(device, x, y): hits}`` into a ``(GRID_SIZE, GRID_SIZE)`` array (rows = y)."""
+    _require_numpy()
+    grid = np.zeros((GRID_SIZE, GRID_SIZE), dtype=np.float64)
+    if not hits:
+        return grid
+    keys = np.array([(x, y) for (_, x, y) in hits.keys()], dtype=np.int64)
+    values = np.fromiter(hits.values(), dtype=np.float64, count=len(hits))
+    xs = np.clip(keys[:, 0], 0, GRID_SIZE - 1)
+    ys = np.clip(keys[:, 1], 0, GRID_SIZE - 1)
+    np.add.at(grid, (ys, xs), values)
+    return grid
+
+
+def render_grid(grid, *, width: int = DEFAULT_WIDTH, height: int | None = None, fmt: str = "png", blur: float = 1.5) -> bytes:
+    """Encode ``grid`` as a transparent RGBA overlay of ``width`` x ``height`` pixels."""
+    _require_numpy()
+    pil_format, _ = FORMATS[fmt]
+    width, height = clamp_size(width, height)
+
+    peak = float(grid.max()) if grid.size else 0.0
+    rgba = np.zeros((GRID_SIZE, GRID_SIZE, 4), dtype=np.uint8)
+    if peak > 0:
+        scaled = np.log1p(grid) / np.log1p(peak)
+        index = np.clip((scaled * 255).round(), 0, 255).astype(np.uint8)
+        rgba[..., :3] = _lut()[index]
+        rgba[..., 3] = np.where(grid > 0, 64 + (scaled * 151).round(), 0).astype(np.uint8)
+
+    image = Image.fromarray(rgba).resize((width, height), Image.Resampling.BILINEAR)
+    if blur > 0:
+        image = image.filter(ImageFilter.GaussianBlur(radius=blur * width / GRID_SIZE / 4))
+
+    buffer = io.BytesIO()
+    if pil_format == "PNG":
+        image.save(buffer, format="PNG", optimize=True)
+    else:
+        image.save(buffer, format="WEBP", quality=80, method=4)
+    return buffer.getvalue()
+
+
+def heatmap_digest(
+    page_id: str,
+    start: date,
+    end: date,
+    *,
+    site_version: str = "",
+    device: str | None = None,
+    width: int = DEFAULT_WIDTH,
+    height: int | None = None,
+    fmt: str = "png",
+) -> str:
+    """Cache/ETag digest of a render request, bound to the page's rollup high-water mark."""
+    width, height = clamp_size(width, height)
+    fingerprint = "|".join([
+        page_id,
+        site_version,
+        device or "",
+        start.isoformat(),
+        end.isoformat(),
+        str(width),
+        str(height),
+        fmt,
+        rollups.high_water_mark(page_id),
+    ])
+    return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()
+
+
+def render_heatmap(
+    page_id: str,
+    start: date,
+    end: date,
+    *,
+    site_version: str = "",
+    device: str | None = None,
+    width: int = DEFAULT_WIDTH,
+    height: int | None = None,
+    fmt: str = "png",
+) -> RenderedHeatmap:
+    """Render (or fetch from cache) the heatmap overlay for a page and day range."""
+    _require_numpy()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported heatmap format: {fmt}")
+    content_type = FORMATS[fmt][1]
+    width, height = clamp_size(width, height)
+    digest = heatmap_digest(
+        page_id, start, end, site_version=site_version, device=device, width=width, height=height, fmt=fmt
+    )
+    etag = f'"{digest}"'
+    cache_key = f"atelier:analytics:heatmap_img:{digest}"
+
+    cached = cache.get(cache_key)
+    if cached is not None:
+        content, total = cached
+        return RenderedHeatmap(content=content, content_type=content_type, etag=etag, total_hits=total)
+
+    _, hits = rollups.heatmap_hits(page_id, start, end, site_version=site_version, device=device)
+    grid = build_grid(hits)
+    content = render_grid(grid, width=width, height=height, fmt=fmt)
+    total = int(grid.sum())
+    cache.set(cache_key, (content, total), CACHE_TTL)
+    return RenderedHeatmap(content=content, content_type=content_type, etag=etag, total_hits=total)
+
+
+__all__ = [
+    "HeatmapRenderError",
+    "RenderedHeatmap",
+    "build_grid",
+    "clamp_size",
+    "heatmap_digest",
+    "render_grid",
+    "render_heatmap",
+]
@@ -33,6 +33,7 @@ class AnalyticsEventRaw(models.Model):
     ua_hash = models.CharField(max_length=64, blank=True, db_index=True)
     ip_hash = models.CharField(max_length=64, blank=True, db_index=True)
     payload = models.JSONField(default=dict, blank=True)
+    sample_rate = models.FloatField(default=1.0)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -60,6 +61,7 @@ class ComponentStatDaily(models.Model):
     impressions = models.PositiveIntegerField(default=0)
     clicks = models.PositiveIntegerField(default=0)
     avg_scroll_pct = models.FloatField(default=0.0)
+    scroll_samples = models.PositiveIntegerField(default=0)
     uu_count = models.PositiveIntegerField(default=0)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -116,8 +118,94 @@ class HeatmapBucketDaily(models.Model):
         return f"{self.date}:{self.page_id}:{self.bucket_x}x{self.bucket_y}"
 
 
+class RollupTier(models.TextChoices):
+    WEEK = "week", "Week (ISO, Monday)"
+    MONTH = "month", "Calendar month"
+
+
+class ComponentStatRollup(models.Model):
+    """Weekly/monthly component aggregates built from ``ComponentStatDaily``.
+
+    ``uu_count`` is the sum of daily unique visitors (visitors are not
+    deduplicated across days).
+    """
+
+    tier = models.CharField(max_length=8, choices=RollupTier.choices)
+    period_start = models.DateField()
+    period_end = models.DateField()
+    site_version = models.CharField(max_length=32, blank=True)
+    page_id = models.CharField(max_length=128, blank=True)
+    slot_id = models.CharField(max_length=128, blank=True)
+    component_alias = models.CharField(max_length=128, blank=True)
+    impressions = models.PositiveIntegerField(default=0)
+    clicks = models.PositiveIntegerField(default=0)
+    avg_scroll_pct = models.FloatField(default=0.0)
+    scroll_samples = models.PositiveIntegerField(default=0)
+    uu_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = "atelier"
+        db_table = "atelier_component_stat_rollup"
+        unique_together = (
+            "tier",
+            "period_start",
+            "site_version",
+            "page_id",
+            "slot_id",
+            "component_alias",
+        )
+        indexes = [
+            models.Index(fields=["tier", "page_id", "period_start"], name="aa_cmp_rollup_lookup"),
+        ]
+        verbose_name = "Component Rollup Stat"
+        verbose_name_plural = "Component Rollup Stats"
+
+    def __str__(self) -> str:  # pragma: no cover - debug only
+        return f"{self.tier}:{self.period_start}:{self.component_alias or '-'}"
+
+
+class HeatmapBucketRollup(models.Model):
+    """Weekly/monthly heatmap buckets built from ``HeatmapBucketDaily``."""
+
+    tier = models.CharField(max_length=8, choices=RollupTier.choices)
+    period_start = models.DateField()
+    period_end = models.DateField()
+    site_version = models.CharField(max_length=32, blank=True)
+    page_id = models.CharField(max_length=128, blank=True)
+    device = models.CharField(max_length=8, blank=True)
+    bucket_x = models.PositiveSmallIntegerField()
+    bucket_y = models.PositiveSmallIntegerField()
+    hits = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = "atelier"
+        db_table = "atelier_heatmap_bucket_rollup"
+        unique_together = (
+            "tier",
+            "period_start",
+            "site_version",
+            "page_id",
+            "device",
+            "bucket_x",
+            "bucket_y",
+        )
+        indexes = [
+            models.Index(fields=["tier", "page_id", "period_start", "device"], name="aa_heatmap_rollup_lookup"),
+        ]
+        verbose_name = "Heatmap Bucket Rollup"
+        verbose_name_plural = "Heatmap Bucket Rollups"
+
+    def __str__(self) -> str:  # pragma: no cover - debug only
+        return f"{self.tier}:{self.period_start}:{self.page_id}:{self.bucket_x}x{self.bucket_y}"
+
+
 __all__ = [
     "AnalyticsEventRaw",
     "ComponentStatDaily",
+    "ComponentStatRollup",
     "HeatmapBucketDaily",
+    "HeatmapBucketRollup",
+    "RollupTier",
 ]
@@ -0,0 +1,328 @@
+"""Time partitioning and retention helpers for raw analytics events.
+
+On PostgreSQL ``atelier_analytics_event_raw`` can be converted into a
+declarative ``PARTITION BY RANGE (ts)`` table. Partitions are aligned on the
+default time zone so that a rollup day always maps to exactly one partition,
+and retention drops whole partitions instead of deleting rows. Other
+backends keep the plain table and purge with small chunked deletes.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+import logging
+import re
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection as default_connection, transaction
+from django.utils import timezone
+
+from .models import AnalyticsEventRaw
+
+
+log = logging.getLogger("apps.atelier.analytics.partitions")
+
+RAW_TABLE = AnalyticsEventRaw._meta.db_table
+LEGACY_TABLE = f"{RAW_TABLE}_legacy"
+DEFAULT_PARTITION = f"{RAW_TABLE}_default"
+ID_SEQUENCE = f"{RAW_TABLE}_pid_seq"
+
+GRANULARITIES = ("day", "month")
+DEFAULT_GRANULARITY = "month"
+DEFAULT_AHEAD = 3
+DEFAULT_CHUNK_SIZE = 5000
+
+_BOUND_RE = re.compile(r"FROM \((?P<start>[^)]*)\) TO \((?P<end>[^)]*)\)")
+
+
+@dataclass(frozen=True)
+class Partition:
+    """A partition of the raw table and its ``[start, end)`` range (None = unbounded)."""
+
+    name: str
+    start: Optional[datetime]
+    end: Optional[datetime]
+    is_default: bool = False
+
+
+def partition_granularity() -> str:
+    value = str(getattr(settings, "ANALYTICS_RAW_PARTITION_GRANULARITY", DEFAULT_GRANULARITY) or "").lower()
+    return value if value in GRANULARITIES else DEFAULT_GRANULARITY
+
+
+def partitions_ahead() -> int:
+    try:
+        return max(int(getattr(settings, "ANALYTICS_RAW_PARTITION_AHEAD", DEFAULT_AHEAD)), 0)
+    except (TypeError, ValueError):
+        return DEFAULT_AHEAD
+
+
+def _local_midnight(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min), timezone.get_default_timezone())
+
+
+def day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """Return the aware ``[start, end)`` range covering ``day`` in the default time zone.
+
+    Filtering on this range (instead of ``ts__date``) lets PostgreSQL prune to a
+    single partition and keeps the ``ts`` indexes usable on every backend.
+    """
+    return _local_midnight(day), _local_midnight(day + timedelta(days=1))
+
+
+def period_start(day: date, granularity: str) -> date:
+    if granularity == "day":
+        return day
+    return day.replace(day=1)
+
+
+def next_period(start: date, granularity: str) -> date:
+    if granularity == "day":
+        return start + timedelta(days=1)
+    if start.month == 12:
+        return date(start.year + 1, 1, 1)
+    return date(start.year, start.month + 1, 1)
+
+
+def partition_name(start: date, granularity: str) -> str:
+    suffix = start.strftime("%Y%m%d") if granularity == "day" else start.strftime("%Y%m")
+    return f"{RAW_TABLE}_p{suffix}"
+
+
+def supports_partitioning(connection=None) -> bool:
+    conn = connection or default_connection
+    return conn.vendor == "postgresql"
+
+
+def is_partitioned(connection=None) -> bool:
+    conn = connection or default_connection
+    if not supports_partitioning(conn):
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [RAW_TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def _parse_bound(value: str) -> Optional[datetime]:
+    value = value.strip()
+    if value.upper() in {"MINVALUE", "MAXVALUE"}:
+        return None
+    parsed = datetime.fromisoformat(value.strip("'"))
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.get_default_timezone())
+    return parsed
+
+
+def list_partitions(connection=None) -> List[Partition]:
+    """Return the attached partitions ordered by range start (default partition last)."""
+    conn = connection or default_connection
+    if not is_partitioned(conn):
+        return []
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) "
+            "FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = %s AND pg_table_is_visible(parent.oid)",
+            [RAW_TABLE],
+        )
+        rows = cursor.fetchall()
+
+    partitions: List[Partition] = []
+    for name, bound in rows:
+        if (bound or "").strip().upper() == "DEFAULT":
+            partitions.append(Partition(name=name, start=None, end=None, is_default=True))
+            continue
+        match = _BOUND_RE.search(bound or "")
+        if not match:
+            log.warning("analytics partition %s has unexpected bound %r", name, bound)
+            continue
+        partitions.append(
+            Partition(name=name, start=_parse_bound(match["start"]), end=_parse_bound(match["end"]))
+        )
+    partitions.sort(key=lambda p: (p.is_default, p.start or datetime.min.replace(tzinfo=dt_timezone.utc)))
+    return partitions
+
+
+def _overlaps(part: Partition, start: datetime, end: datetime) -> bool:
+    if part.is_default:
+        return False
+    lower_ok = part.end is None or part.end > start
+    upper_ok = part.start is None or part.start < end
+    return lower_ok and upper_ok
+
+
+def ensure_partitions(
+    *,
+    ahead: Optional[int] = None,
+    granularity: Optional[str] = None,
+    today: Optional[date] = None,
+    connection=None,
+) -> List[str]:
+    """Pre-create the current partition plus ``ahead`` future ones. Returns created names."""
+    conn = connection or default_connection
+    if not is_partitioned(conn):
+        return []
+    granularity = granularity or partition_granularity()
+    ahead = partitions_ahead() if ahead is None else max(int(ahead), 0)
+    today = today or timezone.localdate()
+
+    existing = list_partitions(conn)
+    created: List[str] = []
+    start = period_start(today, granularity)
+    for _ in range(ahead + 1):
+        end = next_period(start, granularity)
+        lower, upper = _local_midnight(start), _local_midnight(end)
+        if not any(_overlaps(part, lower, upper) for part in existing):
+            name = partition_name(start, granularity)
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{RAW_TABLE}" '
+                    "FOR VALUES FROM (%s) TO (%s)",
+                    [lower, upper],
+                )
+            existing.append(Partition(name=name, start=lower, end=upper))
+            created.append(name)
+        start = end
+
+    if created:
+        log.info("analytics partitions created=%s", ",".join(created))
+    return created
+
+
+def convert_to_partitioned(*, granularity: Optional[str] = None, ahead: Optional[int] = None, connection=None) -> bool:
+    """Turn the plain raw table into a range-partitioned one (PostgreSQL only).
+
+    The existing table is kept as-is and attached as the ``[MINVALUE, boundary)``
+    partition, so no rows are copied. Primary key and ``event_uuid`` uniqueness
+    are widened to include ``ts`` as required by PostgreSQL. The operation takes
+    an ACCESS EXCLUSIVE lock on the table and validates the legacy rows; run it
+    in a maintenance window. Returns False when nothing had to be done.
+    """
+    conn = connection or default_connection
+    if not supports_partitioning(conn) or is_partitioned(conn):
+        return False
+    granularity = granularity or partition_granularity()
+
+    indexed_columns = [
+        field.column
+        for field in AnalyticsEventRaw._meta.concrete_fields
+        if field.db_index and not field.primary_key and not field.unique
+    ]
+
+    with transaction.atomic(using=conn.alias):
+        with conn.cursor() as cursor:
+            cursor.execute(f'SELECT MAX(ts), MAX(id) FROM "{RAW_TABLE}"')
+            max_ts, max_id = cursor.fetchone()
+
+            boundary_day = period_start(timezone.localdate(), granularity)
+            if max_ts is not None:
+                last_day = period_start(timezone.localtime(max_ts).date(), granularity)
+                boundary_day = max(boundary_day, next_period(last_day, granularity))
+            boundary = _local_midnight(boundary_day)
+
+            cursor.execute(f'ALTER TABLE "{RAW_TABLE}" RENAME TO "{LEGACY_TABLE}"')
+            for index in AnalyticsEventRaw._meta.indexes:
+                cursor.execute(f'ALTER INDEX IF EXISTS "{index.name}" RENAME TO "{index.name}_legacy"')
+
+            # Partition keys must be part of every unique constraint.
+            cursor.execute(
+                "SELECT conname FROM pg_constraint "
+                "WHERE conrelid = %s::regclass AND contype IN ('p', 'u')",
+                [LEGACY_TABLE],
+            )
+            for (constraint,) in cursor.fetchall():
+                cursor.execute(f'ALTER TABLE "{LEGACY_TABLE}" DROP CONSTRAINT "{constraint}"')
+            cursor.execute(f'ALTER TABLE "{LEGACY_TABLE}" ALTER COLUMN id DROP IDENTITY IF EXISTS')
+            cursor.execute(f'ALTER TABLE "{LEGACY_TABLE}" ALTER COLUMN id DROP DEFAULT')
+
+            cursor.execute(
+                f'CREATE TABLE "{RAW_TABLE}" (LIKE "{LEGACY_TABLE}" INCLUDING DEFAULTS) '
+                "PARTITION BY RANGE (ts)"
+            )
+            cursor.execute(f'CREATE SEQUENCE "{ID_SEQUENCE}" OWNED BY "{RAW_TABLE}".id')
+            cursor.execute("SELECT setval(%s, %s)", [ID_SEQUENCE, int(max_id or 0) + 1])
+            cursor.execute(
+                f'ALTER TABLE "{RAW_TABLE}" ALTER COLUMN id SET DEFAULT nextval(%s::regclass)',
+                [ID_SEQUENCE],
+            )
+            cursor.execute(f'ALTER TABLE "{RAW_TABLE}" ADD CONSTRAINT "{RAW_TABLE}_pkey" PRIMARY KEY (id, ts)')
+            cursor.execute(
+                f'ALTER TABLE "{RAW_TABLE}" ADD CONSTRAINT "{RAW_TABLE}_event_uuid_ts_uniq" '
+                "UNIQUE (event_uuid, ts)"
+            )
+            for column in indexed_columns:
+                cursor.execute(f'CREATE INDEX "{RAW_TABLE}_{column}_pidx" ON "{RAW_TABLE}" ({column})')
+            for index in AnalyticsEventRaw._meta.indexes:
+                columns = ", ".join(AnalyticsEventRaw._meta.get_field(f).column for f in index.fields)
+                cursor.execute(f'CREATE INDEX "{index.name}" ON "{RAW_TABLE}" ({columns})')
+
+            cursor.execute(
+                f'ALTER TABLE "{RAW_TABLE}" ATTACH PARTITION "{LEGACY_TABLE}" '
+                "FOR VALUES FROM (MINVALUE) TO (%s)",
+                [boundary],
+            )
+            cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{RAW_TABLE}" DEFAULT')
+
+        ensure_partitions(ahead=ahead, granularity=granularity, connection=conn)
+
+    log.info("analytics raw table partitioned granularity=%s legacy_boundary=%s", granularity, boundary.isoformat())
+    return True
+
+
+def drop_partitions_before(cutoff: datetime, *, detach_only: bool = False, dry_run: bool = False, connection=None) -> List[str]:
+    """Detach (and drop) every partition whose whole range ends before ``cutoff``."""
+    conn = connection or default_connection
+    expired = [
+        part
+        for part in list_partitions(conn)
+        if not part.is_default and part.end is not None and part.end <= cutoff
+    ]
+    if dry_run:
+        return [part.name for part in expired]
+
+    for part in expired:
+        with transaction.atomic(using=conn.alias), conn.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE "{RAW_TABLE}" DETACH PARTITION "{part.name}"')
+            if not detach_only:
+                cursor.execute(f'DROP TABLE "{part.name}"')
+        log.info("analytics partition %s %s", part.name, "detached" if detach_only else "dropped")
+    return [part.name for part in expired]
+
+
+def chunked_delete(cutoff: datetime, *, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Delete raw events older than ``cutoff`` in short transactions of ``chunk_size`` rows."""
+    chunk_size = max(int(chunk_size), 1)
+    total = 0
+    while True:
+        ids = list(
+            AnalyticsEventRaw.objects.filter(ts__lt=cutoff)
+            .order_by("ts")
+            .values_list("id", flat=True)[:chunk_size]
+        )
+        if not ids:
+            break
+        deleted, _ = AnalyticsEventRaw.objects.filter(id__in=ids).delete()
+        total += deleted
+    return total
+
+
+__all__ = [
+    "Partition",
+    "chunked_delete",
+    "convert_to_partitioned",
+    "day_bounds",
+    "drop_partitions_before",
+    "ensure_partitions",
+    "is_partitioned",
+    "list_partitions",
+    "partition_name",
+    "supports_partitioning",
+]
@@ -0,0 +1,310 @@
+"""Weekly/monthly rollup tiers built from the daily analytics aggregates.
+
+A period is rebuilt by upserting its rows on the table's unique key and then
+pruning the rows this rebuild did not touch, so concurrent rebuilds of the same
+period never collide on insert. ``rollup_incremental`` schedules the rebuild
+through ``claim_rebuild`` so one period is refreshed at most once per
+``ANALYTICS_ROLLUP_COALESCE_SECONDS``.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, timedelta
+import logging
+from typing import Dict, Iterable, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Max, Sum
+from django.utils import timezone
+
+from .models import (
+    ComponentStatDaily,
+    ComponentStatRollup,
+    HeatmapBucketDaily,
+    HeatmapBucketRollup,
+    RollupTier,
+)
+
+
+log = logging.getLogger("apps.atelier.analytics.rollups")
+
+DAY = "day"
+TIERS = (RollupTier.WEEK, RollupTier.MONTH)
+MAX_RANGE_DAYS = 366
+
+_HWM_KEY = "atelier:analytics:hwm:{page_id}"
+_HWM_TTL = 7 * 24 * 3600
+
+_PENDING_KEY = "atelier:analytics:rollup-pending:{site_version}:{page_id}:{week}:{month}"
+DEFAULT_COALESCE_SECONDS = 60
+
+_COMPONENT_UNIQUE = ["tier", "period_start", "site_version", "page_id", "slot_id", "component_alias"]
+_COMPONENT_VALUES = ["period_end", "impressions", "clicks", "avg_scroll_pct", "scroll_samples", "uu_count", "updated_at"]
+_HEATMAP_UNIQUE = ["tier", "period_start", "site_version", "page_id", "device", "bucket_x", "bucket_y"]
+_HEATMAP_VALUES = ["period_end", "hits", "updated_at"]
+
+
+def period_bounds(day: date, tier: str) -> Tuple[date, date]:
+    """Return the inclusive ``(start, end)`` of the ``tier`` period containing ``day``."""
+    if tier == RollupTier.WEEK:
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if tier == RollupTier.MONTH:
+        start = day.replace(day=1)
+        following = date(start.year + 1, 1, 1) if start.month == 12 else date(start.year, start.month + 1, 1)
+        return start, following - timedelta(days=1)
+    return day, day
+
+
+def cover_range(start: date, end: date) -> List[Tuple[str, date, date]]:
+    """Split ``[start, end]`` into the fewest day/week/month segments.
+
+    Whole months are preferred, then whole ISO weeks, then single days. A week
+    is not used when it would swallow the first day of a month that fits
+    entirely in the range, so that month can still be read as one row set.
+    """
+    segments: List[Tuple[str, date, date]] = []
+    current = start
+    while current <= end:
+        month_start, month_end = period_bounds(current, RollupTier.MONTH)
+        if current == month_start and month_end <= end:
+            segments.append((RollupTier.MONTH.value, month_start, month_end))
+            current = month_end + timedelta(days=1)
+            continue
+        week_start, week_end = period_bounds(current, RollupTier.WEEK)
+        if current == week_start and week_end <= end:
+            next_month = month_end + timedelta(days=1)
+            blocks_month = next_month <= week_end and period_bounds(next_month, RollupTier.MONTH)[1] <= end
+            if not blocks_month:
+                segments.append((RollupTier.WEEK.value, week_start, week_end))
+                current = week_end + timedelta(days=1)
+                continue
+        segments.append((DAY, current, current))
+        current += timedelta(days=1)
+    return segments
+
+
+def _upsert_period(model, objs: list, unique_fields: List[str], update_fields: List[str], batch_size: int,
+                   *, tier: str, start: date, page_id: str, site_version: str, stamp) -> None:
+    """Upsert the period rows, then drop the ones left over from an older rebuild.
+
+    ``updated_at`` (auto_now) is refreshed on insert and on conflict, so rows not
+    written by this rebuild are exactly those older than ``stamp``.
+    """
+    model.objects.bulk_create(
+        objs,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=update_fields,
+    )
+    model.objects.filter(
+        tier=tier,
+        period_start=start,
+        page_id=page_id,
+        site_version=site_version,
+        updated_at__lt=stamp,
+    ).delete()
+
+
+def _rebuild_component_period(tier: str, start: date, end: date, page_id: str, site_version: str) -> None:
+    stamp = timezone.now()
+    weighted_scroll = ExpressionWrapper(F("avg_scroll_pct") * F("scroll_samples"), output_field=FloatField())
+    rows = (
+        ComponentStatDaily.objects.filter(
+            date__gte=start,
+            date__lte=end,
+            page_id=page_id,
+            site_version=site_version,
+        )
+        .values("slot_id", "component_alias")
+        .annotate(
+            impressions_sum=Sum("impressions"),
+            clicks_sum=Sum("clicks"),
+            uu_sum=Sum("uu_count"),
+            samples_sum=Sum("scroll_samples"),
+            weighted_scroll_sum=Sum(weighted_scroll),
+            scroll_sum=Sum("avg_scroll_pct"),
+            days=Count("id"),
+        )
+    )
+    objs = []
+    for row in rows:
+        samples = int(row["samples_sum"] or 0)
+        if samples:
+            avg_scroll = float(row["weighted_scroll_sum"] or 0.0) / samples
+        else:
+            # Daily rows written before scroll_samples existed: plain mean of days.
+            avg_scroll = float(row["scroll_sum"] or 0.0) / max(int(row["days"] or 0), 1)
+        objs.append(ComponentStatRollup(
+            tier=tier,
+            period_start=start,
+            period_end=end,
+            site_version=site_version,
+            page_id=page_id,
+            slot_id=row["slot_id"] or "",
+            component_alias=row["component_alias"] or "",
+            impressions=int(row["impressions_sum"] or 0),
+            clicks=int(row["clicks_sum"] or 0),
+            avg_scroll_pct=avg_scroll,
+            scroll_samples=samples,
+            uu_count=int(row["uu_sum"] or 0),
+        ))
+    _upsert_period(
+        ComponentStatRollup, objs, _COMPONENT_UNIQUE, _COMPONENT_VALUES, 500,
+        tier=tier, start=start, page_id=page_id, site_version=site_version, stamp=stamp,
+    )
+
+
+def _rebuild_heatmap_period(tier: str, start: date, end: date, page_id: str, site_version: str) -> None:
+    stamp = timezone.now()
+    rows = (
+        HeatmapBucketDaily.objects.filter(
+            date__gte=start,
+            date__lte=end,
+            page_id=page_id,
+            site_version=site_version,
+        )
+        .values("device", "bucket_x", "bucket_y")
+        .annotate(hits_sum=Sum("hits"))
+    )
+    objs = [
+        HeatmapBucketRollup(
+            tier=tier,
+            period_start=start,
+            period_end=end,
+            site_version=site_version,
+            page_id=page_id,
+            device=row["device"] or "",
+            bucket_x=row["bucket_x"],
+            bucket_y=row["bucket_y"],
+            hits=int(row["hits_sum"] or 0),
+        )
+        for row in rows
+    ]
+    _upsert_period(
+        HeatmapBucketRollup, objs, _HEATMAP_UNIQUE, _HEATMAP_VALUES, 1000,
+        tier=tier, start=start, page_id=page_id, site_version=site_version, stamp=stamp,
+    )
+
+
+def rebuild_periods(day: date, page_id: str, site_version: str, tiers: Iterable[str] = TIERS) -> None:
+    """Recompute every tier period containing ``day`` for one page/site version."""
+    with transaction.atomic():
+        for tier in tiers:
+            start, end = period_bounds(day, tier)
+            _rebuild_component_period(tier, start, end, page_id, site_version)
+            _rebuild_heatmap_period(tier, start, end, page_id, site_version)
+    bump_high_water_mark(page_id)
+    log.debug("rebuild_periods day=%s page=%s site=%s", day, page_id, site_version)
+
+
+def coalesce_seconds() -> int:
+    return max(int(getattr(settings, "ANALYTICS_ROLLUP_COALESCE_SECONDS", DEFAULT_COALESCE_SECONDS)), 0)
+
+
+def _pending_key(day: date, page_id: str, site_version: str) -> str:
+    week = period_bounds(day, RollupTier.WEEK)[0]
+    month = period_bounds(day, RollupTier.MONTH)[0]
+    return _PENDING_KEY.format(site_version=site_version, page_id=page_id, week=week, month=month)
+
+
+def claim_rebuild(day: date, page_id: str, site_version: str) -> bool:
+    """True when no rebuild of the periods containing ``day`` is already scheduled.
+
+    Days sharing the same week and month share the marker. The marker outlives the
+    window so a lost task only delays the next rebuild instead of blocking it.
+    """
+    window = coalesce_seconds()
+    if not window:
+        return True
+    return cache.add(_pending_key(day, page_id, site_version), 1, max(window * 4, 60))
+
+
+def release_rebuild(day: date, page_id: str, site_version: str) -> None:
+    """Clear the marker before rebuilding: events arriving meanwhile schedule a new pass."""
+    cache.delete(_pending_key(day, page_id, site_version))
+
+
+def bump_high_water_mark(page_id: str) -> str:
+    """Record that aggregates for ``page_id`` changed (invalidates cached reads)."""
+    value = timezone.now().isoformat()
+    cache.set(_HWM_KEY.format(page_id=page_id), value, _HWM_TTL)
+    return value
+
+
+def high_water_mark(page_id: str) -> str:
+    """Return the last aggregate write marker for ``page_id``.
+
+    Served from the cache; on a miss it is rebuilt from the ``updated_at``
+    columns so every worker derives the same value after an eviction.
+    """
+    key = _HWM_KEY.format(page_id=page_id)
+    value = cache.get(key)
+    if value:
+        return value
+    candidates = [
+        ComponentStatDaily.objects.filter(page_id=page_id).aggregate(top=Max("updated_at"))["top"],
+        HeatmapBucketDaily.objects.filter(page_id=page_id).aggregate(top=Max("updated_at"))["top"],
+        ComponentStatRollup.objects.filter(page_id=page_id).aggregate(top=Max("updated_at"))["top"],
+        HeatmapBucketRollup.objects.filter(page_id=page_id).aggregate(top=Max("updated_at"))["top"],
+    ]
+    present = [value for value in candidates if value is not None]
+    value = max(present).isoformat() if present else "0"
+    cache.set(key, value, _HWM_TTL)
+    return value
+
+
+def segment_filters(segments: List[Tuple[str, date, date]]) -> Dict[str, List[date]]:
+    """Group segments by tier: ``{"day": [...], "week": [...], "month": [...]}`` of period starts."""
+    grouped: Dict[str, List[date]] = {}
+    for tier, start, _ in segments:
+        grouped.setdefault(tier, []).append(start)
+    return grouped
+
+
+def heatmap_hits(
+    page_id: str,
+    start: date,
+    end: date,
+    *,
+    site_version: str = "",
+    device: str | None = None,
+) -> Tuple[List[Tuple[str, date, date]], Dict[Tuple[str, int, int], int]]:
+    """Merge heatmap hits over ``[start, end]`` reading the coarsest tiers.
+
+    Returns ``(segments, {(device, bucket_x, bucket_y): hits})``.
+    """
+    segments = cover_range(start, end)
+    filters: Dict[str, str] = {"page_id": page_id}
+    if site_version:
+        filters["site_version"] = site_version
+    if device:
+        filters["device"] = device
+
+    hits: Dict[Tuple[str, int, int], int] = defaultdict(int)
+    for tier, starts in segment_filters(segments).items():
+        if tier == DAY:
+            qs = HeatmapBucketDaily.objects.filter(date__in=starts, **filters)
+        else:
+            qs = HeatmapBucketRollup.objects.filter(tier=tier, period_start__in=starts, **filters)
+        for dev, bucket_x, bucket_y, count in qs.values_list("device", "bucket_x", "bucket_y", "hits"):
+            hits[(dev, bucket_x, bucket_y)] += count
+    return segments, dict(hits)
+
+
+__all__ = [
+    "MAX_RANGE_DAYS",
+    "bump_high_water_mark",
+    "claim_rebuild",
+    "coalesce_seconds",
+    "cover_range",
+    "heatmap_hits",
+    "high_water_mark",
+    "period_bounds",
+    "rebuild_periods",
+    "release_rebuild",
+    "segment_filters",
+]
@@ -0,0 +1,127 @@
+"""Adaptive load-shedding for the analytics collector.
+
+The sampler watches two back-pressure signals:
+
+- the depth of the Celery ``analytics`` queue on the Redis broker, probed at
+  most every ``probe_interval_seconds`` per process;
+- the ingest lag (enqueue -> ``persist_raw``), kept as an EWMA in the cache by
+  the worker.
+
+Their ratio to the configured targets gives a pressure; above 1.0 each
+event type is sampled at ``1 / pressure`` bounded by its floor. Protected
+types and events flagged ``payload.conversion`` are always kept. Decisions
+are deterministic per ``event_uuid`` so client retries are kept or dropped
+consistently, and the applied rate is stored on each event so rollups can
+re-weight counts by ``1 / sample_rate``.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+log = logging.getLogger("atelier.analytics.sampling")
+
+LAG_CACHE_KEY = "atelier:analytics:ingest_lag"
+MIN_SAMPLE_RATE = 0.001
+_LAG_ALPHA = 0.2
+
+_DEFAULTS: Dict[str, Any] = {
+    "enabled": True,
+    "queue": "analytics",
+    "queue_depth_target": 5000,
+    "lag_target_seconds": 30.0,
+    "probe_interval_seconds": 5.0,
+    "min_rates": {"view": 0.05, "scroll": 0.05, "heatmap": 0.02, "click": 0.25},
+    "protected_types": [],
+}
+
+
+def sampling_config() -> Dict[str, Any]:
+    config = dict(_DEFAULTS)
+    config.update(getattr(settings, "ANALYTICS_SAMPLING", None) or {})
+    return config
+
+
+def record_ingest_lag(lag_seconds: float) -> None:
+    """Fold one observed enqueue->persist lag into the shared EWMA."""
+    lag = max(float(lag_seconds), 0.0)
+    previous = cache.get(LAG_CACHE_KEY)
+    value = lag if previous is None else (1 - _LAG_ALPHA) * float(previous) + _LAG_ALPHA * lag
+    cache.set(LAG_CACHE_KEY, value, 600)
+
+
+class AdaptiveSampler:
+    """Per-process sampler; signals are refreshed lazily on ``pressure()``."""
+
+    def __init__(self) -> None:
+        self._probed_at = 0.0
+        self._queue_depth = 0
+        self._redis = None
+
+    def _broker(self):
+        if self._redis is None:
+            import redis
+
+            url = getattr(settings, "CELERY_BROKER_URL", "") or ""
+            if not url.startswith(("redis://", "rediss://")):
+                return None
+            self._redis = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        return self._redis
+
+    def queue_depth(self, queue: str) -> int:
+        try:
+            client = self._broker()
+            return int(client.llen(queue)) if client is not None else 0
+        except Exception:  # broker unreachable: do not shed on missing signal
+            log.debug("analytics sampling: queue depth probe failed", exc_info=True)
+            return 0
+
+    def pressure(self, config: Optional[Dict[str, Any]] = None) -> float:
+        config = config or sampling_config()
+        now = time.monotonic()
+        if now - self._probed_at >= float(config["probe_interval_seconds"]):
+            self._queue_depth = self.queue_depth(config["queue"])
+            self._probed_at = now
+        lag = float(cache.get(LAG_CACHE_KEY) or 0.0)
+        depth_ratio = self._queue_depth / max(float(config["queue_depth_target"]), 1.0)
+        lag_ratio = lag / max(float(config["lag_target_seconds"]), 0.001)
+        return max(depth_ratio, lag_ratio, 0.0)
+
+    def rate_for(self, event_type: str, payload: Optional[Dict[str, Any]] = None, *, pressure: float) -> float:
+        config = sampling_config()
+        if not config["enabled"] or pressure <= 1.0:
+            return 1.0
+        if event_type in set(config["protected_types"]) or (payload or {}).get("conversion") is True:
+            return 1.0
+        floor = float((config["min_rates"] or {}).get(event_type, 1.0))
+        rate = max(1.0 / pressure, floor, MIN_SAMPLE_RATE)
+        return round(min(rate, 1.0), 3)
+
+    @staticmethod
+    def keep(event_uuid: Any, rate: float) -> bool:
+        if rate >= 1.0:
+            return True
+        digest = hashlib.blake2b(str(event_uuid).encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") / 2**64 < rate
+
+
+_sampler = AdaptiveSampler()
+
+
+def get_sampler() -> AdaptiveSampler:
+    return _sampler
+
+
+__all__ = [
+    "AdaptiveSampler",
+    "LAG_CACHE_KEY",
+    "get_sampler",
+    "record_ingest_lag",
+    "sampling_config",
+]
@@ -5,17 +5,22 @@ from collections import defaultdict
 from datetime import date, datetime
 import hashlib
 import logging
+import time
 from typing import Dict, List, Tuple
 
 from celery import shared_task
 from django.db import transaction
-from django.db.models import Avg, Count, Q, FloatField
+from django.db.models import ExpressionWrapper, F, FloatField, Q, Sum, Value
 from django.db.models.functions import Cast
 from django.db.models.fields.json import KeyTextTransform
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
 
 from .models import AnalyticsEventRaw, ComponentStatDaily, HeatmapBucketDaily
+from .exporters import export_raw_parquet
+from .partitions import day_bounds, ensure_partitions
+from .rollups import claim_rebuild, coalesce_seconds, rebuild_periods, release_rebuild
+from .sampling import MIN_SAMPLE_RATE, record_ingest_lag
 
 
 log = logging.getLogger("apps.atelier.analytics.tasks")
@@ -51,6 +56,10 @@ def _normalize_event(event: Dict, ua_hash: str, ip_hash: str) -> AnalyticsEventR
         return None
     ts = _ensure_datetime(event.get("ts"))
     payload = event.get("payload") or {}
+    try:
+        sample_rate = min(max(float(event.get("sample_rate", 1.0)), MIN_SAMPLE_RATE), 1.0)
+    except (TypeError, ValueError):
+        sample_rate = 1.0
     return AnalyticsEventRaw(
         event_uuid=event.get("event_uuid"),
         ts=ts,
@@ -69,6 +78,7 @@ def _normalize_event(event: Dict, ua_hash: str, ip_hash: str) -> AnalyticsEventR
         ua_hash=ua_hash,
         ip_hash=ip_hash,
         payload=payload,
+        sample_rate=sample_rate,
     )
 
 
@@ -79,6 +89,11 @@ def persist_raw(events: List[Dict], meta: Dict | None = None) -> int:
         return 0
 
     meta = meta or {}
+    if meta.get("enqueued_at"):
+        try:
+            record_ingest_lag(time.time() - float(meta["enqueued_at"]))
+        except (TypeError, ValueError):
+            pass
     ua_hash = _stable_hash(meta.get("user_agent"))
     ip_hash = _stable_hash(meta.get("ip"))
 
@@ -90,7 +105,7 @@ def persist_raw(events: List[Dict], meta: Dict | None = None) -> int:
             continue
         normalized.append(normalized_event)
         rollup_targets.add((
-            normalized_event.ts.date().isoformat(),
+            timezone.localtime(normalized_event.ts).date().isoformat(),
             normalized_event.page_id,
             normalized_event.site_version,
         ))
@@ -114,16 +129,22 @@ def _update_component_daily(day: date, page_id: str, site_version: str, qs) -> N
         KeyTextTransform("scroll_pct", "payload"),
         FloatField(),
     )
+    # Sampled events stand for 1 / sample_rate events.
+    weight = ExpressionWrapper(Value(1.0) / F("sample_rate"), output_field=FloatField())
+    scroll_filter = (
+        Q(event_type="scroll")
+        & ~Q(payload__scroll_pct=None)
+        & ~Q(payload__scroll_pct="")
+    )
 
     aggregates = qs.values("slot_id", "component_alias").annotate(
-        impressions=Count("id", filter=Q(event_type="view")),
-        clicks=Count("id", filter=Q(event_type="click")),
-        avg_scroll_pct=Avg(
-            scroll_value,
-            filter=Q(event_type="scroll")
-            & ~Q(payload__scroll_pct=None)
-            & ~Q(payload__scroll_pct=""),
+        impressions=Sum(weight, filter=Q(event_type="view")),
+        clicks=Sum(weight, filter=Q(event_type="click")),
+        scroll_weighted=Sum(
+            ExpressionWrapper(scroll_value / F("sample_rate"), output_field=FloatField()),
+            filter=scroll_filter,
         ),
+        scroll_samples=Sum(weight, filter=scroll_filter),
     )
 
     visitor_map: Dict[Tuple[str, str], set[str]] = defaultdict(set)
@@ -143,9 +164,12 @@ def _update_component_daily(day: date, page_id: str, site_version: str, qs) -> N
         key = (slot_id, component_alias)
         seen_keys.add(key)
         defaults = {
-            "impressions": int(agg.get("impressions") or 0),
-            "clicks": int(agg.get("clicks") or 0),
-            "avg_scroll_pct": float(agg.get("avg_scroll_pct") or 0.0),
+            "impressions": round(agg.get("impressions") or 0),
+            "clicks": round(agg.get("clicks") or 0),
+            "avg_scroll_pct": (
+                float(agg["scroll_weighted"]) / float(agg["scroll_samples"]) if agg.get("scroll_samples") else 0.0
+            ),
+            "scroll_samples": round(agg.get("scroll_samples") or 0),
             "uu_count": len(visitor_map.get(key, set())),
         }
         ComponentStatDaily.objects.update_or_create(
@@ -186,7 +210,7 @@ def _bucket(value: float | None) -> int | None:
 
 
 def _update_heatmap(day: date, page_id: str, site_version: str, qs) -> None:
-    heatmap_rows_qs = qs.filter(event_type="heatmap").values("device", "payload__x", "payload__y")
+    heatmap_rows_qs = qs.filter(event_type="heatmap").values("device", "payload__x", "payload__y", "sample_rate")
     heatmap_rows = list(heatmap_rows_qs)
     if not heatmap_rows:
         HeatmapBucketDaily.objects.filter(
@@ -196,14 +220,14 @@ def _update_heatmap(day: date, page_id: str, site_version: str, qs) -> None:
         ).delete()
         return
 
-    counts: Dict[Tuple[str, int, int], int] = defaultdict(int)
+    counts: Dict[Tuple[str, int, int], float] = defaultdict(float)
     for row in heatmap_rows:
         bx = _bucket(row.get("payload__x"))
         by = _bucket(row.get("payload__y"))
         if bx is None or by is None:
             continue
         device = (row.get("device") or "").strip()[:8]
-        counts[(device, bx, by)] += 1
+        counts[(device, bx, by)] += 1.0 / (row.get("sample_rate") or 1.0)
 
     existing = {
         (obj.device or "", obj.bucket_x, obj.bucket_y): obj
@@ -224,7 +248,7 @@ def _update_heatmap(day: date, page_id: str, site_version: str, qs) -> None:
             device=device,
             bucket_x=bx,
             bucket_y=by,
-            defaults={"hits": hits},
+            defaults={"hits": round(hits)},
         )
 
     for key, obj in existing.items():
@@ -235,9 +259,11 @@ def _update_heatmap(day: date, page_id: str, site_version: str, qs) -> None:
 @shared_task(queue="analytics")
 def rollup_incremental(date_str: str, page_id: str, site_version: str) -> None:
     day = date.fromisoformat(date_str)
+    start, end = day_bounds(day)
     with transaction.atomic():
         qs = AnalyticsEventRaw.objects.select_for_update().filter(
-            ts__date=day,
+            ts__gte=start,
+            ts__lt=end,
             page_id=page_id,
             site_version=site_version,
         )
@@ -252,12 +278,41 @@ def rollup_incremental(date_str: str, page_id: str, site_version: str) -> None:
                 page_id=page_id,
                 site_version=site_version,
             ).delete()
-            return
-        _update_component_daily(day, page_id, site_version, qs)
-        _update_heatmap(day, page_id, site_version, qs)
-        log.debug(
-            "rollup_incremental completed date=%s page=%s site=%s", date_str, page_id, site_version
-        )
+        else:
+            _update_component_daily(day, page_id, site_version, qs)
+            _update_heatmap(day, page_id, site_version, qs)
+            log.debug(
+                "rollup_incremental completed date=%s page=%s site=%s", date_str, page_id, site_version
+            )
+    # Every event batch lands here: coalesce the week/month rebuild over a window.
+    if claim_rebuild(day, page_id, site_version):
+        rollup_periods.apply_async((date_str, page_id, site_version), countdown=coalesce_seconds())
 
 
-__all__ = ["persist_raw", "rollup_incremental"]
+@shared_task(queue="analytics")
+def rollup_periods(date_str: str, page_id: str, site_version: str) -> None:
+    """Refresh the weekly/monthly tiers containing ``date_str`` from the daily tables."""
+    day = date.fromisoformat(date_str)
+    release_rebuild(day, page_id, site_version)
+    rebuild_periods(day, page_id, site_version)
+
+
+@shared_task(queue="analytics")
+def maintain_raw_partitions() -> list[str]:
+    """Pre-create upcoming raw event partitions (no-op when the table is not partitioned)."""
+    return ensure_partitions()
+
+
+@shared_task(queue="analytics")
+def export_raw_parquet_incremental() -> int:
+    """Nightly incremental Parquet export of raw events (from the stored watermark)."""
+    return export_raw_parquet(incremental=True).rows
+
+
+__all__ = [
+    "export_raw_parquet_incremental",
+    "maintain_raw_partitions",
+    "persist_raw",
+    "rollup_incremental",
+    "rollup_periods",
+]
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from datetime import date
+import io
+import unittest
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from PIL import Image
+
+from apps.atelier.analytics import heatmap_render, rollups
+from apps.atelier.analytics.models import HeatmapBucketDaily
+
+
+@unittest.skipIf(heatmap_render.np is None, "numpy not installed")
+class HeatmapRenderTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        for day, hits in ((date(2026, 2, 3), 5), (date(2026, 2, 4), 7)):
+            HeatmapBucketDaily.objects.create(
+                date=day, site_version="core", page_id="home", device="d", bucket_x=10, bucket_y=20, hits=hits
+            )
+        HeatmapBucketDaily.objects.create(
+            date=date(2026, 2, 3), site_version="core", page_id="home", device="m", bucket_x=99, bucket_y=0, hits=1
+        )
+        rollups.rebuild_periods(date(2026, 2, 3), "home", "core")
+
+    def test_build_grid_accumulates_rows_by_y_then_x(self) -> None:
+        grid = heatmap_render.build_grid({("d", 10, 20): 12, ("m", 10, 20): 3, ("d", 99, 0): 1})
+        self.assertEqual(grid.shape, (100, 100))
+        self.assertEqual(grid[20, 10], 15)
+        self.assertEqual(grid[0, 99], 1)
+        self.assertEqual(grid.sum(), 16)
+
+    def test_render_grid_produces_transparent_overlay(self) -> None:
+        grid = heatmap_render.build_grid({("d", 50, 50): 4})
+        image = Image.open(io.BytesIO(heatmap_render.render_grid(grid, width=200, height=100)))
+        self.assertEqual(image.size, (200, 100))
+        self.assertEqual(image.mode, "RGBA")
+        self.assertEqual(image.getpixel((0, 0))[3], 0)
+        self.assertGreater(image.getpixel((101, 51))[3], 0)
+
+    def test_image_endpoint_renders_and_caches(self) -> None:
+        url = reverse("analytics:analytics-heatmap-image")
+        params = {"page_id": "home", "start": "2026-02-01", "end": "2026-02-28", "fmt": "webp", "width": "120"}
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertEqual(response["X-Heatmap-Hits"], "13")
+        self.assertEqual(Image.open(io.BytesIO(response.content)).size, (120, 120))
+
+        with self.assertNumQueries(0):
+            again = self.client.get(url, params)
+        self.assertEqual(again.content, response.content)
+        self.assertEqual(self.client.get(url, params, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+        device_only = self.client.get(url, {**params, "device": "m"})
+        self.assertEqual(device_only["X-Heatmap-Hits"], "1")
+        self.assertEqual(self.client.get(url, {**params, "fmt": "gif"}).status_code, 400)
+
+    def test_out_of_range_sizes_share_one_cache_entry(self) -> None:
+        url = reverse("analytics:analytics-heatmap-image")
+        params = {"page_id": "home", "start": "2026-02-01", "end": "2026-02-28"}
+        first = self.client.get(url, {**params, "width": "5000"})
+        self.assertEqual(Image.open(io.BytesIO(first.content)).size, (2000, 2000))
+        for width in ("5001", "2000", "99999"):
+            with self.assertNumQueries(0):
+                again = self.client.get(url, {**params, "width": width})
+            self.assertEqual(again["ETag"], first["ETag"])
+        self.assertEqual(
+            heatmap_render.heatmap_digest("home", date(2026, 2, 1), date(2026, 2, 28), width=10),
+            heatmap_render.heatmap_digest("home", date(2026, 2, 1), date(2026, 2, 28), width=50, height=50),
+        )
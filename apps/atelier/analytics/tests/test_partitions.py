@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+import uuid
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.atelier.analytics import partitions
+from apps.atelier.analytics.models import AnalyticsEventRaw, ComponentStatDaily
+from apps.atelier.analytics.tasks import rollup_incremental
+
+
+def _event(ts: datetime, **extra) -> AnalyticsEventRaw:
+    fields = {
+        "event_uuid": uuid.uuid4(),
+        "ts": ts,
+        "page_id": "login",
+        "site_version": "core",
+        "slot_id": "hero",
+        "component_alias": "hero/main",
+        "event_type": "view",
+        "consent": "Y",
+    }
+    fields.update(extra)
+    return AnalyticsEventRaw.objects.create(**fields)
+
+
+class PartitionHelpersTests(TestCase):
+    def test_periods_and_names(self) -> None:
+        self.assertEqual(partitions.period_start(date(2026, 3, 17), "month"), date(2026, 3, 1))
+        self.assertEqual(partitions.next_period(date(2026, 12, 1), "month"), date(2027, 1, 1))
+        self.assertEqual(partitions.next_period(date(2026, 2, 28), "day"), date(2026, 3, 1))
+        self.assertEqual(
+            partitions.partition_name(date(2026, 3, 1), "month"),
+            "atelier_analytics_event_raw_p202603",
+        )
+        self.assertEqual(
+            partitions.partition_name(date(2026, 3, 17), "day"),
+            "atelier_analytics_event_raw_p20260317",
+        )
+
+    def test_day_bounds_follow_default_timezone(self) -> None:
+        start, end = partitions.day_bounds(date(2026, 3, 17))
+        local_start = timezone.localtime(start, timezone.get_default_timezone())
+        self.assertEqual(local_start.date(), date(2026, 3, 17))
+        self.assertEqual(local_start.time(), time.min)
+        self.assertEqual(timezone.localtime(end, timezone.get_default_timezone()).date(), date(2026, 3, 18))
+
+    def test_sqlite_is_never_partitioned(self) -> None:
+        self.assertFalse(partitions.is_partitioned())
+        self.assertEqual(partitions.ensure_partitions(), [])
+        self.assertEqual(partitions.list_partitions(), [])
+
+
+class RollupRangeTests(TestCase):
+    def test_rollup_counts_only_events_inside_local_day(self) -> None:
+        day = date(2026, 3, 17)
+        start, end = partitions.day_bounds(day)
+        _event(start)
+        _event(end - timedelta(seconds=1))
+        _event(end)
+        _event(start - timedelta(seconds=1))
+
+        rollup_incremental(day.isoformat(), "login", "core")
+
+        stat = ComponentStatDaily.objects.get(date=day, page_id="login")
+        self.assertEqual(stat.impressions, 2)
+
+
+class PurgeRawTests(TestCase):
+    def setUp(self) -> None:
+        now = timezone.now()
+        for days in (200, 150, 120):
+            _event(now - timedelta(days=days))
+        _event(now)
+
+    def test_chunked_delete_removes_only_expired_rows(self) -> None:
+        deleted = partitions.chunked_delete(timezone.now() - timedelta(days=90), chunk_size=2)
+        self.assertEqual(deleted, 3)
+        self.assertEqual(AnalyticsEventRaw.objects.count(), 1)
+
+    def test_purge_command_dry_run_and_delete(self) -> None:
+        out = StringIO()
+        call_command("analytics_purge_raw", "--older-than", "90", "--dry-run", stdout=out)
+        self.assertIn("3 events", out.getvalue())
+        self.assertEqual(AnalyticsEventRaw.objects.count(), 4)
+
+        out = StringIO()
+        call_command("analytics_purge_raw", "--older-than", "90", "--chunk-size", "1", stdout=out)
+        self.assertIn("Deleted 3", out.getvalue())
+        self.assertEqual(AnalyticsEventRaw.objects.count(), 1)
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.atelier.analytics import rollups
+from apps.atelier.analytics.tasks import rollup_incremental, rollup_periods
+from apps.atelier.analytics.models import (
+    ComponentStatDaily,
+    ComponentStatRollup,
+    HeatmapBucketDaily,
+    HeatmapBucketRollup,
+)
+
+
+class CoverRangeTests(TestCase):
+    def test_prefers_months_then_weeks_then_days(self) -> None:
+        segments = rollups.cover_range(date(2026, 1, 29), date(2026, 3, 10))
+        self.assertEqual(
+            [(tier, start.isoformat()) for tier, start, _ in segments],
+            [
+                ("day", "2026-01-29"),
+                ("day", "2026-01-30"),
+                ("day", "2026-01-31"),
+                ("month", "2026-02-01"),
+                ("day", "2026-03-01"),
+                ("week", "2026-03-02"),
+                ("day", "2026-03-09"),
+                ("day", "2026-03-10"),
+            ],
+        )
+
+    def test_week_does_not_swallow_a_whole_month(self) -> None:
+        # 2026-06-29 is a Monday whose week contains July 1st.
+        segments = rollups.cover_range(date(2026, 6, 29), date(2026, 7, 31))
+        self.assertIn(("month", date(2026, 7, 1), date(2026, 7, 31)), segments)
+
+
+class RollupRangeViewTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        start = date(2026, 2, 1)
+        for offset in range(28):
+            day = start + timedelta(days=offset)
+            ComponentStatDaily.objects.create(
+                date=day,
+                site_version="core",
+                page_id="home",
+                slot_id="hero",
+                component_alias="hero/main",
+                impressions=10,
+                clicks=1,
+                avg_scroll_pct=50.0 if offset % 2 else 100.0,
+                scroll_samples=1 if offset % 2 else 3,
+                uu_count=2,
+            )
+            HeatmapBucketDaily.objects.create(
+                date=day, site_version="core", page_id="home", device="d", bucket_x=1, bucket_y=2, hits=3
+            )
+        for day in (date(2026, 2, 1), date(2026, 2, 2), date(2026, 2, 9), date(2026, 2, 16), date(2026, 2, 23)):
+            rollups.rebuild_periods(day, "home", "core")
+
+    def test_rebuild_periods_aggregates_daily_rows(self) -> None:
+        month = ComponentStatRollup.objects.get(tier="month", period_start=date(2026, 2, 1))
+        self.assertEqual(month.impressions, 280)
+        self.assertEqual(month.uu_count, 56)
+        self.assertAlmostEqual(month.avg_scroll_pct, (14 * 3 * 100.0 + 14 * 50.0) / 56)
+        week = HeatmapBucketRollup.objects.get(tier="week", period_start=date(2026, 2, 2))
+        self.assertEqual(week.hits, 21)
+
+    def test_rebuild_upserts_and_prunes_stale_rows(self) -> None:
+        HeatmapBucketDaily.objects.filter(date=date(2026, 2, 3)).update(bucket_x=4)
+        rollups.rebuild_periods(date(2026, 2, 3), "home", "core")
+        rollups.rebuild_periods(date(2026, 2, 3), "home", "core")
+
+        week = HeatmapBucketRollup.objects.filter(tier="week", period_start=date(2026, 2, 2))
+        self.assertEqual(
+            sorted(week.values_list("bucket_x", "hits")),
+            [(1, 18), (4, 3)],
+        )
+        month = ComponentStatRollup.objects.get(tier="month", period_start=date(2026, 2, 1))
+        self.assertEqual(month.impressions, 280)
+
+    def test_range_endpoint_uses_rollups_and_etag(self) -> None:
+        url = reverse("analytics:analytics-components-range")
+        params = {"page_id": "home", "start": "2026-02-01", "end": "2026-02-28"}
+        with self.assertNumQueries(1):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["segments"], [{"tier": "month", "start": "2026-02-01", "end": "2026-02-28"}])
+        self.assertEqual(response.json()["results"][0]["impressions"], 280)
+
+        etag = response["ETag"]
+        with self.assertNumQueries(0):
+            cached = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+
+        rollups.bump_high_water_mark("home")
+        refreshed = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertNotEqual(refreshed["ETag"], etag)
+
+    def test_heatmap_range_merges_tiers(self) -> None:
+        url = reverse("analytics:analytics-heatmap-range")
+        response = self.client.get(url, {"page_id": "home", "start": "2026-02-02", "end": "2026-02-10"})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([segment["tier"] for segment in body["segments"]], ["week", "day", "day"])
+        self.assertEqual(body["buckets"], [{"device": "d", "bucket_x": 1, "bucket_y": 2, "hits": 27}])
+
+    def test_range_validation(self) -> None:
+        url = reverse("analytics:analytics-heatmap-range")
+        response = self.client.get(url, {"page_id": "home", "start": "2026-02-10", "end": "2026-02-01"})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(ANALYTICS_ROLLUP_COALESCE_SECONDS=60)
+class RollupCoalescingTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_chained_rebuild_is_scheduled_once_per_window(self) -> None:
+        with mock.patch("apps.atelier.analytics.tasks.rollup_periods.apply_async") as schedule:
+            # Feb 3rd and 4th share week and month: one pending rebuild covers both.
+            for day in ("2026-02-03", "2026-02-03", "2026-02-04"):
+                rollup_incremental(day, "home", "core")
+            rollup_incremental("2026-02-03", "pricing", "core")
+        self.assertEqual(schedule.call_count, 2)
+        self.assertEqual(schedule.call_args_list[0].kwargs["countdown"], 60)
+
+        rollup_periods("2026-02-03", "home", "core")
+        with mock.patch("apps.atelier.analytics.tasks.rollup_periods.apply_async") as schedule:
+            rollup_incremental("2026-02-04", "home", "core")
+        schedule.assert_called_once()
+
+    @override_settings(ANALYTICS_ROLLUP_COALESCE_SECONDS=0)
+    def test_zero_window_disables_coalescing(self) -> None:
+        with mock.patch("apps.atelier.analytics.tasks.rollup_periods.apply_async") as schedule:
+            rollup_incremental("2026-02-03", "home", "core")
+            rollup_incremental("2026-02-03", "home", "core")
+        self.assertEqual(schedule.call_count, 2)
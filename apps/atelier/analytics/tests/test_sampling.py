@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from datetime import date
+from unittest import mock
+import uuid
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.atelier.analytics import sampling
+from apps.atelier.analytics.models import AnalyticsEventRaw, ComponentStatDaily, HeatmapBucketDaily
+from apps.atelier.analytics.partitions import day_bounds
+from apps.atelier.analytics.tasks import persist_raw, rollup_incremental
+
+
+class AdaptiveSamplerTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.sampler = sampling.AdaptiveSampler()
+
+    def test_no_shedding_below_target(self) -> None:
+        with mock.patch.object(self.sampler, "queue_depth", return_value=100):
+            pressure = self.sampler.pressure()
+        self.assertLess(pressure, 1.0)
+        self.assertEqual(self.sampler.rate_for("view", {}, pressure=pressure), 1.0)
+
+    def test_pressure_lowers_rate_down_to_floor(self) -> None:
+        with mock.patch.object(self.sampler, "queue_depth", return_value=20000):
+            pressure = self.sampler.pressure()
+        self.assertEqual(pressure, 4.0)
+        self.assertEqual(self.sampler.rate_for("view", {}, pressure=pressure), 0.25)
+        self.assertEqual(self.sampler.rate_for("heatmap", {}, pressure=400.0), 0.02)
+        self.assertEqual(self.sampler.rate_for("click", {"conversion": True}, pressure=400.0), 1.0)
+        with override_settings(ANALYTICS_SAMPLING={"protected_types": ["click"]}):
+            self.assertEqual(self.sampler.rate_for("click", {}, pressure=400.0), 1.0)
+
+    def test_ingest_lag_contributes_to_pressure(self) -> None:
+        sampling.record_ingest_lag(90)
+        with mock.patch.object(self.sampler, "queue_depth", return_value=0):
+            self.assertAlmostEqual(self.sampler.pressure(), 3.0)
+
+    def test_keep_is_deterministic_and_proportional(self) -> None:
+        ids = [uuid.uuid4() for _ in range(4000)]
+        kept = [event_id for event_id in ids if self.sampler.keep(event_id, 0.25)]
+        self.assertAlmostEqual(len(kept) / len(ids), 0.25, delta=0.03)
+        self.assertEqual(kept, [event_id for event_id in ids if self.sampler.keep(event_id, 0.25)])
+
+
+class SampledRollupTests(TestCase):
+    def test_rollups_reweight_sampled_events(self) -> None:
+        day = date(2026, 3, 17)
+        start, _ = day_bounds(day)
+        events = [
+            {"event_uuid": str(uuid.uuid4()), "event_type": "view", "ts": start.isoformat(), "page_id": "home",
+             "site_version": "core", "slot_id": "hero", "component_alias": "hero/main", "sample_rate": 0.25},
+            {"event_uuid": str(uuid.uuid4()), "event_type": "view", "ts": start.isoformat(), "page_id": "home",
+             "site_version": "core", "slot_id": "hero", "component_alias": "hero/main"},
+            {"event_uuid": str(uuid.uuid4()), "event_type": "heatmap", "ts": start.isoformat(), "page_id": "home",
+             "site_version": "core", "payload": {"x": 0.5, "y": 0.5}, "sample_rate": 0.1},
+        ]
+        persist_raw(events, meta={})
+        self.assertEqual(
+            sorted(AnalyticsEventRaw.objects.values_list("sample_rate", flat=True)),
+            [0.1, 0.25, 1.0],
+        )
+
+        rollup_incremental(day.isoformat(), "home", "core")
+
+        self.assertEqual(ComponentStatDaily.objects.get(date=day, slot_id="hero").impressions, 5)
+        self.assertEqual(HeatmapBucketDaily.objects.get(date=day, bucket_x=50, bucket_y=50).hits, 10)
+
+
+class CollectorSamplingTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.url = reverse("analytics:analytics-collect")
+        self.client.cookies["cookie_consent_marketing"] = "1"
+
+    def _post(self, count: int):
+        events = [
+            {"event_uuid": str(uuid.uuid4()), "event_type": "view", "page_id": "home"}
+            for _ in range(count)
+        ]
+        return self.client.post(self.url, {"events": events}, content_type="application/json")
+
+    def test_collector_tags_kept_events_with_rate(self) -> None:
+        with mock.patch.object(sampling.AdaptiveSampler, "pressure", return_value=1000.0), \
+                mock.patch("apps.atelier.analytics.tasks.persist_raw.delay") as delay:
+            response = self._post(40)
+        self.assertEqual(response.status_code, 202)
+        body = response.json()
+        self.assertEqual(body["accepted"] + body["sampled_out"], 40)
+        self.assertGreater(body["sampled_out"], 0)
+        if body["accepted"]:
+            sent = delay.call_args.args[0]
+            self.assertTrue(all(event["sample_rate"] == 0.05 for event in sent))
+            self.assertIn("enqueued_at", delay.call_args.kwargs["meta"])
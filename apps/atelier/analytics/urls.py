@@ -2,12 +2,21 @@
 from django.urls import path
 
 from .views import CollectAPIView
-from .views_read import ComponentStatsView, HeatmapBucketsView
+from .views_read import (
+    ComponentStatsRangeView,
+    ComponentStatsView,
+    HeatmapBucketsView,
+    HeatmapImageView,
+    HeatmapRangeView,
+)
 
 urlpatterns = [
     path("collect/", CollectAPIView.as_view(), name="analytics-collect"),
     path("components/", ComponentStatsView.as_view(), name="analytics-components"),
     path("heatmap/", HeatmapBucketsView.as_view(), name="analytics-heatmap"),
+    path("components/range/", ComponentStatsRangeView.as_view(), name="analytics-components-range"),
+    path("heatmap/range/", HeatmapRangeView.as_view(), name="analytics-heatmap-range"),
+    path("heatmap/image/", HeatmapImageView.as_view(), name="analytics-heatmap-image"),
 ]
 
 __all__ = ["urlpatterns"]
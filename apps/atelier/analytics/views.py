@@ -4,6 +4,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any, Dict, List
 import logging
+import time
 
 from django.conf import settings
 from django.http import HttpRequest
@@ -11,6 +12,7 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .sampling import get_sampler
 from .serializers import CollectBatchSerializer
 from .throttling import AnalyticsIPThrottle
 from . import tasks
@@ -68,10 +70,20 @@ class CollectAPIView(APIView):
             "host": request.get_host() if hasattr(request, "get_host") else "",
         }
 
+        # Shed load under back-pressure; kept events carry their sampling rate.
+        sampler = get_sampler()
+        pressure = sampler.pressure()
+        dropped = 0
+
         # Flatten events to include context but leave heavy work to Celery.
         enriched: List[Dict[str, Any]] = []
         for event in events:
+            rate = sampler.rate_for(event.get("event_type", ""), event.get("payload"), pressure=pressure)
+            if not sampler.keep(event.get("event_uuid"), rate):
+                dropped += 1
+                continue
             entry = dict(event)
+            entry["sample_rate"] = rate
             ts = entry.get("ts")
             if isinstance(ts, datetime):
                 entry["ts"] = ts.isoformat()
@@ -87,12 +99,16 @@ class CollectAPIView(APIView):
                 entry["referer"] = ctx["referer"]
             enriched.append(entry)
 
-        tasks.persist_raw.delay(enriched, meta={
-            "user_agent": ctx["user_agent"],
-            "ip": ctx["ip"],
-            "host": ctx["host"],
-        })
-        return Response({"accepted": len(enriched)}, status=status.HTTP_202_ACCEPTED)
+        if dropped:
+            log.debug("analytics sampling dropped=%s kept=%s pressure=%.2f", dropped, len(enriched), pressure)
+        if enriched:
+            tasks.persist_raw.delay(enriched, meta={
+                "user_agent": ctx["user_agent"],
+                "ip": ctx["ip"],
+                "host": ctx["host"],
+                "enqueued_at": time.time(),
+            })
+        return Response({"accepted": len(enriched), "sampled_out": dropped}, status=status.HTTP_202_ACCEPTED)
 
     @staticmethod
     def _resolve_user_id(request: HttpRequest) -> str:
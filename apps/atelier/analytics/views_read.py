@@ -1,13 +1,24 @@
 """Read-only analytics endpoints for aggregated metrics."""
 from __future__ import annotations
 
+from collections import defaultdict
+import hashlib
+import json
+from typing import Any, Callable, Dict, Tuple
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.http import HttpResponse
 from django.utils import timezone
 from django.utils.dateparse import parse_date
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import ComponentStatDaily, HeatmapBucketDaily
+from . import heatmap_render, rollups
+from .models import ComponentStatDaily, ComponentStatRollup, HeatmapBucketDaily
+
+RANGE_CACHE_TTL = 300
 
 
 class ComponentStatsView(APIView):
@@ -98,4 +109,220 @@ class HeatmapBucketsView(APIView):
         })
 
 
-__all__ = ["ComponentStatsView", "HeatmapBucketsView"]
+def _parse_range(request) -> Tuple[Any, Any, Response | None]:
+    start = parse_date(request.query_params.get("start") or "")
+    end = parse_date(request.query_params.get("end") or "")
+    if start is None or end is None:
+        return None, None, Response({"detail": "start and end dates are required."}, status=status.HTTP_400_BAD_REQUEST)
+    if end < start:
+        return None, None, Response({"detail": "end must not precede start."}, status=status.HTTP_400_BAD_REQUEST)
+    if (end - start).days + 1 > rollups.MAX_RANGE_DAYS:
+        return None, None, Response(
+            {"detail": f"Range limited to {rollups.MAX_RANGE_DAYS} days."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return start, end, None
+
+
+def _tier_q(segments, *, day_field: str, period_field: str) -> Dict[str, Q]:
+    """Return one ``Q`` per tier selecting the segments' period starts."""
+    grouped = rollups.segment_filters(segments)
+    filters: Dict[str, Q] = {}
+    for tier, starts in grouped.items():
+        if tier == rollups.DAY:
+            filters[tier] = Q(**{f"{day_field}__in": starts})
+        else:
+            filters[tier] = Q(tier=tier, **{f"{period_field}__in": starts})
+    return filters
+
+
+def _etag_matches(request, etag: str) -> bool:
+    if_none_match = request.headers.get("If-None-Match", "")
+    return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+
+def _cached_range_response(request, kind: str, page_id: str, build: Callable[[], Dict[str, Any]]) -> Response:
+    """Serve ``build()`` through the cache, keyed and ETagged by the page's rollup high-water mark."""
+    hwm = rollups.high_water_mark(page_id)
+    params = json.dumps(sorted(request.query_params.items()), separators=(",", ":"))
+    digest = hashlib.sha1(f"{kind}|{params}|{hwm}".encode("utf-8")).hexdigest()
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={RANGE_CACHE_TTL}"}
+
+    if _etag_matches(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    cache_key = f"atelier:analytics:range:{kind}:{digest}"
+    payload = cache.get(cache_key)
+    if payload is None:
+        payload = build()
+        cache.set(cache_key, payload, RANGE_CACHE_TTL)
+    return Response(payload, headers=headers)
+
+
+def _segments_payload(segments) -> list[dict]:
+    return [{"tier": tier, "start": start.isoformat(), "end": end.isoformat()} for tier, start, end in segments]
+
+
+class ComponentStatsRangeView(APIView):
+    """Component aggregates over ``[start, end]`` read from the coarsest rollup tiers.
+
+    ``uu_count`` is summed per day/period and therefore counts returning
+    visitors once per day.
+    """
+
+    def get(self, request, *args, **kwargs) -> Response:
+        start, end, error = _parse_range(request)
+        if error is not None:
+            return error
+        page_id = request.query_params.get("page_id")
+        if not page_id:
+            return Response({"detail": "page_id is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        site_version = request.query_params.get("site_version", "")
+        slot_id = request.query_params.get("slot_id")
+        component_alias = request.query_params.get("component_alias")
+
+        def build() -> Dict[str, Any]:
+            segments = rollups.cover_range(start, end)
+            filters = {"page_id": page_id}
+            if site_version:
+                filters["site_version"] = site_version
+            if slot_id:
+                filters["slot_id"] = slot_id
+            if component_alias:
+                filters["component_alias"] = component_alias
+
+            totals: Dict[Tuple[str, str, str], Dict[str, float]] = defaultdict(
+                lambda: {"impressions": 0, "clicks": 0, "uu_count": 0, "scroll_weight": 0.0, "scroll_samples": 0}
+            )
+            fields = (
+                "site_version",
+                "slot_id",
+                "component_alias",
+                "impressions",
+                "clicks",
+                "uu_count",
+                "avg_scroll_pct",
+                "scroll_samples",
+            )
+            for tier, q in _tier_q(segments, day_field="date", period_field="period_start").items():
+                model = ComponentStatDaily if tier == rollups.DAY else ComponentStatRollup
+                for row in model.objects.filter(q, **filters).values(*fields):
+                    bucket = totals[(row["site_version"], row["slot_id"], row["component_alias"])]
+                    bucket["impressions"] += row["impressions"]
+                    bucket["clicks"] += row["clicks"]
+                    bucket["uu_count"] += row["uu_count"]
+                    bucket["scroll_weight"] += (row["avg_scroll_pct"] or 0.0) * row["scroll_samples"]
+                    bucket["scroll_samples"] += row["scroll_samples"]
+
+            results = [
+                {
+                    "page_id": page_id,
+                    "slot_id": slot,
+                    "component_alias": alias,
+                    "site_version": version,
+                    "impressions": values["impressions"],
+                    "clicks": values["clicks"],
+                    "avg_scroll_pct": (
+                        values["scroll_weight"] / values["scroll_samples"] if values["scroll_samples"] else 0.0
+                    ),
+                    "uu_count": values["uu_count"],
+                }
+                for (version, slot, alias), values in sorted(totals.items(), key=lambda item: item[0][1:] + item[0][:1])
+            ]
+            return {
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "page_id": page_id,
+                "site_version": site_version,
+                "segments": _segments_payload(segments),
+                "results": results,
+            }
+
+        return _cached_range_response(request, "components", page_id, build)
+
+
+class HeatmapRangeView(APIView):
+    """Heatmap buckets merged over ``[start, end]`` from the coarsest rollup tiers."""
+
+    def get(self, request, *args, **kwargs) -> Response:
+        start, end, error = _parse_range(request)
+        if error is not None:
+            return error
+        page_id = request.query_params.get("page_id")
+        if not page_id:
+            return Response({"detail": "page_id is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        site_version = request.query_params.get("site_version", "")
+        device = request.query_params.get("device")
+
+        def build() -> Dict[str, Any]:
+            segments, hits = rollups.heatmap_hits(page_id, start, end, site_version=site_version, device=device)
+            buckets = [
+                {"device": dev, "bucket_x": bx, "bucket_y": by, "hits": count}
+                for (dev, bx, by), count in sorted(hits.items())
+            ]
+            return {
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "page_id": page_id,
+                "site_version": site_version,
+                "segments": _segments_payload(segments),
+                "buckets": buckets,
+            }
+
+        return _cached_range_response(request, "heatmap", page_id, build)
+
+
+class HeatmapImageView(APIView):
+    """Render the heatmap of ``[start, end]`` as a transparent PNG/WebP overlay."""
+
+    def get(self, request, *args, **kwargs):
+        start, end, error = _parse_range(request)
+        if error is not None:
+            return error
+        page_id = request.query_params.get("page_id")
+        if not page_id:
+            return Response({"detail": "page_id is required."}, status=status.HTTP_400_BAD_REQUEST)
+        # ``format`` is reserved by DRF content negotiation, hence ``fmt``.
+        fmt = (request.query_params.get("fmt") or "png").lower()
+        if fmt not in heatmap_render.FORMATS:
+            return Response({"detail": "fmt must be png or webp."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            width, height = heatmap_render.clamp_size(
+                int(request.query_params.get("width") or heatmap_render.DEFAULT_WIDTH),
+                int(request.query_params["height"]) if request.query_params.get("height") else None,
+            )
+        except ValueError:
+            return Response({"detail": "width/height must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+
+        options = {
+            "site_version": request.query_params.get("site_version", ""),
+            "device": request.query_params.get("device") or None,
+            "width": width,
+            "height": height,
+            "fmt": fmt,
+        }
+        try:
+            etag = f'"{heatmap_render.heatmap_digest(page_id, start, end, **options)}"'
+            if _etag_matches(request, etag):
+                response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                rendered = heatmap_render.render_heatmap(page_id, start, end, **options)
+                response = HttpResponse(rendered.content, content_type=rendered.content_type)
+                response["X-Heatmap-Hits"] = str(rendered.total_hits)
+        except heatmap_render.HeatmapRenderError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response["ETag"] = etag
+        response["Cache-Control"] = f"private, max-age={RANGE_CACHE_TTL}"
+        return response
+
+
+__all__ = [
+    "ComponentStatsRangeView",
+    "ComponentStatsView",
+    "HeatmapBucketsView",
+    "HeatmapImageView",
+    "HeatmapRangeView",
+]
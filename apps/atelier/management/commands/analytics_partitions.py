@@ -0,0 +1,64 @@
+"""Manage time partitions of the analytics raw events table (PostgreSQL)."""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.atelier.analytics import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert the analytics raw table to range partitions on ts, pre-create "
+        "upcoming partitions and list the current layout."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Partition the table in place (existing rows become the legacy partition).",
+        )
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=None,
+            help="Number of future partitions to keep ready (default: ANALYTICS_RAW_PARTITION_AHEAD).",
+        )
+        parser.add_argument(
+            "--granularity",
+            choices=partitions.GRANULARITIES,
+            default=None,
+            help="Partition size (default: ANALYTICS_RAW_PARTITION_GRANULARITY).",
+        )
+        parser.add_argument("--list", action="store_true", dest="list_only", help="Only list partitions.")
+
+    def handle(self, *args, **options):
+        if not partitions.supports_partitioning():
+            self.stdout.write(self.style.WARNING(
+                "Database backend does not support declarative partitioning; "
+                "analytics_purge_raw falls back to chunked deletes."
+            ))
+            return
+
+        granularity = options.get("granularity")
+        ahead = options.get("ahead")
+
+        if options.get("convert"):
+            if partitions.convert_to_partitioned(granularity=granularity, ahead=ahead):
+                self.stdout.write(self.style.SUCCESS("Analytics raw table converted to partitions."))
+            else:
+                self.stdout.write("Analytics raw table already partitioned.")
+        elif not partitions.is_partitioned():
+            raise CommandError("Analytics raw table is not partitioned yet; run with --convert first.")
+
+        if not options.get("list_only"):
+            created = partitions.ensure_partitions(ahead=ahead, granularity=granularity)
+            self.stdout.write(self.style.SUCCESS(f"Created {len(created)} partition(s): {', '.join(created) or '-'}"))
+
+        for part in partitions.list_partitions():
+            if part.is_default:
+                self.stdout.write(f"{part.name}  DEFAULT")
+                continue
+            start = part.start.isoformat() if part.start else "MINVALUE"
+            end = part.end.isoformat() if part.end else "MAXVALUE"
+            self.stdout.write(f"{part.name}  [{start}, {end})")
@@ -6,11 +6,15 @@ from datetime import timedelta
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
+from apps.atelier.analytics import partitions
 from apps.atelier.analytics.models import AnalyticsEventRaw
 
 
 class Command(BaseCommand):
-    help = "Purge analytics raw events older than the specified number of days."
+    help = (
+        "Purge analytics raw events older than the specified number of days. "
+        "Partitioned tables drop whole partitions; other backends delete in chunks."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -26,17 +30,57 @@ class Command(BaseCommand):
             dest="dry_run",
             help="Only report the number of rows that would be deleted.",
         )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=partitions.DEFAULT_CHUNK_SIZE,
+            dest="chunk_size",
+            help=f"Rows deleted per transaction when not partitioned (default: {partitions.DEFAULT_CHUNK_SIZE}).",
+        )
+        parser.add_argument(
+            "--detach-only",
+            action="store_true",
+            dest="detach_only",
+            help="Detach expired partitions but keep their tables (e.g. for archiving).",
+        )
+        parser.add_argument(
+            "--exact",
+            action="store_true",
+            dest="exact",
+            help="Also chunk-delete expired rows left in the partition straddling the cutoff.",
+        )
 
     def handle(self, *args, **options):
         days = max(int(options["older_than"]), 0)
         dry_run = bool(options.get("dry_run"))
+        chunk_size = max(int(options.get("chunk_size") or partitions.DEFAULT_CHUNK_SIZE), 1)
         cutoff = timezone.now() - timedelta(days=days)
 
+        if partitions.is_partitioned():
+            names = partitions.drop_partitions_before(
+                cutoff,
+                detach_only=bool(options.get("detach_only")),
+                dry_run=dry_run,
+            )
+            verb = "detached" if options.get("detach_only") else "dropped"
+            if dry_run:
+                self.stdout.write(self.style.WARNING(
+                    f"[dry-run] {len(names)} partition(s) older than {days} days: {', '.join(names) or '-'}"
+                ))
+                return
+            self.stdout.write(self.style.SUCCESS(
+                f"{len(names)} analytics partition(s) {verb}: {', '.join(names) or '-'}"
+            ))
+            if options.get("exact"):
+                deleted = partitions.chunked_delete(cutoff, chunk_size=chunk_size)
+                self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} remaining events older than {days} days."))
+            return
+
         qs = AnalyticsEventRaw.objects.filter(ts__lt=cutoff)
-        count = qs.count()
         if dry_run:
+            count = qs.count()
             self.stdout.write(self.style.WARNING(f"[dry-run] {count} events older than {days} days."))
             return
 
-        deleted, _ = qs.delete()
+        deleted = partitions.chunked_delete(cutoff, chunk_size=chunk_size)
         self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} analytics events older than {days} days."))
@@ -0,0 +1,50 @@
+"""Render an analytics heatmap overlay to an image file."""
+from __future__ import annotations
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.atelier.analytics import heatmap_render
+
+
+class Command(BaseCommand):
+    help = "Render the heatmap of a page over a day range as a PNG/WebP overlay."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-id", dest="page_id", required=True)
+        parser.add_argument("--start", required=True, help="First day (YYYY-MM-DD).")
+        parser.add_argument("--end", required=True, help="Last day (YYYY-MM-DD).")
+        parser.add_argument("--site-version", dest="site_version", default="")
+        parser.add_argument("--device", default=None)
+        parser.add_argument("--width", type=int, default=heatmap_render.DEFAULT_WIDTH)
+        parser.add_argument("--height", type=int, default=None)
+        parser.add_argument("--format", dest="fmt", choices=sorted(heatmap_render.FORMATS), default="png")
+        parser.add_argument("--out", required=True, help="Destination file.")
+
+    def handle(self, *args, **options):
+        start = parse_date(options["start"] or "")
+        end = parse_date(options["end"] or "")
+        if start is None or end is None or end < start:
+            raise CommandError("Invalid --start/--end range.")
+        try:
+            rendered = heatmap_render.render_heatmap(
+                options["page_id"],
+                start,
+                end,
+                site_version=options["site_version"],
+                device=options["device"],
+                width=options["width"],
+                height=options["height"],
+                fmt=options["fmt"],
+            )
+        except heatmap_render.HeatmapRenderError as exc:
+            raise CommandError(str(exc)) from exc
+
+        out = Path(options["out"])
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_bytes(rendered.content)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {out} ({len(rendered.content)} bytes, {rendered.total_hits} hits)."
+        ))
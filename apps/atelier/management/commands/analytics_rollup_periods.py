@@ -0,0 +1,53 @@
+"""Backfill weekly/monthly analytics rollups from the daily aggregates."""
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.atelier.analytics import rollups
+from apps.atelier.analytics.models import ComponentStatDaily, HeatmapBucketDaily
+
+
+class Command(BaseCommand):
+    help = "Rebuild weekly and monthly analytics rollups covering a date range."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", required=True, help="First day (YYYY-MM-DD).")
+        parser.add_argument("--end", required=True, help="Last day (YYYY-MM-DD).")
+        parser.add_argument("--page-id", dest="page_id", default=None, help="Restrict to one page_id.")
+
+    def handle(self, *args, **options):
+        start = parse_date(options["start"] or "")
+        end = parse_date(options["end"] or "")
+        if start is None or end is None or end < start:
+            raise CommandError("Invalid --start/--end range.")
+
+        targets: set[tuple[str, str]] = set()
+        for model in (ComponentStatDaily, HeatmapBucketDaily):
+            qs = model.objects.filter(date__gte=start, date__lte=end)
+            if options.get("page_id"):
+                qs = qs.filter(page_id=options["page_id"])
+            targets.update(qs.values_list("page_id", "site_version").distinct())
+
+        # One rebuild per (period, page, site) is enough: walk one day per week/month.
+        days = []
+        current = start
+        while current <= end:
+            days.append(current)
+            current = rollups.period_bounds(current, "week")[1] + timedelta(days=1)
+        if days[-1] != end:
+            days.append(end)
+        rebuilt = 0
+        for page_id, site_version in sorted(targets):
+            seen_months = set()
+            for day in days:
+                month = rollups.period_bounds(day, "month")[0]
+                tiers = ["week"] if month in seen_months else ["week", "month"]
+                seen_months.add(month)
+                rollups.rebuild_periods(day, page_id, site_version, tiers=tiers)
+                rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {rebuilt} period set(s) for {len(targets)} page/site pair(s)."
+        ))
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atelier', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='componentstatdaily',
+            name='scroll_samples',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ComponentStatRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tier', models.CharField(choices=[('week', 'Week (ISO, Monday)'), ('month', 'Calendar month')], max_length=8)),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('site_version', models.CharField(blank=True, max_length=32)),
+                ('page_id', models.CharField(blank=True, max_length=128)),
+                ('slot_id', models.CharField(blank=True, max_length=128)),
+                ('component_alias', models.CharField(blank=True, max_length=128)),
+                ('impressions', models.PositiveIntegerField(default=0)),
+                ('clicks', models.PositiveIntegerField(default=0)),
+                ('avg_scroll_pct', models.FloatField(default=0.0)),
+                ('scroll_samples', models.PositiveIntegerField(default=0)),
+                ('uu_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Component Rollup Stat',
+                'verbose_name_plural': 'Component Rollup Stats',
+                'db_table': 'atelier_component_stat_rollup',
+                'indexes': [models.Index(fields=['tier', 'page_id', 'period_start'], name='aa_cmp_rollup_lookup')],
+                'unique_together': {('tier', 'period_start', 'site_version', 'page_id', 'slot_id', 'component_alias')},
+            },
+        ),
+        migrations.CreateModel(
+            name='HeatmapBucketRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tier', models.CharField(choices=[('week', 'Week (ISO, Monday)'), ('month', 'Calendar month')], max_length=8)),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('site_version', models.CharField(blank=True, max_length=32)),
+                ('page_id', models.CharField(blank=True, max_length=128)),
+                ('device', models.CharField(blank=True, max_length=8)),
+                ('bucket_x', models.PositiveSmallIntegerField()),
+                ('bucket_y', models.PositiveSmallIntegerField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Heatmap Bucket Rollup',
+                'verbose_name_plural': 'Heatmap Bucket Rollups',
+                'db_table': 'atelier_heatmap_bucket_rollup',
+                'indexes': [models.Index(fields=['tier', 'page_id', 'period_start', 'device'], name='aa_heatmap_rollup_lookup')],
+                'unique_together': {('tier', 'period_start', 'site_version', 'page_id', 'device', 'bucket_x', 'bucket_y')},
+            },
+        ),
+    ]
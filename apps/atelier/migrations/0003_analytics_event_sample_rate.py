@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atelier', '0002_analytics_rollup_tiers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analyticseventraw',
+            name='sample_rate',
+            field=models.FloatField(default=1.0),
+        ),
+    ]
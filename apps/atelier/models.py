@@ -2,11 +2,15 @@
 from .analytics.models import (  # noqa: F401
     AnalyticsEventRaw,
     ComponentStatDaily,
+    ComponentStatRollup,
     HeatmapBucketDaily,
+    HeatmapBucketRollup,
 )
 
 __all__ = [
     "AnalyticsEventRaw",
     "ComponentStatDaily",
+    "ComponentStatRollup",
     "HeatmapBucketDaily",
+    "HeatmapBucketRollup",
 ]
@@ -0,0 +1,94 @@
+# apps/common/smtp_sink.py
+"""Puits SMTP local pour les bancs d'essai (``leads_loadtest``, ``email_smtp_bench``).
+
+Serveur en thread qui accepte tout et ne délivre rien : il compte connexions,
+messages et destinataires, et peut simuler la latence d'un MTA distant.
+"""
+from __future__ import annotations
+
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str) -> None:
+        self.wfile.write((line + "\r\n").encode("ascii"))
+
+    def handle(self) -> None:
+        self.server.sink.connected()
+        self._reply("220 loadtest-sink ESMTP")
+        recipients = 0
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            verb = raw.decode("utf-8", "replace").strip().split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self._reply("250-loadtest-sink")
+                self._reply("250 8BITMIME")
+            elif verb in ("HELO", "MAIL", "RSET", "NOOP"):
+                recipients = 0 if verb in ("MAIL", "RSET") else recipients
+                self._reply("250 OK")
+            elif verb == "RCPT":
+                recipients += 1
+                self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk in (b".\r\n", b".\n"):
+                        break
+                if self.server.sink.latency:
+                    time.sleep(self.server.sink.latency)  # simule le traitement d'un vrai MTA
+                self.server.sink.received(recipients)
+                self._reply("250 OK queued")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class _SMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    """Serveur SMTP minimal en thread : accepte tout, compte connexions, messages et destinataires.
+
+    ``latency`` (secondes) retarde la réponse à DATA, comme un MTA distant.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0) -> None:
+        self._server = _SMTPServer((host, port), _SMTPHandler)
+        self._server.sink = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._lock = threading.Lock()
+        self.latency = max(float(latency), 0.0)
+        self.connections = 0
+        self.messages = 0
+        self.recipients = 0
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    def connected(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def received(self, recipients: int) -> None:
+        with self._lock:
+            self.messages += 1
+            self.recipients += recipients
+
+    def __enter__(self) -> "SMTPSink":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
@@ -38,6 +38,8 @@ class StepConfig(BaseModel):
     conditions: List[ConditionConfig] = []
     # Optionnel : visibilité conditionnelle de la step
     show_if: Optional[List[ConditionConfig]] = None
+    # Mode brouillon : écrire FlowSession/Lead en base à la fin de cette step
+    checkpoint: bool = False
 
 class FlowConfig(BaseModel):
     key: str
@@ -0,0 +1,99 @@
+# apps/flowforms/engine/compiled.py
+"""
+Flows compilés : un ``CompiledFlow`` par clé de flow et par version de config.
+
+La config Pydantic est déjà mise en cache par ``load_config`` (clé = path, mtime) ;
+on s'appuie sur l'identité de cet objet : tant qu'il ne change pas, le flow compilé
+(dict, Router indexé, classes de form par step) est réutilisé. Par requête, il ne
+reste qu'à instancier le form.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from django import forms
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from apps.flowforms.conf.loader import load_config
+from apps.flowforms.conf.schema import FlowFormsConfig
+
+from .forms_builder import build_form_class
+from .router import Router
+
+
+class CompiledFlow:
+    def __init__(self, flow_cfg: Dict[str, Any]) -> None:
+        self.flow_cfg = flow_cfg
+        self.key: str = flow_cfg["key"]
+        self.kind: str = flow_cfg["kind"]
+        self.router = Router.from_flow(flow_cfg)
+        self.step_cfgs: Dict[str, Dict[str, Any]] = {}
+        for s in flow_cfg.get("steps") or []:
+            self.step_cfgs.setdefault(s["key"], s)
+        self.checkpoints: Tuple[str, ...] = tuple(
+            s["key"] for s in (flow_cfg.get("steps") or []) if s.get("checkpoint")
+        )
+        self._form_classes: Dict[str, type[forms.ModelForm]] = {}
+        self._lock = threading.Lock()
+
+    def step_cfg(self, step_key: str) -> Dict[str, Any]:
+        try:
+            return self.step_cfgs[step_key]
+        except KeyError:
+            raise KeyError(f"Step '{step_key}' not found") from None
+
+    def form_class(self, step_key: str) -> type[forms.ModelForm]:
+        """Classe de form de la step, construite au premier usage puis réutilisée."""
+        cls = self._form_classes.get(step_key)
+        if cls is None:
+            with self._lock:
+                cls = self._form_classes.get(step_key)
+                if cls is None:
+                    cls = build_form_class(self.step_cfg(step_key))
+                    self._form_classes[step_key] = cls
+        return cls
+
+
+_lock = threading.Lock()
+_compiled: Dict[str, Tuple[FlowFormsConfig, CompiledFlow]] = {}
+
+
+def _find_flow(cfg: FlowFormsConfig, flow_key: str) -> Optional[Dict[str, Any]]:
+    for f in getattr(cfg, "flows", []) or []:
+        if f.key == flow_key:
+            return f.model_dump()
+    return None
+
+
+def get_compiled_flow(flow_key: str) -> CompiledFlow:
+    """Même contrat que ``get_flow`` (KeyError si flow inconnu), mais compilé et mis en cache."""
+    cfg = load_config()
+    entry = _compiled.get(flow_key)
+    if entry is not None and entry[0] is cfg:
+        return entry[1]
+    with _lock:
+        entry = _compiled.get(flow_key)
+        if entry is not None and entry[0] is cfg:
+            return entry[1]
+        flow_cfg = _find_flow(cfg, flow_key)
+        if flow_cfg is None:
+            raise KeyError(f"Flow '{flow_key}' introuvable dans la configuration.")
+        compiled = CompiledFlow(flow_cfg)
+        # nouvelle config => on ne garde que les flows de cette version
+        for key in [k for k, (c, _) in _compiled.items() if c is not cfg]:
+            del _compiled[key]
+        _compiled[flow_key] = (cfg, compiled)
+        return compiled
+
+
+def invalidate_compiled_flows() -> None:
+    with _lock:
+        _compiled.clear()
+
+
+@receiver(setting_changed)
+def _on_setting_changed(setting=None, **kwargs):
+    if setting in ("FLOWFORMS_POLICY_YAML", "FLOWFORMS_VALIDATORS_MAP"):
+        invalidate_compiled_flows()
@@ -0,0 +1,149 @@
+# apps/flowforms/engine/drafts.py
+"""
+Brouillons de flow (backend ``FLOWFORMS_STORAGE_BACKEND = "draft"``).
+
+Entre deux checkpoints, l'avancement d'un visiteur (snapshot cumulatif, step
+courante) vit dans le cache (Redis en prod) avec un TTL, sans écriture SQL.
+``FlowSession`` / ``Lead`` ne sont écrits qu'aux checkpoints :
+
+- première step d'identité (email/phone fournis alors qu'aucun lead n'est lié) ;
+- steps marquées ``checkpoint: true`` dans le YAML ;
+- soumission finale (``storage.commit_draft`` avant ``submit_lead_from_flowsession``).
+
+Chaque brouillon est indexé dans un sorted set (id FlowSession -> date de dernière
+écriture). ``recover_drafts`` (tâche beat) rejoue en base les brouillons restés
+sans checkpoint au-delà d'un délai de grâce : un crash worker ou un visiteur qui
+abandonne ne perd donc pas son snapshot, et les relances d'abandon le voient.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.flowforms.models import FlowSession
+
+from .scoreset import score_set
+
+log = logging.getLogger("flowforms.drafts")
+
+DRAFT_KEY = "flowforms:draft:{fs_id}"
+INDEX_KEY = "flowforms:drafts"
+DEFAULT_TTL_SECONDS = 2 * 24 * 3600
+DEFAULT_RECOVER_AFTER_SECONDS = 15 * 60
+IDENTITY_FIELDS = ("email", "phone")
+
+
+def drafts_enabled() -> bool:
+    return getattr(settings, "FLOWFORMS_STORAGE_BACKEND", "db") == "draft"
+
+
+def draft_ttl() -> int:
+    return int(getattr(settings, "FLOWFORMS_DRAFT_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+
+
+def _key(fs_id: int) -> str:
+    return DRAFT_KEY.format(fs_id=fs_id)
+
+
+# -----------------------------
+# Lecture / écriture
+# -----------------------------
+def load_draft(fs_id: int) -> Optional[Dict[str, Any]]:
+    try:
+        return cache.get(_key(fs_id))
+    except Exception:
+        log.warning("draft_load_failed fs=%s", fs_id, exc_info=True)
+        return None
+
+
+def save_draft(fs: FlowSession, form_kind: str) -> bool:
+    """Écrit le brouillon de ``fs`` (état en mémoire). False si le cache est indisponible."""
+    now = time.time()
+    draft = {
+        "flow_key": fs.flow_key,
+        "form_kind": form_kind,
+        "session_key": fs.session_key,
+        "current_step": fs.current_step,
+        "snapshot": dict(fs.data_snapshot or {}),
+        "saved_at": now,
+    }
+    try:
+        # index d'abord : un brouillon écrit est toujours récupérable
+        score_set(INDEX_KEY).add(fs.id, now)
+        cache.set(_key(fs.id), draft, draft_ttl())
+    except Exception:
+        log.warning("draft_save_failed fs=%s ; fallback DB", fs.id, exc_info=True)
+        return False
+    return True
+
+
+def discard_draft(fs_id: int, saved_at: Optional[float] = None) -> None:
+    """Supprime le brouillon après checkpoint (l'index n'est vidé que s'il n'a pas été réécrit)."""
+    try:
+        if saved_at is None:
+            cache.delete(_key(fs_id))
+            score_set(INDEX_KEY).remove_if_unchanged(fs_id, float("inf"))
+            return
+        current = cache.get(_key(fs_id))
+        if current and current.get("saved_at", 0) <= saved_at:
+            cache.delete(_key(fs_id))
+        score_set(INDEX_KEY).remove_if_unchanged(fs_id, saved_at)
+    except Exception:
+        log.warning("draft_discard_failed fs=%s", fs_id, exc_info=True)
+
+
+def apply_draft(fs: FlowSession) -> Optional[Dict[str, Any]]:
+    """Superpose le brouillon (plus récent que la base par construction) sur ``fs`` en mémoire."""
+    draft = load_draft(fs.id)
+    if not draft:
+        return None
+    fs.data_snapshot = dict(draft.get("snapshot") or {})
+    fs.current_step = draft.get("current_step") or fs.current_step
+    return draft
+
+
+def is_checkpoint(fs: FlowSession, step_key: str, cleaned_data: Dict[str, Any], checkpoints=()) -> bool:
+    if step_key in (checkpoints or ()):
+        return True
+    # première step d'identité : le lead doit exister pour le merge / les relances
+    return fs.lead_id is None and any(cleaned_data.get(f) for f in IDENTITY_FIELDS)
+
+
+# -----------------------------
+# Récupération
+# -----------------------------
+def recover_drafts(*, older_than: Optional[float] = None, limit: int = 500) -> int:
+    """
+    Rejoue en base les brouillons non écrits depuis ``older_than`` secondes
+    (``FLOWFORMS_DRAFT_RECOVER_AFTER_SECONDS`` par défaut). Retourne le nombre rejoué.
+    """
+    from .storage import commit_draft  # import local : storage dépend de ce module
+
+    if older_than is None:
+        older_than = float(getattr(settings, "FLOWFORMS_DRAFT_RECOVER_AFTER_SECONDS", DEFAULT_RECOVER_AFTER_SECONDS))
+    index = score_set(INDEX_KEY)
+    due = index.between(float("-inf"), time.time() - older_than)[:limit]
+    if not due:
+        return 0
+
+    sessions = FlowSession.objects.select_related("lead").in_bulk([fs_id for fs_id, _ in due])
+    replayed = 0
+    for fs_id, saved_at in due:
+        fs = sessions.get(fs_id)
+        if fs is None:
+            discard_draft(fs_id, saved_at)
+            continue
+        try:
+            if commit_draft(fs):
+                replayed += 1
+        except Exception:
+            log.exception("draft_recover_failed fs=%s", fs_id)
+            continue
+        # brouillon expiré ou rejoué : l'entrée d'index n'a plus lieu d'être
+        index.remove_if_unchanged(fs_id, saved_at)
+    log.info("drafts_recovered due=%s replayed=%s", len(due), replayed)
+    return replayed
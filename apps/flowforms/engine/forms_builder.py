@@ -173,14 +173,11 @@ def _save_into_instance(instance: Lead, spec: FieldSpec, value):
 # ------------------------------------------------------------
 # Public API
 # ------------------------------------------------------------
-def build_form_for_step(step_cfg: Dict[str, Any], *, instance: Lead | None = None, theme_attrs: Dict[str, Any] | None = None) -> forms.ModelForm:
+def build_form_class(step_cfg: Dict[str, Any]) -> type[forms.ModelForm]:
     """
-    Construit dynamiquement un ModelForm lié à Lead, limité aux champs définis
-    dans step_cfg["fields"].
-
-    - Supporte context.* (JSON proxy)
-    - Injecte attrs CSS (theme_attrs au niveau du form + attrs par champ dans la config)
-    - Attache validators (map configurable)
+    Compile la classe ModelForm d'une step (champs, widgets, validators construits une fois).
+    Les champs sont déclarés sur la classe : Django les copie à chaque instanciation,
+    l'appelant peut donc mettre la classe en cache (cf. engine.compiled).
     """
     if not step_cfg or "fields" not in step_cfg:
         raise ImproperlyConfigured("step_cfg invalide : 'fields' attendu.")
@@ -195,7 +192,8 @@ def build_form_for_step(step_cfg: Dict[str, Any], *, instance: Lead | None = Non
 
     # Champs "purs" Lead pour Meta.fields
     meta_fields = [s.name for s in field_specs if not s.name.startswith("context.")]
-    # Toujours autoriser un sous-ensemble strict
+    specs_by_name = {s.name: s for s in reversed(field_specs)}
+
     class _DynamicForm(forms.ModelForm):
         class Meta:
             model = Lead
@@ -205,26 +203,12 @@ def build_form_for_step(step_cfg: Dict[str, Any], *, instance: Lead | None = Non
             _instance = kwargs.get("instance")
             super().__init__(*args, **kwargs)
 
-            # Thème (attrs globaux)
-            if theme_attrs:
-                for k, v in (theme_attrs or {}).items():
-                    self.attrs = getattr(self, "attrs", {})
-                    self.attrs[k] = v
-
-            # Installer dynamiquement les champs (y compris context.*)
-            # D’abord retirer les champs Meta existants (pour repartir propre)
-            for name in list(self.fields.keys()):
-                if name not in [s.name for s in field_specs if not s.name.startswith("context.")]:
-                    self.fields.pop(name)
-
-            for spec in field_specs:
-                f = _make_django_field(spec)
-                # initial
-                if _instance is not None:
+            # initial (y compris context.*) sur les copies propres à l'instance
+            if _instance is not None:
+                for spec in field_specs:
                     init_val = _initial_from_instance(_instance, spec)
                     if init_val not in (None, ""):
-                        f.initial = init_val
-                self.fields[spec.name] = f
+                        self.fields[spec.name].initial = init_val
 
         def clean(self):
             # Laisse Django nettoyer chaque champ (validators custom déjà branchés)
@@ -238,7 +222,7 @@ def build_form_for_step(step_cfg: Dict[str, Any], *, instance: Lead | None = Non
             # => on leur applique le bridge à la main
             lead_obj: Lead = self.instance
             for name, val in self.cleaned_data.items():
-                spec = next((s for s in field_specs if s.name == name), None)
+                spec = specs_by_name.get(name)
                 if not spec:
                     continue
                 if spec.name.startswith("context."):
@@ -250,6 +234,26 @@ def build_form_for_step(step_cfg: Dict[str, Any], *, instance: Lead | None = Non
                 lead_obj.save()
             return lead_obj
 
-    # Instancier le form
-    form = _DynamicForm(instance=instance)
-    return form
\ No newline at end of file
+    # Champs déclarés (noms "context.xxx" inclus) => base_fields, copiés par Django à chaque form
+    for spec in field_specs:
+        _DynamicForm.base_fields[spec.name] = _make_django_field(spec)
+    _DynamicForm.declared_fields = dict(_DynamicForm.base_fields)
+    return _DynamicForm
+
+
+def build_form_for_step(step_cfg: Dict[str, Any], *, instance: Lead | None = None, theme_attrs: Dict[str, Any] | None = None) -> forms.ModelForm:
+    """
+    Construit dynamiquement un ModelForm lié à Lead, limité aux champs définis
+    dans step_cfg["fields"].
+
+    - Supporte context.* (JSON proxy)
+    - Injecte attrs CSS (theme_attrs au niveau du form + attrs par champ dans la config)
+    - Attache validators (map configurable)
+
+    Les vues passent par ``engine.compiled`` qui met la classe en cache par step.
+    """
+    form = build_form_class(step_cfg)(instance=instance)
+    # Thème (attrs globaux)
+    if theme_attrs:
+        form.attrs = {**getattr(form, "attrs", {}), **theme_attrs}
+    return form
@@ -1,16 +1,34 @@
 # apps/flowforms/engine/router.py
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Dict, Any, List, Optional
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
 
-from .steps import Step, CTA
+from .steps import Step, CTA, Predicate
 
 FINISH = "__FINISH__"  # marqueur spécial pour fin anticipée ou submit final
 
 @dataclass
 class Router:
+    """
+    Machine à états d'un flow, compilée une fois à la construction :
+    index clé -> position, prédicats show_if / transitions précompilés,
+    et tuple des clés visibles figé si aucune step n'est conditionnelle.
+    """
     flow_cfg: Dict[str, Any]  # dict validé par schéma (FlowConfig)
     steps: List[Step]
+    _index: Dict[str, int] = field(init=False, repr=False)
+    _show_if: List[Tuple[Predicate, ...]] = field(init=False, repr=False)
+    _transitions: List[Tuple[Tuple[Predicate, Optional[str]], ...]] = field(init=False, repr=False)
+    _static_keys: Optional[Tuple[str, ...]] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._index = {}
+        for pos, s in enumerate(self.steps):
+            self._index.setdefault(s.key, pos)
+        self._show_if = [tuple(c.compile() for c in s.show_if) for s in self.steps]
+        self._transitions = [tuple((c.compile(), c.next) for c in s.transitions) for s in self.steps]
+        conditional = any(self._show_if)
+        self._static_keys = None if conditional else tuple(s.key for s in self.steps)
 
     @classmethod
     def from_flow(cls, flow_cfg: Dict[str, Any]) -> "Router":
@@ -19,43 +37,49 @@ class Router:
 
     # ---------- visibilité ----------
     def is_step_visible(self, step: Step, snapshot: Dict[str, Any]) -> bool:
-        if not step.show_if:
-            return True
-        return all(cond.evaluate(snapshot) for cond in step.show_if)
+        pos = self._index.get(step.key)
+        if pos is None or self.steps[pos] is not step:
+            return all(cond.evaluate(snapshot) for cond in step.show_if)
+        return all(pred(snapshot) for pred in self._show_if[pos])
+
+    def visible_keys(self, snapshot: Dict[str, Any]) -> Tuple[str, ...]:
+        if self._static_keys is not None:
+            return self._static_keys
+        return tuple(
+            s.key for s, preds in zip(self.steps, self._show_if)
+            if all(pred(snapshot) for pred in preds)
+        )
 
     def visible_steps(self, snapshot: Dict[str, Any]) -> List[Step]:
-        return [s for s in self.steps if self.is_step_visible(s, snapshot)]
+        if self._static_keys is not None:
+            return list(self.steps)
+        return [s for s, preds in zip(self.steps, self._show_if) if all(pred(snapshot) for pred in preds)]
 
     # ---------- helpers ----------
     def get_step(self, key: str) -> Step:
-        for s in self.steps:
-            if s.key == key:
-                return s
-        raise KeyError(f"Step '{key}' not found")
+        try:
+            return self.steps[self._index[key]]
+        except KeyError:
+            raise KeyError(f"Step '{key}' not found") from None
 
     def first_visible_step_key(self, snapshot: Dict[str, Any]) -> str:
-        vs = self.visible_steps(snapshot)
-        if not vs:
-            # s’il n’y a aucune step visible, on considère le flow comme terminé
-            return FINISH
-        return vs[0].key
+        keys = self.visible_keys(snapshot)
+        # s’il n’y a aucune step visible, on considère le flow comme terminé
+        return keys[0] if keys else FINISH
 
-    def prev_visible_step_key(self, current_key: str, snapshot: Dict[str, Any]) -> Optional[str]:
-        vs = self.visible_steps(snapshot)
-        keys = [s.key for s in vs]
+    def _neighbour_key(self, current_key: str, snapshot: Dict[str, Any], offset: int) -> Optional[str]:
+        keys = self.visible_keys(snapshot)
         if current_key not in keys:
             # si la step actuelle n'est plus visible, se rabat sur la première visible
-            return self.first_visible_step_key(snapshot)
-        idx = keys.index(current_key)
-        return keys[idx - 1] if idx > 0 else None
+            return keys[0] if keys else FINISH
+        idx = keys.index(current_key) + offset
+        return keys[idx] if 0 <= idx < len(keys) else None
+
+    def prev_visible_step_key(self, current_key: str, snapshot: Dict[str, Any]) -> Optional[str]:
+        return self._neighbour_key(current_key, snapshot, -1)
 
     def next_visible_step_key(self, current_key: str, snapshot: Dict[str, Any]) -> Optional[str]:
-        vs = self.visible_steps(snapshot)
-        keys = [s.key for s in vs]
-        if current_key not in keys:
-            return self.first_visible_step_key(snapshot)
-        idx = keys.index(current_key)
-        return keys[idx + 1] if idx < len(keys) - 1 else None
+        return self._neighbour_key(current_key, snapshot, 1)
 
     # ---------- transitions de step ----------
     def _apply_step_transitions(self, step: Step, snapshot: Dict[str, Any]) -> Optional[str]:
@@ -63,9 +87,14 @@ class Router:
         Si la step possède des transitions conditionnelles (conditions[].next),
         renvoie la prochaine clé si l'une matche. Sinon None.
         """
-        for cond in step.transitions:
-            if cond.evaluate(snapshot):
-                return cond.next or None
+        pos = self._index.get(step.key)
+        if pos is None or self.steps[pos] is not step:
+            compiled = tuple((c.compile(), c.next) for c in step.transitions)
+        else:
+            compiled = self._transitions[pos]
+        for pred, target in compiled:
+            if pred(snapshot):
+                return target or None
         return None
 
     # ---------- décision principale ----------
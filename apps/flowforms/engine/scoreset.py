@@ -0,0 +1,115 @@
+# apps/flowforms/engine/scoreset.py
+"""
+Sorted set "id -> timestamp" partagé par le write-behind des touches et l'index
+des brouillons : ZSET Redis avec django-redis, sinon dict dans le cache Django
+sous verrou de process (locmem en test/dev).
+"""
+from __future__ import annotations
+
+import threading
+import uuid
+from typing import Dict, List, Tuple
+
+from django.core.cache import cache, caches
+
+
+class RedisScoreSet:
+    def __init__(self, client, key: str) -> None:
+        self.client = client
+        self.key = cache.make_key(key)
+
+    def add(self, member: int, score: float) -> None:
+        # GT : un score plus ancien n'écrase jamais un plus récent
+        self.client.zadd(self.key, {str(member): score}, gt=True)
+
+    def scores(self, members: List[int]) -> Dict[int, float]:
+        if not members:
+            return {}
+        values = self.client.zmscore(self.key, [str(m) for m in members])
+        return {m: float(v) for m, v in zip(members, values) if v is not None}
+
+    def between(self, low: float, high: float) -> List[Tuple[int, float]]:
+        low = "-inf" if low == float("-inf") else low
+        high = "+inf" if high == float("inf") else high
+        items = self.client.zrangebyscore(self.key, low, high, withscores=True)
+        return [(int(m), float(s)) for m, s in items]
+
+    def remove_if_unchanged(self, member: int, score: float) -> None:
+        """Retire le membre sauf s'il a été re-touché entre-temps (score plus récent)."""
+        current = self.client.zscore(self.key, str(member))
+        if current is not None and float(current) <= score:
+            self.client.zrem(self.key, str(member))
+
+    def take(self) -> Tuple[List[Tuple[int, float]], object]:
+        """Détache le set courant (RENAME atomique) ; les nouveaux ajouts repartent à zéro."""
+        token = f"{self.key}:flush:{uuid.uuid4().hex}"
+        try:
+            self.client.rename(self.key, token)
+        except Exception:  # clé absente => rien à prendre
+            return [], None
+        items = self.client.zrange(token, 0, -1, withscores=True)
+        return [(int(m), float(s)) for m, s in items], token
+
+    def done(self, token) -> None:
+        if token:
+            self.client.delete(token)
+
+    def restore(self, token) -> None:
+        # échec du traitement : on refusionne en gardant le score max
+        if token:
+            self.client.zunionstore(self.key, [self.key, token], aggregate="MAX")
+            self.client.delete(token)
+
+
+class LocalScoreSet:
+    _lock = threading.Lock()
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+
+    def _data(self) -> Dict[int, float]:
+        return cache.get(self.key) or {}
+
+    def add(self, member: int, score: float) -> None:
+        with self._lock:
+            data = self._data()
+            data[member] = max(score, data.get(member, 0.0))
+            cache.set(self.key, data, None)
+
+    def scores(self, members: List[int]) -> Dict[int, float]:
+        data = self._data()
+        return {m: data[m] for m in members if m in data}
+
+    def between(self, low: float, high: float) -> List[Tuple[int, float]]:
+        return sorted((m, s) for m, s in self._data().items() if low <= s <= high)
+
+    def remove_if_unchanged(self, member: int, score: float) -> None:
+        with self._lock:
+            data = self._data()
+            if member in data and data[member] <= score:
+                del data[member]
+                cache.set(self.key, data, None)
+
+    def take(self):
+        with self._lock:
+            data = self._data()
+            cache.delete(self.key)
+        return sorted(data.items()), data
+
+    def done(self, token) -> None:
+        pass
+
+    def restore(self, token) -> None:
+        for member, score in (token or {}).items():
+            self.add(member, score)
+
+
+def score_set(key: str):
+    try:
+        from django_redis import get_redis_connection
+        from django_redis.cache import RedisCache
+    except ImportError:
+        return LocalScoreSet(key)
+    if isinstance(caches["default"], RedisCache):
+        return RedisScoreSet(get_redis_connection("default"), key)
+    return LocalScoreSet(key)
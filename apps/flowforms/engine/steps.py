@@ -1,7 +1,33 @@
 # apps/flowforms/engine/steps.py
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
+
+def _in(left: Any, right: Any) -> bool:
+    try:
+        return left in (right or [])
+    except TypeError:
+        return False
+
+def _not_in(left: Any, right: Any) -> bool:
+    try:
+        return left not in (right or [])
+    except TypeError:
+        return True
+
+_OPS: Dict[str, Callable[[Any, Any], bool]] = {
+    "equals": lambda left, right: left == right,
+    "not_equals": lambda left, right: left != right,
+    "in": _in,
+    "not_in": _not_in,
+    "is_true": lambda left, right: bool(left) is True,
+    "is_false": lambda left, right: bool(left) is False,
+}
+
+# opérateur inconnu => sécurité : False
+_UNKNOWN_OP = lambda left, right: False  # noqa: E731
+
+Predicate = Callable[[Dict[str, Any]], bool]
 
 @dataclass(frozen=True)
 class Condition:
@@ -18,30 +44,19 @@ class Condition:
             return ctx.get(field.split(".", 1)[1])
         return snapshot.get(field)
 
+    def compile(self) -> Predicate:
+        """Prédicat précompilé : opérateur et accès au champ résolus une seule fois."""
+        fn = _OPS.get(self.op, _UNKNOWN_OP)
+        right = self.value
+        if self.field.startswith("context."):
+            key = self.field.split(".", 1)[1]
+            return lambda snapshot: fn((snapshot.get("context") or {}).get(key), right)
+        field = self.field
+        return lambda snapshot: fn(snapshot.get(field), right)
+
     def evaluate(self, snapshot: Dict[str, Any]) -> bool:
         left = self._get_value(snapshot, self.field)
-        op = self.op
-        right = self.value
-        if op == "equals":
-            return left == right
-        if op == "not_equals":
-            return left != right
-        if op == "in":
-            try:
-                return left in (right or [])
-            except TypeError:
-                return False
-        if op == "not_in":
-            try:
-                return left not in (right or [])
-            except TypeError:
-                return True
-        if op == "is_true":
-            return bool(left) is True
-        if op == "is_false":
-            return bool(left) is False
-        # opérateur inconnu => sécurité : False
-        return False
+        return _OPS.get(self.op, _UNKNOWN_OP)(left, self.value)
 
 @dataclass(frozen=True)
 class CTA:
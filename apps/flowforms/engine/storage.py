@@ -4,11 +4,22 @@ from dataclasses import dataclass
 from typing import Dict, Any, Optional, Tuple
 
 from django.db import transaction
+from django.db.models import Case, IntegerField, Q, Value, When
 from django.utils import timezone
 
 from apps.leads.models import Lead
 from apps.leads.constants import LeadStatus
+from apps.leads.identity import email_key, phone_key
 from apps.flowforms.models import FlowSession, FlowStatus
+from apps.flowforms.engine.touches import record_touch
+from apps.flowforms.engine.drafts import (
+    apply_draft,
+    discard_draft,
+    drafts_enabled,
+    is_checkpoint,
+    load_draft,
+    save_draft,
+)
 
 DEFAULT_LOOKUP_FIELDS = ("email", "phone", "course_slug")
 
@@ -17,6 +28,7 @@ class FlowContext:
     flow_key: str
     form_kind: str  # ex: "checkout_intent"
     lookup_fields: Tuple[str, ...] = DEFAULT_LOOKUP_FIELDS
+    checkpoints: Tuple[str, ...] = ()  # steps écrites en base en mode brouillon
 
 # -----------------------------
 # Helpers
@@ -31,25 +43,34 @@ def _lead_lookup(form_kind: str, data: Dict[str, Any], lookup_fields: Tuple[str,
     Stratégie par défaut :
       - cherche un Lead du même form_kind
       - en priorité par email (normalisé), sinon phone, sinon course_slug
+    Une seule requête : OR sur les clés d'identité indexées (form_kind, *_key, -created_at),
+    la priorité étant rendue par un CASE trié avant created_at.
     """
-    qs = Lead.objects.filter(form_kind=form_kind).order_by("-created_at")
-    email = (data.get("email") or "").strip().lower()
-    phone = (data.get("phone") or "").strip()
+    email = email_key(data.get("email"))
+    phone = phone_key(data.get("phone"))
     slug = (data.get("course_slug") or "").strip()
 
+    candidates = []
     if "email" in lookup_fields and email:
-        m = qs.filter(email=email).first()
-        if m:
-            return m
+        candidates.append(Q(email_key=email))
     if "phone" in lookup_fields and phone:
-        m = qs.filter(phone=phone).first()
-        if m:
-            return m
+        candidates.append(Q(phone_key=phone))
     if "course_slug" in lookup_fields and slug:
-        m = qs.filter(course_slug=slug).first()
-        if m:
-            return m
-    return None
+        candidates.append(Q(course_slug=slug))
+    if not candidates:
+        return None
+
+    match = Q()
+    for cond in candidates:
+        match |= cond
+    rank = Case(*[When(cond, then=Value(i)) for i, cond in enumerate(candidates)],
+                default=Value(len(candidates)), output_field=IntegerField())
+    return (
+        Lead.objects.filter(match, form_kind=form_kind)
+        .annotate(_identity_rank=rank)
+        .order_by("_identity_rank", "-created_at")
+        .first()
+    )
 
 def _make_idempotency_key(flow_key: str, session_key: str) -> str:
     return f"flow:{flow_key}:{session_key}"
@@ -62,7 +83,7 @@ def get_or_create_session(request, ctx: FlowContext) -> FlowSession:
     Récupère ou crée une FlowSession (clé = flow_key + session_key).
     """
     sk = _ensure_session_key(request)
-    fs, _created = FlowSession.objects.get_or_create(
+    fs, created = FlowSession.objects.get_or_create(
         flow_key=ctx.flow_key,
         session_key=sk,
         defaults={
@@ -70,17 +91,88 @@ def get_or_create_session(request, ctx: FlowContext) -> FlowSession:
             "data_snapshot": {},
         },
     )
-    # Keep last_touch fresh
-    fs.touch()
+    # Keep last_touch fresh (write-behind : pas d'UPDATE sur une vue GET)
+    if not created:
+        record_touch(fs)
+        if drafts_enabled():
+            apply_draft(fs)
     return fs
 
-@transaction.atomic
 def persist_step(
     *,
     flowsession: FlowSession,
     ctx: FlowContext,
     step_key: str,
     cleaned_data: Dict[str, Any],
+) -> Tuple[Lead, FlowSession]:
+    """
+    Persiste les données validées d’une step.
+    En mode brouillon (FLOWFORMS_STORAGE_BACKEND="draft"), hors checkpoint, seul le
+    brouillon est écrit (cache + TTL) ; le lead renvoyé peut alors être non sauvegardé.
+    """
+    if drafts_enabled() and not is_checkpoint(flowsession, step_key, cleaned_data, ctx.checkpoints):
+        snapshot = dict(flowsession.data_snapshot or {})
+        snapshot.update(cleaned_data)
+        flowsession.current_step = step_key
+        flowsession.data_snapshot = snapshot
+        if save_draft(flowsession, ctx.form_kind):
+            record_touch(flowsession)
+            return (flowsession.lead or Lead(form_kind=ctx.form_kind)), flowsession
+
+    lead, flowsession = _persist_step_db(
+        flowsession=flowsession, ctx=ctx, step_key=step_key, cleaned_data=cleaned_data,
+    )
+    if drafts_enabled():
+        discard_draft(flowsession.id)
+    return lead, flowsession
+
+def set_current_step(flowsession: FlowSession, step_key: str, *, ctx: FlowContext) -> None:
+    """Avance la step courante (brouillon si actif, sinon UPDATE)."""
+    flowsession.current_step = step_key
+    if drafts_enabled() and save_draft(flowsession, ctx.form_kind):
+        return
+    flowsession.save(update_fields=["current_step", "updated_at"])
+
+def commit_draft(flowsession: FlowSession, ctx: Optional[FlowContext] = None) -> bool:
+    """
+    Checkpoint : écrit le brouillon courant dans FlowSession/Lead puis le supprime.
+    Utilisé avant la soumission finale et par la récupération (drafts.recover_drafts).
+    Retourne False s'il n'y avait rien à écrire.
+    """
+    draft = load_draft(flowsession.id)
+    if not draft:
+        return False
+    if flowsession.status == FlowStatus.COMPLETED:
+        discard_draft(flowsession.id, draft.get("saved_at"))
+        return False
+    if ctx is None:
+        form_kind = draft.get("form_kind") or _form_kind_for(flowsession)
+        ctx = FlowContext(flow_key=flowsession.flow_key, form_kind=form_kind)
+    snapshot = dict(draft.get("snapshot") or {})
+    flowsession.data_snapshot = snapshot
+    _persist_step_db(
+        flowsession=flowsession,
+        ctx=ctx,
+        step_key=draft.get("current_step") or flowsession.current_step,
+        cleaned_data=snapshot,
+    )
+    discard_draft(flowsession.id, draft.get("saved_at"))
+    return True
+
+def _form_kind_for(flowsession: FlowSession) -> str:
+    if flowsession.lead is not None:
+        return flowsession.lead.form_kind
+    from apps.flowforms.engine.compiled import get_compiled_flow
+
+    return get_compiled_flow(flowsession.flow_key).kind
+
+@transaction.atomic
+def _persist_step_db(
+    *,
+    flowsession: FlowSession,
+    ctx: FlowContext,
+    step_key: str,
+    cleaned_data: Dict[str, Any],
 ) -> Tuple[Lead, FlowSession]:
     """
     Persiste les données validées d’une step :
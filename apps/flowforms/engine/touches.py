@@ -0,0 +1,117 @@
+# apps/flowforms/engine/touches.py
+"""
+Suivi "write-behind" des touches FlowSession.
+
+Une vue GET du wizard n'écrit plus en base : la touche est enregistrée dans
+un sorted set Redis (membre = id FlowSession, score = timestamp epoch), et
+``flush_touches`` (tâche beat) reporte les scores en un UPDATE groupé par lot,
+sans jamais reculer un ``last_touch_at`` plus récent écrit par ``persist_step``.
+
+Les lectures (abandon, relances) passent par la vue fusionnée :
+``effective_last_touch`` / ``last_touch_map`` / ``exclude_recently_touched``.
+
+Le sorted set vient de ``scoreset`` (dict sous verrou sans Redis).
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Iterable
+
+from django.conf import settings
+from django.db.models import Case, DateTimeField, F, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from apps.flowforms.models import FlowSession
+
+from .scoreset import score_set
+
+log = logging.getLogger("flowforms.touches")
+
+TOUCH_KEY = "flowforms:touches"
+FLUSH_CHUNK = 500
+
+
+def write_behind_enabled() -> bool:
+    return bool(getattr(settings, "FLOWFORMS_TOUCH_WRITE_BEHIND", True))
+
+
+def _to_dt(score: float) -> datetime:
+    return datetime.fromtimestamp(float(score), tz=dt_timezone.utc)
+
+
+def _store():
+    return score_set(TOUCH_KEY)
+
+
+# -----------------------------
+# Écriture
+# -----------------------------
+def record_touch(fs: FlowSession) -> None:
+    """Touche une session sans écriture SQL (repli synchrone si le write-behind est coupé ou Redis HS)."""
+    now = timezone.now()
+    if not write_behind_enabled():
+        fs.touch()
+        return
+    try:
+        _store().add(fs.id, now.timestamp())
+    except Exception:
+        log.warning("touch_write_behind_failed fs=%s ; fallback DB", fs.id, exc_info=True)
+        fs.touch()
+        return
+    fs.last_touch_at = now
+
+
+def flush_touches(chunk_size: int = FLUSH_CHUNK) -> int:
+    """Reporte les touches en base (UPDATE ... GREATEST par lot). Retourne le nombre de sessions."""
+    store = _store()
+    items, token = store.take()
+    if not items:
+        return 0
+    try:
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            touched = Case(
+                *[When(id=session_id, then=Value(_to_dt(ts))) for session_id, ts in chunk],
+                output_field=DateTimeField(),
+            )
+            FlowSession.objects.filter(id__in=[session_id for session_id, _ in chunk]).update(
+                last_touch_at=Greatest(F("last_touch_at"), touched)
+            )
+    except Exception:
+        store.restore(token)
+        raise
+    store.done(token)
+    log.info("touches_flushed sessions=%s", len(items))
+    return len(items)
+
+
+# -----------------------------
+# Lecture fusionnée (DB + touches en attente)
+# -----------------------------
+def last_touch_map(sessions: Iterable[FlowSession]) -> Dict[int, datetime]:
+    sessions = list(sessions)
+    pending = _store().scores([fs.id for fs in sessions]) if write_behind_enabled() else {}
+    out = {}
+    for fs in sessions:
+        value = fs.last_touch_at
+        if fs.id in pending:
+            value = max(value, _to_dt(pending[fs.id]))
+        out[fs.id] = value
+    return out
+
+
+def effective_last_touch(fs: FlowSession) -> datetime:
+    return last_touch_map([fs])[fs.id]
+
+
+def exclude_recently_touched(qs, since: datetime):
+    """
+    Pour les sélections d'abandon/relance filtrées sur ``last_touch_at__lt=since`` :
+    retire les sessions touchées depuis ``since`` mais pas encore flushées.
+    """
+    if not write_behind_enabled():
+        return qs
+    fresh = [session_id for session_id, _ in _store().between(since.timestamp(), float("inf"))]
+    return qs.exclude(id__in=fresh) if fresh else qs
@@ -7,4 +7,22 @@ def debug_ping(self, echo: str = "pong") -> dict:
     Tâche Celery no-op pour vérifier l’intégration côté tests.
     S’exécute en local via .apply() (synchrone) sans worker.
     """
-    return {"echo": echo, "now": timezone.now().isoformat()}
\ No newline at end of file
+    return {"echo": echo, "now": timezone.now().isoformat()}
+
+
+@shared_task(name="flowforms.flush_session_touches")
+def flush_session_touches() -> int:
+    """Beat : reporte en base les touches FlowSession accumulées (write-behind)."""
+    from apps.flowforms.engine.touches import flush_touches
+
+    return flush_touches()
+
+
+@shared_task(name="flowforms.recover_flow_drafts")
+def recover_flow_drafts() -> int:
+    """Beat : rejoue en base les brouillons de flow restés sans checkpoint (mode "draft")."""
+    from apps.flowforms.engine.drafts import drafts_enabled, recover_drafts
+
+    if not drafts_enabled():
+        return 0
+    return recover_drafts()
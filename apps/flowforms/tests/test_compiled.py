@@ -0,0 +1,99 @@
+from __future__ import annotations
+import os
+import tempfile
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+import yaml
+
+from apps.flowforms.conf.loader import invalidate_config_cache
+from apps.flowforms.engine.compiled import get_compiled_flow, invalidate_compiled_flows
+from apps.flowforms.engine.steps import Condition
+from apps.leads.models import Lead
+
+
+def _flow(title: str = "Vos coordonnées") -> dict:
+    return {
+        "flows": [
+            {
+                "key": "compiled_flow",
+                "kind": "checkout_intent",
+                "steps": [
+                    {
+                        "key": "s1",
+                        "title": title,
+                        "fields": [{"name": "email", "type": "email", "required": True}],
+                        "ctas": [{"action": "next", "label": "Continuer"}],
+                    },
+                    {
+                        "key": "s2",
+                        "title": "Détails",
+                        "show_if": [{"field": "context.skip_s2", "op": "is_false"}],
+                        "fields": [{"name": "context.note", "type": "text"}],
+                        "ctas": [{"action": "next", "label": "Suivant"}],
+                    },
+                ],
+            }
+        ]
+    }
+
+
+class CompiledFlowTests(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.yaml_path = Path(self.tmpdir.name) / "flows.yaml"
+        self.yaml_path.write_text(yaml.safe_dump(_flow(), sort_keys=False), encoding="utf-8")
+        self.override = override_settings(FLOWFORMS_POLICY_YAML=str(self.yaml_path))
+        self.override.enable()
+        invalidate_config_cache()
+        invalidate_compiled_flows()
+
+    def tearDown(self):
+        self.override.disable()
+        self.tmpdir.cleanup()
+        invalidate_config_cache()
+        invalidate_compiled_flows()
+
+    def test_flow_and_form_classes_are_reused(self):
+        compiled = get_compiled_flow("compiled_flow")
+        self.assertIs(get_compiled_flow("compiled_flow"), compiled)
+        FormClass = compiled.form_class("s2")
+        self.assertIs(compiled.form_class("s2"), FormClass)
+
+        lead = Lead(form_kind="checkout_intent", context={"note": "draft"})
+        first, second = FormClass(instance=lead), FormClass(instance=Lead(form_kind="checkout_intent"))
+        self.assertEqual(first.fields["context.note"].initial, "draft")
+        self.assertIsNone(second.fields["context.note"].initial)
+        self.assertIsNot(first.fields["context.note"], second.fields["context.note"])
+
+    def test_recompiled_when_yaml_changes(self):
+        compiled = get_compiled_flow("compiled_flow")
+        self.yaml_path.write_text(yaml.safe_dump(_flow("Nouveau titre"), sort_keys=False), encoding="utf-8")
+        st = os.stat(self.yaml_path)
+        os.utime(self.yaml_path, (st.st_atime, st.st_mtime + 10))
+
+        fresh = get_compiled_flow("compiled_flow")
+        self.assertIsNot(fresh, compiled)
+        self.assertEqual(fresh.step_cfg("s1")["title"], "Nouveau titre")
+
+    def test_unknown_flow_raises_key_error(self):
+        with self.assertRaises(KeyError):
+            get_compiled_flow("nope")
+
+    def test_router_uses_precompiled_predicates(self):
+        router = get_compiled_flow("compiled_flow").router
+        self.assertEqual(router.visible_keys({"context": {"skip_s2": True}}), ("s1",))
+        self.assertEqual(router.visible_keys({}), ("s1", "s2"))
+        self.assertEqual(router.get_step("s2").key, "s2")
+        with self.assertRaises(KeyError):
+            router.get_step("missing")
+
+    def test_compiled_condition_matches_evaluate(self):
+        snapshots = [{}, {"a": 1}, {"a": [1]}, {"context": {"a": 1}}, {"a": None}]
+        for op, value in [("equals", 1), ("not_equals", 1), ("in", [1, 2]), ("not_in", [1]),
+                          ("in", 3), ("is_true", None), ("is_false", None), ("bogus", 1)]:
+            for field in ("a", "context.a"):
+                cond = Condition(field=field, op=op, value=value)
+                pred = cond.compile()
+                for snap in snapshots:
+                    self.assertEqual(pred(snap), cond.evaluate(snap), (field, op, value, snap))
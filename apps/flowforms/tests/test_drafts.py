@@ -0,0 +1,131 @@
+from __future__ import annotations
+import tempfile
+from pathlib import Path
+
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+import yaml
+
+from apps.flowforms.conf.loader import invalidate_config_cache
+from apps.flowforms.engine import drafts
+from apps.flowforms.engine.compiled import invalidate_compiled_flows
+from apps.flowforms.engine.storage import FlowContext, commit_draft, get_or_create_session, persist_step
+from apps.flowforms.models import FlowSession, FlowStatus
+from apps.flowforms.tasks import recover_flow_drafts
+from apps.leads.models import Lead
+
+
+def add_session(request):
+    middleware = SessionMiddleware(lambda r: None)
+    middleware.process_request(request)
+    request.session.save()
+    return request
+
+
+@override_settings(FLOWFORMS_STORAGE_BACKEND="draft")
+class FlowDraftStorageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.ctx = FlowContext(flow_key="checkout_flow", form_kind="checkout_intent", checkpoints=("s_cp",))
+        self.request = add_session(self.factory.get("/flows/checkout_flow/"))
+        self.fs = get_or_create_session(self.request, self.ctx)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_non_checkpoint_step_writes_no_sql(self):
+        with CaptureQueriesContext(connection) as ctx:
+            lead, fs = persist_step(flowsession=self.fs, ctx=self.ctx, step_key="s1",
+                                    cleaned_data={"course_slug": "python-pro"})
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertIsNone(lead.pk)
+
+        db = FlowSession.objects.get(id=self.fs.id)
+        self.assertEqual(db.data_snapshot, {})
+        # la requête suivante voit le brouillon
+        fs = get_or_create_session(self.request, self.ctx)
+        self.assertEqual(fs.current_step, "s1")
+        self.assertEqual(fs.data_snapshot.get("course_slug"), "python-pro")
+
+    def test_identity_and_configured_steps_are_checkpoints(self):
+        persist_step(flowsession=self.fs, ctx=self.ctx, step_key="s1", cleaned_data={"course_slug": "python-pro"})
+        lead, fs = persist_step(flowsession=self.fs, ctx=self.ctx, step_key="s2",
+                                cleaned_data={"email": "draft@example.com"})
+        self.assertIsNotNone(lead.pk)
+        db = FlowSession.objects.get(id=self.fs.id)
+        self.assertEqual(db.lead_id, lead.id)
+        self.assertEqual(db.data_snapshot, {"course_slug": "python-pro", "email": "draft@example.com"})
+        self.assertIsNone(drafts.load_draft(self.fs.id))
+
+        persist_step(flowsession=fs, ctx=self.ctx, step_key="s_cp", cleaned_data={"context.city": "rabat"})
+        self.assertEqual(FlowSession.objects.get(id=self.fs.id).current_step, "s_cp")
+
+    def test_commit_draft_replays_snapshot(self):
+        persist_step(flowsession=self.fs, ctx=self.ctx, step_key="s1", cleaned_data={"course_slug": "go"})
+        fs = FlowSession.objects.get(id=self.fs.id)
+        self.assertTrue(commit_draft(fs, self.ctx))
+        fs.refresh_from_db()
+        self.assertEqual(fs.data_snapshot, {"course_slug": "go"})
+        self.assertEqual(fs.current_step, "s1")
+        self.assertIsNotNone(fs.lead_id)
+        self.assertFalse(commit_draft(fs, self.ctx))
+
+    def test_recovery_replays_stale_drafts(self):
+        persist_step(flowsession=self.fs, ctx=self.ctx, step_key="s1", cleaned_data={"course_slug": "go"})
+        with override_settings(FLOWFORMS_DRAFT_RECOVER_AFTER_SECONDS=3600):
+            self.assertEqual(recover_flow_drafts.apply().get(), 0)
+        with override_settings(FLOWFORMS_DRAFT_RECOVER_AFTER_SECONDS=-1):
+            self.assertEqual(recover_flow_drafts.apply().get(), 1)
+            self.assertEqual(recover_flow_drafts.apply().get(), 0)
+        self.assertEqual(FlowSession.objects.get(id=self.fs.id).data_snapshot, {"course_slug": "go"})
+
+
+@override_settings(FLOWFORMS_STORAGE_BACKEND="draft")
+class FlowDraftWizardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        flow = {"flows": [{
+            "key": "draft_flow",
+            "kind": "checkout_intent",
+            "steps": [
+                {"key": "s1", "title": "Email", "fields": [{"name": "email", "type": "email", "required": True}],
+                 "ctas": [{"action": "next", "label": "Continuer"}]},
+                {"key": "s2", "title": "Téléphone", "fields": [{"name": "phone", "type": "phone"}],
+                 "ctas": [{"action": "next", "label": "Suivant"}]},
+                {"key": "s3", "title": "Validation", "fields": [],
+                 "ctas": [{"action": "submit", "label": "Envoyer"}]},
+            ],
+        }]}
+        self.tmpdir = tempfile.TemporaryDirectory()
+        path = Path(self.tmpdir.name) / "draft.yaml"
+        path.write_text(yaml.safe_dump(flow, sort_keys=False), encoding="utf-8")
+        self.override = override_settings(FLOWFORMS_POLICY_YAML=str(path))
+        self.override.enable()
+        invalidate_config_cache()
+        invalidate_compiled_flows()
+        self.url = reverse("flowforms:wizard", kwargs={"flow_key": "draft_flow"})
+
+    def tearDown(self):
+        self.override.disable()
+        self.tmpdir.cleanup()
+        invalidate_compiled_flows()
+        cache.clear()
+
+    def test_snapshot_reaches_db_at_submit(self):
+        self.client.post(self.url, data={"email": "u@ex.com", "flowforms_action": "next::"})
+        r = self.client.post(self.url, data={"phone": "+212600000000", "flowforms_action": "next::"}, follow=True)
+        self.assertContains(r, "Validation")
+        fs = FlowSession.objects.get()
+        self.assertNotIn("phone", fs.data_snapshot)
+
+        r = self.client.post(self.url, data={"flowforms_action": "submit::"}, follow=True)
+        self.assertContains(r, "Merci !")
+        fs.refresh_from_db()
+        self.assertEqual(fs.status, FlowStatus.COMPLETED)
+        self.assertEqual(fs.data_snapshot.get("phone"), "+212600000000")
+        self.assertEqual(Lead.objects.get(id=fs.lead_id).email, "u@ex.com")
@@ -87,4 +87,45 @@ class FlowFormsStorageTests(TestCase):
         self.assertNotEqual(fs_a.id, fs_b.id)
         self.assertNotEqual(lead_a.id, lead_b.id)
         self.assertEqual(fs_a.data_snapshot.get("email"), "a@ex.com")
-        self.assertEqual(fs_b.data_snapshot.get("email"), "b@ex.com")
\ No newline at end of file
+        self.assertEqual(fs_b.data_snapshot.get("email"), "b@ex.com")
+
+class LeadIdentityLookupTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.ctx = FlowContext(flow_key="identity_flow", form_kind="contact_full")
+
+    def _persist(self, data):
+        req = add_session(self.factory.get("/"))
+        fs = get_or_create_session(req, self.ctx)
+        return persist_step(flowsession=fs, ctx=self.ctx, step_key="s1", cleaned_data=data)[0]
+
+    def test_identity_keys_maintained_on_save(self):
+        lead = Lead.objects.create(form_kind="contact_full", email="Mixed@Example.com ",
+                                   phone="+212 600-000-000", idempotency_key="id-1")
+        other = Lead.objects.create(form_kind="contact_full", email="mixed@example.com",
+                                    phone="00212600000000", idempotency_key="id-2")
+        self.assertEqual(lead.email_key, other.email_key)
+        self.assertEqual(lead.phone_key, other.phone_key)
+        lead.phone = ""
+        lead.save(update_fields=["phone"])
+        lead.refresh_from_db()
+        self.assertEqual(lead.phone_key, "")
+
+    def test_lookup_uses_priority_in_single_query(self):
+        by_phone = Lead.objects.create(form_kind="contact_full", phone="+212600000001", idempotency_key="p-1")
+        by_email = Lead.objects.create(form_kind="contact_full", email="who@example.com", idempotency_key="e-1")
+        Lead.objects.create(form_kind="checkout_intent", email="who@example.com", idempotency_key="e-2")
+        from apps.flowforms.engine.storage import _lead_lookup
+
+        fields = self.ctx.lookup_fields
+        with self.assertNumQueries(1):
+            found = _lead_lookup("contact_full", {"email": "WHO@example.com", "phone": "+212 600 000 001"}, fields)
+        self.assertEqual(found.id, by_email.id)
+        self.assertEqual(_lead_lookup("contact_full", {"phone": "+212-600-000-001"}, fields).id, by_phone.id)
+        self.assertIsNone(_lead_lookup("contact_full", {"email": "nobody@example.com"}, fields))
+        self.assertIsNone(_lead_lookup("contact_full", {}, fields))
+
+    def test_persist_step_attaches_by_normalized_phone(self):
+        existing = Lead.objects.create(form_kind="contact_full", phone="0612345678", idempotency_key="n-1")
+        lead = self._persist({"phone": "06 12 34 56 78"})
+        self.assertEqual(lead.id, existing.id)
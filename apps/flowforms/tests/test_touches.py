@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from apps.flowforms.engine import touches
+from apps.flowforms.engine.storage import FlowContext, get_or_create_session
+from apps.flowforms.models import FlowSession, FlowStatus
+from apps.flowforms.tasks import flush_session_touches
+
+
+def add_session(request):
+    middleware = SessionMiddleware(lambda r: None)
+    middleware.process_request(request)
+    request.session.save()
+    return request
+
+
+class FlowSessionTouchWriteBehindTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.ctx = FlowContext(flow_key="checkout_flow", form_kind="checkout_intent")
+        self.request = add_session(self.factory.get("/flows/checkout_flow/"))
+        self.fs = get_or_create_session(self.request, self.ctx)
+        self.old = timezone.now() - timedelta(hours=2)
+        FlowSession.objects.filter(id=self.fs.id).update(last_touch_at=self.old)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_touch_is_deferred_until_flush(self):
+        fs = get_or_create_session(self.request, self.ctx)
+        self.assertGreater(fs.last_touch_at, self.old)
+        self.fs.refresh_from_db()
+        self.assertEqual(self.fs.last_touch_at, self.old)
+
+        self.assertEqual(flush_session_touches.apply().get(), 1)
+        self.fs.refresh_from_db()
+        self.assertGreater(self.fs.last_touch_at, self.old)
+        self.assertEqual(touches.flush_touches(), 0)
+
+    def test_flush_never_moves_last_touch_backwards(self):
+        get_or_create_session(self.request, self.ctx)
+        newer = timezone.now() + timedelta(minutes=5)
+        FlowSession.objects.filter(id=self.fs.id).update(last_touch_at=newer)
+        touches.flush_touches()
+        self.fs.refresh_from_db()
+        self.assertEqual(self.fs.last_touch_at, newer)
+
+    def test_merged_view_sees_pending_touches(self):
+        get_or_create_session(self.request, self.ctx)
+        stale = FlowSession.objects.get(id=self.fs.id)
+        self.assertGreater(touches.effective_last_touch(stale), self.old)
+
+        cutoff = timezone.now() - timedelta(hours=1)
+        idle = FlowSession.objects.filter(status=FlowStatus.ACTIVE, last_touch_at__lt=cutoff)
+        self.assertIn(self.fs.id, idle.values_list("id", flat=True))
+        self.assertNotIn(self.fs.id, touches.exclude_recently_touched(idle, cutoff).values_list("id", flat=True))
+
+    @override_settings(FLOWFORMS_TOUCH_WRITE_BEHIND=False)
+    def test_disabled_writes_synchronously(self):
+        get_or_create_session(self.request, self.ctx)
+        self.fs.refresh_from_db()
+        self.assertGreater(self.fs.last_touch_at, self.old)
+        self.assertEqual(touches.flush_touches(), 0)
@@ -10,10 +10,15 @@ from django.shortcuts import render, redirect
 from django.urls import reverse
 from formtools.wizard.views import SessionWizardView
 
-from apps.flowforms.conf.loader import get_flow
-from apps.flowforms.engine.forms_builder import build_form_for_step
-from apps.flowforms.engine.router import Router, FINISH
-from apps.flowforms.engine.storage import FlowContext, get_or_create_session, persist_step
+from apps.flowforms.engine.compiled import get_compiled_flow
+from apps.flowforms.engine.router import FINISH
+from apps.flowforms.engine.storage import (
+    FlowContext,
+    commit_draft,
+    get_or_create_session,
+    persist_step,
+    set_current_step,
+)
 from apps.flowforms.models import FlowStatus
 from apps.leads.models import Lead
 from apps.leads.submissions import submit_lead_from_flowsession
@@ -77,17 +82,20 @@ class FlowFormsWizardView(SessionWizardView):
         return (raw or "next"), None
 
     def _load_runtime(self, request: HttpRequest, *, flow_key: str):
-        self.flow_cfg: Dict[str, Any] = get_flow(flow_key)  # dict
-        self.ctx = FlowContext(flow_key=flow_key, form_kind=self.flow_cfg["kind"])
+        self.compiled = get_compiled_flow(flow_key)  # compilé une fois par version de config
+        self.flow_cfg: Dict[str, Any] = self.compiled.flow_cfg  # dict partagé : lecture seule
+        self.ctx = FlowContext(
+            flow_key=flow_key, form_kind=self.flow_cfg["kind"], checkpoints=self.compiled.checkpoints,
+        )
         self.fs = get_or_create_session(request, self.ctx)
-        self.router = Router.from_flow(self.flow_cfg)
+        self.router = self.compiled.router
         self.snapshot: Dict[str, Any] = self.fs.data_snapshot or {}
 
     def _current_key(self) -> str:
         cur = self.fs.current_step or ""
         if not cur:
             return self.router.first_visible_step_key(self.snapshot)
-        visible = [s.key for s in self.router.visible_steps(self.snapshot)]
+        visible = self.router.visible_keys(self.snapshot)
         if cur not in visible and cur != FINISH:
             return self.router.first_visible_step_key(self.snapshot)
         return cur
@@ -108,13 +116,11 @@ class FlowFormsWizardView(SessionWizardView):
 
     def get_form(self, step=None, data=None, files=None):
         step_key = step or self._current_key()
-        step_cfg = next(s for s in self.flow_cfg["steps"] if s["key"] == step_key)
+        FormClass = self.compiled.form_class(step_key)
         lead = self.fs.lead or Lead(form_kind=self.flow_cfg["kind"])
 
-        unbound = build_form_for_step(step_cfg, instance=lead)
-        FormClass = unbound.__class__
         if data is None and files is None:
-            return unbound
+            return FormClass(instance=lead)
         return FormClass(data=data, files=files, instance=lead)
 
     def get_template_names(self):
@@ -122,8 +128,8 @@ class FlowFormsWizardView(SessionWizardView):
 
     def get_context_data(self, form, **kwargs):
         step_key = self._current_key()
-        step_cfg = next(s for s in self.flow_cfg["steps"] if s["key"] == step_key)
-        visibles = [s.key for s in self.router.visible_steps(self.snapshot)]
+        step_cfg = self.compiled.step_cfg(step_key)
+        visibles = self.router.visible_keys(self.snapshot)
         idx = (visibles.index(step_key) + 1) if step_key in visibles else 1
         total = max(len(visibles), 1)
 
@@ -183,8 +189,7 @@ class FlowFormsWizardView(SessionWizardView):
         if next_key == FINISH:
             return self._mark_completed_and_render_done()
 
-        self.fs.current_step = next_key
-        self.fs.save(update_fields=["current_step", "updated_at"])
+        set_current_step(self.fs, next_key, ctx=self.ctx)
         return redirect(reverse("flowforms:wizard", kwargs={"flow_key": self.ctx.flow_key}))
 
     # --------- done ---------
@@ -196,6 +201,9 @@ class FlowFormsWizardView(SessionWizardView):
         })
 
     def _mark_completed_and_render_done(self) -> HttpResponse:
+        # 0) Checkpoint final : le brouillon éventuel passe en base avant soumission
+        commit_draft(self.fs, self.ctx)
+
         # 1) Soumission vers leads (idempotente)
         try:
             submit_lead_from_flowsession(self.fs)
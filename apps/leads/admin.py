@@ -1,13 +1,25 @@
 from django.contrib import admin
+from django.http import StreamingHttpResponse
+
+from .exports import stream_csv
 from .models import Lead, LeadEvent, LeadSubmissionLog
 
 
+@admin.action(description="Exporter en CSV (flux)")
+def export_leads_csv(modeladmin, request, queryset):
+    # flux par lots : pas de chargement de la sélection en mémoire
+    response = StreamingHttpResponse(stream_csv(queryset.order_by("id")), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = "attachment; filename=leads.csv"
+    return response
+
+
 @admin.register(Lead)
 class LeadAdmin(admin.ModelAdmin):
     list_display = ("id", "form_kind", "email", "phone", "status", "score", "campaign", "created_at")
     list_filter = ("form_kind", "status", "campaign", "country", "billing_country")
     search_fields = ("email", "phone", "course_slug", "company_name", "idempotency_key")
     readonly_fields = ("created_at", "updated_at", "signed_token_hash", "ip_addr", "user_agent", "referer", "page_path")
+    actions = [export_leads_csv]
 
 @admin.register(LeadEvent)
 class LeadEventAdmin(admin.ModelAdmin):
@@ -1,12 +1,19 @@
 import hmac, time, hashlib
 from django.conf import settings
 from django.core.cache import cache
+from .antispam_engine import Decision, get_engine
 
 IDEM_NS = "leads:idem:"
 RL_NS_IP = "leads:rl:ip:"
 RL_NS_EMAIL = "leads:rl:email:"
 DUP_NS = "leads:dup:"
 
+# Fenêtre de déduplication par form_kind (secondes)
+DUP_TTL_BY_KIND = {"email_ebook": 24 * 3600, "contact_full": 2 * 3600, "checkout_intent": 1800}
+DUP_TTL_DEFAULT = 3600
+
+_PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
 def normalize_email(email: str | None) -> str:
     return (email or "").strip().lower()
 
@@ -51,8 +58,53 @@ def dup_fingerprint(form_kind: str, email: str | None = None, phone: str | None
     return h.hexdigest()
 
 def dup_recent(form_kind: str, fp: str, ttl: int) -> bool:
-    k = f"{DUP_NS}{form_kind}:{fp}"
-    if cache.get(k):
-        return True
-    cache.set(k, 1, ttl)
-    return False
\ No newline at end of file
+    # SET NX atomique : deux soumissions concurrentes identiques ne passent plus toutes les deux
+    return get_engine().dedup_many([(f"{DUP_NS}{form_kind}:{fp}", ttl)])[0]
+
+def dup_recent_many(entries: list[tuple[str, str, int]]) -> list[bool]:
+    """
+    Version lot de dup_recent : entries = [(form_kind, fp, ttl), ...], un seul aller-retour.
+    Un doublon interne au lot compte comme récent.
+    """
+    return get_engine().dedup_many([(f"{DUP_NS}{kind}:{fp}", ttl) for kind, fp, ttl in entries])
+
+def dup_release_many(entries: list[tuple[str, str, int]]) -> None:
+    """Libère des empreintes posées par dup_recent_many (lot annulé avant commit)."""
+    if entries:
+        cache.delete_many([f"{DUP_NS}{kind}:{fp}" for kind, fp, _ttl in entries])
+
+def parse_rate(rate: str | None) -> tuple[int, int] | None:
+    """ "30/min" -> (30, 60) ; None/"" -> pas de limite."""
+    if not rate:
+        return None
+    num, period = str(rate).split("/", 1)
+    return int(num), _PERIODS[period.strip()[0]]
+
+def submission_limits(form_kind: str, ip: str | None, email: str | None) -> list[tuple[str, int, int]]:
+    """
+    Fenêtres glissantes par IP et par email normalisé, par form_kind.
+    LEADS_RATE_LIMITS = {"ip": "30/min", "email": "10/min", "form_kinds": {kind: {...}}} ;
+    à défaut, reprend les taux DRF leads_ip / leads_email.
+    """
+    drf_rates = (getattr(settings, "REST_FRAMEWORK", {}) or {}).get("DEFAULT_THROTTLE_RATES", {}) or {}
+    conf = getattr(settings, "LEADS_RATE_LIMITS", None) or {}
+    rates = {"ip": conf.get("ip", drf_rates.get("leads_ip")), "email": conf.get("email", drf_rates.get("leads_email"))}
+    rates.update((conf.get("form_kinds") or {}).get(form_kind, {}))
+
+    limits = []
+    ip_rate, email_rate = parse_rate(rates.get("ip")), parse_rate(rates.get("email"))
+    if ip and ip_rate:
+        limits.append((f"{RL_NS_IP}{form_kind}:{ip}", *ip_rate))
+    email = normalize_email(email)
+    if email and email_rate:
+        limits.append((f"{RL_NS_EMAIL}{form_kind}:{email}", *email_rate))
+    return limits
+
+def guard_submission(form_kind: str, *, ip: str | None = None, email: str | None = None,
+                     idem_key: str = "", idem_ttl: int = 3600) -> Decision:
+    """
+    Contrôle d'entrée d'une soumission, avant tout accès ORM, en un aller-retour :
+    limites IP/email puis SET NX de la clé d'idempotence.
+    """
+    dedup = [(f"{IDEM_NS}{form_kind}:{idem_key}", idem_ttl)] if idem_key else []
+    return get_engine().check(dedup=dedup, limits=submission_limits(form_kind, ip, email))
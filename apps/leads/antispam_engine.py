@@ -0,0 +1,200 @@
+"""Moteur antispam atomique : dédup SET-NX + fenêtres glissantes, en un aller-retour.
+
+Avec django-redis, un script Lua unique :
+
+1. purge puis compte chaque fenêtre glissante (ZSET de timestamps ms) ;
+   la première limite atteinte rejette la soumission sans rien consommer ;
+2. teste les clés de dédup ; une clé présente => doublon, rien n'est consommé ;
+3. sinon pose toutes les clés de dédup (SET NX PX) et ajoute un hit à
+   chaque fenêtre (ZADD + PEXPIRE).
+
+Deux soumissions identiques concurrentes ne peuvent donc plus passer toutes
+les deux (l'ancien ``cache.get`` puis ``cache.set`` le permettait).
+
+Sans Redis (locmem en test/dev), ``LocalAntispamEngine`` reproduit la même
+sémantique sur le cache Django sous un verrou de process. Si Redis est
+injoignable, le moteur laisse passer (fail-open) et journalise.
+"""
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple
+
+from django.core.cache import cache, caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .audit import log_antispam
+
+# (clé, limite, fenêtre en secondes)
+Limit = Tuple[str, int, float]
+# (clé, ttl en secondes)
+Dedup = Tuple[str, float]
+
+OK = "ok"
+RATE_LIMITED = "rate_limited"
+DUPLICATE = "duplicate"
+
+_LUA_CHECK = """
+local now = tonumber(ARGV[1])
+local member = ARGV[2]
+local nd = tonumber(ARGV[3])
+local nl = #KEYS - nd
+for i = 1, nl do
+  local key = KEYS[nd + i]
+  local limit = tonumber(ARGV[3 + nd + (i - 1) * 2 + 1])
+  local window = tonumber(ARGV[3 + nd + (i - 1) * 2 + 2])
+  redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+  if redis.call('ZCARD', key) >= limit then
+    local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+    local retry = window
+    if oldest[2] then retry = window - (now - tonumber(oldest[2])) end
+    return {1, i, retry}
+  end
+end
+for i = 1, nd do
+  if redis.call('EXISTS', KEYS[i]) == 1 then
+    return {2, i, 0}
+  end
+end
+for i = 1, nd do
+  redis.call('SET', KEYS[i], 1, 'PX', tonumber(ARGV[3 + i]), 'NX')
+end
+for i = 1, nl do
+  local key = KEYS[nd + i]
+  local window = tonumber(ARGV[3 + nd + (i - 1) * 2 + 2])
+  redis.call('ZADD', key, now, member)
+  redis.call('PEXPIRE', key, window)
+end
+return {0, 0, 0}
+"""
+
+
+@dataclass(frozen=True)
+class Decision:
+    status: str = OK
+    key: str = ""
+    retry_after: float = 0.0
+
+    @property
+    def allowed(self) -> bool:
+        return self.status == OK
+
+
+class RedisAntispamEngine:
+    def __init__(self, client) -> None:
+        self.client = client
+        self._script = client.register_script(_LUA_CHECK)
+
+    def check(self, *, dedup: Sequence[Dedup] = (), limits: Sequence[Limit] = ()) -> Decision:
+        keys = [cache.make_key(k) for k, _ in dedup] + [cache.make_key(k) for k, _, _ in limits]
+        if not keys:
+            return Decision()
+        args: List = [int(time.time() * 1000), uuid.uuid4().hex, len(dedup)]
+        args += [max(int(ttl * 1000), 1) for _, ttl in dedup]
+        for _, limit, window in limits:
+            args += [int(limit), max(int(window * 1000), 1)]
+        try:
+            code, index, retry_ms = self._script(keys=keys, args=args)
+        except Exception:
+            log_antispam.exception("antispam_engine_unavailable keys=%s", len(keys))
+            return Decision()
+        code, index = int(code), int(index)
+        if code == 1:
+            return Decision(RATE_LIMITED, limits[index - 1][0], max(float(retry_ms), 0.0) / 1000.0)
+        if code == 2:
+            return Decision(DUPLICATE, dedup[index - 1][0])
+        return Decision()
+
+    def dedup_many(self, entries: Sequence[Dedup]) -> List[bool]:
+        """SET NX PX par clé, en un pipeline : True => déjà vu."""
+        if not entries:
+            return []
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key, ttl in entries:
+                pipe.set(cache.make_key(key), 1, px=max(int(ttl * 1000), 1), nx=True)
+            return [not bool(created) for created in pipe.execute()]
+        except Exception:
+            log_antispam.exception("antispam_engine_unavailable dedup=%s", len(entries))
+            return [False] * len(entries)
+
+
+class LocalAntispamEngine:
+    """Même sémantique sur le cache Django (locmem), atomique à l'échelle du process."""
+
+    _lock = threading.Lock()
+
+    def check(self, *, dedup: Sequence[Dedup] = (), limits: Sequence[Limit] = ()) -> Decision:
+        now = time.time()
+        with self._lock:
+            windows = []
+            for key, limit, window in limits:
+                hits = [ts for ts in (cache.get(key) or []) if ts > now - window]
+                if len(hits) >= limit:
+                    return Decision(RATE_LIMITED, key, max(window - (now - hits[0]), 0.0))
+                windows.append((key, hits, window))
+            for key, _ in dedup:
+                if cache.get(key) is not None:
+                    return Decision(DUPLICATE, key)
+            for key, ttl in dedup:
+                cache.set(key, 1, ttl)
+            for key, hits, window in windows:
+                cache.set(key, hits + [now], window)
+        return Decision()
+
+    def dedup_many(self, entries: Sequence[Dedup]) -> List[bool]:
+        with self._lock:
+            return [not cache.add(key, 1, ttl) for key, ttl in entries]
+
+
+_engine = None
+
+
+def _redis_client():
+    try:
+        from django_redis import get_redis_connection
+        from django_redis.cache import RedisCache
+    except ImportError:
+        return None
+    if not isinstance(caches["default"], RedisCache):
+        return None
+    try:
+        return get_redis_connection("default")
+    except Exception:
+        log_antispam.exception("antispam_engine_redis_connection_failed")
+        return None
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        client = _redis_client()
+        _engine = RedisAntispamEngine(client) if client is not None else LocalAntispamEngine()
+    return _engine
+
+
+def reset_engine() -> None:
+    global _engine
+    _engine = None
+
+
+@receiver(setting_changed)
+def _on_setting_changed(setting=None, **kwargs):
+    if setting == "CACHES":
+        reset_engine()
+
+
+__all__ = [
+    "DUPLICATE",
+    "Decision",
+    "LocalAntispamEngine",
+    "OK",
+    "RATE_LIMITED",
+    "RedisAntispamEngine",
+    "get_engine",
+    "reset_engine",
+]
@@ -0,0 +1,267 @@
+"""Ingestion par lots des leads (imports partenaires, rejeux de formulaires hors-ligne).
+
+Chaque élément suit les mêmes règles que ``LeadCollectAPIView`` (politique
+``conf.load_policy``, honeypot, serializer compilé ``lead_serializer``) mais le lot est
+traité en un nombre constant d'allers-retours :
+
+- une seule requête ``idempotency_key IN (...)`` pour les doublons ;
+- un ``bulk_create`` des ``Lead`` puis un ``bulk_create`` des ``LeadEvent`` ;
+- une seule tâche ``process_leads_batch`` pour tout le lot.
+
+Le résultat est rendu élément par élément, dans l'ordre d'entrée.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from uuid import uuid4
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .antispam import normalize_email
+from .audit import log_api, log_antispam
+from .conf import get_global_policy
+from .constants import LeadStatus, RejectReason
+from .models import Lead, LeadEvent
+from .serializers import lead_serializer
+from .tasks import process_leads_batch
+
+DEFAULT_MAX_ITEMS = 500
+BULK_BATCH_SIZE = 500
+
+ACCEPTED = "accepted"
+DUPLICATE = "duplicate"
+REJECTED = "rejected"
+
+
+def max_batch_items() -> int:
+    return int(getattr(settings, "LEADS_BATCH_MAX_ITEMS", DEFAULT_MAX_ITEMS))
+
+
+def request_meta(request) -> Dict[str, Any]:
+    """Traces HTTP recopiées sur chaque lead créé depuis ``request``."""
+    return {
+        "ip": request.META.get("REMOTE_ADDR"),
+        "user_agent": request.META.get("HTTP_USER_AGENT", ""),
+        "referer": request.META.get("HTTP_REFERER", ""),
+        "page_path": request.META.get("REQUEST_URI", ""),
+        "locale": request.headers.get("Accept-Language") or "",
+        "attribution": getattr(request, "_attribution", {}) or {},
+    }
+
+
+def build_lead(data: Dict[str, Any], payload: Dict[str, Any], *, idem_key: str,
+               meta: Optional[Dict[str, Any]] = None) -> Lead:
+    """Instancie (sans sauvegarder) un ``Lead`` PENDING depuis des données validées."""
+    meta = meta or {}
+    context_payload = data.get("context") if isinstance(data.get("context"), dict) else {}
+    context_payload = dict(context_payload)
+    if meta.get("attribution"):
+        context_payload["ads_attribution"] = meta["attribution"]
+
+    user_agent = (meta.get("user_agent") or "")[:300]
+    return Lead(
+        form_kind=data.get("form_kind"),
+        campaign=data.get("campaign") or "",
+        source=data.get("source") or "",
+        utm_source=data.get("utm_source") or "",
+        utm_medium=data.get("utm_medium") or "",
+        utm_campaign=data.get("utm_campaign") or "",
+        context=context_payload,
+        email=normalize_email(data.get("email")),
+        first_name=data.get("first_name") or "",
+        last_name=data.get("last_name") or "",
+        full_name=data.get("full_name") or "",
+        phone=data.get("phone") or "",
+        address_line1=data.get("address_line1") or "",
+        address_line2=data.get("address_line2") or "",
+        city=data.get("city") or "",
+        state=data.get("state") or "",
+        postal_code=data.get("postal_code") or "",
+        country=data.get("country") or "",
+        course_slug=data.get("course_slug") or "",
+        currency=(data.get("currency") or "").upper(),
+        coupon_code=data.get("coupon_code") or "",
+        billing_address_line1=data.get("billing_address_line1") or "",
+        billing_address_line2=data.get("billing_address_line2") or "",
+        billing_city=data.get("billing_city") or "",
+        billing_state=data.get("billing_state") or "",
+        billing_postal_code=data.get("billing_postal_code") or "",
+        billing_country=(data.get("billing_country") or "").upper(),
+        company_name=data.get("company_name") or "",
+        tax_id_type=data.get("tax_id_type") or "",
+        tax_id=data.get("tax_id") or "",
+        save_customer=bool(data.get("save_customer") or False),
+        accept_terms=bool(data.get("accept_terms") or False),
+        invoice_language=data.get("invoice_language") or "",
+        ebook_id=data.get("ebook_id") or "",
+        newsletter_optin=bool(data.get("newsletter_optin") or False),
+        consent=bool(data.get("consent") or False),
+        consent_ip=meta.get("ip"),
+        consent_user_agent=user_agent,
+        idempotency_key=idem_key or "",
+        client_ts=data.get("client_ts"),
+        signed_token_hash="",
+        honeypot_value=payload.get("honeypot") or "",
+        status=LeadStatus.PENDING,
+        queued_at=timezone.now(),
+        ip_addr=meta.get("ip"),
+        user_agent=user_agent,
+        referer=(meta.get("referer") or "")[:500],
+        page_path=(meta.get("page_path") or "")[:300],
+        locale=(meta.get("locale") or "")[:16],
+        ab_variant=(payload.get("ab_variant") or "")[:32],
+    )
+
+
+@dataclass
+class ItemResult:
+    index: int
+    status: str
+    idempotency_key: str = ""
+    lead_id: Optional[int] = None
+    reason: str = ""
+    errors: Any = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"index": self.index, "status": self.status}
+        if self.idempotency_key:
+            out["idempotency_key"] = self.idempotency_key
+        if self.lead_id is not None:
+            out["lead_id"] = self.lead_id
+        if self.reason:
+            out["reason"] = self.reason
+        if self.errors is not None:
+            out["errors"] = self.errors
+        return out
+
+
+@dataclass
+class BatchResult:
+    items: List[ItemResult] = field(default_factory=list)
+
+    def count(self, status: str) -> int:
+        return sum(1 for item in self.items if item.status == status)
+
+    @property
+    def lead_ids(self) -> List[int]:
+        return [item.lead_id for item in self.items if item.status == ACCEPTED and item.lead_id]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "accepted": self.count(ACCEPTED),
+            "duplicates": self.count(DUPLICATE),
+            "rejected": self.count(REJECTED),
+            "results": [item.as_dict() for item in self.items],
+        }
+
+
+def _item_key(item: Dict[str, Any]) -> str:
+    return str(item.get("idempotency_key") or "").strip()[:200]
+
+
+def _insert(pending: List[tuple]) -> set:
+    """``bulk_create`` des leads ; renvoie les clés perdues sur une course concurrente."""
+    leads = [lead for _, lead in pending]
+    for lead in leads:
+        lead.refresh_identity_keys()  # bulk_create ne passe pas par save()
+    taken: set = set()
+    while leads:
+        try:
+            with transaction.atomic():
+                Lead.objects.bulk_create(leads, batch_size=BULK_BATCH_SIZE)
+            break
+        except IntegrityError:
+            # Une autre requête a inséré une des clés entre le IN et l'insert :
+            # on relit les clés prises et on réinsère le reste, jusqu'à ne plus
+            # avoir de conflit (chaque tour retire au moins une clé).
+            keys = [lead.idempotency_key for lead in leads if lead.idempotency_key]
+            lost = set(Lead.objects.filter(idempotency_key__in=keys).values_list("idempotency_key", flat=True))
+            if not lost:
+                raise  # conflit étranger à l'idempotence
+            taken |= lost
+            leads = [lead for lead in leads if lead.idempotency_key not in lost]
+            for lead in leads:
+                lead.pk = None
+    return taken
+
+
+def ingest_batch(items: Iterable[Any], *, meta: Optional[Dict[str, Any]] = None,
+                 enqueue: bool = True) -> BatchResult:
+    """Valide, déduplique et insère un lot de leads ; un seul traitement async est planifié."""
+    items = list(items)
+    global_pol = get_global_policy()
+    require_key = bool(global_pol.get("require_idempotency_header", True))
+    result = BatchResult(items=[ItemResult(index=i, status=REJECTED) for i in range(len(items))])
+
+    candidates: List[tuple] = []
+    for index, item in enumerate(items):
+        slot = result.items[index]
+        if not isinstance(item, dict):
+            slot.reason = RejectReason.INVALID
+            slot.errors = {"non_field_errors": ["Objet JSON attendu."]}
+            continue
+        key = _item_key(item)
+        slot.idempotency_key = key
+        if require_key and not key:
+            slot.reason = RejectReason.INVALID
+            slot.errors = {"idempotency_key": ["Champ requis."]}
+            continue
+        if (item.get("honeypot") or "").strip():
+            slot.reason = RejectReason.HONEYPOT
+            log_antispam.info("lead_rejected reason=%s batch_index=%s", RejectReason.HONEYPOT, index)
+            continue
+        payload = {k: v for k, v in item.items() if k != "idempotency_key"}
+        ser = lead_serializer(payload)
+        if not ser.is_valid():
+            slot.reason = RejectReason.INVALID
+            slot.errors = ser.errors
+            continue
+        candidates.append((index, key, payload, ser.validated_data))
+
+    # Idempotence : une seule requête IN pour tout le lot.
+    keys = {key for _, key, _, _ in candidates if key}
+    existing = set()
+    if keys:
+        existing = set(Lead.objects.filter(idempotency_key__in=keys).values_list("idempotency_key", flat=True))
+
+    pending: List[tuple] = []
+    seen = set()
+    for index, key, payload, data in candidates:
+        slot = result.items[index]
+        if key and (key in existing or key in seen):
+            slot.status = DUPLICATE
+            continue
+        if key:
+            seen.add(key)
+        else:
+            # idempotency_key est unique en base : clé technique si la politique ne l'exige pas.
+            key = f"batch-{uuid4().hex}"
+        pending.append((index, build_lead(data, payload, idem_key=key, meta=meta)))
+
+    if pending:
+        lost = _insert(pending)
+        created = []
+        for index, lead in pending:
+            slot = result.items[index]
+            if lead.idempotency_key in lost:
+                slot.status = DUPLICATE
+                continue
+            slot.status = ACCEPTED
+            slot.lead_id = lead.pk
+            created.append(lead)
+        LeadEvent.objects.bulk_create(
+            [LeadEvent(lead=lead, event="accepted", payload={"batch": True}) for lead in created],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+    log_api.info(
+        "batch_ingested size=%s accepted=%s duplicates=%s rejected=%s",
+        len(items), result.count(ACCEPTED), result.count(DUPLICATE), result.count(REJECTED),
+    )
+
+    if enqueue and result.lead_ids:
+        process_leads_batch.delay(result.lead_ids)
+    return result
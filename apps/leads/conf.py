@@ -1,6 +1,15 @@
-import os, yaml
+import hashlib, json, os, threading, time, yaml
 from django.conf import settings
-from functools import lru_cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+# Rechargement à chaud : le YAML est re-stat() au plus toutes les N secondes
+# (LEADS_POLICY_RELOAD_SECONDS, 0 = à chaque appel) et relu si son mtime/taille change.
+DEFAULT_RELOAD_SECONDS = 2.0
+
+_lock = threading.Lock()
+_state = {"current": None, "signature": None, "checked_at": 0.0}
+
 
 def _load_yaml_policy(path: str) -> dict:
     try:
@@ -9,8 +18,14 @@ def _load_yaml_policy(path: str) -> dict:
     except FileNotFoundError:
         return {}
 
-@lru_cache(maxsize=1)
-def load_policy() -> dict:
+def _yaml_signature(path: str):
+    try:
+        st = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return (path, None, None)
+    return (path, st.st_mtime_ns, st.st_size)
+
+def _build_policy() -> dict:
     # 1) settings dict
     settings_policy = getattr(settings, "LEADS_FIELD_POLICY", {})
     # 2) YAML
@@ -26,6 +41,46 @@ def load_policy() -> dict:
             policy[k] = v
     return policy
 
+def _policy_version(policy: dict) -> str:
+    # "version" explicite dans le YAML prioritaire, sinon empreinte du contenu fusionné
+    explicit = policy.get("version")
+    digest = hashlib.sha1(json.dumps(policy, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:12]
+    return f"{explicit}:{digest}" if explicit else digest
+
+def _snapshot() -> tuple:
+    """(policy, version) courants ; relit le YAML si sa signature a changé."""
+    now = time.monotonic()
+    interval = float(getattr(settings, "LEADS_POLICY_RELOAD_SECONDS", DEFAULT_RELOAD_SECONDS))
+    current = _state["current"]
+    if current is not None and now - _state["checked_at"] < interval:
+        return current
+    signature = _yaml_signature(getattr(settings, "LEADS_POLICY_YAML", ""))
+    with _lock:
+        if _state["current"] is None or signature != _state["signature"]:
+            policy = _build_policy()
+            _state.update(current=(policy, _policy_version(policy)), signature=signature)
+        _state["checked_at"] = now
+        return _state["current"]
+
+def load_policy() -> dict:
+    return _snapshot()[0]
+
+def policy_version() -> str:
+    """Version de la politique courante (change à chaque rechargement effectif)."""
+    return _snapshot()[1]
+
+def reset_policy_cache() -> None:
+    with _lock:
+        _state.update(current=None, signature=None, checked_at=0.0)
+
+# compat : l'ancienne implémentation était un lru_cache
+load_policy.cache_clear = reset_policy_cache
+
+@receiver(setting_changed)
+def _on_setting_changed(setting=None, **kwargs):
+    if setting in ("LEADS_FIELD_POLICY", "LEADS_POLICY_YAML"):
+        reset_policy_cache()
+
 def get_form_policy(form_kind: str, campaign: str | None = None) -> dict:
     p = load_policy()
     fk = (p.get("form_kinds") or {}).get(form_kind, {})
@@ -38,6 +93,17 @@ def get_form_policy(form_kind: str, campaign: str | None = None) -> dict:
         merged["fields"] = merged_fields
     return merged
 
+def policy_cache_key(form_kind: str, campaign: str | None = None) -> tuple:
+    """
+    Clé (form_kind, campaign, version) d'une politique effective.
+    form_kind/campaign inconnus sont ramenés à "" : la clé reste bornée
+    quelles que soient les valeurs envoyées par le client.
+    """
+    p, version = _snapshot()
+    kind = form_kind if form_kind in (p.get("form_kinds") or {}) else ""
+    camp = campaign if campaign and campaign in (p.get("campaign_overrides") or {}) else ""
+    return (kind, camp, version)
+
 def get_global_policy() -> dict:
     p = load_policy()
-    return p.get("global") or {}
\ No newline at end of file
+    return p.get("global") or {}
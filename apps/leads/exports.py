@@ -0,0 +1,179 @@
+"""Exports de leads en flux (CSV / NDJSON) et pagination keyset pour la synchro CRM.
+
+Jamais de queryset évalué en mémoire : ``values_list(...).iterator(chunk_size=...)``
+alimente directement un ``StreamingHttpResponse``.
+
+Deux parcours :
+
+- pagination par ``id`` (``after`` = dernier id vu) pour un export ponctuel ;
+- synchro incrémentale par curseur ``since`` sur ``(updated_at, id)`` : chaque
+  réponse rend le curseur à repasser à l'appel suivant, seuls les deltas
+  (créations et mises à jour) reviennent.
+
+``updated_at`` est posé en Python avant le commit (le pipeline l'affecte puis
+route et ``bulk_update`` sous verrou) : une ligne peut devenir visible après
+une autre plus récente. La synchro ne lit donc que les lignes modifiées avant
+``now() - LEADS_EXPORT_SYNC_LAG_SECONDS`` ; le curseur ne dépasse jamais une
+ligne encore en cours d'écriture, elle part dans l'appel suivant.
+"""
+from __future__ import annotations
+
+import base64
+import csv
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+
+from .constants import FormKind, LeadStatus
+from .models import Lead
+
+EXPORT_FIELDS = (
+    "id", "form_kind", "status", "reject_reason", "score",
+    "campaign", "source", "utm_source", "utm_medium", "utm_campaign",
+    "email", "first_name", "last_name", "full_name", "phone",
+    "city", "country", "course_slug", "currency", "ebook_id",
+    "newsletter_optin", "consent", "locale",
+    "created_at", "updated_at", "enriched_at",
+)
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_SYNC_LAG_SECONDS = 120
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+def chunk_size() -> int:
+    return int(getattr(settings, "LEADS_EXPORT_CHUNK_SIZE", DEFAULT_CHUNK_SIZE))
+
+
+def sync_lag_seconds() -> int:
+    return max(int(getattr(settings, "LEADS_EXPORT_SYNC_LAG_SECONDS", DEFAULT_SYNC_LAG_SECONDS)), 0)
+
+
+# -----------------------------
+# Curseur (opaque pour le client)
+# -----------------------------
+def encode_cursor(updated_at: datetime, lead_id: int) -> str:
+    raw = json.dumps([updated_at.isoformat(), lead_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        stamp, lead_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        parsed = parse_datetime(stamp)
+        if parsed is None:
+            raise ValueError(stamp)
+        return parsed, int(lead_id)
+    except Exception as exc:
+        raise serializers.ValidationError({"since": "Curseur invalide."}) from exc
+
+
+# -----------------------------
+# Filtres
+# -----------------------------
+class LeadExportFilterSerializer(serializers.Serializer):
+    form_kind = serializers.ChoiceField(choices=FormKind.choices, required=False)
+    status = serializers.ChoiceField(choices=LeadStatus.choices, required=False)
+    campaign = serializers.CharField(required=False, max_length=64)
+    created_from = serializers.DateTimeField(required=False)
+    created_to = serializers.DateTimeField(required=False)
+    after = serializers.IntegerField(required=False, min_value=0)
+    since = serializers.CharField(required=False, allow_blank=True)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=MAX_PAGE_SIZE)
+    fmt = serializers.ChoiceField(choices=("csv", "ndjson"), required=False, default="csv")
+
+    def validate(self, attrs):
+        if attrs.get("after") is not None and "since" in attrs:
+            raise serializers.ValidationError("after et since sont exclusifs.")
+        if attrs.get("since"):
+            attrs["since_key"] = decode_cursor(attrs["since"])
+        return attrs
+
+
+def filtered_leads(params: Dict[str, Any]):
+    qs = Lead.objects.all()
+    if params.get("form_kind"):
+        qs = qs.filter(form_kind=params["form_kind"])
+    if params.get("status"):
+        qs = qs.filter(status=params["status"])
+    if "campaign" in params:
+        qs = qs.filter(campaign=params["campaign"])
+    if params.get("created_from"):
+        qs = qs.filter(created_at__gte=params["created_from"])
+    if params.get("created_to"):
+        qs = qs.filter(created_at__lt=params["created_to"])
+    return qs
+
+
+def keyset(qs, params: Dict[str, Any]):
+    """Ordonne et positionne le queryset : (updated_at, id) en mode synchro, id sinon."""
+    if "since" in params:
+        # borne de sécurité : rien de plus récent que now() - lag (commits tardifs)
+        qs = qs.filter(updated_at__lte=timezone.now() - timedelta(seconds=sync_lag_seconds()))
+        key = params.get("since_key")
+        if key:
+            stamp, lead_id = key
+            qs = qs.filter(Q(updated_at__gt=stamp) | Q(updated_at=stamp, id__gt=lead_id))
+        return qs.order_by("updated_at", "id")
+    if params.get("after"):
+        qs = qs.filter(id__gt=params["after"])
+    return qs.order_by("id")
+
+
+def sync_high_water_mark(qs) -> Optional[Tuple[datetime, int]]:
+    """Borne haute figée au début d'un export synchro (``qs`` issu de ``keyset``, donc déjà ≤ now() - lag)."""
+    last = qs.order_by("-updated_at", "-id").values_list("updated_at", "id").first()
+    return tuple(last) if last else None
+
+
+def bounded(qs, mark: Tuple[datetime, int]):
+    stamp, lead_id = mark
+    return qs.filter(Q(updated_at__lt=stamp) | Q(updated_at=stamp, id__lte=lead_id))
+
+
+# -----------------------------
+# Sérialisation en flux
+# -----------------------------
+class _Echo:
+    """Pseudo-buffer : csv.writer écrit une ligne, on la renvoie telle quelle."""
+
+    def write(self, value):
+        return value
+
+
+def _rows(qs, fields: Iterable[str]) -> Iterator[tuple]:
+    return qs.values_list(*fields).iterator(chunk_size=chunk_size())
+
+
+def stream_csv(qs, fields: Tuple[str, ...] = EXPORT_FIELDS) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in _rows(qs, fields):
+        yield writer.writerow(["" if v is None else (v.isoformat() if isinstance(v, datetime) else v) for v in row])
+
+
+def stream_ndjson(qs, fields: Tuple[str, ...] = EXPORT_FIELDS) -> Iterator[str]:
+    for row in _rows(qs, fields):
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+def page(qs, limit: int, *, sync: bool, since: str = "", fields: Tuple[str, ...] = EXPORT_FIELDS) -> Dict[str, Any]:
+    """Une page keyset (limit + 1 lignes lues pour savoir s'il en reste)."""
+    rows = list(qs.values(*fields)[: limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    out: Dict[str, Any] = {"results": rows, "has_more": has_more}
+    if sync:
+        # page vide : le client garde son curseur
+        out["cursor"] = encode_cursor(rows[-1]["updated_at"], rows[-1]["id"]) if rows else (since or None)
+    else:
+        out["next_after"] = rows[-1]["id"] if rows and has_more else None
+    return out
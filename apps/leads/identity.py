@@ -0,0 +1,33 @@
+"""Clés d'identité normalisées des leads (email / téléphone hachés).
+
+Les clés sont indexées avec ``form_kind`` et ``created_at`` : la résolution
+d'un lead existant (flowforms) devient une seule requête indexée, quel que
+soit le format saisi (casse, espaces, séparateurs du téléphone).
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+
+KEY_LENGTH = 32
+
+_PHONE_STRIP = re.compile(r"[\s().\-/]")
+
+
+def normalize_phone(phone: str | None) -> str:
+    value = _PHONE_STRIP.sub("", (phone or "").strip())
+    if value.startswith("00"):
+        value = "+" + value[2:]
+    return value
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:KEY_LENGTH] if value else ""
+
+
+def email_key(email: str | None) -> str:
+    return _digest((email or "").strip().lower())
+
+
+def phone_key(phone: str | None) -> str:
+    return _digest(normalize_phone(phone))
@@ -0,0 +1,350 @@
+"""Harnais de charge du tunnel lead (utilisé par ``manage.py leads_loadtest``).
+
+Rejoue des parcours réalistes avec N utilisateurs virtuels (threads) :
+
+- ``api``    : POST /api/leads/collect/ (en-tête d'idempotence, IP distincte par VU) ;
+- ``batch``  : POST /api/leads/collect/batch/ ;
+- ``wizard`` : GET puis POST de chaque step d'un flow flowforms (routage simulé
+  avec le Router compilé, valeurs générées d'après le type des champs).
+
+Chaque requête est chronométrée par étiquette (p50/p95/p99). Le retard de file
+est mesuré côté base : ``enriched_at - created_at`` des leads du run (tag dans
+l'idempotency_key / l'email), que le traitement soit inline (Celery eager) ou
+fait par de vrais workers. Étape optionnelle : mise en outbox d'un email par
+lead VALID puis drain vers un puits SMTP local (``apps.common.smtp_sink``).
+
+Transport : ``django.test.Client`` en process (par défaut) ou HTTP réel
+(``requests``) vers ``--target``.
+"""
+from __future__ import annotations
+
+import math
+import re
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from django.db import close_old_connections
+
+FUNNELS = ("api", "batch", "wizard")
+
+
+# -----------------------------
+# Mesures
+# -----------------------------
+def percentile(values: List[float], pct: float) -> float:
+    """Percentile au rang le plus proche (0 si aucune valeur)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(math.ceil(pct / 100.0 * len(ordered))), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+@dataclass
+class Recorder:
+    latencies: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    statuses: Dict[str, Counter] = field(default_factory=lambda: defaultdict(Counter))
+    errors: Counter = field(default_factory=Counter)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, label: str, seconds: float, status: int) -> None:
+        with self._lock:
+            self.latencies[label].append(seconds)
+            self.statuses[label][status] += 1
+            if status >= 400 or status == 0:
+                self.errors[label] += 1
+
+    def summary(self, elapsed: float) -> List[Dict[str, Any]]:
+        rows = []
+        for label in sorted(self.latencies):
+            values = self.latencies[label]
+            rows.append({
+                "label": label,
+                "count": len(values),
+                "errors": self.errors[label],
+                "rps": len(values) / elapsed if elapsed else 0.0,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+                "statuses": dict(self.statuses[label]),
+            })
+        return rows
+
+
+# -----------------------------
+# Transports
+# -----------------------------
+class InProcessTransport:
+    def __init__(self, remote_addr: str) -> None:
+        from django.test import Client
+
+        self.client = Client(REMOTE_ADDR=remote_addr)
+
+    def reset(self) -> None:
+        self.client.cookies.clear()
+
+    def post_json(self, path: str, body: Any, headers: Optional[Dict[str, str]] = None) -> int:
+        extra = {f"HTTP_{k.upper().replace('-', '_')}": v for k, v in (headers or {}).items()}
+        return self.client.post(path, data=body, content_type="application/json", **extra).status_code
+
+    def get(self, path: str) -> int:
+        return self.client.get(path).status_code
+
+    def post_form(self, path: str, data: Dict[str, Any]) -> int:
+        return self.client.post(path, data=data).status_code
+
+
+class HTTPTransport:
+    _csrf_re = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+    def __init__(self, base_url: str, timeout: float = 30.0) -> None:
+        import requests
+
+        self.base = base_url.rstrip("/")
+        self.session = requests.Session()
+        self.timeout = timeout
+        self._csrf = ""
+
+    def reset(self) -> None:
+        self.session.cookies.clear()
+        self._csrf = ""
+
+    def post_json(self, path: str, body: Any, headers: Optional[Dict[str, str]] = None) -> int:
+        return self.session.post(self.base + path, json=body, headers=headers or {}, timeout=self.timeout).status_code
+
+    def get(self, path: str) -> int:
+        resp = self.session.get(self.base + path, timeout=self.timeout)
+        match = self._csrf_re.search(resp.text or "")
+        if match:
+            self._csrf = match.group(1)
+        return resp.status_code
+
+    def post_form(self, path: str, data: Dict[str, Any]) -> int:
+        payload = dict(data, csrfmiddlewaretoken=self._csrf)
+        resp = self.session.post(self.base + path, data=payload, headers={"Referer": self.base + path},
+                                 timeout=self.timeout, allow_redirects=False)
+        return resp.status_code
+
+
+# -----------------------------
+# Parcours
+# -----------------------------
+@dataclass
+class RunConfig:
+    funnels: List[str]
+    tag: str
+    batch_items: int = 20
+    flow_key: str = ""
+    form_kind: str = "email_ebook"
+    ingest_token: str = ""  # Bearer de /collect/batch/
+
+
+def _timed(recorder: Recorder, label: str, fn: Callable[[], int]) -> int:
+    started = time.perf_counter()
+    try:
+        status = fn()
+    except Exception:
+        status = 0
+    recorder.record(label, time.perf_counter() - started, status)
+    return status
+
+
+def _lead_payload(cfg: RunConfig, n: str) -> Dict[str, Any]:
+    return {
+        "form_kind": cfg.form_kind,
+        "email": f"lt-{cfg.tag}-{n}@example.com",
+        "first_name": "Load",
+        "idempotency_key": f"lt-{cfg.tag}-{n}",
+    }
+
+
+def funnel_api(transport, cfg: RunConfig, recorder: Recorder, n: str) -> None:
+    body = _lead_payload(cfg, n)
+    _timed(recorder, "api.collect", lambda: transport.post_json(
+        "/api/leads/collect/", body, {"X-Idempotency-Key": body["idempotency_key"]}))
+
+
+def funnel_batch(transport, cfg: RunConfig, recorder: Recorder, n: str) -> None:
+    items = [_lead_payload(cfg, f"{n}-{i}") for i in range(cfg.batch_items)]
+    headers = {"Authorization": f"Bearer {cfg.ingest_token}"} if cfg.ingest_token else {}
+    _timed(recorder, "api.collect_batch", lambda: transport.post_json(
+        "/api/leads/collect/batch/", {"leads": items}, headers))
+
+
+def _field_value(spec: Dict[str, Any], cfg: RunConfig, n: str) -> Any:
+    kind = (spec.get("type") or "text").lower()
+    choices = spec.get("choices") or []
+    if kind == "email":
+        return f"lt-{cfg.tag}-{n}@example.com"
+    if kind in ("phone", "tel"):
+        return "+2126" + str(abs(hash(n)) % 10 ** 8).zfill(8)
+    if kind in ("number", "int", "integer"):
+        return 1
+    if kind in ("bool", "checkbox") and not choices:
+        return "on"
+    if choices:
+        first = choices[0]
+        return str(first[0] if isinstance(first, (list, tuple)) else first)
+    if kind == "date":
+        return "2025-01-01"
+    if kind == "datetime":
+        return "2025-01-01T10:00"
+    if kind == "file":
+        return None
+    return f"load {n}"[: spec.get("max_length") or 64]
+
+
+def funnel_wizard(transport, cfg: RunConfig, recorder: Recorder, n: str) -> None:
+    from django.urls import reverse
+
+    from apps.flowforms.engine.compiled import get_compiled_flow
+    from apps.flowforms.engine.router import FINISH
+
+    flow = get_compiled_flow(cfg.flow_key)
+    url = reverse("flowforms:wizard", kwargs={"flow_key": cfg.flow_key})
+    transport.reset()  # nouveau visiteur => nouvelle session / FlowSession
+    if _timed(recorder, "wizard.get", lambda: transport.get(url)) >= 400:
+        return
+
+    snapshot: Dict[str, Any] = {}
+    current = flow.router.first_visible_step_key(snapshot)
+    for _ in range(len(flow.router.steps) + 1):
+        if current in (FINISH, None):
+            return
+        step = flow.step_cfg(current)
+        data = {}
+        for spec in step.get("fields") or []:
+            value = _field_value(spec, cfg, n)
+            if value is not None:
+                data[spec["name"]] = value
+        submit = any(c.get("action") == "submit" for c in step.get("ctas") or [])
+        data["flowforms_action"] = "submit::" if submit else "next::"
+        status = _timed(recorder, "wizard.step", lambda: transport.post_form(url, data))
+        if status >= 400:
+            return
+        snapshot.update({k: v for k, v in data.items() if k != "flowforms_action"})
+        action = "submit" if submit else "next"
+        current = flow.router.resolve(current_key=current, action=action, snapshot=snapshot)
+        if current != FINISH:
+            _timed(recorder, "wizard.get", lambda: transport.get(url))
+
+
+_FUNNEL_FNS = {"api": funnel_api, "batch": funnel_batch, "wizard": funnel_wizard}
+
+
+def run_load(*, cfg: RunConfig, iterations: int, concurrency: int, duration: float = 0.0,
+             transport_factory: Callable[[int], Any]) -> tuple[Recorder, float]:
+    """Exécute ``iterations`` parcours (ou pendant ``duration`` s) répartis sur ``concurrency`` VU."""
+    recorder = Recorder()
+    counter = iter(range(10 ** 12))
+    counter_lock = threading.Lock()
+    deadline = time.monotonic() + duration if duration else None
+
+    def next_n() -> Optional[int]:
+        with counter_lock:
+            n = next(counter)
+        if deadline is not None:
+            return n if time.monotonic() < deadline else None
+        return n if n < iterations else None
+
+    def virtual_user(vu: int) -> None:
+        transport = transport_factory(vu)
+        try:
+            while True:
+                n = next_n()
+                if n is None:
+                    return
+                funnel = cfg.funnels[n % len(cfg.funnels)]
+                _FUNNEL_FNS[funnel](transport, cfg, recorder, f"{vu}-{n}")
+        finally:
+            close_old_connections()
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        virtual_user(0)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for future in [pool.submit(virtual_user, vu) for vu in range(concurrency)]:
+                future.result()
+    return recorder, time.perf_counter() - started
+
+
+# -----------------------------
+# Aval : retard de file, outbox
+# -----------------------------
+def run_leads_queryset(tag: str):
+    from django.db.models import Q
+
+    from .models import Lead
+
+    prefix = f"lt-{tag}-"
+    return Lead.objects.filter(Q(idempotency_key__startswith=prefix) | Q(email__startswith=prefix))
+
+
+def wait_processed(tag: str, timeout: float, poll: float = 0.5) -> Dict[str, Any]:
+    """Attend la sortie de PENDING des leads du run puis calcule le retard de file."""
+    from .constants import LeadStatus
+
+    deadline = time.monotonic() + timeout
+    qs = run_leads_queryset(tag)
+    while qs.filter(status=LeadStatus.PENDING).exists() and time.monotonic() < deadline:
+        time.sleep(poll)
+    rows = list(qs.values_list("status", "created_at", "enriched_at"))
+    lags = [(enriched - created).total_seconds() for _, created, enriched in rows if enriched and created]
+    return {
+        "leads": len(rows),
+        "by_status": dict(Counter(status for status, _, _ in rows)),
+        "lag_p50_ms": percentile(lags, 50) * 1000,
+        "lag_p95_ms": percentile(lags, 95) * 1000,
+        "lag_p99_ms": percentile(lags, 99) * 1000,
+    }
+
+
+def enqueue_and_drain(tag: str, template_slug: str, *, drain: bool = True, timeout: float = 60.0) -> Dict[str, Any]:
+    """Met en outbox un email par lead VALID du run puis (option) draine jusqu'à épuisement."""
+    from apps.messaging.exceptions import TemplateNotFoundError
+    from apps.messaging.models import OutboxEmail
+    from apps.messaging.services import EmailService
+
+    from .constants import LeadStatus
+
+    emails = list(run_leads_queryset(tag).filter(status=LeadStatus.VALID).exclude(email="")
+                  .values_list("email", flat=True))
+    started = time.perf_counter()
+    try:
+        for email in emails:
+            EmailService.compose_and_enqueue(
+                namespace="loadtest", purpose="lead_ack", template_slug=template_slug,
+                to=[email], dedup_key=f"loadtest:{tag}:{email}", context={"first_name": "Load"},
+            )
+    except TemplateNotFoundError:
+        return {"skipped": f"template '{template_slug}' introuvable"}
+    enqueue_s = time.perf_counter() - started
+
+    outbox = OutboxEmail.objects.filter(namespace="loadtest", dedup_key__startswith=f"loadtest:{tag}:")
+    if drain:
+        from apps.messaging.tasks import drain_outbox_batch
+
+        deadline = time.monotonic() + timeout
+        pending = (OutboxEmail.Status.QUEUED, OutboxEmail.Status.SENDING)
+        while outbox.filter(status__in=pending).exists() and time.monotonic() < deadline:
+            drain_outbox_batch.apply(kwargs={"limit": 200})
+    rows = list(outbox.values_list("status", "created_at", "sent_at"))
+    lags = [(sent - created).total_seconds() for _, created, sent in rows if sent and created]
+    return {
+        "enqueued": len(emails),
+        "enqueue_rate": len(emails) / enqueue_s if enqueue_s else 0.0,
+        "by_status": dict(Counter(status for status, _, _ in rows)),
+        "send_lag_p50_ms": percentile(lags, 50) * 1000,
+        "send_lag_p95_ms": percentile(lags, 95) * 1000,
+        "send_lag_p99_ms": percentile(lags, 99) * 1000,
+    }
+
+
+def new_tag() -> str:
+    return uuid.uuid4().hex[:10]
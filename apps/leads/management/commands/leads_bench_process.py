@@ -0,0 +1,96 @@
+"""Benchmark du traitement des leads : process_lead unitaire vs lot."""
+from __future__ import annotations
+
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.leads.antispam import DUP_TTL_BY_KIND, DUP_TTL_DEFAULT, dup_fingerprint, dup_release_many
+from apps.leads.constants import LeadStatus
+from apps.leads.models import Lead
+from apps.leads.pipeline import process_pending_batch
+from apps.leads.tasks import process_lead
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le débit (leads/s, requêtes SQL) du traitement unitaire process_lead "
+        "face au traitement par lot (skip_locked + bulk_update). Tout est annulé en fin de run, "
+        "empreintes de dédup du cache comprises."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=500, help="Leads synthétiques par scénario.")
+        parser.add_argument("--batch-size", type=int, default=200, dest="batch_size", help="Taille de lot.")
+
+    def _seed(self, count: int, tag: str) -> list[Lead]:
+        kinds = ("email_ebook", "contact_full")
+        leads = [
+            Lead(
+                form_kind=kinds[i % len(kinds)],
+                email=f"bench-{tag}-{i}@example.com",
+                phone=f"+2126{i:08d}",
+                idempotency_key=f"bench-{tag}-{i}",
+                status=LeadStatus.PENDING,
+                consent=True,
+            )
+            for i in range(count)
+        ]
+        return Lead.objects.bulk_create(leads, batch_size=500)
+
+    def _run(self, label: str, count: int, fn) -> dict:
+        tag = uuid.uuid4().hex[:8]
+        leads = self._seed(count, tag)
+        ids = [lead.id for lead in leads]
+        # empreintes posées dans le cache par le run : libérées à la fin, comme les lignes
+        fingerprints = [
+            (lead.form_kind,
+             dup_fingerprint(lead.form_kind, email=lead.email, phone=lead.phone, course_slug=lead.course_slug),
+             DUP_TTL_BY_KIND.get(lead.form_kind, DUP_TTL_DEFAULT))
+            for lead in leads
+        ]
+        try:
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                fn(ids)
+                elapsed = time.perf_counter() - started
+        finally:
+            dup_release_many(fingerprints)
+        valid = Lead.objects.filter(id__in=ids, status=LeadStatus.VALID).count()
+        return {
+            "label": label,
+            "seconds": elapsed,
+            "rate": count / elapsed if elapsed else 0.0,
+            "queries": len(ctx.captured_queries),
+            "valid": valid,
+        }
+
+    def handle(self, *args, **options):
+        count = max(int(options["count"]), 1)
+        size = max(int(options["batch_size"]), 1)
+
+        def single(ids):
+            for lead_id in ids:
+                process_lead.run(lead_id)
+
+        def batched(ids):
+            for start in range(0, len(ids), size):
+                process_pending_batch(lead_ids=ids[start:start + size], limit=size)
+
+        results = []
+        with transaction.atomic():
+            for label, fn in (("single", single), (f"batch({size})", batched)):
+                results.append(self._run(label, count, fn))
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'mode':<12} {'leads':>6} {'sec':>8} {'leads/s':>9} {'queries':>8} {'valid':>6}")
+        for r in results:
+            self.stdout.write(
+                f"{r['label']:<12} {count:>6} {r['seconds']:>8.3f} {r['rate']:>9.1f} {r['queries']:>8} {r['valid']:>6}"
+            )
+        base, batch = results
+        if batch["seconds"]:
+            self.stdout.write(self.style.SUCCESS(f"Speedup: x{base['seconds'] / batch['seconds']:.1f}"))
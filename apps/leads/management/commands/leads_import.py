@@ -0,0 +1,112 @@
+"""Import de leads en lots depuis un fichier JSON (tableau) ou NDJSON."""
+from __future__ import annotations
+
+import itertools
+import json
+import sys
+from typing import Any, Iterator, List
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.leads import batch
+
+
+def _iter_items(stream) -> Iterator[Any]:
+    head = stream.read(1)
+    while head and head.isspace():
+        head = stream.read(1)
+    if head == "[":
+        yield from json.loads(head + stream.read())
+        return
+    first = (head + stream.readline()) if head else ""
+    for line_no, line in enumerate(itertools.chain([first], stream), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            raise CommandError(f"NDJSON invalide ligne {line_no}: {exc}") from exc
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe des leads (tableau JSON ou NDJSON, '-' pour stdin) via le pipeline batch : "
+        "validation par la politique, idempotence en une requête IN, bulk_create, "
+        "une tâche de traitement par lot."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=str, help="Fichier JSON/NDJSON ou '-' pour stdin.")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=batch.DEFAULT_MAX_ITEMS,
+            dest="chunk_size",
+            help="Leads insérés par lot.",
+        )
+        parser.add_argument(
+            "--source",
+            type=str,
+            default="",
+            help="Valeur 'source' appliquée aux leads qui n'en ont pas.",
+        )
+        parser.add_argument(
+            "--no-process",
+            action="store_true",
+            dest="no_process",
+            help="Insère les leads PENDING sans planifier leur traitement.",
+        )
+        parser.add_argument(
+            "--show-rejected",
+            action="store_true",
+            dest="show_rejected",
+            help="Affiche le détail des éléments rejetés.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        chunk_size = max(int(options["chunk_size"]), 1)
+        totals = {"accepted": 0, "duplicates": 0, "rejected": 0}
+        offset = 0
+
+        stream = sys.stdin if path == "-" else None
+        try:
+            if stream is None:
+                stream = open(path, "r", encoding="utf-8")
+        except OSError as exc:
+            raise CommandError(str(exc)) from exc
+
+        def flush(chunk: List[Any]) -> None:
+            result = batch.ingest_batch(chunk, enqueue=not options["no_process"])
+            summary = result.as_dict()
+            for key in totals:
+                totals[key] += summary[key]
+            if options["show_rejected"]:
+                for item in result.items:
+                    if item.status == batch.REJECTED:
+                        self.stdout.write(
+                            f"#{offset + item.index} rejeté ({item.reason}) {json.dumps(item.errors, default=str)}"
+                        )
+
+        try:
+            chunk: List[Any] = []
+            for item in _iter_items(stream):
+                if options["source"] and isinstance(item, dict) and not item.get("source"):
+                    item["source"] = options["source"]
+                chunk.append(item)
+                if len(chunk) >= chunk_size:
+                    flush(chunk)
+                    offset += len(chunk)
+                    chunk = []
+            if chunk:
+                flush(chunk)
+        except ValueError as exc:
+            raise CommandError(f"JSON invalide: {exc}") from exc
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Acceptés: {totals['accepted']}  Doublons: {totals['duplicates']}  Rejetés: {totals['rejected']}"
+        ))
@@ -0,0 +1,154 @@
+"""Test de charge bout en bout du tunnel lead (collect, batch, wizard flowforms, traitement, outbox)."""
+from __future__ import annotations
+
+import json
+import secrets
+from contextlib import ExitStack
+
+from celery import current_app
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from apps.common.smtp_sink import SMTPSink
+from apps.leads import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        "Rejoue des parcours lead (api, batch, wizard) avec N utilisateurs virtuels et rapporte "
+        "débit, latences p50/p95/p99 et retard de file. En process : Celery eager, adapter "
+        "Google Ads mock et puits SMTP local. Avec --target : HTTP réel vers une instance "
+        "lancée séparément (workers Celery réels, retard mesuré en base)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--funnels", default="api,wizard",
+                            help=f"Parcours séparés par des virgules parmi {', '.join(loadtest.FUNNELS)}.")
+        parser.add_argument("--iterations", type=int, default=200, help="Nombre total de parcours.")
+        parser.add_argument("--duration", type=float, default=0.0,
+                            help="Durée en secondes (prioritaire sur --iterations si > 0).")
+        parser.add_argument("--concurrency", type=int, default=8, help="Utilisateurs virtuels (threads).")
+        parser.add_argument("--target", default="", help="URL de base (HTTP réel) ; vide = en process.")
+        parser.add_argument("--flow-key", dest="flow_key", default="", help="Flow du parcours wizard.")
+        parser.add_argument("--form-kind", dest="form_kind", default="email_ebook", help="form_kind api/batch.")
+        parser.add_argument("--batch-items", dest="batch_items", type=int, default=20, help="Leads par POST batch.")
+        parser.add_argument("--ingest-token", dest="ingest_token", default="",
+                            help="Bearer du parcours batch (défaut : LEADS_INGEST_TOKEN, jeton éphémère en process).")
+        parser.add_argument("--process", choices=("inline", "worker"), default="inline",
+                            help="inline : Celery eager (en process) ; worker : workers externes.")
+        parser.add_argument("--wait-timeout", dest="wait_timeout", type=float, default=120.0,
+                            help="Attente max du traitement des leads (s).")
+        parser.add_argument("--email-template", dest="email_template", default="marketing/promo",
+                            help="Template outbox par lead VALID ; vide = étape désactivée.")
+        parser.add_argument("--respect-rate-limits", dest="respect_rate_limits", action="store_true",
+                            help="Conserver LEADS_RATE_LIMITS (désactivées par défaut en process).")
+        parser.add_argument("--json", action="store_true", help="Rapport JSON.")
+
+    def handle(self, *args, **options):
+        funnels = [f.strip() for f in options["funnels"].split(",") if f.strip()]
+        unknown = set(funnels) - set(loadtest.FUNNELS)
+        if not funnels or unknown:
+            raise CommandError(f"Parcours inconnu(s) : {', '.join(sorted(unknown)) or '(aucun)'}")
+        target = options["target"].strip()
+        if target and options["process"] == "inline":
+            raise CommandError("--target implique --process worker (le traitement tourne côté serveur).")
+
+        cfg = loadtest.RunConfig(
+            funnels=funnels,
+            tag=loadtest.new_tag(),
+            batch_items=max(int(options["batch_items"]), 1),
+            flow_key=options["flow_key"] or getattr(settings, "FLOWFORMS_DEFAULT_FLOW_KEY", "checkout_intent_flow"),
+            form_kind=options["form_kind"],
+            ingest_token=options["ingest_token"] or getattr(settings, "LEADS_INGEST_TOKEN", ""),
+        )
+        if not target and not cfg.ingest_token:
+            cfg.ingest_token = secrets.token_urlsafe(16)
+        if target:
+            def factory(vu):
+                return loadtest.HTTPTransport(target)
+        else:
+            def factory(vu):
+                # une IP par VU, comme des visiteurs distincts
+                return loadtest.InProcessTransport(f"10.{vu // 65536 % 256}.{vu // 256 % 256}.{vu % 256}")
+
+        with ExitStack() as stack:
+            sink = None
+            if not target:
+                sink = stack.enter_context(SMTPSink())
+                host, port = sink.address
+                overrides = {
+                    "ADS_S2S_MODE": "mock",
+                    "EMAIL_BACKEND": "django.core.mail.backends.smtp.EmailBackend",
+                    "EMAIL_HOST": host, "EMAIL_PORT": port,
+                    "EMAIL_USE_SSL": False, "EMAIL_USE_TLS": False,
+                    "EMAIL_HOST_USER": "", "EMAIL_HOST_PASSWORD": "",
+                    "LEADS_INGEST_TOKEN": cfg.ingest_token,
+                }
+                if not options["respect_rate_limits"]:
+                    overrides["LEADS_RATE_LIMITS"] = {"ip": "", "email": ""}
+                stack.enter_context(override_settings(**overrides))
+                if options["process"] == "inline":
+                    previous = current_app.conf.task_always_eager
+                    current_app.conf.task_always_eager = True
+                    stack.callback(setattr, current_app.conf, "task_always_eager", previous)
+
+            recorder, elapsed = loadtest.run_load(
+                cfg=cfg,
+                iterations=max(int(options["iterations"]), 1),
+                concurrency=max(int(options["concurrency"]), 1),
+                duration=float(options["duration"] or 0.0),
+                transport_factory=factory,
+            )
+            queue = loadtest.wait_processed(cfg.tag, timeout=options["wait_timeout"])
+            outbox = None
+            if options["email_template"]:
+                outbox = loadtest.enqueue_and_drain(
+                    cfg.tag, options["email_template"], drain=not target, timeout=options["wait_timeout"],
+                )
+            smtp = {"messages": sink.messages, "recipients": sink.recipients} if sink else None
+
+        report = {
+            "tag": cfg.tag,
+            "mode": "http" if target else "in-process",
+            "funnels": funnels,
+            "elapsed_s": elapsed,
+            "requests": recorder.summary(elapsed),
+            "queue": queue,
+            "outbox": outbox,
+            "smtp_sink": smtp,
+        }
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2, default=str))
+            return
+        self._print(report)
+
+    def _print(self, report: dict) -> None:
+        self.stdout.write(f"run={report['tag']} mode={report['mode']} funnels={','.join(report['funnels'])} "
+                          f"elapsed={report['elapsed_s']:.2f}s")
+        self.stdout.write(f"{'request':<20} {'count':>7} {'err':>5} {'req/s':>8} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8}")
+        for r in report["requests"]:
+            self.stdout.write(
+                f"{r['label']:<20} {r['count']:>7} {r['errors']:>5} {r['rps']:>8.1f} "
+                f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}"
+            )
+        q = report["queue"]
+        rate = q["leads"] / report["elapsed_s"] if report["elapsed_s"] else 0.0
+        self.stdout.write(
+            f"leads={q['leads']} ({rate:.1f}/s) status={q['by_status']} "
+            f"queue_lag p50={q['lag_p50_ms']:.0f}ms p95={q['lag_p95_ms']:.0f}ms p99={q['lag_p99_ms']:.0f}ms"
+        )
+        outbox = report["outbox"]
+        if outbox and "skipped" in outbox:
+            self.stdout.write(self.style.WARNING(f"outbox: {outbox['skipped']}"))
+        elif outbox:
+            self.stdout.write(
+                f"outbox enqueued={outbox['enqueued']} ({outbox['enqueue_rate']:.1f}/s) status={outbox['by_status']} "
+                f"send_lag p50={outbox['send_lag_p50_ms']:.0f}ms p95={outbox['send_lag_p95_ms']:.0f}ms "
+                f"p99={outbox['send_lag_p99_ms']:.0f}ms"
+            )
+        if report["smtp_sink"] is not None:
+            self.stdout.write(f"smtp_sink messages={report['smtp_sink']['messages']}")
+        errors = sum(r["errors"] for r in report["requests"])
+        style = self.style.SUCCESS if not errors else self.style.WARNING
+        self.stdout.write(style(f"errors={errors}"))
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:54
+
+import hashlib
+import re
+
+from django.db import migrations, models
+
+BACKFILL_CHUNK = 2000
+_PHONE_STRIP = re.compile(r"[\s().\-/]")
+
+
+# Copie figée de apps.leads.identity au moment de la migration.
+def _digest(value):
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:32] if value else ""
+
+
+def _phone(value):
+    value = _PHONE_STRIP.sub("", (value or "").strip())
+    return "+" + value[2:] if value.startswith("00") else value
+
+
+def backfill_identity_keys(apps, schema_editor):
+    """Remplit email_key/phone_key par lots de BACKFILL_CHUNK (keyset sur id, un commit par lot)."""
+    Lead = apps.get_model("leads", "Lead")
+    last_id = 0
+    while True:
+        rows = list(
+            Lead.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "email", "phone")[:BACKFILL_CHUNK]
+        )
+        if not rows:
+            break
+        objs = [
+            Lead(id=pk, email_key=_digest((email or "").strip().lower()), phone_key=_digest(_phone(phone)))
+            for pk, email, phone in rows
+        ]
+        Lead.objects.bulk_update(objs, ["email_key", "phone_key"], batch_size=500)
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+    # Backfill par lots : chaque bulk_update est commité séparément sur une grosse table.
+    atomic = False
+
+    dependencies = [
+        ('billing', '0003_customerprofile_invoiceartifact_orderitem_and_more'),
+        ('leads', '0003_alter_lead_form_kind'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='email_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='phone_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+        migrations.RunPython(backfill_identity_keys, reverse_code=migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['form_kind', 'email_key', '-created_at'], name='lead_kind_email_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['form_kind', 'phone_key', '-created_at'], name='lead_kind_phone_key_idx'),
+        ),
+    ]
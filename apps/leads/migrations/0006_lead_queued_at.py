@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:57
+
+from django.db import migrations, models
+
+
+def backfill_queued_at(apps, schema_editor):
+    """Les PENDING existants hors wizard en cours restent éligibles au drain."""
+    Lead = apps.get_model("leads", "Lead")
+    (
+        Lead.objects.filter(status="PENDING", queued_at__isnull=True)
+        .exclude(flow_sessions__status="ACTIVE")
+        .update(queued_at=models.F("created_at"))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0003_customerprofile_invoiceartifact_orderitem_and_more'),
+        ('flowforms', '0001_initial'),
+        ('leads', '0005_lead_updated_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='queued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_queued_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['status', 'queued_at'], name='lead_status_queued_idx'),
+        ),
+    ]
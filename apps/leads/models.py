@@ -1,6 +1,7 @@
 from django.db import models
 from django.utils import timezone
 from .constants import FormKind, LeadStatus
+from .identity import email_key, phone_key
 
 
 class Lead(models.Model):
@@ -18,6 +19,9 @@ class Lead(models.Model):
     last_name = models.CharField(max_length=100, blank=True, default="")
     full_name = models.CharField(max_length=150, blank=True, default="")
     phone = models.CharField(max_length=32, blank=True, default="")
+    # clés d'identité normalisées/hachées (voir identity.py), maintenues au save
+    email_key = models.CharField(max_length=32, blank=True, default="", editable=False)
+    phone_key = models.CharField(max_length=32, blank=True, default="", editable=False)
 
     # adresse
     address_line1 = models.CharField(max_length=200, blank=True, default="")
@@ -61,6 +65,9 @@ class Lead(models.Model):
 
     # état & enrichissement
     status = models.CharField(max_length=16, choices=LeadStatus.choices, default=LeadStatus.PENDING)
+    # Posé quand l'ingestion (API, lot, soumission finale d'un flow) confie le lead au pipeline.
+    # Un lead PENDING sans queued_at est un brouillon flowforms : le drain ne le touche pas.
+    queued_at = models.DateTimeField(null=True, blank=True)
     reject_reason = models.CharField(max_length=32, blank=True, default="")
     score = models.FloatField(default=0.0)
     risk_flags = models.JSONField(default=dict, blank=True)
@@ -87,11 +94,27 @@ class Lead(models.Model):
             models.Index(fields=["form_kind", "email", "created_at"]),
             models.Index(fields=["status"]),
             models.Index(fields=["course_slug", "created_at"]),
+            models.Index(fields=["form_kind", "email_key", "-created_at"], name="lead_kind_email_key_idx"),
+            models.Index(fields=["form_kind", "phone_key", "-created_at"], name="lead_kind_phone_key_idx"),
+            models.Index(fields=["updated_at", "id"], name="lead_updated_id_idx"),  # curseur export synchro
+            models.Index(fields=["status", "queued_at"], name="lead_status_queued_idx"),  # drain PENDING
         ]
 
     def __str__(self):
         return f"Lead#{self.id} {self.form_kind} {self.email or self.phone}"
 
+    def refresh_identity_keys(self) -> None:
+        """À appeler avant bulk_create/bulk_update (qui court-circuitent save)."""
+        self.email_key = email_key(self.email)
+        self.phone_key = phone_key(self.phone)
+
+    def save(self, *args, **kwargs):
+        self.refresh_identity_keys()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"email", "phone"} & set(update_fields):
+            kwargs["update_fields"] = set(update_fields) | {"email_key", "phone_key"}
+        super().save(*args, **kwargs)
+
 
 class LeadEvent(models.Model):
     lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name="events")
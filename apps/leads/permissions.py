@@ -1,5 +1,34 @@
+import hmac
+
+from django.conf import settings
 from rest_framework.permissions import BasePermission
 
 class PublicPOSTOnly(BasePermission):
     def has_permission(self, request, view):
-        return request.method == "POST"
\ No newline at end of file
+        return request.method == "POST"
+
+
+class StaffOrBearerToken(BasePermission):
+    """Staff connecté (admin) ou ``Authorization: Bearer <settings.<token_setting>>`` (vide = staff uniquement)."""
+
+    token_setting = ""
+
+    def has_permission(self, request, view):
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated and user.is_staff:
+            return True
+        expected = getattr(settings, self.token_setting, "") or ""
+        scheme, _, token = request.META.get("HTTP_AUTHORIZATION", "").partition(" ")
+        return bool(expected) and scheme.lower() == "bearer" and hmac.compare_digest(token.strip(), expected)
+
+
+class StaffOrExportToken(StaffOrBearerToken):
+    """Staff ou jeton de synchro CRM : ``Authorization: Bearer <LEADS_EXPORT_TOKEN>``."""
+
+    token_setting = "LEADS_EXPORT_TOKEN"
+
+
+class StaffOrIngestToken(StaffOrBearerToken):
+    """Staff ou partenaire d'import par lot : ``Authorization: Bearer <LEADS_INGEST_TOKEN>``."""
+
+    token_setting = "LEADS_INGEST_TOKEN"
@@ -0,0 +1,166 @@
+"""Traitement par lot des leads PENDING.
+
+Sans ``lead_ids`` (drain), seuls les leads confiés au pipeline par l'ingestion
+(``queued_at`` renseigné) sont réservés : les leads PENDING créés en cours de
+wizard par flowforms attendent la soumission finale.
+
+Même règles métier que ``tasks.process_lead`` (requis de la politique,
+déduplication par empreinte, normalisation, score, hook adsbridge, routage),
+mais pour N leads à la fois :
+
+- réservation ``select_for_update(skip_locked=True)`` : plusieurs workers
+  se partagent la file sans s'attendre ;
+- normalisation / score en mémoire puis un ``bulk_update`` ;
+- déduplication en un aller-retour de cache (SET NX) ; si la transaction
+  échoue, les empreintes posées par ce lot sont libérées, sinon le retry
+  rejetterait tout le lot comme doublon ;
+- ``LeadEvent`` d'audit en un ``bulk_create`` ;
+- routage groupé hors transaction (``RoutingService.after_validation_batch``).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .antispam import DUP_TTL_BY_KIND, DUP_TTL_DEFAULT, dup_fingerprint, dup_recent_many, dup_release_many
+from .audit import log_tasks
+from .conf import get_form_policy
+from .constants import LeadStatus, RejectReason
+from .models import Lead, LeadEvent
+from .services import EnrichmentService, RoutingService, ScoringService
+
+DEFAULT_BATCH_SIZE = 200
+
+_UPDATE_FIELDS = [
+    "email", "phone", "email_key", "phone_key", "full_name", "consent_at",
+    "score", "enriched_at", "status", "reject_reason", "updated_at",
+]
+
+
+def batch_size() -> int:
+    return int(getattr(settings, "LEADS_PROCESS_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+
+
+@dataclass
+class BatchOutcome:
+    claimed: int = 0
+    valid: List[int] = field(default_factory=list)
+    rejected: List[int] = field(default_factory=list)
+
+
+def _missing_required(lead: Lead, policies: dict) -> Optional[str]:
+    key = (lead.form_kind, lead.campaign or None)
+    if key not in policies:
+        policies[key] = get_form_policy(*key)
+    for fname, spec in (policies[key].get("fields") or {}).items():
+        if spec.get("required") is True and not getattr(lead, fname, None):
+            return fname
+    return None
+
+
+def _reject(lead: Lead, reason: str, now) -> None:
+    lead.status = LeadStatus.REJECTED
+    lead.reject_reason = reason
+    lead.updated_at = now
+
+
+def _record_conversions(leads: List[Lead]) -> None:
+    try:
+        from apps.adsbridge import hooks as adsbridge_hooks
+    except Exception:
+        log_tasks.exception("lead_adsbridge_import_failed")
+        return
+    for lead in leads:
+        try:
+            # savepoint : un échec du hook ne doit pas annuler le lot
+            with transaction.atomic():
+                adsbridge_hooks.record_lead_conversion(lead)
+        except Exception:
+            log_tasks.exception("lead_adsbridge_hook_failed lead=%s", lead.id)
+
+
+def process_pending_batch(lead_ids: Optional[Iterable[int]] = None, limit: Optional[int] = None) -> BatchOutcome:
+    """Réserve et traite jusqu'à ``limit`` leads PENDING (``lead_ids`` ou, à défaut, les leads en file)."""
+    limit = limit or batch_size()
+    outcome = BatchOutcome()
+    now = timezone.now()
+    claimed_fps: list = []
+    try:
+        valid = _process_locked(lead_ids, limit, outcome, now, claimed_fps)
+    except Exception:
+        dup_release_many(claimed_fps)
+        raise
+
+    # Routage groupé hors lock
+    if valid:
+        RoutingService.after_validation_batch(valid)
+    if outcome.claimed:
+        log_tasks.info("lead_batch_done claimed=%s valid=%s rejected=%s",
+                       outcome.claimed, len(outcome.valid), len(outcome.rejected))
+    return outcome
+
+
+def _process_locked(lead_ids, limit: int, outcome: BatchOutcome, now, claimed_fps: list) -> List[Lead]:
+    """Partie transactionnelle du lot ; ``claimed_fps`` reçoit les empreintes posées par ce lot."""
+    with transaction.atomic():
+        qs = Lead.objects.select_for_update(skip_locked=True).filter(status=LeadStatus.PENDING)
+        if lead_ids is not None:
+            qs = qs.filter(id__in=list(lead_ids))
+        else:
+            qs = qs.filter(queued_at__isnull=False)
+        leads = list(qs.order_by("id")[:limit])
+        outcome.claimed = len(leads)
+        if not leads:
+            return []
+
+        events: List[LeadEvent] = []
+        policies: dict = {}
+
+        # 1) Validation défensive (requis selon la politique)
+        survivors = []
+        for lead in leads:
+            missing = _missing_required(lead, policies)
+            if missing:
+                _reject(lead, RejectReason.INVALID, now)
+                events.append(LeadEvent(lead=lead, event="rejected", payload={"missing": missing}))
+                outcome.rejected.append(lead.id)
+            else:
+                survivors.append(lead)
+
+        # 2) Déduplication fenêtre, en un aller-retour cache
+        entries = [
+            (lead.form_kind,
+             dup_fingerprint(lead.form_kind, email=lead.email, phone=lead.phone, course_slug=lead.course_slug),
+             DUP_TTL_BY_KIND.get(lead.form_kind, DUP_TTL_DEFAULT))
+            for lead in survivors
+        ]
+        valid = []
+        for lead, entry, is_dup in zip(survivors, entries, dup_recent_many(entries)):
+            if is_dup:
+                _reject(lead, RejectReason.DUPLICATE, now)
+                events.append(LeadEvent(lead=lead, event="rejected", payload={"reason": "duplicate"}))
+                outcome.rejected.append(lead.id)
+                continue
+            claimed_fps.append(entry)
+            # 3) Enrichissement + score en mémoire
+            EnrichmentService.apply(lead, now=now)
+            lead.refresh_identity_keys()
+            lead.score = ScoringService.score(lead)
+            lead.enriched_at = now
+            lead.status = LeadStatus.VALID
+            lead.updated_at = now
+            events.append(LeadEvent(lead=lead, event="normalized", payload={}))
+            events.append(LeadEvent(lead=lead, event="validated", payload={"score": lead.score}))
+            valid.append(lead)
+            outcome.valid.append(lead.id)
+
+        Lead.objects.bulk_update(leads, _UPDATE_FIELDS)
+        LeadEvent.objects.bulk_create(events)
+
+        if valid:
+            _record_conversions(valid)
+    return valid
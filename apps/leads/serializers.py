@@ -1,5 +1,6 @@
+import threading
 from rest_framework import serializers
-from .conf import get_form_policy
+from .conf import get_form_policy, policy_cache_key
 from .validators import is_valid_email, is_valid_phone, is_valid_postal
 
 _VALIDATOR_MAP = {
@@ -31,6 +32,19 @@ class BooleanLikeField(serializers.BooleanField):
         # Fallback DRF (lèvera ValidationError si inacceptable)
         return super().to_internal_value(data)
 
+def build_policy_field(spec: dict) -> serializers.Field:
+    req = bool(spec.get("required", False))
+    allow_blank = not req
+    max_length = spec.get("max_length")
+    ftype = (spec.get("type") or "string").lower()
+
+    if ftype in ("bool", "boolean"):
+        return BooleanLikeField(required=req)
+    if ftype in ("json", "object", "dict"):
+        return serializers.JSONField(required=req)
+    return serializers.CharField(required=req, allow_blank=allow_blank,
+                                 max_length=max_length, allow_null=False)
+
 class DynamicLeadSerializer(serializers.Serializer):
     # socle commun minimal
     form_kind = serializers.CharField()
@@ -55,20 +69,7 @@ class DynamicLeadSerializer(serializers.Serializer):
         for fname, spec in fields_pol.items():
             if fname in self.fields:
                 continue
-            req = bool(spec.get("required", False))
-            allow_blank = not req
-            max_length = spec.get("max_length")
-            ftype = (spec.get("type") or "string").lower()
-
-            if ftype in ("bool", "boolean"):
-                field = BooleanLikeField(required=req)
-            elif ftype in ("json", "object", "dict"):
-                field = serializers.JSONField(required=req)
-            else:
-                field = serializers.CharField(required=req, allow_blank=allow_blank,
-                                              max_length=max_length, allow_null=False)
-
-            self.fields[fname] = field
+            self.fields[fname] = build_policy_field(spec)
 
         return super().to_internal_value(data)
 
@@ -86,4 +87,64 @@ class DynamicLeadSerializer(serializers.Serializer):
                 if fn and val and not fn(val):
                     raise serializers.ValidationError({fname: f"Format invalide ({vname})."})
 
-        return attrs
\ No newline at end of file
+        return attrs
+
+
+class CompiledLeadSerializer(DynamicLeadSerializer):
+    """
+    Base des classes compilées : champs de politique déclarés sur la classe,
+    validators résolus une fois ; aucune lecture de politique par requête.
+    """
+    policy_validators: tuple = ()
+
+    def to_internal_value(self, data):
+        return serializers.Serializer.to_internal_value(self, data)
+
+    def validate(self, attrs):
+        for fname, vname, fn in self.policy_validators:
+            val = attrs.get(fname, "")
+            if val and not fn(val):
+                raise serializers.ValidationError({fname: f"Format invalide ({vname})."})
+        return attrs
+
+
+_compiled: dict = {}
+_compiled_lock = threading.Lock()
+
+def compile_lead_serializer(form_kind: str, campaign: str | None = None) -> type:
+    """
+    Classe de serializer pour (form_kind, campaign, version de politique),
+    mise en cache par process. Un changement de version (rechargement du YAML)
+    vide le cache.
+    """
+    key = policy_cache_key(form_kind, campaign)
+    cls = _compiled.get(key)
+    if cls is not None:
+        return cls
+
+    kind, camp, version = key
+    fields_pol = get_form_policy(kind, camp or None).get("fields") or {}
+    attrs = {"policy_validators": tuple(
+        (fname, vname, _VALIDATOR_MAP[vname])
+        for fname, spec in fields_pol.items()
+        for vname in spec.get("validators", [])
+        if vname in _VALIDATOR_MAP
+    )}
+    for fname, spec in fields_pol.items():
+        if fname not in DynamicLeadSerializer._declared_fields:
+            attrs[fname] = build_policy_field(spec)
+    cls = type(f"LeadSerializer_{kind or 'default'}", (CompiledLeadSerializer,), attrs)
+
+    with _compiled_lock:
+        stale = [k for k in _compiled if k[2] != version]
+        for k in stale:
+            del _compiled[k]
+        _compiled[key] = cls
+    return cls
+
+def lead_serializer(data) -> DynamicLeadSerializer:
+    """Instancie le serializer compilé correspondant au form_kind/campaign du payload."""
+    raw = data if hasattr(data, "get") else {}
+    kind = str(raw.get("form_kind") or "").strip()
+    campaign = str(raw.get("campaign") or "").strip() or None
+    return compile_lead_serializer(kind, campaign)(data=data)
@@ -6,14 +6,19 @@ from apps.billing.services import PaymentService, PriceService  # existants chez
 
 class EnrichmentService:
     @staticmethod
-    def normalize(lead: Lead):
+    def apply(lead: Lead, now=None):
+        """Normalisations en mémoire (sans save), partagées avec le traitement par lot."""
         # Normalisations légères (exemples)
         lead.email = (lead.email or "").strip().lower()
         lead.phone = (lead.phone or "").strip()
         lead.full_name = (lead.full_name or "").strip()
         # Consentement horodaté
         if lead.consent and not lead.consent_at:
-            lead.consent_at = timezone.now()
+            lead.consent_at = now or timezone.now()
+
+    @staticmethod
+    def normalize(lead: Lead):
+        EnrichmentService.apply(lead)
         lead.save(update_fields=[
             "email", "phone", "full_name", "consent_at", "updated_at"
         ])
@@ -65,4 +70,47 @@ class RoutingService:
             lead.save(update_fields=["order", "updated_at"])
             LeadEvent.objects.create(lead=lead, event="order_preprovisioned",
                                      payload={"order_id": order.id, "client_secret": payload.get("client_secret")})
-            log_route.info("lead_checkout_order lead=%s order=%s", lead.id, order.id)
\ No newline at end of file
+            log_route.info("lead_checkout_order lead=%s order=%s", lead.id, order.id)
+
+    @staticmethod
+    def after_validation_batch(leads):
+        """
+        Variante groupée de after_validation : events bulk par famille,
+        une seule requête Course pour les checkout_intent, bulk_update des orders.
+        """
+        events = []
+        ebook = [l for l in leads if l.form_kind == "email_ebook"]
+        contact = [l for l in leads if l.form_kind == "contact_full"]
+        checkout = [l for l in leads if l.form_kind == "checkout_intent" and l.course_slug and l.email]
+
+        events += [LeadEvent(lead=l, event="ebook_optin", payload={"ebook_id": l.ebook_id}) for l in ebook]
+        events += [LeadEvent(lead=l, event="crm_queue", payload={}) for l in contact]
+
+        with_order = []
+        if checkout:
+            courses = Course.objects.published().in_bulk({l.course_slug for l in checkout}, field_name="slug")
+            for lead in checkout:
+                course = courses.get(lead.course_slug)
+                if course is None:
+                    continue
+                try:
+                    order, payload = PaymentService.create_or_update_order_and_intent(
+                        user=None,
+                        email=lead.email,
+                        course=course,
+                        currency=PriceService.select_currency(lead.currency or "EUR"),
+                    )
+                except Exception:
+                    log_route.exception("lead_checkout_order_failed lead=%s", lead.id)
+                    continue
+                lead.order_id = order.id
+                lead.updated_at = timezone.now()
+                with_order.append(lead)
+                events.append(LeadEvent(lead=lead, event="order_preprovisioned",
+                                        payload={"order_id": order.id, "client_secret": payload.get("client_secret")}))
+
+        if with_order:
+            Lead.objects.bulk_update(with_order, ["order", "updated_at"])
+        if events:
+            LeadEvent.objects.bulk_create(events)
+        log_route.info("lead_batch_routed ebook=%s crm=%s orders=%s", len(ebook), len(contact), len(with_order))
@@ -84,6 +84,9 @@ def submit_lead_from_flowsession(fs: FlowSession) -> SubmitResult:
         # Appliquer snapshot -> lead
         _apply_fields(lead, snapshot)
         _merge_context(lead, snapshot)
+        # Le lead (PENDING depuis la 1re step) devient éligible au pipeline, drain compris
+        if lead.status == LeadStatus.PENDING and not lead.queued_at:
+            lead.queued_at = timezone.now()
         lead.save()
 
         LeadEvent.objects.create(
@@ -6,7 +6,8 @@ from .constants import LeadStatus
 from .audit import log_tasks
 from .conf import get_form_policy
 from .services import EnrichmentService, ScoringService, RoutingService
-from .antispam import dup_fingerprint, dup_recent, normalize_email
+from .pipeline import batch_size, process_pending_batch
+from .antispam import DUP_TTL_BY_KIND, DUP_TTL_DEFAULT, dup_fingerprint, dup_recent, normalize_email
 
 @shared_task(name="leads.process_lead", queue="leads", autoretry_for=(Exception,), retry_backoff=True, max_retries=8)
 def process_lead(lead_id: int):
@@ -34,9 +35,8 @@ def process_lead(lead_id: int):
 
         # Déduplication fenêtre
         # TTL selon kind
-        ttl_map = {"email_ebook": 24 * 3600, "contact_full": 2 * 3600, "checkout_intent": 1800}
         fp = dup_fingerprint(lead.form_kind, email=lead.email, phone=lead.phone, course_slug=lead.course_slug)
-        if dup_recent(lead.form_kind, fp, ttl=ttl_map.get(lead.form_kind, 3600)):
+        if dup_recent(lead.form_kind, fp, ttl=DUP_TTL_BY_KIND.get(lead.form_kind, DUP_TTL_DEFAULT)):
             lead.status = LeadStatus.REJECTED
             lead.reject_reason = "DUPLICATE"
             lead.save(update_fields=["status", "reject_reason", "updated_at"])
@@ -60,4 +60,24 @@ def process_lead(lead_id: int):
 
     # Routage hors lock
     RoutingService.after_validation(lead)
-    log_tasks.info("lead_processed lead=%s", lead.id)
\ No newline at end of file
+    log_tasks.info("lead_processed lead=%s", lead.id)
+
+@shared_task(name="leads.process_leads_batch", queue="leads", autoretry_for=(Exception,), retry_backoff=True, max_retries=8)
+def process_leads_batch(lead_ids: list[int]):
+    """Traite un lot ingéré en une seule tâche (voir pipeline.process_pending_batch)."""
+    outcome = process_pending_batch(lead_ids=lead_ids, limit=len(lead_ids))
+    # Leads réservés par un autre worker (skip_locked) : traités par celui-ci ou le drain.
+    log_tasks.info("lead_batch_processed size=%s claimed=%s", len(lead_ids), outcome.claimed)
+
+
+@shared_task(name="leads.drain_pending_leads", queue="leads")
+def drain_pending_leads(limit: int | None = None, max_rounds: int = 10):
+    """Vide la file PENDING (leads ``queued_at``) par lots (beat) ; plusieurs workers peuvent tourner en parallèle."""
+    limit = limit or batch_size()
+    total = 0
+    for _ in range(max_rounds):
+        outcome = process_pending_batch(limit=limit)
+        total += outcome.claimed
+        if outcome.claimed < limit:
+            break
+    return total
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+import unittest
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.leads import antispam
+from apps.leads.antispam_engine import (
+    DUPLICATE, OK, RATE_LIMITED, LocalAntispamEngine, RedisAntispamEngine, get_engine,
+)
+from apps.leads.models import Lead
+
+
+def _live_redis():
+    try:
+        import redis
+
+        client = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://127.0.0.1:6379/15"), socket_connect_timeout=0.2)
+        client.ping()
+        return client
+    except Exception:
+        return None
+
+
+class EngineContractMixin:
+    engine = None
+
+    def test_sliding_window_rejects_without_consuming_dedup(self):
+        limits = [(f"rl:{uuid4().hex}", 2, 60)]
+        self.assertEqual(self.engine.check(limits=limits).status, OK)
+        self.assertEqual(self.engine.check(limits=limits).status, OK)
+        key = f"idem:{uuid4().hex}"
+        decision = self.engine.check(dedup=[(key, 60)], limits=limits)
+        self.assertEqual(decision.status, RATE_LIMITED)
+        self.assertGreater(decision.retry_after, 0)
+        # la clé d'idempotence n'a pas été posée par la tentative rejetée
+        self.assertEqual(self.engine.check(dedup=[(key, 60)]).status, OK)
+
+    def test_dedup_does_not_consume_rate(self):
+        key, limits = f"idem:{uuid4().hex}", [(f"rl:{uuid4().hex}", 2, 60)]
+        self.assertEqual(self.engine.check(dedup=[(key, 60)], limits=limits).status, OK)
+        self.assertEqual(self.engine.check(dedup=[(key, 60)], limits=limits).status, DUPLICATE)
+        self.assertEqual(self.engine.check(limits=limits).status, OK)
+
+    def test_window_slides(self):
+        limits = [(f"rl:{uuid4().hex}", 1, 0.2)]
+        self.assertEqual(self.engine.check(limits=limits).status, OK)
+        self.assertEqual(self.engine.check(limits=limits).status, RATE_LIMITED)
+        time.sleep(0.25)
+        self.assertEqual(self.engine.check(limits=limits).status, OK)
+
+    def test_concurrent_dedup_lets_exactly_one_through(self):
+        key, results = f"dup:{uuid4().hex}", []
+        barrier = threading.Barrier(8)
+
+        def worker():
+            barrier.wait()
+            results.extend(self.engine.dedup_many([(key, 60)]))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results.count(False), 1)
+
+
+class LocalEngineTests(EngineContractMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.engine = LocalAntispamEngine()
+
+    def test_locmem_backend_selects_local_engine(self):
+        self.assertIsInstance(get_engine(), LocalAntispamEngine)
+
+
+@unittest.skipIf(_live_redis() is None, "Redis non disponible")
+class RedisEngineTests(EngineContractMixin, TestCase):
+    def setUp(self):
+        self.engine = RedisAntispamEngine(_live_redis())
+
+
+class CollectGuardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("leads:collect")
+
+    def _post(self, key, email="flood@example.com"):
+        body = {"form_kind": "email_ebook", "email": email, "honeypot": ""}
+        return self.client.post(self.url, data=body, content_type="application/json", HTTP_X_IDEMPOTENCY_KEY=key)
+
+    @override_settings(LEADS_RATE_LIMITS={"ip": "100/min", "email": "2/min"})
+    def test_email_flood_is_rejected_before_orm(self):
+        self.assertEqual(self._post("f1").status_code, 202)
+        self.assertEqual(self._post("f2").status_code, 202)
+        resp = self._post("f3")
+        self.assertEqual(resp.status_code, 429)
+        self.assertIn("Retry-After", resp)
+        self.assertEqual(Lead.objects.count(), 2)
+        self.assertEqual(self._post("f4", email="other@example.com").status_code, 202)
+
+    @override_settings(LEADS_RATE_LIMITS={"ip": "100/min", "email": "10/min",
+                                          "form_kinds": {"email_ebook": {"ip": "1/min"}}})
+    def test_form_kind_override(self):
+        self.assertEqual(self._post("k1", email="a@example.com").status_code, 202)
+        self.assertEqual(self._post("k2", email="b@example.com").status_code, 429)
+
+    def test_replayed_idempotency_key_is_duplicate(self):
+        self.assertEqual(self._post("same").json()["status"], "pending")
+        self.assertEqual(self._post("same").json()["status"], "duplicate")
+        self.assertEqual(Lead.objects.count(), 1)
+
+    def test_submission_limits_default_to_drf_rates(self):
+        limits = antispam.submission_limits("email_ebook", "1.2.3.4", " A@B.com ")
+        self.assertEqual(limits, [
+            ("leads:rl:ip:email_ebook:1.2.3.4", 30, 60),
+            ("leads:rl:email:email_ebook:a@b.com", 10, 60),
+        ])
@@ -0,0 +1,124 @@
+import json
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.leads import batch
+from apps.leads.constants import LeadStatus
+from apps.leads.models import Lead, LeadEvent
+
+
+def _item(key, **extra):
+    body = {"form_kind": "email_ebook", "email": f"{key}@example.com", "idempotency_key": key}
+    body.update(extra)
+    return body
+
+
+@override_settings(LEADS_INGEST_TOKEN="partner-secret")
+class LeadsBatchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("leads:collect-batch")
+        self.auth = {"HTTP_AUTHORIZATION": "Bearer partner-secret"}
+
+    def test_batch_endpoint_requires_staff_or_ingest_token(self):
+        body = {"leads": [_item("anon")]}
+        for headers in ({}, {"HTTP_AUTHORIZATION": "Bearer wrong"}):
+            resp = self.client.post(self.url, data=body, content_type="application/json", **headers)
+            self.assertEqual(resp.status_code, 403)
+        with self.settings(LEADS_INGEST_TOKEN=""):
+            resp = self.client.post(self.url, data=body, content_type="application/json", HTTP_AUTHORIZATION="Bearer ")
+            self.assertEqual(resp.status_code, 403)
+        self.assertFalse(Lead.objects.filter(idempotency_key="anon").exists())
+
+    def test_batch_endpoint_reports_per_item_results(self):
+        Lead.objects.create(form_kind="email_ebook", email="old@example.com", idempotency_key="old")
+        leads = [
+            _item("a1"),
+            _item("old"),
+            _item("a2", honeypot="bot"),
+            _item("a3", email="not-an-email"),
+            {"form_kind": "email_ebook", "email": "nokey@example.com"},
+            _item("a1"),
+            _item("a4", email="A4@Example.com"),
+        ]
+        with mock.patch("apps.leads.batch.process_leads_batch.delay") as delay:
+            resp = self.client.post(self.url, data={"leads": leads}, content_type="application/json", **self.auth)
+
+        self.assertEqual(resp.status_code, 202)
+        body = resp.json()
+        self.assertEqual((body["accepted"], body["duplicates"], body["rejected"]), (2, 2, 3))
+        statuses = [r["status"] for r in body["results"]]
+        self.assertEqual(statuses, ["accepted", "duplicate", "rejected", "rejected", "rejected", "duplicate", "accepted"])
+        self.assertEqual(body["results"][2]["reason"], "HONEYPOT")
+        self.assertIn("email", body["results"][3]["errors"])
+
+        created = Lead.objects.filter(idempotency_key__in=["a1", "a4"])
+        self.assertEqual(created.count(), 2)
+        self.assertEqual(created.get(idempotency_key="a4").email, "a4@example.com")
+        self.assertEqual(LeadEvent.objects.filter(event="accepted", lead__in=created).count(), 2)
+        delay.assert_called_once_with([body["results"][0]["lead_id"], body["results"][6]["lead_id"]])
+
+    def test_batch_resolves_idempotency_in_one_query(self):
+        Lead.objects.create(form_kind="email_ebook", idempotency_key="k0")
+        items = [_item(f"k{i}") for i in range(20)]
+        with mock.patch("apps.leads.batch.process_leads_batch.delay"):
+            with CaptureQueriesContext(connection) as ctx:
+                result = batch.ingest_batch(items)
+        self.assertEqual(result.count(batch.ACCEPTED), 19)
+        sql = [q["sql"] for q in ctx.captured_queries]
+        self.assertEqual(sum(1 for q in sql if q.startswith("SELECT")), 1)
+        self.assertEqual(sum(1 for q in sql if 'INSERT INTO "leads_leadevent"' in q), 1)
+
+    def test_insert_retries_until_no_key_conflict_is_left(self):
+        Lead.objects.create(form_kind="email_ebook", idempotency_key="r1")
+        pending = [(i, batch.build_lead({"form_kind": "email_ebook"}, {}, idem_key=key, meta={}))
+                   for i, key in enumerate(["r1", "r2", "ok"])]
+        real_filter = Lead.objects.filter
+        raced = []
+
+        def racing_filter(*args, **kwargs):
+            # une autre requête insère r2 juste après la 1re relecture des clés prises
+            qs = real_filter(*args, **kwargs)
+            if raced:
+                return qs
+            raced.append(Lead.objects.create(form_kind="email_ebook", idempotency_key="r2"))
+            return qs.exclude(idempotency_key="r2")
+
+        with mock.patch.object(Lead.objects, "filter", side_effect=racing_filter):
+            lost = batch._insert(pending)
+
+        self.assertEqual(lost, {"r1", "r2"})
+        self.assertEqual(Lead.objects.filter(idempotency_key__in=["r1", "r2", "ok"]).count(), 3)
+        self.assertIsNotNone(pending[2][1].pk)
+
+    def test_batch_rejects_oversized_and_empty_payloads(self):
+        with self.settings(LEADS_BATCH_MAX_ITEMS=2):
+            resp = self.client.post(self.url, data={"leads": [_item("x1"), _item("x2"), _item("x3")]},
+                                    content_type="application/json", **self.auth)
+        self.assertEqual(resp.status_code, 413)
+        resp = self.client.post(self.url, data={"leads": []}, content_type="application/json", **self.auth)
+        self.assertEqual(resp.status_code, 400)
+
+    def test_batch_task_processes_leads(self):
+        batch.ingest_batch([_item("p1"), _item("p2")])
+        self.assertEqual(
+            set(Lead.objects.filter(idempotency_key__in=["p1", "p2"]).values_list("status", flat=True)),
+            {LeadStatus.VALID},
+        )
+
+    def test_import_command_reads_ndjson(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".ndjson", encoding="utf-8") as fh:
+            for key in ("n1", "n2", "n3"):
+                fh.write(json.dumps(_item(key)) + "\n")
+            fh.flush()
+            call_command("leads_import", fh.name, "--chunk-size", "2", "--no-process", "--source", "partner")
+        leads = Lead.objects.filter(idempotency_key__in=["n1", "n2", "n3"])
+        self.assertEqual(leads.count(), 3)
+        self.assertEqual(set(leads.values_list("source", "status")), {("partner", LeadStatus.PENDING)})
@@ -0,0 +1,40 @@
+import json
+import smtplib
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from apps.common.smtp_sink import SMTPSink
+from apps.leads.loadtest import percentile
+
+
+class LoadTestHarnessTests(TestCase):
+    def test_percentile_nearest_rank(self):
+        values = [float(i) for i in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_smtp_sink_counts_messages(self):
+        with SMTPSink() as sink:
+            host, port = sink.address
+            with smtplib.SMTP(host, port, timeout=5) as smtp:
+                smtp.sendmail("a@example.com", ["b@example.com", "c@example.com"], "Subject: hi\r\n\r\nbody")
+        self.assertEqual(sink.messages, 1)
+        self.assertEqual(sink.recipients, 2)
+
+    def test_command_reports_funnel_metrics(self):
+        out = StringIO()
+        call_command(
+            "leads_loadtest", "--funnels", "api,batch,wizard", "--iterations", "3",
+            "--concurrency", "1", "--batch-items", "2", "--wait-timeout", "5", "--json", stdout=out,
+        )
+        report = json.loads(out.getvalue())
+        labels = {row["label"]: row for row in report["requests"]}
+        self.assertEqual(labels["api.collect"]["count"], 1)
+        self.assertEqual(labels["api.collect_batch"]["count"], 1)
+        self.assertGreaterEqual(labels["wizard.step"]["count"], 1)
+        self.assertEqual(sum(row["errors"] for row in report["requests"]), 0, report["requests"])
+        self.assertEqual(report["queue"]["leads"], 4)
+        self.assertEqual(report["smtp_sink"]["messages"], report["outbox"]["by_status"].get("sent", 0))
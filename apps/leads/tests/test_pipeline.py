@@ -0,0 +1,112 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.flowforms.engine.storage import FlowContext, persist_step
+from apps.flowforms.models import FlowSession, FlowStatus
+from apps.leads.antispam import dup_fingerprint, dup_recent
+from apps.leads.constants import LeadStatus
+from apps.leads.models import Lead, LeadEvent
+from apps.leads.pipeline import process_pending_batch
+from apps.leads.tasks import drain_pending_leads
+
+
+class LeadsPipelineTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def _lead(self, key, **extra):
+        fields = {"form_kind": "email_ebook", "email": f"{key}@example.com", "idempotency_key": key,
+                  "status": LeadStatus.PENDING, "queued_at": timezone.now()}
+        fields.update(extra)
+        return Lead.objects.create(**fields)
+
+    def test_batch_validates_rejects_and_routes(self):
+        ok = self._lead("b1", email="  B1@Example.com ", consent=True)
+        dup = self._lead("b2", email="b1@example.com")
+        invalid = self._lead("b3", form_kind="checkout_intent", email="c@example.com")
+        contact = self._lead("b4", form_kind="contact_full", phone="+33600000000")
+        done = self._lead("b5", status=LeadStatus.VALID)
+
+        outcome = process_pending_batch()
+
+        self.assertEqual(outcome.claimed, 4)
+        for lead in (ok, dup, invalid, contact, done):
+            lead.refresh_from_db()
+        self.assertEqual((ok.status, ok.email, ok.score), (LeadStatus.VALID, "b1@example.com", 10.0))
+        self.assertIsNotNone(ok.consent_at)
+        self.assertEqual((dup.status, dup.reject_reason), (LeadStatus.REJECTED, "DUPLICATE"))
+        self.assertEqual((invalid.status, invalid.reject_reason), (LeadStatus.REJECTED, "INVALID"))
+        self.assertEqual(contact.status, LeadStatus.VALID)
+        self.assertEqual(done.score, 0.0)
+        self.assertEqual(
+            set(LeadEvent.objects.filter(lead=ok).values_list("event", flat=True)),
+            {"normalized", "validated", "ebook_optin"},
+        )
+        self.assertTrue(LeadEvent.objects.filter(lead=contact, event="crm_queue").exists())
+
+    def test_batch_restricted_to_ids_and_limit(self):
+        leads = [self._lead(f"l{i}") for i in range(5)]
+        outcome = process_pending_batch(lead_ids=[l.id for l in leads[:3]], limit=2)
+        self.assertEqual(outcome.claimed, 2)
+        self.assertEqual(Lead.objects.filter(status=LeadStatus.PENDING).count(), 3)
+
+    def test_drain_processes_all_pending(self):
+        for i in range(5):
+            self._lead(f"d{i}")
+        self.assertEqual(drain_pending_leads(limit=2), 5)
+        self.assertFalse(Lead.objects.filter(status=LeadStatus.PENDING).exists())
+
+    def test_drain_skips_wizard_lead_until_final_submit(self):
+        from apps.leads.submissions import submit_lead_from_flowsession
+
+        fs = FlowSession.objects.create(flow_key="checkout_intent_flow", session_key="wiz-1",
+                                        status=FlowStatus.ACTIVE)
+        ctx = FlowContext(flow_key="checkout_intent_flow", form_kind="checkout_intent")
+        lead, fs = persist_step(flowsession=fs, ctx=ctx, step_key="contact",
+                                cleaned_data={"email": "wiz@example.com"})
+
+        # 1re step seulement : course_slug/currency/accept_terms manquent encore
+        self.assertEqual(drain_pending_leads(limit=10), 0)
+        lead.refresh_from_db()
+        self.assertEqual((lead.status, lead.queued_at), (LeadStatus.PENDING, None))
+
+        fs.data_snapshot = {**fs.data_snapshot, "course_slug": "cours-test", "currency": "EUR", "accept_terms": True}
+        fs.save(update_fields=["data_snapshot"])
+        self.assertTrue(submit_lead_from_flowsession(fs).ok)
+
+        lead.refresh_from_db()
+        self.assertEqual(lead.status, LeadStatus.VALID)
+        self.assertIsNotNone(lead.queued_at)
+
+    def test_failed_batch_releases_its_fingerprints(self):
+        leads = [self._lead(f"r{i}") for i in range(3)]
+        with mock.patch.object(LeadEvent.objects, "bulk_create", side_effect=RuntimeError("db down")):
+            with self.assertRaises(RuntimeError):
+                process_pending_batch()
+        self.assertEqual(Lead.objects.filter(status=LeadStatus.PENDING).count(), 3)
+
+        # le retry retrouve des empreintes libres : rien n'est rejeté comme doublon
+        outcome = process_pending_batch()
+        self.assertEqual(sorted(outcome.valid), [lead.id for lead in leads])
+
+    def test_adsbridge_failure_does_not_abort_batch(self):
+        self._lead("h1")
+        with mock.patch("apps.adsbridge.hooks.record_lead_conversion", side_effect=RuntimeError("boom")):
+            outcome = process_pending_batch()
+        self.assertEqual(len(outcome.valid), 1)
+
+    def test_bench_command_rolls_back(self):
+        call_command("leads_bench_process", "--count", "6", "--batch-size", "4", stdout=mock.MagicMock())
+        self.assertFalse(Lead.objects.filter(idempotency_key__startswith="bench-").exists())
+
+    def test_bench_command_releases_dedup_keys(self):
+        tags = ["feedbeef", "cafebabe"]
+        with mock.patch("uuid.uuid4", side_effect=[mock.Mock(hex=t * 4) for t in tags]):
+            call_command("leads_bench_process", "--count", "2", "--batch-size", "2", stdout=mock.MagicMock())
+        for tag in tags:
+            fp = dup_fingerprint("email_ebook", email=f"bench-{tag}-0@example.com", phone="+212600000000")
+            self.assertFalse(dup_recent("email_ebook", fp, ttl=60))
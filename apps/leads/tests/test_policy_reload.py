@@ -0,0 +1,82 @@
+import os
+import tempfile
+from pathlib import Path
+
+from django.test import SimpleTestCase, override_settings
+
+from apps.leads import conf
+from apps.leads.serializers import DynamicLeadSerializer, compile_lead_serializer, lead_serializer
+
+POLICY_V1 = """
+form_kinds:
+  email_ebook:
+    fields:
+      email: { required: true, max_length: 254, validators: ["email"] }
+campaign_overrides:
+  promo:
+    fields:
+      first_name: { required: true, max_length: 100 }
+"""
+
+POLICY_V2 = """
+form_kinds:
+  email_ebook:
+    fields:
+      email: { required: false, max_length: 254, validators: ["email"] }
+      ebook_id: { required: true, max_length: 64 }
+"""
+
+
+class PolicyReloadTests(SimpleTestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "leads_fields.yaml"
+        self.path.write_text(POLICY_V1, encoding="utf-8")
+        self._override = override_settings(LEADS_POLICY_YAML=str(self.path), LEADS_FIELD_POLICY={},
+                                           LEADS_POLICY_RELOAD_SECONDS=0)
+        self._override.enable()
+
+    def tearDown(self):
+        self._override.disable()
+        self._tmp.cleanup()
+
+    def _rewrite(self, content):
+        st = self.path.stat()
+        self.path.write_text(content, encoding="utf-8")
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    def test_compiled_class_is_cached_and_bounded(self):
+        cls = compile_lead_serializer("email_ebook")
+        self.assertIs(compile_lead_serializer("email_ebook"), cls)
+        self.assertIs(compile_lead_serializer("email_ebook", "unknown-campaign"), cls)
+        self.assertIsNot(compile_lead_serializer("email_ebook", "promo"), cls)
+        self.assertIs(compile_lead_serializer("nope-1"), compile_lead_serializer("nope-2"))
+
+    def test_policy_file_change_hot_reloads(self):
+        version = conf.policy_version()
+        cls = compile_lead_serializer("email_ebook")
+        self.assertFalse(lead_serializer({"form_kind": "email_ebook"}).is_valid())
+
+        self._rewrite(POLICY_V2)
+        self.assertNotEqual(conf.policy_version(), version)
+        self.assertIsNot(compile_lead_serializer("email_ebook"), cls)
+        ser = lead_serializer({"form_kind": "email_ebook", "ebook_id": "eb-1"})
+        self.assertTrue(ser.is_valid(), ser.errors)
+        self.assertEqual(ser.validated_data["ebook_id"], "eb-1")
+
+    def test_compiled_matches_dynamic_serializer(self):
+        payloads = [
+            {"form_kind": "email_ebook", "email": "a@example.com"},
+            {"form_kind": "email_ebook", "email": "not-an-email"},
+            {"form_kind": "email_ebook"},
+            {"form_kind": "email_ebook", "campaign": "promo", "email": "a@example.com"},
+            {"form_kind": "email_ebook", "campaign": "promo", "email": "a@example.com", "first_name": "Ann"},
+            {"form_kind": "other", "foo": "bar"},
+        ]
+        for payload in payloads:
+            with self.subTest(payload=payload):
+                compiled, dynamic = lead_serializer(payload), DynamicLeadSerializer(data=payload)
+                self.assertEqual(compiled.is_valid(), dynamic.is_valid())
+                self.assertEqual(dict(compiled.errors), dict(dynamic.errors))
+                if dynamic.is_valid():
+                    self.assertEqual(dict(compiled.validated_data), dict(dynamic.validated_data))
@@ -1,8 +1,17 @@
 from django.urls import path
-from .views import LeadCollectAPIView, SignPayloadView
+from .views import (
+    LeadBatchCollectAPIView,
+    LeadCollectAPIView,
+    LeadExportPageView,
+    LeadExportStreamView,
+    SignPayloadView,
+)
 
 app_name = "leads"
 urlpatterns = [
     path("collect/", LeadCollectAPIView.as_view(), name="collect"),
+    path("collect/batch/", LeadBatchCollectAPIView.as_view(), name="collect-batch"),
     path("sign/", SignPayloadView.as_view(), name="sign"),  # ⬅️ nouveau
+    path("export/", LeadExportStreamView.as_view(), name="export"),
+    path("export/page/", LeadExportPageView.as_view(), name="export-page"),
 ]
\ No newline at end of file
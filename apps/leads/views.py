@@ -1,21 +1,26 @@
-import hashlib, json
+import hashlib, json, math
 from typing import Any, Iterable
 
 from django.conf import settings
 from django.db import IntegrityError
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .permissions import PublicPOSTOnly
-from .serializers import DynamicLeadSerializer
+from rest_framework.exceptions import Throttled
+from .permissions import PublicPOSTOnly, StaffOrExportToken, StaffOrIngestToken
+from .serializers import lead_serializer
 from .models import Lead, LeadEvent
-from .constants import LeadStatus, RejectReason
+from .constants import RejectReason
 from .audit import log_api, log_antispam
 from .conf import get_global_policy
 import logging
 
-from .antispam import idempotency_seen, verify_signed_token, normalize_email
+from .antispam import guard_submission, verify_signed_token
+from .antispam_engine import DUPLICATE, RATE_LIMITED
 from .tasks import process_lead
+from .batch import build_lead, ingest_batch, max_batch_items, request_meta
+from . import exports
 
 
 logger = logging.getLogger(__name__)
@@ -50,7 +55,7 @@ def _configured_signature_ignores() -> set[str]:
 
 # --- SIGN ENDPOINT (génère un signed_token pour /leads/collect) ---
 import time, hmac, hashlib, json
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework.views import APIView
 from .permissions import PublicPOSTOnly
 
@@ -94,7 +99,9 @@ class SignPayloadView(APIView):
 class LeadCollectAPIView(APIView):
     permission_classes = [PublicPOSTOnly]
     authentication_classes = []  # public
-    throttle_scope = None  # on utilise nos classes custom via settings
+    throttle_scope = None
+    # Limites IP/email appliquées par guard_submission (atomique, un aller-retour)
+    throttle_classes = []
 
     def post(self, request, *args, **kwargs):
         payload = request.data or {}
@@ -103,19 +110,30 @@ class LeadCollectAPIView(APIView):
 
         # Idempotency header
         idem_key = request.headers.get("X-Idempotency-Key", "")
-        if global_pol.get("require_idempotency_header", True):
-            if not idem_key:
-                return Response({"detail": "X-Idempotency-Key requis."}, status=status.HTTP_400_BAD_REQUEST)
+        require_idem = global_pol.get("require_idempotency_header", True)
+        if require_idem and not idem_key:
+            return Response({"detail": "X-Idempotency-Key requis."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Antispam avant tout accès ORM : fenêtres IP/email + idempotence cache (SET NX), atomique
+        decision = guard_submission(
+            payload.get("form_kind", ""),
+            ip=request.META.get("REMOTE_ADDR"),
+            email=payload.get("email"),
+            idem_key=idem_key if require_idem else "",
+            idem_ttl=3600,
+        )
+        if decision.status == RATE_LIMITED:
+            self._audit(request, payload, 0, RejectReason.RATE_LIMIT)
+            raise Throttled(wait=math.ceil(decision.retry_after))
+        if decision.status == DUPLICATE:
+            return Response({"status": "duplicate", "detail": "déjà reçu"}, status=status.HTTP_202_ACCEPTED)
 
+        if require_idem:
             # Short-circuit if a Lead with this idempotency_key already exists (DB-level idempotency)
             existing = Lead.objects.filter(idempotency_key=idem_key).only("id").first()
             if existing:
                 return Response({"status": "duplicate", "detail": "déjà reçu"}, status=status.HTTP_202_ACCEPTED)
 
-            # Cache-level idempotency (atomic)
-            if idempotency_seen(payload.get("form_kind", ""), idem_key, ttl=3600):
-                return Response({"status": "duplicate", "detail": "déjà reçu"}, status=status.HTTP_202_ACCEPTED)
-
         # CSRF/HMAC token (si cross-origin)
         # if global_pol.get("signed_token_required", False):
         #     stoken = payload.get("signed_token")
@@ -135,7 +153,7 @@ class LeadCollectAPIView(APIView):
             return Response({"detail": "Rejected."}, status=status.HTTP_202_ACCEPTED)
 
         # Serializer (politique dynamique)
-        ser = DynamicLeadSerializer(data=payload)
+        ser = lead_serializer(payload)
         if not ser.is_valid():
             self._audit(request, payload, 0, RejectReason.INVALID, errors=ser.errors)
             return Response(ser.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -143,66 +161,11 @@ class LeadCollectAPIView(APIView):
         data = ser.validated_data
 
 
-        context_payload = data.get("context") if isinstance(data.get("context"), dict) else {}
-        context_payload = dict(context_payload)
-        attribution_cookie = getattr(request, "_attribution", {}) or {}
-        if attribution_cookie:
-            context_payload["ads_attribution"] = attribution_cookie
-
         print(data)
         try:
             # Crée le lead minimal
-            lead = Lead.objects.create(
-                form_kind=data.get("form_kind"),
-                campaign=data.get("campaign") or "",
-                source=data.get("source") or "",
-                utm_source=data.get("utm_source") or "",
-                utm_medium=data.get("utm_medium") or "",
-                utm_campaign=data.get("utm_campaign") or "",
-                context=context_payload,
-                email=normalize_email(data.get("email")),
-                first_name=data.get("first_name") or "",
-                last_name=data.get("last_name") or "",
-                full_name=data.get("full_name") or "",
-                phone=data.get("phone") or "",
-                address_line1=data.get("address_line1") or "",
-                address_line2=data.get("address_line2") or "",
-                city=data.get("city") or "",
-                state=data.get("state") or "",
-                postal_code=data.get("postal_code") or "",
-                country=data.get("country") or "",
-                course_slug=data.get("course_slug") or "",
-                currency=(data.get("currency") or "").upper(),
-                coupon_code=data.get("coupon_code") or "",
-                billing_address_line1=data.get("billing_address_line1") or "",
-                billing_address_line2=data.get("billing_address_line2") or "",
-                billing_city=data.get("billing_city") or "",
-                billing_state=data.get("billing_state") or "",
-                billing_postal_code=data.get("billing_postal_code") or "",
-                billing_country=(data.get("billing_country") or "").upper(),
-                company_name=data.get("company_name") or "",
-                tax_id_type=data.get("tax_id_type") or "",
-                tax_id=data.get("tax_id") or "",
-                save_customer=bool(data.get("save_customer") or False),
-                accept_terms=bool(data.get("accept_terms") or False),
-                invoice_language=data.get("invoice_language") or "",
-                ebook_id=data.get("ebook_id") or "",
-                newsletter_optin=bool(data.get("newsletter_optin") or False),
-                consent=bool(data.get("consent") or False),
-                consent_ip=request.META.get("REMOTE_ADDR"),
-                consent_user_agent=request.META.get("HTTP_USER_AGENT", "")[:300],
-                idempotency_key=idem_key or "",
-                client_ts=data.get("client_ts"),
-                signed_token_hash="",  # utile si tu veux historiser le token
-                honeypot_value=payload.get("honeypot") or "",
-                status=LeadStatus.PENDING,
-                ip_addr=request.META.get("REMOTE_ADDR"),
-                user_agent=request.META.get("HTTP_USER_AGENT", "")[:300],
-                referer=request.META.get("HTTP_REFERER", "")[:500],
-                page_path=request.META.get("REQUEST_URI", "")[:300],
-                locale=(request.headers.get("Accept-Language") or "")[:16],
-                ab_variant=(payload.get("ab_variant") or "")[:32],
-            )
+            lead = build_lead(data, payload, idem_key=idem_key, meta=request_meta(request))
+            lead.save(force_insert=True)
 
         except IntegrityError:
             # If a concurrent/previous request inserted the same idempotency_key, treat as duplicate (202).
@@ -218,3 +181,90 @@ class LeadCollectAPIView(APIView):
 
     def _audit(self, request, payload, lead_id, reason: str, errors=None):
         log_antispam.info("lead_rejected reason=%s ip=%s ua=%s", reason, request.META.get("REMOTE_ADDR"), request.META.get("HTTP_USER_AGENT"))
+
+
+class LeadBatchCollectAPIView(APIView):
+    """
+    POST /api/leads/collect/batch/
+    Corps: {"leads": [{"form_kind": ..., "idempotency_key": ..., ...}, ...]}
+
+    Réponse 202 : compteurs + résultat par élément (même ordre).
+
+    Réservé au staff et aux partenaires (``Authorization: Bearer <LEADS_INGEST_TOKEN>``) :
+    les éléments ne passent ni par guard_submission ni par les limites IP/email du
+    formulaire public, un lot anonyme serait une injection en masse vers le CRM.
+    """
+    permission_classes = [StaffOrIngestToken]
+    authentication_classes = [SessionAuthentication]
+
+    def post(self, request, *args, **kwargs):
+        incoming = request.data if isinstance(request.data, dict) else {}
+        items = incoming.get("leads")
+        if not isinstance(items, list) or not items:
+            return Response({"detail": "leads: liste non vide requise."}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max_batch_items()
+        if len(items) > limit:
+            return Response({"detail": f"Lot trop volumineux (max {limit})."},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        log_api.info("collect_batch_request size=%s ip=%s", len(items), request.META.get("REMOTE_ADDR"))
+        result = ingest_batch(items, meta=request_meta(request))
+        return Response(result.as_dict(), status=status.HTTP_202_ACCEPTED)
+
+
+class LeadExportStreamView(APIView):
+    """
+    GET /api/leads/export/?fmt=csv|ndjson&form_kind=&status=&campaign=&created_from=&created_to=
+    Export complet en flux (StreamingHttpResponse, curseur serveur par lots).
+
+    Mode synchro : ``since=`` (vide au premier appel) ne renvoie que les leads créés ou
+    modifiés après le curseur ; le curseur suivant est rendu dans ``X-Export-Cursor``.
+    """
+    permission_classes = [StaffOrExportToken]
+    authentication_classes = [SessionAuthentication]
+    throttle_classes = []
+
+    def get(self, request, *args, **kwargs):
+        params = _export_params(request)
+        qs = exports.keyset(exports.filtered_leads(params), params)
+        headers = {}
+        if "since" in params:
+            # borne figée : ce qui est écrit pendant le flux part dans la synchro suivante
+            mark = exports.sync_high_water_mark(qs)
+            if mark:
+                qs = exports.bounded(qs, mark)
+            headers["X-Export-Cursor"] = exports.encode_cursor(*mark) if mark else params["since"]
+
+        if params["fmt"] == "ndjson":
+            response = StreamingHttpResponse(exports.stream_ndjson(qs), content_type="application/x-ndjson")
+        else:
+            response = StreamingHttpResponse(exports.stream_csv(qs), content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = 'attachment; filename="leads.%s"' % params["fmt"]
+        for name, value in headers.items():
+            response[name] = value
+        log_api.info("lead_export fmt=%s sync=%s user=%s", params["fmt"], "since" in params, request.user)
+        return response
+
+
+class LeadExportPageView(APIView):
+    """
+    GET /api/leads/export/page/?limit=500&after=<id> | ?since=<curseur>
+    Pages JSON keyset pour la synchro CRM : ``next_after`` (parcours par id) ou
+    ``cursor`` (deltas depuis ``since``), à repasser tel quel à l'appel suivant.
+    """
+    permission_classes = [StaffOrExportToken]
+    authentication_classes = [SessionAuthentication]
+    throttle_classes = []
+
+    def get(self, request, *args, **kwargs):
+        params = _export_params(request)
+        qs = exports.keyset(exports.filtered_leads(params), params)
+        limit = params.get("limit") or exports.DEFAULT_PAGE_SIZE
+        sync = "since" in params
+        return Response(exports.page(qs, limit, sync=sync, since=params.get("since", "")))
+
+
+def _export_params(request) -> dict:
+    ser = exports.LeadExportFilterSerializer(data=request.query_params)
+    ser.is_valid(raise_exception=True)
+    return ser.validated_data
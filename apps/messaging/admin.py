@@ -12,8 +12,16 @@ from django.utils import timezone
 from django.utils.html import escape
 
 from .campaigns import CampaignService
-from .models import Campaign, CampaignRecipient, EmailAttempt, EmailTemplate, OutboxEmail
+from .models import (
+    ArchivedOutboxEmail,
+    Campaign,
+    CampaignRecipient,
+    EmailAttempt,
+    EmailTemplate,
+    OutboxEmail,
+)
 from .services import EmailService, TemplateService, schedule_outbox_drain
+from .template_cache import invalidate_template_cache
 
 
 def _schedule_outbox_drain() -> None:
@@ -170,17 +178,65 @@ class OutboxEmailAdmin(admin.ModelAdmin):
     )
     inlines = [EmailAttemptInline]
     actions = [requeue_emails, suppress_emails, resend_emails, export_emails_csv]
+
+
+@admin.register(ArchivedOutboxEmail)
+class ArchivedOutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("namespace", "purpose", "status", "template_slug", "sent_at", "created_at", "archived_at")
+    list_filter = ("namespace", "purpose", "status")
+    search_fields = ("dedup_key", "to", "rendered_subject", "provider_message_id")
+    date_hierarchy = "created_at"
+    exclude = ("html_body", "text_body")
+    readonly_fields = (
+        "original_id",
+        "namespace",
+        "purpose",
+        "dedup_key",
+        "flow_id",
+        "to",
+        "cc",
+        "bcc",
+        "reply_to",
+        "locale",
+        "template_slug",
+        "template_version",
+        "rendered_subject",
+        "rendered_html",
+        "rendered_text",
+        "context",
+        "headers",
+        "attachments",
+        "metadata",
+        "status",
+        "attempt_count",
+        "attempts",
+        "sent_at",
+        "last_error_code",
+        "last_error_message",
+        "provider_message_id",
+        "created_at",
+        "updated_at",
+        "archived_at",
+    )
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+    def has_change_permission(self, request, obj=None) -> bool:
+        return False
 
 
 @admin.action(description="Activer les templates sélectionnés")
 def activate_templates(modeladmin, request, queryset):
     count = queryset.update(is_active=True)
+    invalidate_template_cache()  # update() bypasses post_save
     modeladmin.message_user(request, f"{count} templates activés")
 
 
 @admin.action(description="Désactiver les templates sélectionnés")
 def deactivate_templates(modeladmin, request, queryset):
     count = queryset.update(is_active=False)
+    invalidate_template_cache()
     modeladmin.message_user(request, f"{count} templates désactivés")
 
 
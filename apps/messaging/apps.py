@@ -9,4 +9,5 @@ class MessagingConfig(AppConfig):
     def ready(self) -> None:
         # Import system checks at startup.
         from . import checks  # noqa: F401
+        from . import template_cache  # noqa: F401  (invalidation signals)
         import apps.messaging.tasks_debug  # noqa: F401
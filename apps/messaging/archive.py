@@ -0,0 +1,192 @@
+"""Cold storage for delivered/failed outbox rows.
+
+``drain_outbox_batch`` scans ``OutboxEmail`` by status, priority and ``scheduled_at``;
+terminal rows kept forever bloat that table and its indexes with rendered bodies.
+``archive_outbox`` moves SENT/FAILED/SUPPRESSED rows untouched for
+``MESSAGING_OUTBOX_ARCHIVE_AFTER_DAYS`` into ``ArchivedOutboxEmail`` (with their
+``EmailAttempt`` history as JSON) and deletes them from the hot table. Bodies are
+zlib-compressed into ``ArchivedEmailBody`` keyed by sha256, so campaign copies of the
+same HTML are stored once.
+
+Each batch is one transaction: a row is either still live or fully archived, and
+re-running after a crash is safe (``original_id`` is unique).
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import zlib
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .models import ArchivedEmailBody, ArchivedOutboxEmail, EmailAttempt, OutboxEmail
+
+log = logging.getLogger("messaging.archive")
+
+ARCHIVABLE_STATUSES = (
+    OutboxEmail.Status.SENT,
+    OutboxEmail.Status.FAILED,
+    OutboxEmail.Status.SUPPRESSED,
+)
+DEFAULT_ARCHIVE_AFTER_DAYS = 90
+DEFAULT_ARCHIVE_BATCH_SIZE = 500
+
+
+@dataclass
+class ArchiveResult:
+    archived: int = 0
+    bodies_created: int = 0
+    body_bytes: int = 0  # uncompressed bodies of the archived rows
+    stored_bytes: int = 0  # compressed bytes actually written (new bodies only)
+
+
+def body_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _archive_after_days() -> int:
+    return max(int(getattr(settings, "MESSAGING_OUTBOX_ARCHIVE_AFTER_DAYS", DEFAULT_ARCHIVE_AFTER_DAYS)), 0)
+
+
+def _batch_size() -> int:
+    return max(int(getattr(settings, "MESSAGING_OUTBOX_ARCHIVE_BATCH_SIZE", DEFAULT_ARCHIVE_BATCH_SIZE)), 1)
+
+
+def archivable(*, older_than_days: Optional[int] = None):
+    days = _archive_after_days() if older_than_days is None else max(int(older_than_days), 0)
+    cutoff = timezone.now() - timedelta(days=days)
+    return OutboxEmail.objects.filter(status__in=ARCHIVABLE_STATUSES, updated_at__lt=cutoff)
+
+
+def _store_bodies(texts: Dict[str, str], result: ArchiveResult) -> None:
+    """Insert the bodies whose digest is not stored yet."""
+
+    existing = set(ArchivedEmailBody.objects.filter(digest__in=texts).values_list("digest", flat=True))
+    rows = []
+    for digest, text in texts.items():
+        if digest in existing:
+            continue
+        raw = text.encode("utf-8")
+        data = zlib.compress(raw, 9)
+        rows.append(ArchivedEmailBody(digest=digest, data=data, size=len(raw)))
+        result.stored_bytes += len(data)
+    ArchivedEmailBody.objects.bulk_create(rows, ignore_conflicts=True)
+    result.bodies_created += len(rows)
+
+
+def _attempt_payload(attempt: EmailAttempt) -> dict:
+    return {
+        "status": attempt.status,
+        "error_code": attempt.error_code,
+        "error_message": attempt.error_message,
+        "provider_message_id": attempt.provider_message_id,
+        "duration_ms": attempt.duration_ms,
+        "created_at": attempt.created_at.isoformat(),
+    }
+
+
+@transaction.atomic
+def _archive_batch(ids, result: ArchiveResult) -> int:
+    rows = list(
+        OutboxEmail.objects.filter(id__in=ids, status__in=ARCHIVABLE_STATUSES).prefetch_related(
+            Prefetch("attempts", queryset=EmailAttempt.objects.order_by("created_at", "id"))
+        )
+    )
+    if not rows:
+        return 0
+
+    texts: Dict[str, str] = {}
+    digests = {}
+    for row in rows:
+        html = body_digest(row.rendered_html) if row.rendered_html else None
+        text = body_digest(row.rendered_text) if row.rendered_text else None
+        if html:
+            texts[html] = row.rendered_html
+        if text:
+            texts[text] = row.rendered_text
+        digests[row.id] = (html, text)
+        result.body_bytes += len(row.rendered_html.encode("utf-8")) + len(row.rendered_text.encode("utf-8"))
+    _store_bodies(texts, result)
+
+    ArchivedOutboxEmail.objects.bulk_create(
+        [
+            ArchivedOutboxEmail(
+                original_id=row.id,
+                namespace=row.namespace,
+                purpose=row.purpose,
+                dedup_key=row.dedup_key,
+                flow_id=row.flow_id,
+                to=row.to,
+                cc=row.cc,
+                bcc=row.bcc,
+                reply_to=row.reply_to,
+                locale=row.locale,
+                template_slug=row.template_slug,
+                template_version=row.template_version,
+                rendered_subject=row.rendered_subject,
+                html_body_id=digests[row.id][0],
+                text_body_id=digests[row.id][1],
+                context=row.context,
+                headers=row.headers,
+                attachments=row.attachments,
+                metadata=row.metadata,
+                status=row.status,
+                attempt_count=row.attempt_count,
+                attempts=[_attempt_payload(attempt) for attempt in row.attempts.all()],
+                sent_at=row.sent_at,
+                last_error_code=row.last_error_code,
+                last_error_message=row.last_error_message,
+                provider_message_id=row.provider_message_id,
+                created_at=row.created_at,
+                updated_at=row.updated_at,
+            )
+            for row in rows
+        ],
+        ignore_conflicts=True,
+    )
+    archived_ids = [row.id for row in rows]
+    EmailAttempt.objects.filter(outbox_id__in=archived_ids).delete()
+    OutboxEmail.objects.filter(id__in=archived_ids).delete()
+    return len(archived_ids)
+
+
+def archive_outbox(
+    *,
+    older_than_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> ArchiveResult:
+    """Archive terminal rows older than the horizon, ``batch_size`` rows per transaction."""
+
+    size = _batch_size() if batch_size is None else max(int(batch_size), 1)
+    queryset = archivable(older_than_days=older_than_days).order_by("id")
+    result = ArchiveResult()
+    last_id = 0
+    while limit is None or result.archived < limit:
+        take = size if limit is None else min(size, limit - result.archived)
+        ids = list(queryset.filter(id__gt=last_id).values_list("id", flat=True)[:take])
+        if not ids:
+            break
+        last_id = ids[-1]
+        result.archived += _archive_batch(ids, result)
+
+    if result.archived:
+        log.info(
+            "outbox_archived",
+            extra={
+                "archived": result.archived,
+                "bodies_created": result.bodies_created,
+                "body_bytes": result.body_bytes,
+                "stored_bytes": result.stored_bytes,
+            },
+        )
+    return result
+
+
+__all__ = ["ARCHIVABLE_STATUSES", "ArchiveResult", "archivable", "archive_outbox", "body_digest"]
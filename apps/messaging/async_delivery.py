@@ -0,0 +1,286 @@
+"""Asyncio outbox delivery: many concurrent SMTP sessions in a single process.
+
+A Celery prefork worker holds a whole process for the SMTP conversation of every
+email, so throughput only grows with process count. ``AsyncDeliveryWorker`` claims
+due rows like ``drain_outbox_batch`` and runs up to ``concurrency`` sessions, each
+keeping one SMTP connection open across messages. Attempts, status transitions and
+retry classification are those of ``tasks.send_outbox_batch``; ORM calls go through
+``sync_to_async`` (thread-sensitive: one DB thread), only the network I/O overlaps.
+
+With the SMTP email backend and ``aiosmtplib`` installed (optional) sessions speak
+SMTP natively on the event loop. Otherwise each session drives a
+``PooledSMTPConnection`` from its own thread, which works with any EMAIL_BACKEND.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.utils import timezone
+
+from . import metrics as messaging_metrics
+from .models import OutboxEmail
+from .tasks import (
+    DEFAULT_SMTP_MAX_RECONNECTS,
+    PooledSMTPConnection,
+    _build_message,
+    _claim_due,
+    _classify_smtp_error,
+    _record_failure,
+    _record_success,
+    _release,
+)
+
+log = logging.getLogger("messaging.async_delivery")
+
+DEFAULT_CONCURRENCY = 20
+SMTP_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+
+
+def _max_reconnects() -> int:
+    return max(int(getattr(settings, "MESSAGING_SMTP_MAX_RECONNECTS", DEFAULT_SMTP_MAX_RECONNECTS)), 0)
+
+
+def _aiosmtplib():
+    if getattr(settings, "EMAIL_BACKEND", "") != SMTP_BACKEND:
+        return None
+    try:
+        import aiosmtplib
+    except ImportError:
+        return None
+    return aiosmtplib
+
+
+class ThreadedTransport:
+    """Any email backend, one blocking connection driven from an executor thread."""
+
+    def __init__(self, executor: ThreadPoolExecutor) -> None:
+        self._executor = executor
+        self._pool = PooledSMTPConnection(max_reconnects=_max_reconnects())
+
+    @property
+    def opened(self) -> int:
+        return self._pool.opened
+
+    @property
+    def exhausted(self) -> bool:
+        return self._pool.exhausted
+
+    async def send(self, message: EmailMultiAlternatives) -> int:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._pool.send, message)
+
+    async def close(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._pool.close)
+
+
+class AiosmtplibTransport:
+    """Native asyncio SMTP session with the reconnect policy of ``PooledSMTPConnection``."""
+
+    def __init__(self, lib) -> None:
+        self._lib = lib
+        self._smtp = None
+        self.opened = 0
+        self.reconnects_left = _max_reconnects()
+
+    @property
+    def exhausted(self) -> bool:
+        return self._smtp is None and self.reconnects_left == 0 and self.opened > 0
+
+    def _is_transport_error(self, exc: Exception) -> bool:
+        lib = self._lib
+        return isinstance(exc, (lib.SMTPServerDisconnected, lib.SMTPConnectError, lib.SMTPTimeoutError)) or (
+            isinstance(exc, OSError) and not isinstance(exc, lib.SMTPException)
+        )
+
+    async def _connection(self):
+        if self._smtp is None:
+            smtp = self._lib.SMTP(
+                hostname=settings.EMAIL_HOST,
+                port=settings.EMAIL_PORT,
+                username=settings.EMAIL_HOST_USER or None,
+                password=settings.EMAIL_HOST_PASSWORD or None,
+                use_tls=bool(settings.EMAIL_USE_SSL),
+                start_tls=bool(settings.EMAIL_USE_TLS),
+                timeout=getattr(settings, "EMAIL_TIMEOUT", None),
+            )
+            self.opened += 1
+            await smtp.connect()
+            self._smtp = smtp
+        return self._smtp
+
+    async def _send_once(self, message: EmailMultiAlternatives) -> int:
+        recipients = message.recipients()
+        if not recipients:
+            return 0
+        smtp = await self._connection()
+        await smtp.send_message(message.message(), sender=message.from_email, recipients=recipients)
+        return 1
+
+    async def send(self, message: EmailMultiAlternatives) -> int:
+        try:
+            return await self._send_once(message)
+        except Exception as exc:
+            if not self._is_transport_error(exc):
+                raise
+            await self.close()
+            if self.reconnects_left == 0:
+                raise
+            self.reconnects_left -= 1
+            log.info("outbox_smtp_reconnect", extra={"error": str(exc)[:200], "left": self.reconnects_left})
+        try:
+            return await self._send_once(message)
+        except Exception as exc:
+            if self._is_transport_error(exc):
+                await self.close()
+            raise
+
+    async def close(self) -> None:
+        if self._smtp is None:
+            return
+        smtp, self._smtp = self._smtp, None
+        try:
+            await smtp.quit()
+        except Exception:  # pragma: no cover - best effort on a broken socket
+            smtp.close()
+
+
+def _start_attempt(outbox_id: int, worker_id: str) -> Optional[Tuple[OutboxEmail, datetime]]:
+    outbox = OutboxEmail.objects.filter(pk=outbox_id).first()
+    if outbox is None:  # pragma: no cover - defensive
+        log.warning("missing_outbox", extra={"outbox_id": outbox_id})
+        return None
+    if outbox.status == OutboxEmail.Status.SENT:
+        log.info("outbox_already_sent", extra={"outbox_id": outbox_id})
+        return None
+    start = timezone.now()
+    outbox.attempt_count += 1
+    outbox.locked_at = start
+    outbox.locked_by = worker_id
+    outbox.save(update_fields=["attempt_count", "locked_at", "locked_by", "updated_at"])
+    return outbox, start
+
+
+class AsyncDeliveryWorker:
+    """Claim due outbox rows and deliver them over ``concurrency`` concurrent SMTP sessions."""
+
+    def __init__(
+        self,
+        *,
+        concurrency: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        poll_interval: float = 1.0,
+        worker_id: Optional[str] = None,
+    ) -> None:
+        default = getattr(settings, "MESSAGING_ASYNC_SMTP_CONCURRENCY", DEFAULT_CONCURRENCY)
+        self.concurrency = max(int(concurrency or default), 1)
+        self.batch_size = max(int(batch_size or self.concurrency * 4), 1)
+        self.poll_interval = max(float(poll_interval), 0.0)
+        self.worker_id = worker_id or f"async:{os.getpid()}"
+        self.sent = 0
+        self.failed = 0
+        self.connections = 0
+        self._stopping = False
+
+    def stop(self) -> None:
+        """Finish in-flight messages, hand the rest of the claimed rows back, then return."""
+        self._stopping = True
+
+    async def run(self, *, once: bool = False, max_messages: Optional[int] = None) -> int:
+        """Poll and deliver until ``stop()``; ``once`` returns as soon as nothing is due."""
+
+        claimed = 0
+        while not self._stopping:
+            limit = self.batch_size if max_messages is None else min(self.batch_size, max_messages - claimed)
+            if limit <= 0:
+                break
+            by_lane = await sync_to_async(_claim_due)(limit, worker_id=self.worker_id)
+            ids = [outbox_id for lane_ids in by_lane.values() for outbox_id in lane_ids]
+            if ids:
+                claimed += len(ids)
+                await self.deliver(ids)
+            elif once:
+                break
+            else:
+                await asyncio.sleep(self.poll_interval)
+        return self.sent
+
+    async def deliver(self, outbox_ids: List[int]) -> int:
+        """Send already claimed (SENDING) rows; returns how many were sent."""
+
+        sessions = min(self.concurrency, len(outbox_ids))
+        if not sessions:
+            return 0
+        messaging_metrics.record_batch_size("async", len(outbox_ids))
+        queue: asyncio.Queue = asyncio.Queue()
+        for outbox_id in outbox_ids:
+            queue.put_nowait(outbox_id)
+
+        sent_before = self.sent
+        lib = _aiosmtplib()
+        executor = None if lib else ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="smtp-session")
+        transports = [AiosmtplibTransport(lib) if lib else ThreadedTransport(executor) for _ in range(sessions)]
+        try:
+            await asyncio.gather(*(self._session(queue, transport) for transport in transports))
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+            self.connections += sum(transport.opened for transport in transports)
+
+        leftover = []
+        while not queue.empty():
+            leftover.append(queue.get_nowait())
+        if leftover:
+            released = await sync_to_async(_release)(leftover)
+            log.warning("outbox_async_released", extra={"released": released, "stopping": self._stopping})
+
+        log.info(
+            "outbox_async_delivered",
+            extra={"count": len(outbox_ids), "sent": self.sent - sent_before, "sessions": sessions},
+        )
+        return self.sent - sent_before
+
+    async def _session(self, queue: asyncio.Queue, transport) -> None:
+        try:
+            while not self._stopping and not transport.exhausted:
+                try:
+                    outbox_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await self._deliver_one(outbox_id, transport)
+        finally:
+            await transport.close()
+
+    async def _deliver_one(self, outbox_id: int, transport) -> None:
+        started = await sync_to_async(_start_attempt)(outbox_id, self.worker_id)
+        if started is None:
+            return
+        outbox, start = started
+        try:
+            message = await sync_to_async(_build_message)(outbox)
+            sent = await transport.send(message)
+            provider_id = getattr(message, "extra_headers", {}).get("Message-ID", "")
+        except Exception as exc:
+            await sync_to_async(_record_failure)(
+                outbox, classification=_classify_smtp_error(exc), error=str(exc), started_at=start
+            )
+            self.failed += 1
+            return
+
+        if sent:
+            await sync_to_async(_record_success)(outbox, provider_id=provider_id, started_at=start)
+            self.sent += 1
+        else:  # pragma: no cover - defensive
+            await sync_to_async(_record_failure)(
+                outbox, classification="smtp_error", error="SMTP backend returned 0", started_at=start
+            )
+            self.failed += 1
+
+
+__all__ = ["AiosmtplibTransport", "AsyncDeliveryWorker", "ThreadedTransport"]
@@ -3,101 +3,167 @@ from __future__ import annotations
 
 import logging
 
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import Lower
 from django.utils import timezone
 
 from apps.accounts.models import StudentProfile
 
 from .models import Campaign, CampaignRecipient
-from .services import EmailService
+from .services import BulkEmail, EmailService
 
 log = logging.getLogger("messaging.campaigns")
 
+DEFAULT_CHUNK_SIZE = 500
+
+
+def _chunk_size() -> int:
+    return max(int(getattr(settings, "MESSAGING_CAMPAIGN_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)), 1)
+
+
+def _recipient_context(recipient: CampaignRecipient) -> dict:
+    metadata = recipient.metadata if isinstance(recipient.metadata, dict) else {}
+    context = metadata.get("context")
+    return dict(context) if isinstance(context, dict) else {}
+
+
+def _checkpoint(campaign: Campaign, *, last_recipient_id: int, count: int, at) -> None:
+    """Record fan-out progress in campaign.metadata (same transaction as the chunk)."""
+    metadata = dict(campaign.metadata) if isinstance(campaign.metadata, dict) else {}
+    progress = dict(metadata.get("progress") or {})
+    progress["processed"] = int(progress.get("processed", 0)) + count
+    progress["last_recipient_id"] = last_recipient_id
+    progress["updated_at"] = at.isoformat()
+    metadata["progress"] = progress
+    campaign.metadata = metadata
+    campaign.save(update_fields=["metadata", "updated_at"])
+
 
 class CampaignService:
     @staticmethod
-    @transaction.atomic
     def build_recipients(campaign: Campaign, *, limit: int | None = None) -> int:
-        """Populate CampaignRecipient rows from marketing opt-ins."""
-        existing = {
-            email.lower(): email
-            for email in campaign.recipients.values_list("email", flat=True)
-        }
-        qs = (
-            StudentProfile.objects.select_related("user")
-            .filter(marketing_opt_in=True, user__is_active=True)
+        """Populate CampaignRecipient rows from marketing opt-ins.
+
+        Profiles are scanned by id from ``campaign.recipients_cursor`` in chunks; each
+        chunk is one transaction that inserts the new recipients and advances the
+        cursor, so a call costs O(limit) whatever the audience size. Opt-ins on
+        profiles below the cursor are not picked up again.
+        """
+        chunk_size = _chunk_size()
+        created = 0
+        while limit is None or created < limit:
+            size = chunk_size if limit is None else min(chunk_size, limit - created)
+            added, exhausted = CampaignService._build_chunk(campaign, size)
+            created += added
+            if exhausted:
+                break
+        return created
+
+    @staticmethod
+    @transaction.atomic
+    def _build_chunk(campaign: Campaign, size: int) -> tuple[int, bool]:
+        already = CampaignRecipient.objects.filter(campaign=campaign, email=Lower(OuterRef("user__email")))
+        candidates = (
+            StudentProfile.objects.filter(
+                id__gt=campaign.recipients_cursor,
+                marketing_opt_in=True,
+                user__is_active=True,
+            )
             .exclude(user__email="")
+            .exclude(Exists(already))
+            .order_by("id")
+            .values_list("id", "user_id", "user__email")[:size]
         )
         locale = campaign.locale
-        created = []
-        seen = set(existing.keys())
-        count = 0
-        for profile in qs.iterator():
-            user = profile.user
-            if not user:
-                continue
-            email = (user.email or "").strip().lower()
+        rows = []
+        seen = set()
+        last_id = None
+        scanned = 0
+        for profile_id, user_id, email in candidates.iterator(chunk_size=size):
+            scanned += 1
+            last_id = profile_id
+            email = (email or "").strip().lower()
             if not email or email in seen:
                 continue
             seen.add(email)
-            created.append(
-                CampaignRecipient(
-                    campaign=campaign,
-                    email=email,
-                    user=user,
-                    locale=locale,
-                )
-            )
-            count += 1
-            if limit and count >= limit:
-                break
-        if created:
-            CampaignRecipient.objects.bulk_create(created, ignore_conflicts=True)
-        return len(created)
+            rows.append(CampaignRecipient(campaign=campaign, email=email, user_id=user_id, locale=locale))
+        if rows:
+            # ignore_conflicts: the (campaign, email) constraint settles concurrent builders.
+            CampaignRecipient.objects.bulk_create(rows, ignore_conflicts=True)
+        if last_id is not None:
+            Campaign.objects.filter(pk=campaign.pk).update(recipients_cursor=last_id)
+            campaign.recipients_cursor = last_id
+        return len(rows), scanned < size
 
     @staticmethod
-    @transaction.atomic
     def enqueue_batch(campaign: Campaign, *, limit: int | None = None) -> int:
-        """Enqueue a batch of campaign emails respecting opt-in and dry-run."""
-        CampaignService.build_recipients(campaign)
+        """Enqueue a batch of campaign emails respecting opt-in and dry-run.
+
+        The batch is processed in chunks of ``MESSAGING_CAMPAIGN_CHUNK_SIZE``, each
+        committed on its own: recipient statuses and the ``progress`` checkpoint in
+        ``campaign.metadata`` survive an interrupted run, which resumes on PENDING rows.
+        """
         limit = limit or campaign.batch_size
+        CampaignService.build_recipients(campaign, limit=limit)
+        chunk_size = _chunk_size()
+        processed = 0
+        while processed < limit:
+            done = CampaignService._enqueue_chunk(campaign, min(chunk_size, limit - processed))
+            if not done:
+                break
+            processed += done
+        if processed:
+            log.info(
+                "campaign_batch_enqueued",
+                extra={"campaign_id": campaign.id, "count": processed},
+            )
+        return processed
+
+    @staticmethod
+    @transaction.atomic
+    def _enqueue_chunk(campaign: Campaign, size: int) -> int:
         pending = list(
-            campaign.recipients.filter(status=CampaignRecipient.Status.PENDING)[:limit]
+            campaign.recipients.filter(status=CampaignRecipient.Status.PENDING)
+            .select_for_update(skip_locked=True)
+            .order_by("id")[:size]
         )
+        if not pending:
+            return 0
         now = timezone.now()
-        processed = 0
-        metadata = campaign.metadata if isinstance(campaign.metadata, dict) else {}
-        base_context = metadata.get("context", {}) if isinstance(metadata, dict) else {}
-        for recipient in pending:
-            if campaign.dry_run:
-                recipient.status = CampaignRecipient.Status.SUPPRESSED
-                recipient.last_enqueued_at = now
-                recipient.save(update_fields=["status", "last_enqueued_at", "updated_at"])
-                processed += 1
-                continue
+        if campaign.dry_run:
+            status = CampaignRecipient.Status.SUPPRESSED
+        else:
+            metadata = campaign.metadata if isinstance(campaign.metadata, dict) else {}
+            base_context = metadata.get("context", {}) if isinstance(metadata, dict) else {}
             context = dict(base_context)
             context.setdefault("campaign_slug", campaign.slug)
-            EmailService.compose_and_enqueue(
+            EmailService.bulk_enqueue(
                 namespace="marketing",
                 purpose=f"campaign:{campaign.slug}",
                 template_slug=campaign.template_slug,
-                to=[recipient.email],
                 locale=campaign.locale,
-                dedup_key=f"campaign:{campaign.id}:{recipient.email}",
+                base_context=context,
                 subject_override=campaign.subject_override or None,
                 metadata={"campaign_id": campaign.id},
-                context=context,
+                messages=[
+                    BulkEmail(
+                        to=[recipient.email],
+                        dedup_key=f"campaign:{campaign.id}:{recipient.email}",
+                        context=_recipient_context(recipient),
+                    )
+                    for recipient in pending
+                ],
             )
-            recipient.status = CampaignRecipient.Status.QUEUED
+            status = CampaignRecipient.Status.QUEUED
+        for recipient in pending:
+            recipient.status = status
             recipient.last_enqueued_at = now
-            recipient.save(update_fields=["status", "last_enqueued_at", "updated_at"])
-            processed += 1
-        if processed:
-            log.info(
-                "campaign_batch_enqueued",
-                extra={"campaign_id": campaign.id, "count": processed},
-            )
-        return processed
+            recipient.updated_at = now
+        CampaignRecipient.objects.bulk_update(pending, ["status", "last_enqueued_at", "updated_at"], batch_size=500)
+        _checkpoint(campaign, last_recipient_id=pending[-1].id, count=len(pending), at=now)
+        return len(pending)
 
     @staticmethod
     @transaction.atomic
@@ -0,0 +1,147 @@
+"""Delivery lanes for the outbox drain.
+
+Every OutboxEmail belongs to a lane, set at enqueue time: campaign mail
+(``MESSAGING_BULK_NAMESPACES`` or ``campaign:<slug>`` purposes) goes to ``bulk``,
+everything else (password reset, email verification, receipts...) to
+``transactional``. The drain reads each lane separately and splits its batch by
+lane weight (``MESSAGING_DELIVERY_LANES``), handing unused slots to lanes that
+still have due rows, so a campaign backlog of any size never hides a reset email.
+
+A lane with ``slo_seconds`` whose oldest due row is older than that is "late": it
+is served before any weighted sharing until it has caught up. ``queue`` optionally
+routes the lane's send tasks to its own Celery queue, so transactional sends are
+not stuck behind campaign sends already waiting in the broker.
+"""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+TRANSACTIONAL = "transactional"
+BULK = "bulk"
+
+DEFAULT_LANES = {
+    TRANSACTIONAL: {"weight": 4, "slo_seconds": 60, "queue": ""},
+    BULK: {"weight": 1, "slo_seconds": None, "queue": ""},
+}
+DEFAULT_BULK_NAMESPACES = ("marketing",)
+
+
+@dataclass(frozen=True)
+class Lane:
+    name: str
+    weight: int = 1
+    slo_seconds: Optional[float] = None
+    queue: str = ""
+
+
+def configured_lanes() -> List[Lane]:
+    """Lanes from settings (merged over the defaults), latency-bound lanes first."""
+
+    config = {name: dict(spec) for name, spec in DEFAULT_LANES.items()}
+    for name, spec in (getattr(settings, "MESSAGING_DELIVERY_LANES", None) or {}).items():
+        config.setdefault(name, {}).update(spec or {})
+    lanes = [
+        Lane(
+            name=name,
+            weight=max(int(spec.get("weight") or 1), 1),
+            slo_seconds=float(spec["slo_seconds"]) if spec.get("slo_seconds") else None,
+            queue=spec.get("queue") or "",
+        )
+        for name, spec in config.items()
+    ]
+    return sorted(lanes, key=lambda lane: (lane.slo_seconds is None, lane.slo_seconds or 0, -lane.weight))
+
+
+def lane_for(namespace: str, purpose: str) -> str:
+    bulk_namespaces = getattr(settings, "MESSAGING_BULK_NAMESPACES", DEFAULT_BULK_NAMESPACES)
+    if namespace in bulk_namespaces or purpose.startswith("campaign:"):
+        return BULK
+    return TRANSACTIONAL
+
+
+def route(lane_name: str) -> dict:
+    """``apply_async`` options of a lane's send tasks (empty: CELERY_TASK_ROUTES applies)."""
+
+    queue = next((lane.queue for lane in configured_lanes() if lane.name == lane_name), "")
+    return {"queue": queue} if queue else {}
+
+
+def fair_shares(capacity: int, weights: Dict[str, int]) -> Dict[str, int]:
+    """Split ``capacity`` by weight (largest remainder); no lane gets 0 while capacity allows."""
+
+    total = sum(weights.values())
+    if capacity <= 0 or total <= 0:
+        return {name: 0 for name in weights}
+    exact = {name: capacity * weight / total for name, weight in weights.items()}
+    shares = {name: int(value) for name, value in exact.items()}
+    remainder = capacity - sum(shares.values())
+    for name in sorted(exact, key=lambda n: exact[n] - shares[n], reverse=True)[:remainder]:
+        shares[name] += 1
+    for name in weights:
+        if shares[name] == 0:
+            donor = max(shares, key=shares.get)
+            if shares[donor] > 1:
+                shares[donor] -= 1
+                shares[name] = 1
+    return shares
+
+
+# Candidate rows start with (id, scheduled_at, ...); ``take`` pops up to n rows off the
+# deque and returns the ids it claims (it may skip throttled rows).
+Take = Callable[[Deque[tuple], int], List[int]]
+
+
+def allocate(
+    lanes: Sequence[Lane],
+    candidates: Dict[str, Sequence[tuple]],
+    limit: int,
+    *,
+    now: datetime,
+    take: Take,
+) -> Tuple[Dict[str, List[int]], List[str]]:
+    """Claimed ids per lane for one drain, and the lanes found past their SLO."""
+
+    queues = {lane.name: deque(candidates.get(lane.name, ())) for lane in lanes}
+    claimed: Dict[str, List[int]] = {lane.name: [] for lane in lanes}
+    capacity = max(limit, 0)
+
+    late = [
+        lane.name
+        for lane in lanes
+        if lane.slo_seconds
+        and queues[lane.name]
+        and (now - min(row[1] for row in queues[lane.name])).total_seconds() > lane.slo_seconds
+    ]
+    for name in late:
+        got = take(queues[name], capacity)
+        claimed[name] += got
+        capacity -= len(got)
+
+    weights = {lane.name: lane.weight for lane in lanes}
+    while capacity > 0:
+        active = {name: weight for name, weight in weights.items() if queues[name]}
+        if not active:
+            break
+        for name, share in fair_shares(capacity, active).items():
+            if share:
+                got = take(queues[name], share)
+                claimed[name] += got
+                capacity -= len(got)
+    return claimed, late
+
+
+__all__ = [
+    "BULK",
+    "Lane",
+    "TRANSACTIONAL",
+    "allocate",
+    "configured_lanes",
+    "fair_shares",
+    "lane_for",
+    "route",
+]
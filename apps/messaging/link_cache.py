@@ -0,0 +1,75 @@
+"""Short-lived cache of email link outcomes (verify email, unsubscribe).
+
+Mail-client prefetchers and security scanners open the links of an email several
+times, and every hit used to load the user and profile again. The first click that
+carries a correctly signed token now stores its outcome under the sha256 digest of
+the token (never the token itself) for ``MESSAGING_LINK_RESULT_CACHE_SECONDS``; later
+hits replay that first outcome without any DB query. Forged or expired tokens are
+not cached: rejecting them costs no DB work and must not let anyone fill the cache.
+
+HEAD requests and browser/mail-client prefetches (``Purpose``, ``Sec-Purpose``,
+``X-Purpose``, ``X-Moz`` headers) never act on the token: they only check its signature.
+"""
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse
+
+DEFAULT_LINK_RESULT_CACHE_SECONDS = 300
+PREFETCH_HEADERS = ("HTTP_PURPOSE", "HTTP_SEC_PURPOSE", "HTTP_X_PURPOSE", "HTTP_X_MOZ")
+PREFETCH_VALUES = ("prefetch", "preview", "prerender")
+
+
+def _ttl() -> int:
+    return max(int(getattr(settings, "MESSAGING_LINK_RESULT_CACHE_SECONDS", DEFAULT_LINK_RESULT_CACHE_SECONDS)), 0)
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _key(purpose: str, token: str) -> str:
+    return f"messaging:link:{purpose}:{token_digest(token)}"
+
+
+def cached_outcome(purpose: str, token: str) -> Optional[Dict[str, Any]]:
+    if not _ttl():
+        return None
+    return cache.get(_key(purpose, token))
+
+
+def remember_outcome(purpose: str, token: str, outcome: Dict[str, Any]) -> Dict[str, Any]:
+    """Store ``outcome`` unless a concurrent click got there first; return the stored one."""
+
+    ttl = _ttl()
+    if not ttl:
+        return outcome
+    key = _key(purpose, token)
+    if cache.add(key, outcome, ttl):
+        return outcome
+    return cache.get(key) or outcome
+
+
+def is_prefetch(request: HttpRequest) -> bool:
+    if request.method == "HEAD":
+        return True
+    for header in PREFETCH_HEADERS:
+        value = request.META.get(header, "").lower()
+        if any(marker in value for marker in PREFETCH_VALUES):
+            return True
+    return False
+
+
+def prefetch_response() -> HttpResponse:
+    """Answer a prefetch of a valid link without acting on it (nor letting it be cached)."""
+
+    response = HttpResponse(status=204)
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+__all__ = ["cached_outcome", "is_prefetch", "prefetch_response", "remember_outcome", "token_digest"]
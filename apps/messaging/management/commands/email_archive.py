@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from apps.messaging.archive import archivable, archive_outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive les OutboxEmail SENT/FAILED/SUPPRESSED plus anciens que --days : corps compressés "
+        "et dédupliqués par hash, lignes retirées de la table chaude scannée par le drain."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None,
+                            help="Ancienneté minimale (défaut : MESSAGING_OUTBOX_ARCHIVE_AFTER_DAYS).")
+        parser.add_argument("--batch-size", dest="batch_size", type=int, default=None,
+                            help="Lignes par transaction (défaut : MESSAGING_OUTBOX_ARCHIVE_BATCH_SIZE).")
+        parser.add_argument("--limit", type=int, default=None, help="Nombre maximum de lignes à archiver.")
+        parser.add_argument("--dry-run", action="store_true", help="Compte seulement les lignes archivables.")
+
+    def handle(self, *args, **options) -> None:
+        if options["dry_run"]:
+            self.stdout.write(f"Archivables: {archivable(older_than_days=options['days']).count()}")
+            return
+        result = archive_outbox(
+            older_than_days=options["days"],
+            batch_size=options["batch_size"],
+            limit=options["limit"],
+        )
+        ratio = result.stored_bytes / result.body_bytes if result.body_bytes else 0.0
+        self.stdout.write(
+            f"Archivées: {result.archived}, nouveaux corps: {result.bodies_created}, "
+            f"{result.body_bytes} octets -> {result.stored_bytes} stockés ({ratio:.1%})"
+        )
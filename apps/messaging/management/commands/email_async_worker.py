@@ -0,0 +1,48 @@
+"""Deliver the outbox from an asyncio worker (many concurrent SMTP sessions, one process)."""
+from __future__ import annotations
+
+import signal
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+
+from apps.messaging.async_delivery import AsyncDeliveryWorker
+
+
+class Command(BaseCommand):
+    help = (
+        "Vide l'outbox avec un worker asyncio : jusqu'à --concurrency sessions SMTP simultanées "
+        "dans un seul processus, mêmes transitions de statut, EmailAttempt et relances que les "
+        "tâches Celery. SIGTERM/SIGINT : termine les envois en cours puis rend les autres lignes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=None,
+                            help="Sessions SMTP simultanées (défaut : MESSAGING_ASYNC_SMTP_CONCURRENCY).")
+        parser.add_argument("--batch-size", dest="batch_size", type=int, default=None,
+                            help="Lignes réclamées par tour (défaut : 4 x concurrency).")
+        parser.add_argument("--poll-interval", dest="poll_interval", type=float, default=1.0,
+                            help="Attente (s) quand rien n'est dû.")
+        parser.add_argument("--once", action="store_true", help="S'arrête dès que plus rien n'est dû.")
+        parser.add_argument("--max-messages", dest="max_messages", type=int, default=None,
+                            help="S'arrête après avoir réclamé ce nombre d'e-mails.")
+
+    def handle(self, *args, **options):
+        worker = AsyncDeliveryWorker(
+            concurrency=options["concurrency"],
+            batch_size=options["batch_size"],
+            poll_interval=options["poll_interval"],
+        )
+        previous = {}
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            previous[sig] = signal.signal(sig, lambda *_: worker.stop())
+        try:
+            async_to_sync(worker.run)(once=options["once"], max_messages=options["max_messages"])
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+
+        self.stdout.write(
+            f"Envoyés : {worker.sent}, échecs : {worker.failed}, connexions SMTP : {worker.connections} "
+            f"(concurrence {worker.concurrency})"
+        )
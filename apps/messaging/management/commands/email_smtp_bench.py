@@ -0,0 +1,165 @@
+"""Compare per-message (prefork task), batched and asyncio outbox delivery against a local SMTP sink."""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+import uuid
+from contextlib import ExitStack
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from apps.common.smtp_sink import SMTPSink
+from apps.messaging.async_delivery import AsyncDeliveryWorker
+from apps.messaging.models import OutboxEmail
+from apps.messaging.tasks import send_outbox_batch, send_outbox_email
+
+BENCH_NAMESPACE = "smtp-bench"
+MODES = ("per-message", "batch", "async")
+
+
+class _AiosmtpdSink:
+    """Same interface as SMTPSink on top of aiosmtpd (optional dependency)."""
+
+    def __init__(self, controller_cls, latency: float = 0.0) -> None:
+        sink = self
+
+        class Handler:
+            async def handle_EHLO(self, server, session, envelope, hostname, responses):
+                sink.connections += 1
+                session.host_name = hostname
+                return responses
+
+            async def handle_DATA(self, server, session, envelope):
+                if sink.latency:
+                    await asyncio.sleep(sink.latency)
+                sink.messages += 1
+                sink.recipients += len(envelope.rcpt_tos)
+                return "250 OK queued"
+
+        self.connections = self.messages = self.recipients = 0
+        self.latency = latency
+        self._controller = controller_cls(Handler(), hostname="127.0.0.1", port=0)
+
+    @property
+    def address(self):
+        return self._controller.hostname, self._controller.port
+
+    def __enter__(self) -> "_AiosmtpdSink":
+        self._controller.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._controller.stop()
+
+
+def _local_sink(kind: str, latency: float):
+    if kind == "aiosmtpd":
+        try:
+            from aiosmtpd.controller import Controller
+        except ImportError as exc:
+            raise CommandError("aiosmtpd n'est pas installé (pip install aiosmtpd) ; utilisez --sink thread.") from exc
+        return _AiosmtpdSink(Controller, latency)
+    return SMTPSink(latency=latency)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le débit d'envoi de l'outbox (une connexion SMTP par e-mail comme une tâche "
+        "prefork, lots sur une connexion persistante, worker asyncio à sessions concurrentes) "
+        "contre un puits SMTP local. Crée puis supprime ses propres "
+        f"OutboxEmail (namespace {BENCH_NAMESPACE!r}) ; aucune autre ligne n'est envoyée."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=200, help="E-mails par mode.")
+        parser.add_argument("--batch-size", dest="batch_size", type=int, default=50, help="E-mails par lot.")
+        parser.add_argument("--concurrency", type=int, default=20,
+                            help="Sessions SMTP simultanées du mode async.")
+        parser.add_argument("--latency-ms", dest="latency_ms", type=float, default=0.0,
+                            help="Délai de réponse du puits à DATA (simule un MTA distant).")
+        parser.add_argument("--modes", default=",".join(MODES), help=f"Parmi {', '.join(MODES)}.")
+        parser.add_argument("--sink", choices=("thread", "aiosmtpd"), default="thread",
+                            help="Puits local : serveur en thread (défaut) ou aiosmtpd.")
+        parser.add_argument("--json", action="store_true", help="Rapport JSON.")
+
+    def handle(self, *args, **options):
+        modes = [m.strip() for m in options["modes"].split(",") if m.strip()]
+        unknown = set(modes) - set(MODES)
+        if not modes or unknown:
+            raise CommandError(f"Mode inconnu : {', '.join(sorted(unknown)) or '(aucun)'}")
+        count = max(int(options["messages"]), 1)
+        batch_size = max(int(options["batch_size"]), 1)
+        concurrency = max(int(options["concurrency"]), 1)
+
+        report = []
+        with ExitStack() as stack:
+            sink = stack.enter_context(_local_sink(options["sink"], max(options["latency_ms"], 0.0) / 1000.0))
+            host, port = sink.address
+            stack.enter_context(override_settings(
+                EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+                EMAIL_HOST=host, EMAIL_PORT=port,
+                EMAIL_USE_SSL=False, EMAIL_USE_TLS=False,
+                EMAIL_HOST_USER="", EMAIL_HOST_PASSWORD="",
+            ))
+            for mode in modes:
+                before = (sink.connections, sink.messages)
+                ids = self._enqueue(count)
+                try:
+                    started = time.perf_counter()
+                    if mode == "batch":
+                        for offset in range(0, len(ids), batch_size):
+                            send_outbox_batch.apply(args=[ids[offset:offset + batch_size]])
+                    elif mode == "async":
+                        async_to_sync(AsyncDeliveryWorker(concurrency=concurrency).deliver)(ids)
+                    else:
+                        for outbox_id in ids:
+                            send_outbox_email.apply(args=[outbox_id])
+                    elapsed = time.perf_counter() - started
+                    sent = OutboxEmail.objects.filter(id__in=ids, status=OutboxEmail.Status.SENT).count()
+                finally:
+                    OutboxEmail.objects.filter(id__in=ids).delete()
+                report.append({
+                    "mode": mode,
+                    "messages": count,
+                    "sent": sent,
+                    "elapsed_s": elapsed,
+                    "per_second": sent / elapsed if elapsed else 0.0,
+                    "smtp_connections": sink.connections - before[0],
+                    "sink_messages": sink.messages - before[1],
+                })
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(f"{'mode':<12} {'sent':>6} {'conns':>6} {'elapsed':>9} {'msg/s':>8}")
+        for row in report:
+            self.stdout.write(
+                f"{row['mode']:<12} {row['sent']:>6} {row['smtp_connections']:>6} "
+                f"{row['elapsed_s']:>8.2f}s {row['per_second']:>8.1f}"
+            )
+
+    def _enqueue(self, count: int) -> list[int]:
+        run = uuid.uuid4().hex[:8]
+        rows = [
+            OutboxEmail(
+                namespace=BENCH_NAMESPACE,
+                purpose="bench",
+                dedup_key=f"{run}-{i}",
+                to=[f"bench+{i}@example.com"],
+                template_slug="bench",
+                rendered_subject=f"Bench {i}",
+                rendered_text="Corps de test",
+                rendered_html="<p>Corps de test</p>",
+                status=OutboxEmail.Status.SENDING,  # même état que les lignes réclamées par le drain
+            )
+            for i in range(count)
+        ]
+        OutboxEmail.objects.bulk_create(rows, batch_size=500)
+        return list(
+            OutboxEmail.objects.filter(namespace=BENCH_NAMESPACE, dedup_key__startswith=f"{run}-")
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
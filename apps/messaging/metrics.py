@@ -1,12 +1,46 @@
-"""Instrumentation helpers for messaging flows (password reset, etc.)."""
+"""Instrumentation helpers for messaging flows (password reset, delivery pipeline).
+
+Counters and histograms are recorded where the work happens (send tasks, async
+worker, rate limiters). Celery workers and web processes only share them through
+prometheus_client multiprocess mode: set ``PROMETHEUS_MULTIPROC_DIR`` for both.
+
+Outbox depth is not computed on scrape: ``refresh_outbox_snapshot`` (beat task
+``refresh_outbox_metrics``) runs one GROUP BY and stores the result in the cache,
+``OutboxSnapshotCollector`` turns it into gauges when ``render_metrics`` is called.
+"""
 from __future__ import annotations
 
-from typing import Any
+import os
+from collections import Counter as Tally
+from datetime import datetime
+from typing import Any, Iterable
+
+from django.core.cache import cache
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .models import OutboxEmail
 
 try:  # pragma: no cover - optional dependency
-    from prometheus_client import Counter  # type: ignore
+    from prometheus_client import (  # type: ignore
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        CollectorRegistry,
+        Counter,
+        Histogram,
+        generate_latest,
+    )
+    from prometheus_client.core import GaugeMetricFamily  # type: ignore
 except Exception:  # pragma: no cover - Prometheus not installed
-    Counter = None  # type: ignore
+    Counter = Histogram = GaugeMetricFamily = None  # type: ignore
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+OUTBOX_SNAPSHOT_CACHE_KEY = "messaging:metrics:outbox"
+OUTBOX_SNAPSHOT_TTL_SECONDS = 10 * 60
+
+_LATENCY_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 900, 1800, 3600, 4 * 3600, 24 * 3600)
+_ATTEMPT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+_BATCH_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
 
 
 def _build_counter(name: str, documentation: str, labelnames: list[str]) -> Any:
@@ -15,12 +49,57 @@ def _build_counter(name: str, documentation: str, labelnames: list[str]) -> Any:
     return Counter(name, documentation, labelnames=labelnames)
 
 
+def _build_histogram(name: str, documentation: str, labelnames: list[str], buckets: tuple) -> Any:
+    if Histogram is None:  # pragma: no cover - metrics disabled
+        return None
+    return Histogram(name, documentation, labelnames=labelnames, buckets=buckets)
+
+
 _RESET_EVENTS_COUNTER = _build_counter(
     "messaging_password_reset_events_total",
     "Password reset email pipeline events.",
     ["event"],
 )
 
+_ENQUEUE_TO_SEND = _build_histogram(
+    "messaging_outbox_enqueue_to_send_seconds",
+    "Time between outbox creation and successful delivery.",
+    ["namespace"],
+    _LATENCY_BUCKETS,
+)
+
+_ATTEMPT_SECONDS = _build_histogram(
+    "messaging_smtp_attempt_seconds",
+    "Duration of one delivery attempt (message build + SMTP conversation).",
+    ["outcome"],
+    _ATTEMPT_BUCKETS,
+)
+
+_SMTP_ERRORS = _build_counter(
+    "messaging_smtp_errors_total",
+    "Failed delivery attempts by classification.",
+    ["classification"],
+)
+
+_BATCH_SIZE = _build_histogram(
+    "messaging_delivery_batch_size",
+    "Emails handled per drain claim, SMTP batch or async delivery round.",
+    ["path"],
+    _BATCH_BUCKETS,
+)
+
+_RATE_LIMITED = _build_counter(
+    "messaging_rate_limited_total",
+    "Emails suppressed (user limiter) or deferred (delivery lanes) by limiter bucket.",
+    ["limiter", "bucket"],
+)
+
+_LANE_SLO_BREACHES = _build_counter(
+    "messaging_lane_slo_breaches_total",
+    "Drains that found a lane's oldest due email past its latency SLO.",
+    ["lane"],
+)
+
 
 def record_password_reset_event(event: str) -> None:
     if _RESET_EVENTS_COUNTER is None:  # pragma: no cover - metrics disabled
@@ -28,4 +107,120 @@ def record_password_reset_event(event: str) -> None:
     _RESET_EVENTS_COUNTER.labels(event=event).inc()
 
 
-__all__ = ["record_password_reset_event"]
+def record_delivery(*, namespace: str, created_at: datetime | None, started_at: datetime) -> None:
+    if _ENQUEUE_TO_SEND is None:  # pragma: no cover - metrics disabled
+        return
+    now = timezone.now()
+    if created_at is not None:
+        _ENQUEUE_TO_SEND.labels(namespace=namespace).observe(max((now - created_at).total_seconds(), 0.0))
+    _ATTEMPT_SECONDS.labels(outcome="sent").observe(max((now - started_at).total_seconds(), 0.0))
+
+
+def record_failed_attempt(*, classification: str, started_at: datetime) -> None:
+    if _SMTP_ERRORS is None:  # pragma: no cover - metrics disabled
+        return
+    _SMTP_ERRORS.labels(classification=classification).inc()
+    _ATTEMPT_SECONDS.labels(outcome="failed").observe(max((timezone.now() - started_at).total_seconds(), 0.0))
+
+
+def record_batch_size(path: str, size: int) -> None:
+    if _BATCH_SIZE is None or size <= 0:  # pragma: no cover - metrics disabled
+        return
+    _BATCH_SIZE.labels(path=path).observe(size)
+
+
+def record_rate_limited(limiter: str, buckets: Iterable[str]) -> None:
+    if _RATE_LIMITED is None:  # pragma: no cover - metrics disabled
+        return
+    for bucket, count in Tally(buckets).items():
+        _RATE_LIMITED.labels(limiter=limiter, bucket=bucket).inc(count)
+
+
+def record_lane_slo_breach(lane: str) -> None:
+    if _LANE_SLO_BREACHES is None:  # pragma: no cover - metrics disabled
+        return
+    _LANE_SLO_BREACHES.labels(lane=lane).inc()
+
+
+def refresh_outbox_snapshot() -> dict:
+    """Aggregate live outbox depth into the cache read by the scrape endpoint."""
+
+    now = timezone.now()
+    live = [OutboxEmail.Status.QUEUED, OutboxEmail.Status.RETRYING, OutboxEmail.Status.SENDING]
+    depth = (
+        OutboxEmail.objects.filter(status__in=live)
+        .order_by()
+        .values_list("status", "priority")
+        .annotate(count=Count("id"))
+    )
+    oldest_due = OutboxEmail.objects.due(as_of=now).order_by().aggregate(oldest=Min("scheduled_at"))["oldest"]
+    snapshot = {
+        "refreshed_at": now.timestamp(),
+        "depth": [[status, priority, count] for status, priority, count in depth],
+        "oldest_due_age": max((now - oldest_due).total_seconds(), 0.0) if oldest_due else 0.0,
+    }
+    cache.set(OUTBOX_SNAPSHOT_CACHE_KEY, snapshot, OUTBOX_SNAPSHOT_TTL_SECONDS)
+    return snapshot
+
+
+class OutboxSnapshotCollector:
+    """Expose the cached outbox snapshot as gauges (no DB access on scrape)."""
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        snapshot = cache.get(OUTBOX_SNAPSHOT_CACHE_KEY)
+        if not snapshot:
+            return
+        depth = GaugeMetricFamily(
+            "messaging_outbox_depth", "Live outbox rows by status and priority.", labels=["status", "priority"]
+        )
+        for status, priority, count in snapshot["depth"]:
+            depth.add_metric([status, str(priority)], count)
+        yield depth
+        yield GaugeMetricFamily(
+            "messaging_outbox_oldest_due_age_seconds",
+            "Age of the oldest due queued/retrying email.",
+            value=snapshot["oldest_due_age"],
+        )
+        yield GaugeMetricFamily(
+            "messaging_outbox_snapshot_timestamp_seconds",
+            "When the outbox depth snapshot was refreshed.",
+            value=snapshot["refreshed_at"],
+        )
+
+
+def metrics_enabled() -> bool:
+    return Counter is not None
+
+
+def render_metrics() -> bytes:
+    """Prometheus text exposition of the process (or multiprocess) registry plus outbox gauges."""
+
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        body = generate_latest(registry)
+    else:
+        body = generate_latest(REGISTRY)
+    snapshot_registry = CollectorRegistry(auto_describe=False)
+    snapshot_registry.register(OutboxSnapshotCollector())
+    return body + generate_latest(snapshot_registry)
+
+
+__all__ = [
+    "CONTENT_TYPE_LATEST",
+    "OutboxSnapshotCollector",
+    "metrics_enabled",
+    "record_batch_size",
+    "record_delivery",
+    "record_failed_attempt",
+    "record_lane_slo_breach",
+    "record_password_reset_event",
+    "record_rate_limited",
+    "refresh_outbox_snapshot",
+    "render_metrics",
+]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0005_outboxemail_flow_id_outboxemail_next_attempt_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='recipients_cursor',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
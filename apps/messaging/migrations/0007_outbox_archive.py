@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0006_campaign_recipients_cursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEmailBody',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archived email body',
+                'verbose_name_plural': 'Archived email bodies',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOutboxEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.PositiveBigIntegerField(unique=True)),
+                ('namespace', models.CharField(max_length=64)),
+                ('purpose', models.CharField(max_length=64)),
+                ('dedup_key', models.CharField(max_length=128)),
+                ('flow_id', models.CharField(blank=True, default='', max_length=32)),
+                ('to', models.JSONField(blank=True, default=list)),
+                ('cc', models.JSONField(blank=True, default=list)),
+                ('bcc', models.JSONField(blank=True, default=list)),
+                ('reply_to', models.JSONField(blank=True, default=list)),
+                ('locale', models.CharField(default='fr', max_length=12)),
+                ('template_slug', models.CharField(max_length=128)),
+                ('template_version', models.PositiveIntegerField(default=1)),
+                ('rendered_subject', models.CharField(blank=True, default='', max_length=255)),
+                ('context', models.JSONField(blank=True, default=dict)),
+                ('headers', models.JSONField(blank=True, default=dict)),
+                ('attachments', models.JSONField(blank=True, default=list)),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('retrying', 'Retrying'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed'), ('suppressed', 'Suppressed')], max_length=16)),
+                ('attempt_count', models.PositiveSmallIntegerField(default=0)),
+                ('attempts', models.JSONField(blank=True, default=list)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error_code', models.CharField(blank=True, max_length=64)),
+                ('last_error_message', models.CharField(blank=True, max_length=512)),
+                ('provider_message_id', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archived outbox email',
+                'verbose_name_plural': 'Archived outbox emails',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outboxemail',
+            index=models.Index(condition=models.Q(('status__in', ['queued', 'retrying'])), fields=['priority', 'scheduled_at', 'id'], name='outbox_live_due_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedoutboxemail',
+            name='html_body',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='messaging.archivedemailbody'),
+        ),
+        migrations.AddField(
+            model_name='archivedoutboxemail',
+            name='text_body',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='messaging.archivedemailbody'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedoutboxemail',
+            index=models.Index(fields=['namespace', 'dedup_key'], name='archived_outbox_dedup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedoutboxemail',
+            index=models.Index(fields=['created_at'], name='archived_outbox_created_idx'),
+        ),
+    ]
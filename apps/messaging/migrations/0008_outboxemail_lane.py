@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:42
+
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def backfill_bulk_lane(apps, schema_editor):
+    OutboxEmail = apps.get_model("messaging", "OutboxEmail")
+    OutboxEmail.objects.filter(Q(namespace="marketing") | Q(purpose__startswith="campaign:")).update(lane="bulk")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0007_outbox_archive'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='outboxemail',
+            name='outbox_live_due_idx',
+        ),
+        migrations.AddField(
+            model_name='outboxemail',
+            name='lane',
+            field=models.CharField(default='transactional', max_length=16),
+        ),
+        migrations.RunPython(backfill_bulk_lane, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='outboxemail',
+            index=models.Index(condition=models.Q(('status__in', ['queued', 'retrying'])), fields=['lane', 'priority', 'scheduled_at', 'id'], name='outbox_live_lane_due_idx'),
+        ),
+    ]
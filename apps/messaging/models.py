@@ -1,6 +1,7 @@
 """Database structures backing the transactional messaging system."""
 from __future__ import annotations
 
+import zlib
 from datetime import datetime
 from typing import Iterable, Optional
 
@@ -61,6 +62,7 @@ class OutboxEmail(models.Model):
     attachments = models.JSONField(default=list, blank=True)
     status = models.CharField(max_length=16, choices=Status.choices, default=Status.QUEUED)
     priority = models.PositiveSmallIntegerField(default=100)
+    lane = models.CharField(max_length=16, default="transactional")  # see messaging.lanes
     attempt_count = models.PositiveSmallIntegerField(default=0)
     scheduled_at = models.DateTimeField(default=timezone.now)
     next_attempt_at = models.DateTimeField(null=True, blank=True)
@@ -87,6 +89,12 @@ class OutboxEmail(models.Model):
             models.Index(fields=["status", "scheduled_at"], name="outbox_status_schedule_idx"),
             models.Index(fields=["namespace", "status"], name="outbox_namespace_status_idx"),
             models.Index(fields=["locked_at"], name="outbox_locked_idx"),
+            # due_ordered() per lane on live rows only: history never enters the drain index.
+            models.Index(
+                fields=["lane", "priority", "scheduled_at", "id"],
+                name="outbox_live_lane_due_idx",
+                condition=models.Q(status__in=["queued", "retrying"]),
+            ),
         ]
         verbose_name = "Outbox email"
         verbose_name_plural = "Outbox emails"
@@ -164,6 +172,78 @@ class EmailAttempt(models.Model):
         verbose_name_plural = "Email attempts"
 
 
+class ArchivedEmailBody(models.Model):
+    """zlib-compressed rendered body, stored once per content hash."""
+
+    digest = models.CharField(max_length=64, primary_key=True)  # sha256 of the UTF-8 text
+    data = models.BinaryField()
+    size = models.PositiveIntegerField(default=0)  # uncompressed bytes
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Archived email body"
+        verbose_name_plural = "Archived email bodies"
+
+    @property
+    def text(self) -> str:
+        return zlib.decompress(bytes(self.data)).decode("utf-8")
+
+
+class ArchivedOutboxEmail(models.Model):
+    """Terminal OutboxEmail moved out of the hot table by ``archive.archive_outbox``."""
+
+    original_id = models.PositiveBigIntegerField(unique=True)
+    namespace = models.CharField(max_length=64)
+    purpose = models.CharField(max_length=64)
+    dedup_key = models.CharField(max_length=128)
+    flow_id = models.CharField(max_length=32, blank=True, default="")
+    to = models.JSONField(default=list, blank=True)
+    cc = models.JSONField(default=list, blank=True)
+    bcc = models.JSONField(default=list, blank=True)
+    reply_to = models.JSONField(default=list, blank=True)
+    locale = models.CharField(max_length=12, default="fr")
+    template_slug = models.CharField(max_length=128)
+    template_version = models.PositiveIntegerField(default=1)
+    rendered_subject = models.CharField(max_length=255, blank=True, default="")
+    html_body = models.ForeignKey(
+        ArchivedEmailBody, null=True, blank=True, related_name="+", on_delete=models.PROTECT
+    )
+    text_body = models.ForeignKey(
+        ArchivedEmailBody, null=True, blank=True, related_name="+", on_delete=models.PROTECT
+    )
+    context = models.JSONField(default=dict, blank=True)
+    headers = models.JSONField(default=dict, blank=True)
+    attachments = models.JSONField(default=list, blank=True)
+    metadata = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=16, choices=OutboxEmail.Status.choices)
+    attempt_count = models.PositiveSmallIntegerField(default=0)
+    attempts = models.JSONField(default=list, blank=True)  # EmailAttempt rows, oldest first
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error_code = models.CharField(max_length=64, blank=True)
+    last_error_message = models.CharField(max_length=512, blank=True)
+    provider_message_id = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["namespace", "dedup_key"], name="archived_outbox_dedup_idx"),
+            models.Index(fields=["created_at"], name="archived_outbox_created_idx"),
+        ]
+        verbose_name = "Archived outbox email"
+        verbose_name_plural = "Archived outbox emails"
+
+    @property
+    def rendered_html(self) -> str:
+        return self.html_body.text if self.html_body_id else ""
+
+    @property
+    def rendered_text(self) -> str:
+        return self.text_body.text if self.text_body_id else ""
+
+
 class EmailTemplateQuerySet(models.QuerySet):
     def active(self) -> "EmailTemplateQuerySet":
         return self.filter(is_active=True)
@@ -258,6 +338,8 @@ class Campaign(models.Model):
     status = models.CharField(max_length=16, choices=Status.choices, default=Status.DRAFT)
     batch_size = models.PositiveIntegerField(default=500)
     dry_run = models.BooleanField(default=False)
+    # Keyset cursor of build_recipients: last StudentProfile id already scanned.
+    recipients_cursor = models.PositiveBigIntegerField(default=0)
     metadata = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
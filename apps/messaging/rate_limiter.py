@@ -3,14 +3,14 @@ from __future__ import annotations
 import logging
 import time
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Mapping, MutableMapping, Sequence
+from typing import Any, Dict, Iterable, List, Mapping, MutableMapping, Optional, Sequence, Tuple
 
 from django.conf import settings
 from django.core.cache import cache
-from django.utils import timezone
 
+from apps.messaging import metrics as messaging_metrics
 from apps.messaging.models import OutboxEmail
+from apps.messaging.token_bucket import Bucket, get_limiter, refund
 
 logger = logging.getLogger("apps.messaging.rate_limiter")
 
@@ -45,30 +45,38 @@ class RateLimitDecision:
 
 
 class EmailRateLimiter:
-    """Helper to throttle transactional emails per purpose/user."""
+    """Helper to throttle transactional emails per purpose/user.
 
-    @classmethod
-    def evaluate(cls, *, user_id: int, purpose: str) -> RateLimitDecision:
+    Admission uses a token bucket (``max_per_window`` burst, refilled over
+    ``window_seconds``). The fixed-window ``bucket``/``sequence`` pair only gives each
+    email a stable identity for its dedup key. With ``include_failed=False`` the
+    token of an email that ends up failed or suppressed is given back by the send task.
+    """
+
+    @staticmethod
+    def _config(purpose: str) -> Tuple[int, int, bool]:
         config = settings.EMAIL_RATE_LIMIT.get(purpose, {})
         window = max(1, int(config.get("window_seconds", 300)))
         max_per = max(1, int(config.get("max_per_window", 5)))
         include_failed = bool(config.get("include_failed", True))
+        return window, max_per, include_failed
+
+    @staticmethod
+    def _bucket(user_id: int, purpose: str, *, window: int, max_per: int) -> Bucket:
+        return Bucket(key=f"emailrate:tb:{purpose}:{user_id}", capacity=max_per, period=window)
+
+    @classmethod
+    def evaluate(cls, *, user_id: int, purpose: str) -> RateLimitDecision:
+        window, max_per, include_failed = cls._config(purpose)
 
-        now = int(time.time())
+        clock = time.time()
+        now = int(clock)
         bucket = now // window
         cache_key = f"emailrate:{purpose}:{user_id}:{bucket}"
         sequence = cls._increment(cache_key, window)
 
-        allowed = sequence <= max_per
-        if not allowed and not include_failed:
-            if cls._has_capacity_after_failures(
-                user_id=user_id,
-                purpose=purpose,
-                bucket=bucket,
-                window_seconds=window,
-                max_per_window=max_per,
-            ):
-                allowed = True
+        result = get_limiter().take([cls._bucket(user_id, purpose, window=window, max_per=max_per)], now=clock)
+        allowed = result.allowed
 
         return RateLimitDecision(
             user_id=user_id,
@@ -116,6 +124,7 @@ class EmailRateLimiter:
             status=OutboxEmail.Status.SUPPRESSED,
             metadata=dict(meta),
         )
+        messaging_metrics.record_rate_limited("user", [decision.purpose])
         logger.warning(
             "email_rate_limit_suppressed",
             extra={
@@ -144,23 +153,119 @@ class EmailRateLimiter:
                     pass
         return int(value)
 
+    @classmethod
+    def release_failed(cls, outbox: OutboxEmail) -> bool:
+        """Refund the user's token for a failed send when the policy excludes failures."""
+        metadata = outbox.metadata if isinstance(outbox.metadata, dict) else {}
+        user_id = metadata.get("user_id")
+        if not user_id or "rate_limit" not in metadata or outbox.purpose not in settings.EMAIL_RATE_LIMIT:
+            return False
+        window, max_per, include_failed = cls._config(outbox.purpose)
+        if include_failed:
+            return False
+        refund([cls._bucket(user_id, outbox.purpose, window=window, max_per=max_per)], now=time.time())
+        return True
+
+
+# (id, to, purpose, metadata) as read by the outbox drain
+Candidate = Tuple[int, Sequence[str], str, Any]
+
+
+def _lane_label(key: str) -> str:
+    """Metric label of a delivery bucket key; per-user lanes collapse to "user"."""
+    lane = key.split(":", 1)[1] if key.startswith("emaildeliver:") else key
+    return "user" if lane.startswith("user:") else lane
+
+
+def _domain(address: str) -> str:
+    _, _, domain = str(address).strip().rpartition("@")
+    return domain.lower().rstrip(">")
+
+
+class DeliveryThrottle:
+    """Per-lane token buckets checked by the outbox drain before claiming a message.
+
+    ``MESSAGING_DELIVERY_RATE_LIMITS`` lanes (``"600/min"`` rates, empty = unlimited):
+
+    - ``domains``: per recipient domain, ``default_domain`` for the others;
+    - ``purposes``: per purpose, or per family (``campaign`` for ``campaign:<slug>``);
+    - ``user``: per ``metadata.user_id``.
+
+    A message is claimed only when every lane has a token; the others stay queued and
+    are rescheduled to when their lane refills, so workers only get deliverable mail.
+    """
+
     @staticmethod
-    def _has_capacity_after_failures(
-        *,
-        user_id: int,
-        purpose: str,
-        bucket: int,
-        window_seconds: int,
-        max_per_window: int,
-    ) -> bool:
-        window_start_ts = bucket * window_seconds
-        window_start = datetime.fromtimestamp(window_start_ts, tz=timezone.utc)
-        recent = OutboxEmail.objects.filter(
-            purpose=purpose,
-            metadata__user_id=user_id,
-            created_at__gte=window_start,
+    def _config() -> Dict[str, Any]:
+        return getattr(settings, "MESSAGING_DELIVERY_RATE_LIMITS", None) or {}
+
+    @classmethod
+    def enabled(cls) -> bool:
+        config = cls._config()
+        return bool(
+            config.get("domains") or config.get("default_domain") or config.get("purposes") or config.get("user")
         )
-        successful_like = recent.exclude(
-            status__in=[OutboxEmail.Status.FAILED, OutboxEmail.Status.SUPPRESSED]
-        ).count()
-        return successful_like < max_per_window
+
+    @classmethod
+    def buckets_for(cls, *, to: Iterable[str], purpose: str, user_id: Any = None) -> List[Bucket]:
+        config = cls._config()
+        buckets: List[Bucket] = []
+        domains = config.get("domains") or {}
+        default_domain = config.get("default_domain") or ""
+        for domain in sorted({_domain(address) for address in to or []} - {""}):
+            bucket = Bucket.from_rate(f"emaildeliver:domain:{domain}", domains.get(domain, default_domain))
+            if bucket:
+                buckets.append(bucket)
+        purposes = config.get("purposes") or {}
+        lane = purpose if purpose in purposes else purpose.split(":", 1)[0]
+        bucket = Bucket.from_rate(f"emaildeliver:purpose:{lane}", purposes.get(lane))
+        if bucket:
+            buckets.append(bucket)
+        if user_id:
+            bucket = Bucket.from_rate(f"emaildeliver:user:{user_id}", config.get("user"))
+            if bucket:
+                buckets.append(bucket)
+        return buckets
+
+    @classmethod
+    def select(
+        cls,
+        candidates: Iterable[Candidate],
+        limit: int,
+        *,
+        now: Optional[float] = None,
+    ) -> Tuple[List[int], Dict[int, float]]:
+        """Return (ids to claim, {deferred id: seconds until its lane refills}).
+
+        Stops right after the ``limit``-th admitted row: candidates past it are not
+        read, so a shared iterator can be resumed by the caller.
+        """
+        if limit <= 0:
+            return [], {}
+        clock = time.time() if now is None else now
+        limiter = get_limiter()
+        selected: List[int] = []
+        deferred: Dict[int, float] = {}
+        exhausted: Dict[str, float] = {}
+        blocked_by: Dict[int, str] = {}
+        for outbox_id, to, purpose, metadata in candidates:
+            user_id = metadata.get("user_id") if isinstance(metadata, dict) else None
+            buckets = cls.buckets_for(to=to, purpose=purpose, user_id=user_id)
+            # An empty lane stays empty for this pass: skip the round-trip.
+            key = next((b.key for b in buckets if b.key in exhausted), None)
+            if key is not None:
+                deferred[outbox_id] = exhausted[key]
+                blocked_by[outbox_id] = key
+                continue
+            result = limiter.take(buckets, now=clock)
+            if result.allowed:
+                selected.append(outbox_id)
+                if len(selected) >= limit:
+                    break
+            else:
+                exhausted[result.key] = result.retry_after
+                deferred[outbox_id] = result.retry_after
+                blocked_by[outbox_id] = result.key
+        if deferred:
+            messaging_metrics.record_rate_limited("delivery", [_lane_label(key) for key in blocked_by.values()])
+        return selected, deferred
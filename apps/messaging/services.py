@@ -4,17 +4,19 @@ from __future__ import annotations
 import hashlib
 import json
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence
 
 from celery import current_app
 from django.db import IntegrityError, transaction
-from django.template import Context, Template
+from django.template import Context
 from django.utils import timezone
 
 from .exceptions import DeduplicationConflictError, TemplateNotFoundError
+from .lanes import lane_for
 from .models import EmailTemplate, OutboxEmail
+from . import template_cache
 
 
 log = logging.getLogger("messaging.services")
@@ -31,12 +33,27 @@ class EmailComposition:
     template: EmailTemplate
 
 
+@dataclass(frozen=True)
+class BulkEmail:
+    """One recipient of a bulk enqueue; ``context`` is merged over the shared base context."""
+
+    to: List[str]
+    dedup_key: str
+    context: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class BulkEnqueueResult:
+    created: int
+    skipped: int
+
+
 class TemplateService:
     """Resolve and render templates stored in the database."""
 
     @staticmethod
     def resolve(slug: str, locale: str) -> EmailTemplate:
-        template = EmailTemplate.objects.latest_for(slug, locale)
+        template = template_cache.resolve(slug, locale, lambda: EmailTemplate.objects.latest_for(slug, locale))
         if template is None:
             raise TemplateNotFoundError(f"No active template for slug='{slug}' locale='{locale}'")
         return template
@@ -44,15 +61,13 @@ class TemplateService:
     @staticmethod
     def render(template: EmailTemplate, context: Optional[Dict[str, Any]] = None) -> EmailComposition:
         ctx = dict(context or {})
-        # Render subject separately to avoid HTML escaping differences.
-        subject_template = Template(template.subject)
-        html_template = Template(template.html_template)
-        text_template = Template(template.text_template)
+        # Compiled once per template version; render subject separately to avoid HTML escaping differences.
+        compiled = template_cache.get_compiled(template)
 
         subj_ctx = Context(ctx)
-        subject = subject_template.render(subj_ctx).strip()
-        html_body = html_template.render(Context(ctx))
-        text_body = text_template.render(Context(ctx))
+        subject = compiled.subject.render(subj_ctx).strip()
+        html_body = compiled.html.render(Context(ctx))
+        text_body = compiled.text.render(Context(ctx))
 
         return EmailComposition(
             subject=subject,
@@ -153,6 +168,7 @@ class EmailService:
             "attachments": attachments or [],
             "scheduled_at": scheduled_at or timezone.now(),
             "priority": priority,
+            "lane": lane_for(namespace, purpose),
             "metadata": metadata or {},
         }
 
@@ -172,6 +188,77 @@ class EmailService:
         except IntegrityError as exc:  # pragma: no cover - defensive
             raise DeduplicationConflictError("Outbox deduplication conflict") from exc
 
+    @classmethod
+    def bulk_enqueue(
+        cls,
+        *,
+        namespace: str,
+        purpose: str,
+        template_slug: str,
+        messages: Sequence[BulkEmail],
+        locale: str = "fr",
+        base_context: Optional[Dict[str, Any]] = None,
+        subject_override: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        scheduled_at: Optional[datetime] = None,
+        priority: int = 100,
+    ) -> BulkEnqueueResult:
+        """Enqueue many e-mails built from one template with explicit dedup keys.
+
+        The template is resolved and compiled once; recipients without their own
+        context share a single rendering. Existing dedup keys are looked up with one
+        ``IN`` query and the missing rows are inserted with ``bulk_create``
+        (``ignore_conflicts`` covers a concurrent insert of the same key).
+        """
+
+        if not messages:
+            return BulkEnqueueResult(created=0, skipped=0)
+        template = TemplateService.resolve(template_slug, locale)
+        base = dict(base_context or {})
+        shared = TemplateService.render(template, base)
+
+        keys = [message.dedup_key for message in messages]
+        existing = set(
+            OutboxEmail.objects.filter(namespace=namespace, dedup_key__in=keys).values_list("dedup_key", flat=True)
+        )
+        now = timezone.now()
+        lane = lane_for(namespace, purpose)
+        rows: List[OutboxEmail] = []
+        for message in messages:
+            if message.dedup_key in existing:
+                continue
+            recipients = cls._serialise_addresses(message.to)
+            if not recipients:
+                continue
+            existing.add(message.dedup_key)  # duplicates inside the batch
+            composition = shared if not message.context else TemplateService.render(template, {**base, **message.context})
+            rows.append(
+                OutboxEmail(
+                    namespace=namespace,
+                    purpose=purpose,
+                    dedup_key=message.dedup_key,
+                    to=recipients,
+                    locale=locale,
+                    template_slug=template.slug,
+                    template_version=template.version,
+                    subject_override=subject_override or "",
+                    rendered_subject=subject_override or composition.subject,
+                    rendered_html=composition.html_body,
+                    rendered_text=composition.text_body,
+                    context=composition.context,
+                    scheduled_at=scheduled_at or now,
+                    priority=priority,
+                    lane=lane,
+                    metadata=dict(metadata or {}),
+                )
+            )
+
+        if rows:
+            OutboxEmail.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+            transaction.on_commit(schedule_outbox_drain)
+        return BulkEnqueueResult(created=len(rows), skipped=len(messages) - len(rows))
+
+
 def schedule_outbox_drain() -> None:
     """Schedule the Celery drain task, working even when running eagerly."""
 
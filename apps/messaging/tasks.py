@@ -2,8 +2,10 @@
 from __future__ import annotations
 
 import logging
+import math
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Iterable, List
+from typing import Deque, Dict, Iterable, Iterator, List
 
 from celery import shared_task
 from django.conf import settings
@@ -11,19 +13,25 @@ from django.core.mail import EmailMultiAlternatives, get_connection
 from django.db import connection, transaction
 from django.utils import timezone
 
+from .archive import archive_outbox
 from .campaigns import CampaignService
 from .exceptions import TemplateNotFoundError
+from .lanes import allocate, configured_lanes, route as lane_route
 from .models import Campaign, EmailAttempt, OutboxEmail
+from .rate_limiter import DeliveryThrottle, EmailRateLimiter
 from .services import EmailService, TemplateService
 from . import metrics as messaging_metrics
 
-from smtplib import SMTPRecipientsRefused
+from smtplib import SMTPConnectError, SMTPException, SMTPRecipientsRefused, SMTPServerDisconnected
 
 log = logging.getLogger("messaging.tasks")
 
 
 DEFAULT_MAX_ATTEMPTS = 5
 DEFAULT_RETRY_INTERVAL_SECONDS = 5 * 60
+# Due rows scanned per drain slot when delivery lanes are throttled, so that a
+# saturated lane (e.g. one recipient domain) does not starve the others.
+DRAIN_SCAN_FACTOR = 4
 
 
 def _retry_config() -> tuple[int, int]:
@@ -147,6 +155,70 @@ def _update_terminal_state(outbox: OutboxEmail, *, classification: str, error: s
     )
 
 
+def _record_success(outbox: OutboxEmail, *, provider_id: str, started_at: datetime) -> None:
+    outbox.mark_sent(provider_id=provider_id)
+    _record_attempt(
+        outbox,
+        status=EmailAttempt.Status.SUCCESS,
+        started_at=started_at,
+    )
+    log.info("outbox_sent", extra={"outbox_id": outbox.id, "flow_id": outbox.flow_id})
+    messaging_metrics.record_password_reset_event("sent")
+    messaging_metrics.record_delivery(namespace=outbox.namespace, created_at=outbox.created_at, started_at=started_at)
+
+
+def _record_failure(
+    outbox: OutboxEmail,
+    *,
+    classification: str,
+    error: str,
+    started_at: datetime,
+) -> int | None:
+    """Record a failed attempt and move the email to RETRYING or SUPPRESSED.
+
+    Returns the retry countdown (seconds) when another attempt is scheduled, ``None``
+    when the failure is terminal.
+    """
+
+    max_attempts, retry_interval = _retry_config()
+    _record_attempt(
+        outbox,
+        status=EmailAttempt.Status.FAILURE,
+        error_message=error,
+        started_at=started_at,
+    )
+    messaging_metrics.record_failed_attempt(classification=classification, started_at=started_at)
+
+    if _should_retry(classification) and outbox.attempt_count < max_attempts:
+        next_eta = timezone.now() + timedelta(seconds=retry_interval)
+        _update_retry_state(outbox, classification=classification, error=error, next_eta=next_eta)
+        log.info(
+            "outbox_retry_scheduled",
+            extra={
+                "outbox_id": outbox.id,
+                "flow_id": outbox.flow_id,
+                "attempt": outbox.attempt_count,
+                "classification": classification,
+                "next_eta": next_eta.isoformat(),
+            },
+        )
+        return retry_interval
+
+    _update_terminal_state(outbox, classification=classification, error=error)
+    EmailRateLimiter.release_failed(outbox)
+    log.warning(
+        "outbox_terminal",
+        extra={
+            "outbox_id": outbox.id,
+            "flow_id": outbox.flow_id,
+            "classification": classification,
+            "attempt": outbox.attempt_count,
+        },
+    )
+    messaging_metrics.record_password_reset_event(classification)
+    return None
+
+
 @shared_task(bind=True, max_retries=4, acks_late=True)
 def send_outbox_email(self, outbox_id: int) -> None:
     """Send a single OutboxEmail and record the attempt."""
@@ -167,94 +239,168 @@ def send_outbox_email(self, outbox_id: int) -> None:
         log.info("outbox_already_sent", extra={"outbox_id": outbox_id})
         return
 
-    max_attempts, retry_interval = _retry_config()
-
     try:
         message = _build_message(outbox)
         sent = get_connection().send_messages([message])
         provider_id = getattr(message, "extra_headers", {}).get("Message-ID", "")
     except Exception as exc:
-        error_message = str(exc)
-        classification = _classify_smtp_error(exc)
-        _record_attempt(
+        countdown = _record_failure(
             outbox,
-            status=EmailAttempt.Status.FAILURE,
-            error_message=error_message,
+            classification=_classify_smtp_error(exc),
+            error=str(exc),
             started_at=start,
         )
-
-        if _should_retry(classification) and outbox.attempt_count < max_attempts:
-            next_eta = timezone.now() + timedelta(seconds=retry_interval)
-            _update_retry_state(outbox, classification=classification, error=error_message, next_eta=next_eta)
-            log.info(
-                "outbox_retry_scheduled",
-                extra={
-                    "outbox_id": outbox.id,
-                    "flow_id": outbox.flow_id,
-                    "attempt": outbox.attempt_count,
-                    "classification": classification,
-                    "next_eta": next_eta.isoformat(),
-                },
-            )
-            raise self.retry(exc=exc, countdown=retry_interval)
-
-        _update_terminal_state(outbox, classification=classification, error=error_message)
-        log.warning(
-            "outbox_terminal",
-            extra={
-                "outbox_id": outbox.id,
-                "flow_id": outbox.flow_id,
-                "classification": classification,
-                "attempt": outbox.attempt_count,
-            },
-        )
-        messaging_metrics.record_password_reset_event(classification)
+        if countdown is not None:
+            raise self.retry(exc=exc, countdown=countdown)
         return
 
     if sent:
-        outbox.mark_sent(provider_id=provider_id)
-        _record_attempt(
-            outbox,
-            status=EmailAttempt.Status.SUCCESS,
-            started_at=start,
-        )
-        log.info("outbox_sent", extra={"outbox_id": outbox_id, "flow_id": outbox.flow_id})
-        messaging_metrics.record_password_reset_event("sent")
-    else:  # pragma: no cover - defensive
-        error = "SMTP backend returned 0"
-        _record_attempt(
-            outbox,
-            status=EmailAttempt.Status.FAILURE,
-            error_message=error,
-            started_at=start,
-        )
-        if outbox.attempt_count < max_attempts:
-            next_eta = timezone.now() + timedelta(seconds=retry_interval)
-            _update_retry_state(outbox, classification="smtp_error", error=error, next_eta=next_eta)
-            log.warning(
-                "outbox_retry_scheduled",
-                extra={
-                    "outbox_id": outbox.id,
-                    "flow_id": outbox.flow_id,
-                    "attempt": outbox.attempt_count,
-                    "classification": "smtp_error",
-                    "next_eta": next_eta.isoformat(),
-                },
-            )
-            raise self.retry(exc=RuntimeError(error), countdown=retry_interval)
-
-        _update_terminal_state(outbox, classification="smtp_error", error=error)
-        log.warning(
-            "outbox_terminal",
-            extra={
-                "outbox_id": outbox.id,
-                "flow_id": outbox.flow_id,
-                "classification": "smtp_error",
-                "attempt": outbox.attempt_count,
-            },
-        )
-        messaging_metrics.record_password_reset_event("smtp_error")
+        _record_success(outbox, provider_id=provider_id, started_at=start)
         return
+
+    error = "SMTP backend returned 0"
+    countdown = _record_failure(outbox, classification="smtp_error", error=error, started_at=start)
+    if countdown is not None:
+        raise self.retry(exc=RuntimeError(error), countdown=countdown)
+
+
+DEFAULT_SMTP_BATCH_SIZE = 50
+DEFAULT_SMTP_MAX_RECONNECTS = 3
+
+
+def _batch_delivery_enabled() -> bool:
+    return bool(getattr(settings, "MESSAGING_SMTP_BATCH_DELIVERY", False))
+
+
+def _smtp_batch_size() -> int:
+    return max(int(getattr(settings, "MESSAGING_SMTP_BATCH_SIZE", DEFAULT_SMTP_BATCH_SIZE)), 1)
+
+
+def _is_transport_error(exc: Exception) -> bool:
+    """Connection-level failure (drop, timeout, refused connect) as opposed to an SMTP reply."""
+
+    if isinstance(exc, (SMTPServerDisconnected, SMTPConnectError)):
+        return True
+    return isinstance(exc, OSError) and not isinstance(exc, SMTPException)
+
+
+class PooledSMTPConnection:
+    """One email backend connection reused for a whole batch.
+
+    The connection is opened lazily and kept open between messages. A transport
+    error closes it and the message is retried once on a fresh connection, up to
+    ``max_reconnects`` times per batch; SMTP replies (refused recipient, bounce
+    limit...) are raised unchanged so the usual classification applies.
+    """
+
+    def __init__(self, *, max_reconnects: int = DEFAULT_SMTP_MAX_RECONNECTS) -> None:
+        self._conn = None
+        self.opened = 0
+        self.reconnects_left = max(max_reconnects, 0)
+
+    @property
+    def exhausted(self) -> bool:
+        return self._conn is None and self.reconnects_left == 0 and self.opened > 0
+
+    def _connection(self):
+        if self._conn is None:
+            conn = get_connection()
+            self.opened += 1
+            conn.open()
+            self._conn = conn
+        return self._conn
+
+    def send(self, message: EmailMultiAlternatives) -> int:
+        try:
+            return self._connection().send_messages([message])
+        except Exception as exc:
+            if not _is_transport_error(exc):
+                raise
+            self.close()
+            if self.reconnects_left == 0:
+                raise
+            self.reconnects_left -= 1
+            log.info("outbox_smtp_reconnect", extra={"error": str(exc)[:200], "left": self.reconnects_left})
+        try:
+            return self._connection().send_messages([message])
+        except Exception as exc:
+            if _is_transport_error(exc):
+                self.close()
+            raise
+
+    def close(self) -> None:
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        try:
+            conn.close()
+        except Exception:  # pragma: no cover - best effort on a broken socket
+            pass
+
+
+def _release(outbox_ids: List[int]) -> int:
+    """Hand claimed-but-unsent emails back to the next drain."""
+
+    return OutboxEmail.objects.filter(id__in=outbox_ids, status=OutboxEmail.Status.SENDING).update(
+        status=OutboxEmail.Status.QUEUED,
+        locked_at=None,
+        locked_by="",
+    )
+
+
+@shared_task(bind=True, ignore_result=True, acks_late=True)
+def send_outbox_batch(self, outbox_ids: List[int]) -> int:
+    """Send a batch of claimed OutboxEmail rows over one persistent SMTP connection.
+
+    Attempts and retry/terminal transitions are the same as ``send_outbox_email``;
+    retries are not re-published as Celery retries, the drain picks RETRYING rows up
+    again once ``scheduled_at`` is reached.
+    """
+
+    worker_id = f"send:{self.request.id}"
+    by_id = {outbox.id: outbox for outbox in OutboxEmail.objects.filter(id__in=outbox_ids)}
+    batch = [by_id[outbox_id] for outbox_id in outbox_ids if outbox_id in by_id]
+    messaging_metrics.record_batch_size("smtp_batch", len(batch))
+    pool = PooledSMTPConnection(
+        max_reconnects=int(getattr(settings, "MESSAGING_SMTP_MAX_RECONNECTS", DEFAULT_SMTP_MAX_RECONNECTS)),
+    )
+    sent_count = 0
+    try:
+        for index, outbox in enumerate(batch):
+            if pool.exhausted:
+                released = _release([item.id for item in batch[index:]])
+                log.warning("outbox_batch_aborted", extra={"released": released, "connections": pool.opened})
+                break
+            if outbox.status == OutboxEmail.Status.SENT:
+                log.info("outbox_already_sent", extra={"outbox_id": outbox.id})
+                continue
+
+            start = timezone.now()
+            outbox.attempt_count += 1
+            outbox.locked_at = start
+            outbox.locked_by = worker_id
+            outbox.save(update_fields=["attempt_count", "locked_at", "locked_by", "updated_at"])
+            try:
+                message = _build_message(outbox)
+                sent = pool.send(message)
+                provider_id = getattr(message, "extra_headers", {}).get("Message-ID", "")
+            except Exception as exc:
+                _record_failure(outbox, classification=_classify_smtp_error(exc), error=str(exc), started_at=start)
+                continue
+
+            if sent:
+                _record_success(outbox, provider_id=provider_id, started_at=start)
+                sent_count += 1
+            else:  # pragma: no cover - defensive
+                _record_failure(outbox, classification="smtp_error", error="SMTP backend returned 0", started_at=start)
+    finally:
+        pool.close()
+
+    log.info(
+        "outbox_batch_delivered",
+        extra={"count": len(batch), "sent": sent_count, "connections": pool.opened},
+    )
+    return sent_count
 
 
 def _record_attempt(
@@ -270,48 +416,101 @@ def _record_attempt(
         error_message=error_message or "",
         duration_ms=int((timezone.now() - started_at).total_seconds() * 1000),
     )
-@shared_task(bind=True, ignore_result=True, acks_late=True)
-def drain_outbox_batch(self, limit: int = 100) -> None:
-    """Fetch queued emails, mark them as sending, and trigger send tasks."""
+
+
+def _consume(rows: Deque[tuple]) -> Iterator[tuple]:
+    while rows:
+        yield rows.popleft()
+
+
+def _claim_due(limit: int, *, worker_id: str) -> Dict[str, List[int]]:
+    """Mark up to ``limit`` due emails as SENDING for ``worker_id``; returns ids per lane.
+
+    Each delivery lane is read with its own query and the batch is shared by lane
+    weight (see ``messaging.lanes``). Rows whose delivery throttle is empty are
+    rescheduled instead of being claimed.
+    """
 
     now = timezone.now()
-    worker_id = f"drain:{self.request.id}"
-    ids: List[int]
+    throttled = DeliveryThrottle.enabled()
+    scan = limit * DRAIN_SCAN_FACTOR if throttled else limit
+    fields = ("id", "scheduled_at", "to", "purpose", "metadata") if throttled else ("id", "scheduled_at")
+    lanes = configured_lanes()
+    deferred: Dict[int, float] = {}
 
-    if connection.vendor == "sqlite":
-        ids = list(
-            OutboxEmail.objects.due_ordered(as_of=now)
-            .filter(locked_at__isnull=True)
-            .values_list("id", flat=True)[:limit]
-        )
-        OutboxEmail.objects.filter(id__in=ids).update(
-            status=OutboxEmail.Status.SENDING,
-            locked_at=now,
-            locked_by=worker_id,
-        )
-    else:
-        with transaction.atomic():
-            due = (
-                OutboxEmail.objects.due_ordered(as_of=now)
-                .select_for_update(skip_locked=True)
-                .filter(locked_at__isnull=True)[:limit]
-            )
-            ids = list(due.values_list("id", flat=True))
-            if ids:
-                OutboxEmail.objects.filter(id__in=ids).update(
-                    status=OutboxEmail.Status.SENDING,
-                    locked_at=now,
-                    locked_by=worker_id,
-                )
+    def take(rows: Deque[tuple], count: int) -> List[int]:
+        if not throttled:
+            return [rows.popleft()[0] for _ in range(min(count, len(rows)))]
+        selected, lane_deferred = DeliveryThrottle.select(
+            ((row[0], row[2], row[3], row[4]) for row in _consume(rows)), count
+        )
+        deferred.update(lane_deferred)
+        return selected
+
+    with transaction.atomic():
+        due = OutboxEmail.objects.due_ordered(as_of=now).filter(locked_at__isnull=True)
+        if connection.vendor != "sqlite":
+            due = due.select_for_update(skip_locked=True)
+        candidates = {lane.name: list(due.filter(lane=lane.name).values_list(*fields)[:scan]) for lane in lanes}
+        claimed, late = allocate(lanes, candidates, limit, now=now, take=take)
+        ids = [outbox_id for lane_ids in claimed.values() for outbox_id in lane_ids]
+        if ids:
+            OutboxEmail.objects.filter(id__in=ids).update(
+                status=OutboxEmail.Status.SENDING,
+                locked_at=now,
+                locked_by=worker_id,
+            )
+
+    if deferred:
+        _defer_throttled(deferred, now=now)
+    for lane_name in late:
+        log.warning("outbox_lane_slo_breach", extra={"lane": lane_name, "claimed": len(claimed[lane_name])})
+        messaging_metrics.record_lane_slo_breach(lane_name)
+    return {lane_name: lane_ids for lane_name, lane_ids in claimed.items() if lane_ids}
+
+
+@shared_task(bind=True, ignore_result=True, acks_late=True)
+def drain_outbox_batch(self, limit: int = 100) -> None:
+    """Fetch queued emails, mark them as sending, and trigger send tasks.
+
+    With ``MESSAGING_SMTP_BATCH_DELIVERY`` the claimed ids are split into
+    ``send_outbox_batch`` chunks (one SMTP connection each) instead of one task
+    and one connection per email. Send tasks of a lane with a ``queue`` in
+    ``MESSAGING_DELIVERY_LANES`` are published to that queue.
+    """
+
+    claimed = _claim_due(limit, worker_id=f"drain:{self.request.id}")
+    ids = [outbox_id for lane_ids in claimed.values() for outbox_id in lane_ids]
+    messaging_metrics.record_batch_size("drain", len(ids))
 
     if not ids:
         log.debug("outbox_empty", extra={"limit": limit})
         return
 
-    for outbox_id in ids:
-        send_outbox_email.delay(outbox_id)
+    batch_size = _smtp_batch_size() if _batch_delivery_enabled() else None
+    for lane_name, lane_ids in claimed.items():
+        options = lane_route(lane_name)
+        if batch_size:
+            for offset in range(0, len(lane_ids), batch_size):
+                send_outbox_batch.apply_async(args=[lane_ids[offset:offset + batch_size]], **options)
+        else:
+            for outbox_id in lane_ids:
+                send_outbox_email.apply_async(args=[outbox_id], **options)
 
-    log.info("outbox_batch_scheduled", extra={"count": len(ids)})
+    log.info("outbox_batch_scheduled", extra={"count": len(ids), "lanes": {k: len(v) for k, v in claimed.items()}})
+
+
+def _defer_throttled(deferred: Dict[int, float], *, now: datetime) -> None:
+    """Push rows whose delivery lane is empty back to when a token is available."""
+
+    by_delay: Dict[int, List[int]] = defaultdict(list)
+    for outbox_id, wait in deferred.items():
+        by_delay[max(1, math.ceil(wait))].append(outbox_id)
+    for delay, outbox_ids in by_delay.items():
+        OutboxEmail.objects.filter(id__in=outbox_ids, locked_at__isnull=True).update(
+            scheduled_at=now + timedelta(seconds=delay)
+        )
+    log.info("outbox_throttled", extra={"count": len(deferred), "max_delay": max(by_delay)})
 
 
 @shared_task(bind=True, ignore_result=True)
@@ -381,3 +580,20 @@ def process_campaign(self, campaign_id: int, limit: int | None = None) -> None:
     processed = CampaignService.enqueue_batch(campaign, limit=limit)
     if processed == 0:
         CampaignService.complete_if_done(campaign)
+        return
+    # Keep fanning out batch after batch; PAUSED/COMPLETED is re-checked on each hop.
+    process_campaign.delay(campaign_id, limit=limit)
+
+
+@shared_task(bind=True, ignore_result=True)
+def archive_outbox_emails(self, older_than_days: int | None = None) -> int:
+    """Move terminal outbox rows past the retention horizon to cold storage."""
+
+    return archive_outbox(older_than_days=older_than_days).archived
+
+
+@shared_task(bind=True, ignore_result=True)
+def refresh_outbox_metrics(self) -> None:
+    """Refresh the cached outbox depth served by the metrics endpoint."""
+
+    messaging_metrics.refresh_outbox_snapshot()
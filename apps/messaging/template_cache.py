@@ -0,0 +1,120 @@
+"""In-process caches for EmailTemplate resolution and compiled Django templates.
+
+Compiled templates are keyed by ``(slug, locale, version, updated_at)``: an edited or
+new version never hits a stale entry, the LRU bound only limits memory. Resolution
+(``slug, locale`` -> active EmailTemplate) is kept for ``MESSAGING_TEMPLATE_RESOLVE_TTL``
+seconds; both caches are cleared on EmailTemplate save/delete, on
+``FileSystemTemplateLoader.sync`` and by the admin (de)activation actions.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.template import Template
+
+from .models import EmailTemplate
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_RESOLVE_TTL_SECONDS = 30
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    subject: Template
+    html: Template
+    text: Template
+
+
+_lock = threading.Lock()
+_compiled: "OrderedDict[tuple, CompiledTemplate]" = OrderedDict()
+_resolved: Dict[Tuple[str, str], Tuple[float, EmailTemplate]] = {}
+
+
+def _max_entries() -> int:
+    return max(int(getattr(settings, "MESSAGING_TEMPLATE_CACHE_SIZE", DEFAULT_MAX_ENTRIES)), 1)
+
+
+def _resolve_ttl() -> float:
+    return float(getattr(settings, "MESSAGING_TEMPLATE_RESOLVE_TTL", DEFAULT_RESOLVE_TTL_SECONDS))
+
+
+def cache_key(template: EmailTemplate) -> Optional[tuple]:
+    if template.pk is None or template.updated_at is None:
+        return None  # unsaved template: content not pinned by a version
+    return (template.slug, template.locale, template.version, template.updated_at)
+
+
+def compile_template(template: EmailTemplate) -> CompiledTemplate:
+    return CompiledTemplate(
+        subject=Template(template.subject),
+        html=Template(template.html_template),
+        text=Template(template.text_template),
+    )
+
+
+def get_compiled(template: EmailTemplate) -> CompiledTemplate:
+    key = cache_key(template)
+    if key is None:
+        return compile_template(template)
+    with _lock:
+        hit = _compiled.get(key)
+        if hit is not None:
+            _compiled.move_to_end(key)
+            return hit
+    # Compile outside the lock; a concurrent miss only costs a duplicate compile.
+    compiled = compile_template(template)
+    with _lock:
+        _compiled[key] = compiled
+        _compiled.move_to_end(key)
+        limit = _max_entries()
+        while len(_compiled) > limit:
+            _compiled.popitem(last=False)
+    return compiled
+
+
+def resolve(slug: str, locale: str, loader: Callable[[], Optional[EmailTemplate]]) -> Optional[EmailTemplate]:
+    """Return the cached resolution for (slug, locale) or call ``loader``; misses are not cached."""
+
+    ttl = _resolve_ttl()
+    if ttl <= 0:
+        return loader()
+    key = (slug, locale)
+    now = time.monotonic()
+    with _lock:
+        entry = _resolved.get(key)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    template = loader()
+    if template is not None:
+        with _lock:
+            if len(_resolved) >= _max_entries():
+                _resolved.clear()
+            _resolved[key] = (now + ttl, template)
+    return template
+
+
+def invalidate_template_cache() -> None:
+    with _lock:
+        _compiled.clear()
+        _resolved.clear()
+
+
+@receiver(post_save, sender=EmailTemplate, dispatch_uid="messaging_template_cache_save")
+@receiver(post_delete, sender=EmailTemplate, dispatch_uid="messaging_template_cache_delete")
+def _invalidate_on_change(sender, **kwargs) -> None:
+    invalidate_template_cache()
+
+
+__all__ = [
+    "CompiledTemplate",
+    "get_compiled",
+    "invalidate_template_cache",
+    "resolve",
+]
@@ -8,6 +8,7 @@ from typing import Iterable, Optional
 from django.conf import settings
 
 from .models import EmailTemplate
+from .template_cache import invalidate_template_cache
 
 
 @dataclass
@@ -81,6 +82,7 @@ class FileSystemTemplateLoader:
                 metadata={"sources": definition.source_paths},
             )
             updated.append(template)
+        invalidate_template_cache()
         return updated
 
     @staticmethod
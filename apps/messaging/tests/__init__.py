@@ -0,0 +1,19 @@
+"""Shared fixtures for the messaging tests."""
+from __future__ import annotations
+
+from apps.messaging.models import OutboxEmail
+
+
+def make_outbox(key: str, *, to: str = "user@example.com", **fields) -> OutboxEmail:
+    """Create a rendered ``OutboxEmail`` (queued ``accounts/reset`` by default); ``fields`` override."""
+    values = {
+        "namespace": "accounts",
+        "purpose": "reset",
+        "dedup_key": key,
+        "to": [to],
+        "template_slug": "accounts/reset",
+        "rendered_subject": "subject",
+        "rendered_text": "body",
+    }
+    values.update(fields)
+    return OutboxEmail.objects.create(**values)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.messaging.archive import archive_outbox
+from apps.messaging.models import ArchivedEmailBody, ArchivedOutboxEmail, EmailAttempt, OutboxEmail
+from apps.messaging.tasks import drain_outbox_batch
+from apps.messaging.tests import make_outbox
+
+HTML = "<html><body>" + "<p>Bonjour, voici les nouveautés du mois.</p>" * 50 + "</body></html>"
+
+
+def _outbox(key: str, status: str, *, age_days: int = 0, html: str = HTML) -> OutboxEmail:
+    outbox = make_outbox(key, status=status, rendered_html=html, rendered_text="Bonjour")
+    if age_days:
+        OutboxEmail.objects.filter(pk=outbox.pk).update(updated_at=timezone.now() - timedelta(days=age_days))
+    return outbox
+
+
+class OutboxArchiveTests(TestCase):
+    def test_moves_old_terminal_rows_with_shared_bodies(self) -> None:
+        old = [_outbox(f"old{i}", OutboxEmail.Status.SENT, age_days=120) for i in range(3)]
+        failed = _outbox("failed", OutboxEmail.Status.FAILED, age_days=120, html="<p>autre</p>")
+        EmailAttempt.objects.create(outbox=failed, status=EmailAttempt.Status.FAILURE, error_message="550")
+        recent = _outbox("recent", OutboxEmail.Status.SENT, age_days=2)
+        queued = _outbox("queued", OutboxEmail.Status.QUEUED, age_days=120)
+
+        result = archive_outbox(older_than_days=90, batch_size=2)
+
+        self.assertEqual(result.archived, 4)
+        self.assertEqual(
+            set(OutboxEmail.objects.values_list("id", flat=True)), {recent.id, queued.id}
+        )
+        self.assertFalse(EmailAttempt.objects.filter(outbox_id=failed.id).exists())
+        # 2 distinct HTML bodies + 1 shared text body
+        self.assertEqual(ArchivedEmailBody.objects.count(), 3)
+        self.assertLess(result.stored_bytes, result.body_bytes / 10)
+
+        archived = ArchivedOutboxEmail.objects.get(original_id=old[0].id)
+        self.assertEqual(archived.rendered_html, HTML)
+        self.assertEqual(archived.rendered_text, "Bonjour")
+        self.assertEqual(archived.html_body_id, ArchivedOutboxEmail.objects.get(original_id=old[2].id).html_body_id)
+        archived_failed = ArchivedOutboxEmail.objects.get(original_id=failed.id)
+        self.assertEqual(archived_failed.status, OutboxEmail.Status.FAILED)
+        self.assertEqual([a["error_message"] for a in archived_failed.attempts], ["550"])
+
+    def test_rerun_is_idempotent_and_drain_ignores_history(self) -> None:
+        _outbox("a", OutboxEmail.Status.SENT, age_days=120)
+        self.assertEqual(archive_outbox(older_than_days=90).archived, 1)
+        self.assertEqual(archive_outbox(older_than_days=90).archived, 0)
+
+        _outbox("b", OutboxEmail.Status.SENT, age_days=120)
+        archive_outbox(older_than_days=90)
+        self.assertEqual(ArchivedEmailBody.objects.count(), 2)
+        self.assertEqual(ArchivedOutboxEmail.objects.count(), 2)
+
+        with mock.patch("apps.messaging.tasks.send_outbox_email.apply_async") as send:
+            drain_outbox_batch.apply(kwargs={"limit": 10}).get()
+        send.assert_not_called()
+
+    def test_command_dry_run(self) -> None:
+        _outbox("a", OutboxEmail.Status.SUPPRESSED, age_days=120)
+        out = StringIO()
+        call_command("email_archive", "--days", "90", "--dry-run", stdout=out)
+        self.assertIn("Archivables: 1", out.getvalue())
+        self.assertEqual(ArchivedOutboxEmail.objects.count(), 0)
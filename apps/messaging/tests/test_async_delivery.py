@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+from io import StringIO
+from smtplib import SMTPRecipientsRefused
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from apps.messaging.async_delivery import AsyncDeliveryWorker
+from apps.messaging.models import EmailAttempt, OutboxEmail
+from apps.messaging.tests import make_outbox
+from apps.messaging.tests.test_batch_delivery import FakeConnection, _claimed
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class AsyncDeliveryWorkerTests(TestCase):
+    def setUp(self) -> None:
+        FakeConnection.instances = []
+        FakeConnection.calls = 0
+
+    def test_run_once_drains_due_mail(self) -> None:
+        for i in range(7):
+            make_outbox(f"a{i}")
+
+        worker = AsyncDeliveryWorker(concurrency=3, batch_size=4)
+        self.assertEqual(async_to_sync(worker.run)(once=True), 7)
+
+        self.assertEqual(len(mail.outbox), 7)
+        self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.Status.SENT).count(), 7)
+        self.assertEqual(EmailAttempt.objects.filter(status=EmailAttempt.Status.SUCCESS).count(), 7)
+        self.assertEqual(set(OutboxEmail.objects.values_list("attempt_count", flat=True)), {1})
+
+    @override_settings(PASSWORD_RESET_MAX_ATTEMPTS=5, PASSWORD_RESET_RETRY_INTERVAL_SECONDS=300)
+    def test_failures_use_task_classification(self) -> None:
+        bounce, unknown, ok = _claimed("b"), _claimed("u"), _claimed("ok")
+        script = {
+            0: SMTPRecipientsRefused({"user@example.com": (550, b"5.4.6 Hourly Bounce Limit Exceeded")}),
+            1: SMTPRecipientsRefused({"user@example.com": (550, b"5.1.1 User unknown")}),
+        }
+        worker = AsyncDeliveryWorker(concurrency=1)
+
+        with mock.patch("apps.messaging.tasks.get_connection", side_effect=lambda: FakeConnection(script)):
+            self.assertEqual(async_to_sync(worker.deliver)([bounce.id, unknown.id, ok.id]), 1)
+
+        bounce.refresh_from_db()
+        unknown.refresh_from_db()
+        self.assertEqual((bounce.status, bounce.last_error_code), (OutboxEmail.Status.RETRYING, "bounce_limit"))
+        self.assertEqual((unknown.status, unknown.last_error_code), (OutboxEmail.Status.SUPPRESSED, "recipient_unknown"))
+        self.assertEqual(OutboxEmail.objects.get(id=ok.id).status, OutboxEmail.Status.SENT)
+        self.assertEqual(worker.failed, 2)
+
+    @override_settings(MESSAGING_SMTP_MAX_RECONNECTS=0)
+    def test_dead_sessions_release_unsent_rows(self) -> None:
+        ids = [_claimed(f"d{i}").id for i in range(5)]
+        worker = AsyncDeliveryWorker(concurrency=2)
+
+        with mock.patch("apps.messaging.tasks.get_connection", side_effect=lambda: FakeConnection(fail_open=True)):
+            self.assertEqual(async_to_sync(worker.deliver)(ids), 0)
+
+        statuses = list(OutboxEmail.objects.filter(id__in=ids).values_list("status", flat=True))
+        self.assertEqual(statuses.count(OutboxEmail.Status.RETRYING), 2)
+        self.assertEqual(statuses.count(OutboxEmail.Status.QUEUED), 3)
+
+
+class AsyncBenchTests(TestCase):
+    def test_async_mode_keeps_one_connection_per_session(self) -> None:
+        out = StringIO()
+        call_command(
+            "email_smtp_bench", "--messages", "6", "--modes", "per-message,async",
+            "--concurrency", "3", "--latency-ms", "5", "--json", stdout=out,
+        )
+        report = {row["mode"]: row for row in json.loads(out.getvalue())}
+
+        self.assertEqual(report["async"]["sent"], 6)
+        self.assertEqual(report["async"]["smtp_connections"], 3)
+        self.assertEqual(report["per-message"]["smtp_connections"], 6)
+        self.assertFalse(OutboxEmail.objects.filter(namespace="smtp-bench").exists())
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import json
+from io import StringIO
+from smtplib import SMTPRecipientsRefused, SMTPServerDisconnected
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from apps.messaging.models import EmailAttempt, OutboxEmail
+from apps.messaging.tasks import drain_outbox_batch, send_outbox_batch
+from apps.messaging.tests import make_outbox
+
+
+def _claimed(key: str) -> OutboxEmail:
+    return make_outbox(key, status=OutboxEmail.Status.SENDING)
+
+
+class FakeConnection:
+    """Records opens; ``script`` maps the n-th send call (across connections) to an exception."""
+
+    instances: list["FakeConnection"] = []
+    calls = 0
+
+    def __init__(self, script=None, fail_open: bool = False) -> None:
+        self.script = script or {}
+        self.fail_open = fail_open
+        self.closed = False
+        FakeConnection.instances.append(self)
+
+    def open(self):
+        if self.fail_open:
+            raise ConnectionRefusedError("connection refused")
+        return True
+
+    def send_messages(self, messages):
+        call, FakeConnection.calls = FakeConnection.calls, FakeConnection.calls + 1
+        if call in self.script:
+            raise self.script[call]
+        return len(messages)
+
+    def close(self):
+        self.closed = True
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class BatchDeliveryTests(TestCase):
+    def setUp(self) -> None:
+        FakeConnection.instances = []
+        FakeConnection.calls = 0
+
+    @override_settings(MESSAGING_SMTP_BATCH_DELIVERY=True, MESSAGING_SMTP_BATCH_SIZE=2)
+    def test_drain_sends_batches_over_one_connection_each(self) -> None:
+        for i in range(5):
+            make_outbox(f"k{i}")
+
+        with mock.patch("apps.messaging.tasks.get_connection", wraps=mail.get_connection) as get_conn:
+            drain_outbox_batch.apply(kwargs={"limit": 10}).get()
+
+        self.assertEqual(get_conn.call_count, 3)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.Status.SENT).count(), 5)
+        self.assertEqual(EmailAttempt.objects.filter(status=EmailAttempt.Status.SUCCESS).count(), 5)
+
+    def test_reconnects_after_dropped_connection(self) -> None:
+        ids = [_claimed(f"r{i}").id for i in range(3)]
+        script = {1: SMTPServerDisconnected("Connection unexpectedly closed")}
+
+        with mock.patch("apps.messaging.tasks.get_connection", side_effect=lambda: FakeConnection(script)):
+            self.assertEqual(send_outbox_batch.apply(args=[ids]).get(), 3)
+
+        self.assertEqual(len(FakeConnection.instances), 2)
+        self.assertTrue(FakeConnection.instances[0].closed)
+        self.assertEqual(OutboxEmail.objects.filter(id__in=ids, status=OutboxEmail.Status.SENT).count(), 3)
+        self.assertEqual(EmailAttempt.objects.filter(status=EmailAttempt.Status.FAILURE).count(), 0)
+
+    @override_settings(PASSWORD_RESET_MAX_ATTEMPTS=5, PASSWORD_RESET_RETRY_INTERVAL_SECONDS=300)
+    def test_smtp_replies_keep_classification(self) -> None:
+        bounce, unknown, ok = _claimed("b"), _claimed("u"), _claimed("ok")
+        script = {
+            0: SMTPRecipientsRefused({"user@example.com": (550, b"5.4.6 Hourly Bounce Limit Exceeded")}),
+            1: SMTPRecipientsRefused({"user@example.com": (550, b"5.1.1 User unknown")}),
+        }
+
+        with mock.patch("apps.messaging.tasks.get_connection", side_effect=lambda: FakeConnection(script)):
+            send_outbox_batch.apply(args=[[bounce.id, unknown.id, ok.id]]).get()
+
+        self.assertEqual(len(FakeConnection.instances), 1)
+        bounce.refresh_from_db()
+        unknown.refresh_from_db()
+        ok.refresh_from_db()
+        self.assertEqual((bounce.status, bounce.last_error_code), (OutboxEmail.Status.RETRYING, "bounce_limit"))
+        self.assertIsNotNone(bounce.next_attempt_at)
+        self.assertEqual((unknown.status, unknown.last_error_code), (OutboxEmail.Status.SUPPRESSED, "recipient_unknown"))
+        self.assertEqual(ok.status, OutboxEmail.Status.SENT)
+        self.assertEqual(bounce.attempts.get().status, EmailAttempt.Status.FAILURE)
+
+    @override_settings(MESSAGING_SMTP_MAX_RECONNECTS=1)
+    def test_unreachable_server_releases_the_rest_of_the_batch(self) -> None:
+        ids = [_claimed(f"d{i}").id for i in range(4)]
+
+        with mock.patch("apps.messaging.tasks.get_connection", side_effect=lambda: FakeConnection(fail_open=True)):
+            self.assertEqual(send_outbox_batch.apply(args=[ids]).get(), 0)
+
+        first = OutboxEmail.objects.get(id=ids[0])
+        self.assertEqual(first.status, OutboxEmail.Status.RETRYING)
+        self.assertEqual(first.attempt_count, 1)
+        rest = OutboxEmail.objects.filter(id__in=ids[1:])
+        self.assertEqual(set(rest.values_list("status", flat=True)), {OutboxEmail.Status.QUEUED})
+        self.assertEqual(set(rest.values_list("attempt_count", flat=True)), {0})
+        self.assertFalse(rest.filter(locked_at__isnull=False).exists())
+
+
+class SMTPBenchCommandTests(TestCase):
+    def test_batch_mode_reuses_connections(self) -> None:
+        out = StringIO()
+        call_command("email_smtp_bench", "--messages", "6", "--batch-size", "3", "--json", stdout=out)
+        report = {row["mode"]: row for row in json.loads(out.getvalue())}
+
+        self.assertEqual(report["per-message"]["sent"], 6)
+        self.assertEqual(report["batch"]["sent"], 6)
+        self.assertEqual(report["per-message"]["smtp_connections"], 6)
+        self.assertEqual(report["batch"]["smtp_connections"], 2)
+        self.assertEqual(report["batch"]["sink_messages"], 6)
+        self.assertFalse(OutboxEmail.objects.filter(namespace="smtp-bench").exists())
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from apps.accounts.models import StudentProfile
@@ -36,6 +38,27 @@ class CampaignServiceTests(TestCase):
         emails = list(self.campaign.recipients.values_list("email", flat=True))
         self.assertEqual(emails, ["optin@example.com"])
 
+    def test_build_recipients_advances_cursor_incrementally(self) -> None:
+        users = []
+        for i in range(3):
+            user = UserModel.objects.create_user(username=f"fan{i}", email=f"Fan{i}@Example.com", password="x")
+            profile, _ = StudentProfile.objects.get_or_create(user=user)
+            StudentProfile.objects.filter(pk=profile.pk).update(marketing_opt_in=True)
+            users.append(user)
+        # already present (other case): NOT EXISTS skips it without a conflict
+        CampaignRecipient.objects.create(campaign=self.campaign, email="fan0@example.com")
+
+        self.assertEqual(CampaignService.build_recipients(self.campaign, limit=2), 2)
+        cursor = Campaign.objects.get(pk=self.campaign.pk).recipients_cursor
+        self.assertEqual(cursor, StudentProfile.objects.get(user=users[1]).id)
+
+        self.assertEqual(CampaignService.build_recipients(self.campaign, limit=2), 1)
+        self.assertEqual(CampaignService.build_recipients(self.campaign), 0)
+        self.assertEqual(
+            sorted(self.campaign.recipients.values_list("email", flat=True)),
+            ["fan0@example.com", "fan1@example.com", "fan2@example.com", "optin@example.com"],
+        )
+
     @override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
     def test_enqueue_batch_creates_outbox_entries(self) -> None:
         CampaignService.build_recipients(self.campaign)
@@ -58,3 +81,72 @@ class CampaignServiceTests(TestCase):
             OutboxEmail.objects.filter(dedup_key__startswith=f"campaign:{self.campaign.id}:").count(),
             0,
         )
+
+
+class CampaignBulkFanOutTests(TestCase):
+    def setUp(self) -> None:
+        FileSystemTemplateLoader().sync()
+        self.campaign = Campaign.objects.create(
+            name="Promo",
+            slug="promo-bulk",
+            template_slug="marketing/promo",
+            locale="fr",
+            scheduled_at=timezone.now(),
+            status=Campaign.Status.RUNNING,
+            batch_size=10,
+            metadata={"context": {"campaign_name": "Rentrée"}},
+        )
+        CampaignRecipient.objects.bulk_create(
+            CampaignRecipient(campaign=self.campaign, email=f"r{i}@example.com") for i in range(7)
+        )
+        CampaignRecipient.objects.filter(email="r0@example.com").update(
+            metadata={"context": {"user_first_name": "Lina"}}
+        )
+
+    @override_settings(MESSAGING_CAMPAIGN_CHUNK_SIZE=3)
+    def test_enqueue_batch_bulk_inserts_in_chunks(self) -> None:
+        # r1 was already enqueued by an interrupted run: no duplicate row.
+        OutboxEmail.objects.create(
+            namespace="marketing", purpose="x", dedup_key=f"campaign:{self.campaign.id}:r1@example.com",
+            to=["r1@example.com"], template_slug="marketing/promo",
+        )
+
+        with self.captureOnCommitCallbacks(execute=False):
+            count = CampaignService.enqueue_batch(self.campaign, limit=5)
+
+        self.assertEqual(count, 5)
+        keys = set(OutboxEmail.objects.filter(namespace="marketing").values_list("dedup_key", flat=True))
+        self.assertEqual(keys, {f"campaign:{self.campaign.id}:r{i}@example.com" for i in range(5)})
+        self.assertEqual(
+            self.campaign.recipients.filter(status=CampaignRecipient.Status.QUEUED).count(), 5
+        )
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.metadata["progress"]["processed"], 5)
+        self.assertEqual(self.campaign.metadata["context"], {"campaign_name": "Rentrée"})
+
+        lina = OutboxEmail.objects.get(dedup_key=f"campaign:{self.campaign.id}:r0@example.com")
+        other = OutboxEmail.objects.get(dedup_key=f"campaign:{self.campaign.id}:r2@example.com")
+        self.assertIn("Bonjour Lina", lina.rendered_text)
+        self.assertIn("Rentrée", other.rendered_subject)
+        self.assertEqual(other.metadata, {"campaign_id": self.campaign.id})
+
+    @override_settings(MESSAGING_CAMPAIGN_CHUNK_SIZE=100)
+    def test_chunk_query_count_does_not_grow_with_recipients(self) -> None:
+        with self.captureOnCommitCallbacks(execute=False), CaptureQueriesContext(connection) as ctx:
+            CampaignService.enqueue_batch(self.campaign, limit=7)
+
+        sql = [q["sql"] for q in ctx.captured_queries]
+        self.assertLessEqual(len(sql), 12)
+        self.assertEqual(sum(1 for q in sql if q.startswith("INSERT") and '"messaging_outboxemail"' in q.split("(", 1)[0]), 1)
+        self.assertEqual(sum(1 for q in sql if q.startswith('UPDATE "messaging_campaignrecipient"')), 1)
+
+    def test_process_campaign_fans_out_until_complete(self) -> None:
+        from apps.messaging.tasks import process_campaign
+
+        with self.captureOnCommitCallbacks(execute=False):
+            process_campaign.apply(args=[self.campaign.id], kwargs={"limit": 3})
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, Campaign.Status.COMPLETED)
+        self.assertFalse(self.campaign.recipients.filter(status=CampaignRecipient.Status.PENDING).exists())
+        self.assertEqual(OutboxEmail.objects.filter(namespace="marketing").count(), 7)
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.accounts.models import StudentProfile
+from apps.messaging import link_cache
+from apps.messaging.constants import (
+    TOKEN_NAMESPACE_ACCOUNTS,
+    TOKEN_PURPOSE_UNSUBSCRIBE,
+    TOKEN_PURPOSE_VERIFY_EMAIL,
+)
+from apps.messaging.tokens import TokenService
+
+UserModel = get_user_model()
+
+
+def _token(purpose: str, user_id: int) -> str:
+    return TokenService.make_signed(namespace=TOKEN_NAMESPACE_ACCOUNTS, purpose=purpose, claims={"user_id": user_id})
+
+
+@override_settings(ROOT_URLCONF="alfenna.urls", MESSAGING_LINK_RESULT_CACHE_SECONDS=300)
+class LinkResultCacheTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = UserModel.objects.create_user(username="linkuser", email="link@example.com", password="x" * 12)
+        StudentProfile.objects.update_or_create(
+            user=self.user, defaults={"email_verified": False, "marketing_opt_in": True, "marketing_opt_out_at": None}
+        )
+        self.verify_url = reverse("messaging:verify-email")
+        self.unsubscribe_url = reverse("messaging:unsubscribe")
+
+    def test_repeated_click_replays_first_outcome_without_queries(self) -> None:
+        token = _token(TOKEN_PURPOSE_VERIFY_EMAIL, self.user.id)
+        first = self.client.get(self.verify_url, {"t": token, "redirect": 0})
+        self.assertEqual(first.status_code, 200)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.verify_url, {"t": token, "redirect": 0})
+        self.assertEqual(second.json(), first.json())
+
+    def test_cache_key_is_token_digest(self) -> None:
+        token = _token(TOKEN_PURPOSE_UNSUBSCRIBE, self.user.id)
+        self.client.get(self.unsubscribe_url, {"t": token})
+        keys = [key for key in cache._cache if "messaging:link:" in key]  # LocMemCache
+        self.assertEqual(len(keys), 1)
+        self.assertIn(link_cache.token_digest(token), keys[0])
+        self.assertNotIn(token, keys[0])
+
+    def test_rejected_outcome_is_replayed(self) -> None:
+        token = _token(TOKEN_PURPOSE_UNSUBSCRIBE, 987654)
+        first = self.client.get(self.unsubscribe_url, {"t": token})
+        with self.assertNumQueries(0):
+            second = self.client.get(self.unsubscribe_url, {"t": token})
+        self.assertEqual(first.status_code, 400)
+        self.assertEqual(second.json(), first.json())
+
+    def test_forged_token_is_not_cached(self) -> None:
+        response = self.client.get(self.unsubscribe_url, {"t": "forged:token"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIsNone(link_cache.cached_outcome(TOKEN_PURPOSE_UNSUBSCRIBE, "forged:token"))
+
+    def test_head_and_prefetch_do_not_act_on_the_link(self) -> None:
+        token = _token(TOKEN_PURPOSE_UNSUBSCRIBE, self.user.id)
+        with self.assertNumQueries(0):
+            head = self.client.head(self.unsubscribe_url, {"t": token})
+            prefetch = self.client.get(self.unsubscribe_url, {"t": token}, HTTP_SEC_PURPOSE="prefetch;prerender")
+        self.assertEqual(head.status_code, 204)
+        self.assertEqual(prefetch.status_code, 204)
+        self.assertEqual(prefetch["Cache-Control"], "no-store")
+        self.assertTrue(StudentProfile.objects.get(user=self.user).marketing_opt_in)
+        self.assertIsNone(link_cache.cached_outcome(TOKEN_PURPOSE_UNSUBSCRIBE, token))
+
+        self.assertEqual(self.client.get(self.unsubscribe_url, {"t": token}).status_code, 200)
+        self.assertFalse(StudentProfile.objects.get(user=self.user).marketing_opt_in)
+
+    def test_prefetch_of_verify_link_never_redirects(self) -> None:
+        response = self.client.get(self.verify_url, {"t": "bad"}, HTTP_PURPOSE="prefetch")
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn("accounts:verification_error", self.client.session.keys())
+
+    @override_settings(MESSAGING_LINK_RESULT_CACHE_SECONDS=0)
+    def test_zero_ttl_disables_cache(self) -> None:
+        token = _token(TOKEN_PURPOSE_VERIFY_EMAIL, self.user.id)
+        self.client.get(self.verify_url, {"t": token, "redirect": 0})
+        self.assertIsNone(link_cache.cached_outcome(TOKEN_PURPOSE_VERIFY_EMAIL, token))
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import unittest
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.messaging import metrics
+from apps.messaging.models import OutboxEmail
+from apps.messaging.rate_limiter import DeliveryThrottle
+from apps.messaging.tasks import drain_outbox_batch
+from apps.messaging.tests import make_outbox
+
+
+def _sample(name: str, **labels) -> float:
+    from prometheus_client import REGISTRY
+
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@unittest.skipUnless(metrics.metrics_enabled(), "prometheus_client not installed")
+@override_settings(
+    EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    MESSAGING_METRICS_TOKEN="scrape-token",
+)
+class PipelineMetricsTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_delivery_records_latency_and_batch_size(self) -> None:
+        sent_before = _sample("messaging_outbox_enqueue_to_send_seconds_count", namespace="accounts")
+        attempts_before = _sample("messaging_smtp_attempt_seconds_count", outcome="sent")
+        batches_before = _sample("messaging_delivery_batch_size_sum", path="drain")
+        for i in range(3):
+            make_outbox(f"m{i}", scheduled_at=timezone.now() - timedelta(seconds=30))
+
+        drain_outbox_batch.apply(kwargs={"limit": 10}).get()
+
+        self.assertEqual(_sample("messaging_outbox_enqueue_to_send_seconds_count", namespace="accounts") - sent_before, 3)
+        self.assertEqual(_sample("messaging_smtp_attempt_seconds_count", outcome="sent") - attempts_before, 3)
+        self.assertEqual(_sample("messaging_delivery_batch_size_sum", path="drain") - batches_before, 3)
+
+    @override_settings(MESSAGING_DELIVERY_RATE_LIMITS={"domains": {"gmail.com": "1/min"}})
+    def test_deferrals_are_counted_by_lane(self) -> None:
+        before = _sample("messaging_rate_limited_total", limiter="delivery", bucket="domain:gmail.com")
+        candidates = [(i, [f"u{i}@gmail.com"], "reset", {}) for i in range(4)]
+
+        DeliveryThrottle.select(candidates, 10)
+
+        self.assertEqual(_sample("messaging_rate_limited_total", limiter="delivery", bucket="domain:gmail.com") - before, 3)
+
+    def test_endpoint_serves_cached_depth_without_queries(self) -> None:
+        make_outbox("q1")
+        make_outbox("q2", priority=10)
+        make_outbox("r1", status=OutboxEmail.Status.RETRYING)
+        make_outbox("s1", status=OutboxEmail.Status.SENT)
+        metrics.refresh_outbox_snapshot()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("messaging:metrics"), HTTP_AUTHORIZATION="Bearer scrape-token")
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('messaging_outbox_depth{priority="100",status="queued"} 1.0', body)
+        self.assertIn('messaging_outbox_depth{priority="10",status="queued"} 1.0', body)
+        self.assertIn('messaging_outbox_depth{priority="100",status="retrying"} 1.0', body)
+        self.assertNotIn('status="sent"', body)
+        self.assertIn("messaging_outbox_oldest_due_age_seconds", body)
+
+    def test_endpoint_requires_token_or_staff(self) -> None:
+        url = reverse("messaging:metrics")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION="Bearer nope").status_code, 403)
+        staff = get_user_model().objects.create_user("ops", "ops@example.com", "pw", is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from apps.messaging import template_cache
+from apps.messaging.models import EmailTemplate
+from apps.messaging.services import TemplateService
+from apps.messaging.template_loader import FileSystemTemplateLoader
+
+
+class TemplateCacheTests(TestCase):
+    def setUp(self) -> None:
+        template_cache.invalidate_template_cache()
+        self.template = EmailTemplate.objects.create(
+            slug="tests/cache-welcome",
+            locale="fr",
+            version=1,
+            subject="Hi {{ user }}",
+            html_template="<p>Hello {{ user }}</p>",
+            text_template="Hello {{ user }}",
+        )
+
+    def tearDown(self) -> None:
+        template_cache.invalidate_template_cache()
+
+    def test_render_compiles_each_version_once(self) -> None:
+        with mock.patch("apps.messaging.template_cache.Template", wraps=template_cache.Template) as compile_:
+            for name in ("Ana", "Bob", "Cy"):
+                composition = TemplateService.render(self.template, {"user": name})
+                self.assertEqual(composition.subject, f"Hi {name}")
+                self.assertEqual(composition.text_body, f"Hello {name}")
+        self.assertEqual(compile_.call_count, 3)
+
+    def test_resolve_is_served_from_memory(self) -> None:
+        self.assertEqual(TemplateService.resolve("tests/cache-welcome", "fr").id, self.template.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(TemplateService.resolve("tests/cache-welcome", "fr").id, self.template.id)
+
+    def test_save_invalidates(self) -> None:
+        TemplateService.resolve("tests/cache-welcome", "fr")
+        TemplateService.render(self.template, {"user": "Ana"})
+        newer = EmailTemplate.objects.create(
+            slug="tests/cache-welcome", locale="fr", version=2,
+            subject="Welcome {{ user }}", html_template="<p>v2</p>", text_template="v2",
+        )
+
+        resolved = TemplateService.resolve("tests/cache-welcome", "fr")
+        self.assertEqual(resolved.id, newer.id)
+        self.assertEqual(TemplateService.render(resolved, {"user": "Ana"}).subject, "Welcome Ana")
+
+        self.template.subject = "Edited {{ user }}"
+        self.template.save()
+        self.assertEqual(TemplateService.render(self.template, {"user": "Ana"}).subject, "Edited Ana")
+
+    def test_loader_sync_invalidates(self) -> None:
+        TemplateService.resolve("tests/cache-welcome", "fr")
+        with tempfile.TemporaryDirectory() as tmp:
+            FileSystemTemplateLoader(root=Path(tmp), locale="fr").sync()
+        self.assertEqual(template_cache._resolved, {})
+
+    @override_settings(MESSAGING_TEMPLATE_CACHE_SIZE=2)
+    def test_compiled_cache_is_bounded(self) -> None:
+        templates = [
+            EmailTemplate.objects.create(
+                slug="tests/cache-welcome", locale="fr", version=version,
+                subject="s", html_template="h", text_template="t",
+            )
+            for version in range(2, 6)
+        ]
+        for tpl in templates:
+            template_cache.get_compiled(tpl)
+        self.assertEqual(list(template_cache._compiled), [template_cache.cache_key(t) for t in templates[-2:]])
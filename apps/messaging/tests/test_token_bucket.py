@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from apps.messaging.models import OutboxEmail
+from apps.messaging.rate_limiter import DeliveryThrottle, EmailRateLimiter
+from apps.messaging.tasks import drain_outbox_batch
+from apps.messaging.tests import make_outbox
+from apps.messaging.token_bucket import Bucket, LocalTokenBucket, parse_rate, refund
+
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.limiter = LocalTokenBucket()
+        self.bucket = Bucket("tests:tb", capacity=5, period=60)
+
+    def test_parse_rate(self) -> None:
+        self.assertEqual(parse_rate("600/min"), (600, 60))
+        self.assertEqual(parse_rate("10/s"), (10, 1))
+        self.assertIsNone(parse_rate(""))
+        self.assertIsNone(Bucket.from_rate("k", None))
+
+    def test_burst_then_refill(self) -> None:
+        results = [self.limiter.take([self.bucket], now=1000.0).allowed for _ in range(6)]
+        self.assertEqual(results, [True] * 5 + [False])
+
+        denied = self.limiter.take([self.bucket], now=1000.0)
+        self.assertEqual(denied.key, "tests:tb")
+        self.assertAlmostEqual(denied.retry_after, 12.0, places=2)
+        self.assertFalse(self.limiter.take([self.bucket], now=1011.0).allowed)
+        self.assertTrue(self.limiter.take([self.bucket], now=1012.0).allowed)
+
+    def test_no_double_burst_at_window_edge(self) -> None:
+        # A fixed 60 s window would accept 5 at t=59 and 5 more at t=60.
+        allowed = sum(self.limiter.take([self.bucket], now=59.0).allowed for _ in range(5))
+        allowed += sum(self.limiter.take([self.bucket], now=60.0).allowed for _ in range(5))
+        self.assertEqual(allowed, 5)
+
+    def test_take_is_all_or_nothing_across_buckets(self) -> None:
+        narrow = Bucket("tests:narrow", capacity=1, period=60)
+        self.assertTrue(self.limiter.take([self.bucket, narrow], now=0.0).allowed)
+        result = self.limiter.take([self.bucket, narrow], now=0.0)
+        self.assertEqual((result.allowed, result.key), (False, "tests:narrow"))
+        # the denied call did not consume from the wide bucket
+        self.assertEqual(sum(self.limiter.take([self.bucket], now=0.0).allowed for _ in range(5)), 4)
+
+    def test_refund_is_capped_at_capacity(self) -> None:
+        self.limiter.take([self.bucket], now=0.0)
+        refund([self.bucket], now=0.0)
+        refund([self.bucket], now=0.0)
+        self.assertEqual(sum(self.limiter.take([self.bucket], now=0.0).allowed for _ in range(6)), 5)
+
+
+RATES = {
+    "domains": {"gmail.com": "2/min"},
+    "default_domain": "",
+    "purposes": {"campaign": "100/min"},
+    "user": "",
+}
+
+
+@override_settings(MESSAGING_DELIVERY_RATE_LIMITS=RATES)
+class DeliveryThrottleTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_lanes(self) -> None:
+        keys = [b.key for b in DeliveryThrottle.buckets_for(to=["A@Gmail.com"], purpose="campaign:news")]
+        self.assertEqual(keys, ["emaildeliver:domain:gmail.com", "emaildeliver:purpose:campaign"])
+        self.assertEqual(DeliveryThrottle.buckets_for(to=["a@example.com"], purpose="reset"), [])
+
+    def test_drain_claims_only_deliverable_mail(self) -> None:
+        gmail = [make_outbox(f"g{i}", to=f"user{i}@gmail.com", purpose="campaign:news") for i in range(4)]
+        other = [make_outbox(f"o{i}", to=f"user{i}@example.com", purpose="campaign:news") for i in range(2)]
+
+        drain_outbox_batch.apply(kwargs={"limit": 5}).get()
+
+        claimed = set(
+            OutboxEmail.objects.exclude(status__in=[OutboxEmail.Status.QUEUED]).values_list("id", flat=True)
+        )
+        self.assertEqual(claimed, {gmail[0].id, gmail[1].id} | {o.id for o in other})
+        later = OutboxEmail.objects.filter(id__in=[gmail[2].id, gmail[3].id])
+        self.assertEqual(set(later.values_list("status", flat=True)), {OutboxEmail.Status.QUEUED})
+        self.assertTrue(all(o.scheduled_at > timezone.now() for o in later))
+
+
+@override_settings(
+    EMAIL_RATE_LIMIT={"email_verification": {"window_seconds": 300, "max_per_window": 1, "include_failed": False}}
+)
+class RateLimitRefundTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_failed_send_gives_the_token_back(self) -> None:
+        self.assertTrue(EmailRateLimiter.evaluate(user_id=7, purpose="email_verification").allowed)
+        self.assertFalse(EmailRateLimiter.evaluate(user_id=7, purpose="email_verification").allowed)
+
+        failed = OutboxEmail(purpose="email_verification", metadata={"user_id": 7, "rate_limit": {}})
+        self.assertTrue(EmailRateLimiter.release_failed(failed))
+        self.assertTrue(EmailRateLimiter.evaluate(user_id=7, purpose="email_verification").allowed)
@@ -0,0 +1,193 @@
+"""Token buckets for email rate limiting, atomic across several buckets at once.
+
+With django-redis a single Lua script refills every requested bucket, checks that
+each one holds enough tokens and only then debits them all: a message is either
+admitted by every lane (user, purpose, recipient domain) or by none, and a denied
+check consumes nothing. Unlike fixed-window counters there is no 2x burst at
+window edges: capacity is the burst, the refill rate is the sustained limit.
+
+Without Redis (locmem in tests/dev) ``LocalTokenBucket`` applies the same rules on
+the Django cache under a process lock. If Redis is unreachable the limiter fails
+open and logs.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from django.core.cache import cache, caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+log = logging.getLogger("messaging.token_bucket")
+
+_PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+_LUA_TAKE = """
+local now = tonumber(ARGV[1])
+local n = #KEYS
+local left = {}
+for i = 1, n do
+  local cap = tonumber(ARGV[(i - 1) * 3 + 2])
+  local rate = tonumber(ARGV[(i - 1) * 3 + 3])
+  local cost = tonumber(ARGV[(i - 1) * 3 + 4])
+  local data = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+  local tokens = tonumber(data[1])
+  local ts = tonumber(data[2])
+  if tokens == nil then
+    tokens = cap
+    ts = now
+  end
+  tokens = math.min(cap, tokens + math.max(0, now - ts) * rate)
+  if tokens < cost then
+    return {0, i, math.ceil((cost - tokens) / rate)}
+  end
+  left[i] = math.min(cap, tokens - cost)
+end
+for i = 1, n do
+  local cap = tonumber(ARGV[(i - 1) * 3 + 2])
+  local rate = tonumber(ARGV[(i - 1) * 3 + 3])
+  redis.call('HSET', KEYS[i], 'tokens', tostring(left[i]), 'ts', now)
+  redis.call('PEXPIRE', KEYS[i], math.ceil(cap / rate) + 1000)
+end
+return {1, 0, 0}
+"""
+
+
+@dataclass(frozen=True)
+class Bucket:
+    """``capacity`` tokens, refilled at ``capacity / period`` tokens per second."""
+
+    key: str
+    capacity: int
+    period: float
+
+    @property
+    def rate_per_ms(self) -> float:
+        return self.capacity / (self.period * 1000.0)
+
+    @classmethod
+    def from_rate(cls, key: str, rate: Optional[str]) -> Optional["Bucket"]:
+        parsed = parse_rate(rate)
+        if parsed is None:
+            return None
+        return cls(key=key, capacity=parsed[0], period=parsed[1])
+
+
+@dataclass(frozen=True)
+class TakeResult:
+    allowed: bool = True
+    key: str = ""
+    retry_after: float = 0.0
+
+
+def parse_rate(rate: Optional[str]) -> Optional[Tuple[int, int]]:
+    """ "600/min" -> (600, 60); None/"" -> no limit."""
+    if not rate:
+        return None
+    num, period = str(rate).split("/", 1)
+    count = int(num)
+    if count <= 0:
+        return None
+    return count, _PERIODS[period.strip()[0].lower()]
+
+
+class RedisTokenBucket:
+    def __init__(self, client) -> None:
+        self.client = client
+        self._script = client.register_script(_LUA_TAKE)
+
+    def take(self, buckets: Sequence[Bucket], *, now: float, cost: int = 1) -> TakeResult:
+        if not buckets:
+            return TakeResult()
+        args: List = [int(now * 1000)]
+        for bucket in buckets:
+            args += [bucket.capacity, repr(bucket.rate_per_ms), cost]
+        try:
+            allowed, index, wait_ms = self._script(keys=[cache.make_key(b.key) for b in buckets], args=args)
+        except Exception:
+            log.exception("token_bucket_unavailable", extra={"buckets": len(buckets)})
+            return TakeResult()
+        if int(allowed):
+            return TakeResult()
+        return TakeResult(False, buckets[int(index) - 1].key, max(float(wait_ms), 0.0) / 1000.0)
+
+
+class LocalTokenBucket:
+    """Same semantics on the Django cache (locmem), atomic within the process."""
+
+    _lock = threading.Lock()
+
+    def take(self, buckets: Sequence[Bucket], *, now: float, cost: int = 1) -> TakeResult:
+        if not buckets:
+            return TakeResult()
+        now_ms = now * 1000.0
+        with self._lock:
+            left = []
+            for bucket in buckets:
+                tokens, ts = cache.get(bucket.key) or (bucket.capacity, now_ms)
+                rate = bucket.rate_per_ms
+                tokens = min(bucket.capacity, tokens + max(0.0, now_ms - ts) * rate)
+                if tokens < cost:
+                    return TakeResult(False, bucket.key, math.ceil((cost - tokens) / rate) / 1000.0)
+                left.append((bucket, min(bucket.capacity, tokens - cost)))
+            for bucket, tokens in left:
+                cache.set(bucket.key, (tokens, now_ms), math.ceil(bucket.period) + 1)
+        return TakeResult()
+
+
+def refund(buckets: Sequence[Bucket], *, now: float) -> None:
+    """Give one token back (capped at capacity), e.g. for a send that never happened."""
+    get_limiter().take(buckets, now=now, cost=-1)
+
+
+_limiter = None
+
+
+def _redis_client():
+    try:
+        from django_redis import get_redis_connection
+        from django_redis.cache import RedisCache
+    except ImportError:
+        return None
+    if not isinstance(caches["default"], RedisCache):
+        return None
+    try:
+        return get_redis_connection("default")
+    except Exception:
+        log.exception("token_bucket_redis_connection_failed")
+        return None
+
+
+def get_limiter():
+    global _limiter
+    if _limiter is None:
+        client = _redis_client()
+        _limiter = RedisTokenBucket(client) if client is not None else LocalTokenBucket()
+    return _limiter
+
+
+def reset_limiter() -> None:
+    global _limiter
+    _limiter = None
+
+
+@receiver(setting_changed)
+def _on_setting_changed(setting=None, **kwargs):
+    if setting == "CACHES":
+        reset_limiter()
+
+
+__all__ = [
+    "Bucket",
+    "LocalTokenBucket",
+    "RedisTokenBucket",
+    "TakeResult",
+    "get_limiter",
+    "parse_rate",
+    "refund",
+    "reset_limiter",
+]
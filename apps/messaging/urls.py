@@ -9,6 +9,7 @@ app_name = "messaging"
 
 urlpatterns = [
     path("health/", views.healthcheck, name="healthcheck"),
+    path("metrics/", views.prometheus_metrics, name="metrics"),
     path("verify/", views.VerifyEmailView.as_view(), name="verify-email"),
     path("unsubscribe/", views.UnsubscribeView.as_view(), name="unsubscribe"),
     path("reset/request/", views.PasswordResetRequestView.as_view(), name="password-reset-request"),
@@ -1,6 +1,7 @@
 """Public endpoints for messaging flows."""
 from __future__ import annotations
 
+import hmac
 import logging
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -16,6 +17,8 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from . import link_cache
+from . import metrics as messaging_metrics
 from .constants import (
     DEFAULT_SITE_NAME,
     EMAIL_VERIFICATION_TTL_SECONDS,
@@ -44,8 +47,23 @@ def healthcheck(_request: HttpRequest) -> JsonResponse:
     return JsonResponse({"status": "ok", "app": "messaging"})
 
 
+def prometheus_metrics(request: HttpRequest) -> HttpResponse:
+    """Prometheus scrape endpoint; with the bearer token no DB query is made."""
+    if not messaging_metrics.metrics_enabled():
+        return HttpResponse("prometheus_client not installed\n", status=503, content_type="text/plain")
+    token = getattr(settings, "MESSAGING_METRICS_TOKEN", "")
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    if token and header.startswith("Bearer "):
+        allowed = hmac.compare_digest(header[len("Bearer "):].encode(), token.encode())
+    else:
+        allowed = bool(getattr(request, "user", None) and request.user.is_staff)
+    if not allowed:
+        return HttpResponse(status=403)
+    return HttpResponse(messaging_metrics.render_metrics(), content_type=messaging_metrics.CONTENT_TYPE_LATEST)
+
+
 class MessagingBaseView(View):
-    http_method_names = ["get"]
+    http_method_names = ["get", "head"]
 
     def _missing_token(self) -> JsonResponse:
         return JsonResponse({"status": "error", "code": "missing_token"}, status=400)
@@ -56,55 +74,74 @@ class MessagingBaseView(View):
     def _invalid(self, message: str) -> JsonResponse:
         return JsonResponse({"status": "error", "code": "invalid", "detail": message}, status=400)
 
+    def _rejected(self, detail: str) -> dict:
+        return {"ok": False, "detail": detail}
+
+    def _load_profile(self, payload) -> tuple:
+        """(user, profile, None) or (None, None, rejected outcome) for a verified token."""
+
+        user_id = payload.claims.get("user_id")
+        if not user_id:
+            return None, None, self._rejected("Requête incomplète.")
+        try:
+            user = UserModel.objects.select_related("profile").get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None, None, self._rejected("Utilisateur introuvable.")
+        profile = getattr(user, "profile", None)
+        if not profile:
+            return None, None, self._rejected("Profil utilisateur indisponible.")
+        return user, profile, None
+
 
 class VerifyEmailView(MessagingBaseView):
     def get(self, request: HttpRequest, *args, **kwargs) -> JsonResponse:
-        redirect_mode = request.GET.get("redirect", "1") != "0"
+        prefetch = link_cache.is_prefetch(request)
+        redirect_mode = not prefetch and request.GET.get("redirect", "1") != "0"
         token = request.GET.get("t")
         if not token:
             if redirect_mode:
                 request.session[VERIFICATION_ERROR_SESSION_KEY] = "Token manquant."
                 return redirect(reverse("pages:verification_error"))
             return self._missing_token()
-        try:
-            payload = TokenService.read_signed(
-                token,
-                namespace=TOKEN_NAMESPACE_ACCOUNTS,
-                purpose=TOKEN_PURPOSE_VERIFY_EMAIL,
-                ttl_seconds=EMAIL_VERIFICATION_TTL_SECONDS,
-            )
-        except TokenExpiredError:
-            if redirect_mode:
-                request.session[VERIFICATION_ERROR_SESSION_KEY] = "Token expiré. Merci de demander un nouveau lien."
-                return redirect(reverse("pages:verification_error"))
-            return self._expired("Token expiré. Merci de demander un nouveau lien.")
-        except TokenInvalidError:
-            if redirect_mode:
-                request.session[VERIFICATION_ERROR_SESSION_KEY] = "Token invalide."
-                return redirect(reverse("pages:verification_error"))
-            return self._invalid("Token invalide.")
 
-        user_id = payload.claims.get("user_id")
-        if not user_id:
+        outcome = None if prefetch else link_cache.cached_outcome(TOKEN_PURPOSE_VERIFY_EMAIL, token)
+        if outcome is None:
+            try:
+                payload = TokenService.read_signed(
+                    token,
+                    namespace=TOKEN_NAMESPACE_ACCOUNTS,
+                    purpose=TOKEN_PURPOSE_VERIFY_EMAIL,
+                    ttl_seconds=EMAIL_VERIFICATION_TTL_SECONDS,
+                )
+            except TokenExpiredError:
+                if redirect_mode:
+                    request.session[VERIFICATION_ERROR_SESSION_KEY] = "Token expiré. Merci de demander un nouveau lien."
+                    return redirect(reverse("pages:verification_error"))
+                return self._expired("Token expiré. Merci de demander un nouveau lien.")
+            except TokenInvalidError:
+                if redirect_mode:
+                    request.session[VERIFICATION_ERROR_SESSION_KEY] = "Token invalide."
+                    return redirect(reverse("pages:verification_error"))
+                return self._invalid("Token invalide.")
+            if prefetch:
+                return link_cache.prefetch_response()
+            outcome = link_cache.remember_outcome(TOKEN_PURPOSE_VERIFY_EMAIL, token, self._verify(payload))
+
+        if not outcome["ok"]:
             if redirect_mode:
-                request.session[VERIFICATION_ERROR_SESSION_KEY] = "Requête incomplète."
+                request.session[VERIFICATION_ERROR_SESSION_KEY] = outcome["detail"]
                 return redirect(reverse("pages:verification_error"))
-            return self._invalid("Requête incomplète.")
+            return self._invalid(outcome["detail"])
 
-        try:
-            user = UserModel.objects.select_related("profile").get(pk=user_id)
-        except UserModel.DoesNotExist:
-            if redirect_mode:
-                request.session[VERIFICATION_ERROR_SESSION_KEY] = "Utilisateur introuvable."
-                return redirect(reverse("pages:verification_error"))
-            return self._invalid("Utilisateur introuvable.")
+        if redirect_mode:
+            request.session.pop(VERIFICATION_ERROR_SESSION_KEY, None)
+            return redirect(reverse("pages:verification_success"))
+        return JsonResponse(outcome["data"])
 
-        profile = getattr(user, "profile", None)
-        if not profile:
-            if redirect_mode:
-                request.session[VERIFICATION_ERROR_SESSION_KEY] = "Profil utilisateur indisponible."
-                return redirect(reverse("pages:verification_error"))
-            return self._invalid("Profil utilisateur indisponible.")
+    def _verify(self, payload) -> dict:
+        user, profile, rejected = self._load_profile(payload)
+        if rejected:
+            return rejected
 
         now = timezone.now()
         update_fields = ["email_verified", "email_verified_at"]
@@ -116,18 +153,15 @@ class VerifyEmailView(MessagingBaseView):
             profile.save(update_fields=update_fields)
             log.info("email_verified", extra={"user_id": user.id})
 
-        if redirect_mode:
-            request.session.pop(VERIFICATION_ERROR_SESSION_KEY, None)
-            return redirect(reverse("pages:verification_success"))
-
-        return JsonResponse(
-            {
+        return {
+            "ok": True,
+            "data": {
                 "status": "verified",
                 "user_id": user.id,
                 "email": user.email,
                 "verified_at": profile.email_verified_at.isoformat() if profile.email_verified_at else None,
-            }
-        )
+            },
+        }
 
 
 class UnsubscribeView(MessagingBaseView):
@@ -135,30 +169,33 @@ class UnsubscribeView(MessagingBaseView):
         token = request.GET.get("t")
         if not token:
             return self._missing_token()
-        try:
-            payload = TokenService.read_signed(
-                token,
-                namespace=TOKEN_NAMESPACE_ACCOUNTS,
-                purpose=TOKEN_PURPOSE_UNSUBSCRIBE,
-                ttl_seconds=UNSUBSCRIBE_TTL_SECONDS,
-            )
-        except TokenExpiredError:
-            return self._expired("Lien expiré. Merci de te désinscrire via ton espace.")
-        except TokenInvalidError:
-            return self._invalid("Token invalide.")
-
-        user_id = payload.claims.get("user_id")
-        if not user_id:
-            return self._invalid("Requête incomplète.")
-
-        try:
-            user = UserModel.objects.select_related("profile").get(pk=user_id)
-        except UserModel.DoesNotExist:
-            return self._invalid("Utilisateur introuvable.")
 
-        profile = getattr(user, "profile", None)
-        if not profile:
-            return self._invalid("Profil utilisateur indisponible.")
+        prefetch = link_cache.is_prefetch(request)
+        outcome = None if prefetch else link_cache.cached_outcome(TOKEN_PURPOSE_UNSUBSCRIBE, token)
+        if outcome is None:
+            try:
+                payload = TokenService.read_signed(
+                    token,
+                    namespace=TOKEN_NAMESPACE_ACCOUNTS,
+                    purpose=TOKEN_PURPOSE_UNSUBSCRIBE,
+                    ttl_seconds=UNSUBSCRIBE_TTL_SECONDS,
+                )
+            except TokenExpiredError:
+                return self._expired("Lien expiré. Merci de te désinscrire via ton espace.")
+            except TokenInvalidError:
+                return self._invalid("Token invalide.")
+            if prefetch:
+                return link_cache.prefetch_response()
+            outcome = link_cache.remember_outcome(TOKEN_PURPOSE_UNSUBSCRIBE, token, self._unsubscribe(payload))
+
+        if not outcome["ok"]:
+            return self._invalid(outcome["detail"])
+        return JsonResponse(outcome["data"])
+
+    def _unsubscribe(self, payload) -> dict:
+        user, profile, rejected = self._load_profile(payload)
+        if rejected:
+            return rejected
 
         now = timezone.now()
         update_fields = ["marketing_opt_in", "marketing_opt_out_at"]
@@ -170,14 +207,15 @@ class UnsubscribeView(MessagingBaseView):
             profile.save(update_fields=update_fields)
             log.info("marketing_unsubscribe", extra={"user_id": user.id})
 
-        return JsonResponse(
-            {
+        return {
+            "ok": True,
+            "data": {
                 "status": "unsubscribed",
                 "user_id": user.id,
                 "email": user.email,
                 "unsubscribed_at": profile.marketing_opt_out_at.isoformat() if profile.marketing_opt_out_at else None,
-            }
-        )
+            },
+        }
 
 
 class PasswordResetRequestView(APIView):